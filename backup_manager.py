@@ -0,0 +1,206 @@
+# backup_manager.py
+
+# Инкрементальные дедуплицированные бэкапы сохранений мира (content-addressed хранилище)
+import os
+import json
+import time
+import zlib
+import shutil
+import hashlib
+import logging
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from file_manager import atomic_write_text
+
+SAVE_COMPLETE_MARKERS = ("World saved", "Saving finished")
+RESTORE_SUFFIX = '.restoring'  # мир собирается рядом с сохранением и подменяет его целиком
+REPLACED_SUFFIX = '.replaced'
+STALE_TMP_SECONDS = 3600
+
+
+def get_world_save_dir(zomboid_directory, server_name):
+    return os.path.join(zomboid_directory, 'Saves', 'Multiplayer', server_name)
+
+
+def _object_path(backup_root, file_hash):
+    return os.path.join(backup_root, 'objects', file_hash[:2], f"{file_hash}.z")
+
+
+def _snapshots_dir(backup_root):
+    return os.path.join(backup_root, 'snapshots')
+
+
+def list_snapshots(backup_root):
+    """Список id снапшотов, от старых к новым."""
+    snapshots_dir = _snapshots_dir(backup_root)
+    if not os.path.isdir(snapshots_dir):
+        return []
+    return sorted(name[:-5] for name in os.listdir(snapshots_dir) if name.endswith('.json'))
+
+
+def load_manifest(backup_root, snapshot_id):
+    with open(os.path.join(_snapshots_dir(backup_root), f"{snapshot_id}.json"), 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def _store_file(path, backup_root):
+    """Хеширует и сжимает файл за один проход. Возвращает (hash, stored_bytes)."""
+    digest = hashlib.blake2b(digest_size=20)
+    compressor = zlib.compressobj(6)
+    tmp_path = os.path.join(backup_root, 'objects', f".tmp_{os.getpid()}_{id(compressor)}")
+    try:
+        with open(path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            for chunk in iter(lambda: src.read(1024 * 1024), b''):
+                digest.update(chunk)
+                dst.write(compressor.compress(chunk))
+            dst.write(compressor.flush())
+        file_hash = digest.hexdigest()
+        obj_path = _object_path(backup_root, file_hash)
+        if os.path.exists(obj_path):
+            return file_hash, 0
+        os.makedirs(os.path.dirname(obj_path), exist_ok=True)
+        stored = os.path.getsize(tmp_path)
+        os.replace(tmp_path, obj_path)
+        return file_hash, stored
+    finally:
+        # Объект уже есть или чтение/запись оборвались: временный файл не должен остаться в хранилище
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def create_snapshot(source_dir, backup_root, max_workers=None):
+    """
+    Снимает снапшот source_dir. Файлы с теми же size/mtime, что и в предыдущем снапшоте,
+    не читаются; измененные хешируются и сжимаются параллельно, одинаковое содержимое хранится один раз.
+    """
+    os.makedirs(os.path.join(backup_root, 'objects'), exist_ok=True)
+    os.makedirs(_snapshots_dir(backup_root), exist_ok=True)
+    snapshots = list_snapshots(backup_root)
+    previous = load_manifest(backup_root, snapshots[-1])['files'] if snapshots else {}
+
+    files = {}
+    changed = []
+    for dirpath, _, filenames in os.walk(source_dir):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            rel_path = os.path.relpath(path, source_dir).replace(os.sep, '/')
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entry = previous.get(rel_path)
+            if entry and entry[1] == st.st_size and entry[2] == st.st_mtime_ns:
+                files[rel_path] = entry
+            else:
+                changed.append((rel_path, path, st))
+
+    max_workers = max_workers or min(8, os.cpu_count() or 1)
+    stored_bytes = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda item: _store_file(item[1], backup_root), changed)
+        for (rel_path, _, st), (file_hash, stored) in zip(changed, results):
+            files[rel_path] = [file_hash, st.st_size, st.st_mtime_ns]
+            stored_bytes += stored
+
+    snapshot_id = datetime.now().strftime('%Y%m%d-%H%M%S')
+    if snapshot_id in snapshots:
+        snapshot_id += f"-{len(snapshots)}"
+    manifest = {'id': snapshot_id, 'created': time.time(), 'source': source_dir, 'files': files}
+    atomic_write_text(os.path.join(_snapshots_dir(backup_root), f"{snapshot_id}.json"), json.dumps(manifest))
+
+    stats = {'id': snapshot_id, 'files': len(files), 'changed': len(changed), 'stored_bytes': stored_bytes}
+    logging.info(f"Created backup snapshot {snapshot_id} of {source_dir}: {stats}")
+    return stats
+
+
+def _recover_interrupted_restore(target_dir):
+    """Убирает следы прерванного восстановления; если мир успели убрать, но не подменить - возвращает его."""
+    replaced_dir = target_dir + REPLACED_SUFFIX
+    if os.path.isdir(replaced_dir):
+        if os.path.exists(target_dir):
+            shutil.rmtree(replaced_dir)
+        else:
+            os.replace(replaced_dir, target_dir)
+    if os.path.isdir(target_dir + RESTORE_SUFFIX):
+        shutil.rmtree(target_dir + RESTORE_SUFFIX)
+
+
+def restore_snapshot(backup_root, snapshot_id, target_dir):
+    """
+    Восстанавливает снапшот вместо target_dir. Файлы распаковываются в соседнюю папку и подменяют мир
+    переименованием: ошибка на середине не трогает текущее сохранение. Файлов, которых нет в снапшоте,
+    после восстановления не остается.
+    """
+    files = load_manifest(backup_root, snapshot_id)['files']
+    _recover_interrupted_restore(target_dir)
+    restore_dir = target_dir + RESTORE_SUFFIX
+
+    def restore(item):
+        rel_path, (file_hash, _, mtime_ns) = item
+        path = os.path.join(restore_dir, *rel_path.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        decompressor = zlib.decompressobj()
+        with open(_object_path(backup_root, file_hash), 'rb') as src, open(path, 'wb') as dst:
+            for chunk in iter(lambda: src.read(1024 * 1024), b''):
+                dst.write(decompressor.decompress(chunk))
+            dst.write(decompressor.flush())
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    os.makedirs(restore_dir)
+    try:
+        with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as executor:
+            list(executor.map(restore, files.items()))
+    except BaseException:
+        shutil.rmtree(restore_dir, ignore_errors=True)
+        raise
+
+    replaced_dir = target_dir + REPLACED_SUFFIX
+    if os.path.exists(target_dir):
+        os.replace(target_dir, replaced_dir)
+    try:
+        os.replace(restore_dir, target_dir)
+    except OSError:
+        if os.path.exists(replaced_dir):
+            os.replace(replaced_dir, target_dir)
+        raise
+    shutil.rmtree(replaced_dir, ignore_errors=True)
+    logging.info(f"Restored snapshot {snapshot_id} to {target_dir} ({len(files)} files)")
+    return len(files)
+
+
+def prune_snapshots(backup_root, keep_last=24, keep_daily=7):
+    """Оставляет keep_last последних снапшотов и по одному на день за keep_daily дней, остальное удаляет."""
+    snapshots = list_snapshots(backup_root)
+    keep = set(snapshots[-keep_last:]) if keep_last else set()
+    days = []
+    for snapshot_id in reversed(snapshots):
+        day = snapshot_id.split('-')[0]
+        if day not in days:
+            days.append(day)
+            if len(days) <= keep_daily:
+                keep.add(snapshot_id)
+
+    removed = [snapshot_id for snapshot_id in snapshots if snapshot_id not in keep]
+    for snapshot_id in removed:
+        os.remove(os.path.join(_snapshots_dir(backup_root), f"{snapshot_id}.json"))
+
+    freed = 0
+    if removed:
+        referenced = set()
+        for snapshot_id in keep:
+            referenced.update(entry[0] for entry in load_manifest(backup_root, snapshot_id)['files'].values())
+        objects_dir = os.path.join(backup_root, 'objects')
+        now = time.time()
+        for dirpath, _, filenames in os.walk(objects_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if filename.endswith('.z'):
+                    unused = filename[:-2] not in referenced
+                else:
+                    # Временные файлы процессов, упавших посреди бэкапа
+                    unused = filename.startswith('.tmp_') and now - os.path.getmtime(path) > STALE_TMP_SECONDS
+                if unused:
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+    logging.info(f"Pruned {len(removed)} snapshots in {backup_root}, freed {freed} bytes")
+    return removed, freed
@@ -0,0 +1,82 @@
+# benchmarks/bench_console_archive.py
+
+# Стоимость архива консоли: append в потоке вывода, фоновая запись и поиск по месяцам логов.
+# python benchmarks/bench_console_archive.py [--lines 1000000] [--days 90]
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from console_archive import ConsoleArchive  # noqa: E402
+
+PLAYERS = ['Bob', 'Kate', 'Ivan', 'Malts', 'Zed', 'Anna', 'Petr', 'Lucy']
+TEMPLATES = [
+    'LOG  : General     , {t}> Chat: [{player}] {words}',
+    'LOG  : Network     , {t}> [{player}] connected from 10.0.0.{n}',
+    'LOG  : General     , {t}> Saving world... {n} chunks',
+    'WARN : Lua         , {t}> Item not found: Base.{word}',
+    'LOG  : Multiplayer , {t}> Player {player} disconnected',
+]
+WORDS = ['zombie', 'helicopter', 'generator', 'base', 'loot', 'car', 'gun', 'trade', 'raid', 'farm', 'river', 'bridge']
+
+
+def make_line(rng, index):
+    return rng.choice(TEMPLATES).format(t=index, player=rng.choice(PLAYERS), n=rng.randint(1, 254),
+                                        word=rng.choice(WORDS).capitalize(),
+                                        words=' '.join(rng.sample(WORDS, rng.randint(2, 6))))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lines', type=int, default=1000000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--chunk', type=int, default=50, help='lines per display_output call')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='console_archive_bench_')
+    rng = random.Random(1)
+    try:
+        archive = ConsoleArchive(directory, max_segment_bytes=8 * 1024 * 1024, flush_interval=0.2)
+        start = time.time() - args.days * 86400
+        step = args.days * 86400 / args.lines
+        chunks = []
+        for offset in range(0, args.lines, args.chunk):
+            chunks.append((start + offset * step, [make_line(rng, index)
+                                                   for index in range(offset, min(args.lines, offset + args.chunk))]))
+
+        started = time.perf_counter()
+        for received, lines in chunks:
+            archive.append('servertest', lines, received)
+        hot = time.perf_counter() - started
+        print(f"append (output path): {hot / args.lines * 1e9:.0f} ns/line, {len(chunks)} calls")
+
+        archive.flush(timeout=600)
+        drained = time.perf_counter() - started
+        print(f"background write + index: {args.lines / drained:,.0f} lines/s")
+
+        queries = [('helicopter raid', {}), ('Malts', {'since': time.time() - 7 * 86400}),
+                   ('Chat Kate generator', {'since': start + 30 * 86400, 'until': start + 31 * 86400}),
+                   ('Base.Generator', {}), ('nosuchword', {})]
+        for text, period in queries:
+            archive.search(text, **period)
+            started = time.perf_counter()
+            rows = archive.search(text, **period)
+            print(f"search {text!r:28} {len(rows):4d} rows in {(time.perf_counter() - started) * 1000:7.2f} ms")
+        archive.close()
+        sizes = {}
+        for root, _, names in os.walk(directory):
+            for name in names:
+                part = 'segments' if os.path.basename(root) == 'segments' else 'index'
+                sizes[part] = sizes.get(part, 0) + os.path.getsize(os.path.join(root, name))
+        print(f"archive size: index {sizes.get('index', 0) / 1024 / 1024:.1f} MB, "
+              f"segments {sizes.get('segments', 0) / 1024 / 1024:.1f} MB")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
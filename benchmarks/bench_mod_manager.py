@@ -0,0 +1,258 @@
+# benchmarks/bench_mod_manager.py
+
+# Время операций Mod Manager на синтетических каталогах (Qt без окна, QT_QPA_PLATFORM=offscreen):
+# python benchmarks/bench_mod_manager.py [--sizes 100,1000,10000,50000] [--repeat 5] [--save-baseline]
+# Каждый запуск дописывается в историю (--history); при медиане хуже базовой на --threshold и больше чем
+# на --min-delta-ms операция помечается как регрессия, и скрипт завершается с кодом 1.
+import os
+import sys
+import json
+import time
+import random
+import inspect
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+from bench_mod_search import make_catalog  # noqa: E402
+from preset_store import write_preset  # noqa: E402
+
+SIZES = [100, 1000, 10000, 50000]
+HISTORY_PATH = os.path.join(BENCH_DIR, 'mod_manager_history.json')
+BASELINE_PATH = os.path.join(BENCH_DIR, 'mod_manager_baseline.json')
+OPERATIONS = ['load_inactive_mods', 'load_active_mods', 'move_mod_to_active', 'toggle_mod_item', 'save_preset',
+              'load_preset_from_path', 'remove_selected_mod', 'check_and_remove_duplicates']
+# Методы окна, которые не нужны вкладке Mod Manager или требуют остального окна
+SKIPPED_METHODS = {'__init__', 'closeEvent', 'append_to_console'}
+
+
+def make_dataset(directory, count, seed=1):
+    """modsdb.json на count модов, activemods.json (каждый десятый) и два пресета в modpacks/."""
+    rng = random.Random(seed)
+    catalog = make_catalog(count, seed)
+    for index, mod in enumerate(catalog):
+        # Часть модов требует другой мод каталога (require= из mod.info)
+        if index and rng.random() < 0.2:
+            required = catalog[rng.randrange(index)]['Mod ID'][0]
+            mod['require'] = {mod['Mod ID'][0]: [required]}
+    active = [dict(mod, disabled_mod_ids=[], disabled_map_folders=[]) for mod in catalog[::10]]
+    for name, mods in (('modsdb.json', catalog), ('activemods.json', active)):
+        with open(os.path.join(directory, name), 'w', encoding='utf-8') as file:
+            json.dump(mods, file, ensure_ascii=False)
+    modpacks_dir = os.path.join(directory, 'modpacks')
+    os.makedirs(modpacks_dir)
+    # Пресеты отличаются от активных модов: загрузка по очереди всегда дает непустую разницу
+    half = max(1, len(active) // 2)
+    presets = []
+    for name, mods in (('bench-a.json', active[:half] + catalog[1::10][:half]),
+                       ('bench-b.json', active[half:] + catalog[2::10][:half])):
+        path = os.path.join(modpacks_dir, name)
+        write_preset(path, mods)
+        presets.append(path)
+    return presets
+
+
+def create_host_class():
+    """
+    Класс с методами MainWindow, но без остального окна (браузер, наблюдатель, таймеры сервера):
+    замеряется тот же код, что вызывают кнопки вкладки.
+    """
+    import ui_main
+    from PySide6.QtWidgets import QWidget, QHBoxLayout
+    from PySide6.QtCore import QTimer
+    from mod_journal import ModStore
+    from mod_search import TrigramIndex
+
+    class Dialogs:
+        """Модальные окна заменены ответами без ожидания пользователя."""
+        preset_name = 'bench'
+
+        @staticmethod
+        def information(*args, **kwargs):
+            return None
+
+        warning = information
+        question = information
+
+        @classmethod
+        def getText(cls, *args, **kwargs):
+            return cls.preset_name, True
+
+    ui_main.QMessageBox = Dialogs
+    ui_main.QInputDialog = Dialogs
+
+    def __init__(self, directory):
+        QWidget.__init__(self)
+        self.console_lines = []
+        self.mod_store = ModStore(os.path.join(directory, 'modstore'),
+                                  {'catalog': os.path.join(directory, 'modsdb.json'),
+                                   'active': os.path.join(directory, 'activemods.json')})
+        self.mod_store_timer = QTimer(self)
+        self.mod_store_timer.setSingleShot(True)
+        self.mod_search_index = TrigramIndex()
+        self.mod_search_seq = None
+        self.create_mod_manager_tab(QHBoxLayout(self))
+
+    def append_to_console(self, text):
+        self.console_lines.append(text)
+
+    methods = {name: value for name, value in vars(ui_main.MainWindow).items()
+               if inspect.isfunction(value) and name not in SKIPPED_METHODS}
+    methods.update(__init__=__init__, append_to_console=append_to_console)
+    return type('ModManagerHost', (QWidget,), methods), Dialogs
+
+
+def prepare(host, operation, state):
+    """Состояние перед замером: выбранный элемент, дубликаты и т.п. Возвращает аргументы вызова."""
+    if operation == 'move_mod_to_active':
+        host.inactive_mods_list.setCurrentRow(host.inactive_mods_list.count() // 2)
+    elif operation == 'toggle_mod_item':
+        mod_ids = host.active_mods_tree.topLevelItem(0).child(0)
+        return mod_ids.child(0), 0
+    elif operation == 'save_preset':
+        state['dialogs'].preset_name = f"bench-saved-{state['run']}"
+    elif operation == 'load_preset_from_path':
+        return (state['presets'][state['run'] % 2],)
+    elif operation == 'remove_selected_mod':
+        host.active_mods_tree.setCurrentItem(
+            host.active_mods_tree.topLevelItem(host.active_mods_tree.topLevelItemCount() - 1))
+    elif operation == 'check_and_remove_duplicates':
+        with host.mod_store.transaction("bench duplicates") as tx:
+            for mod in host.mod_store.active[:10]:
+                tx.append('active', mod)
+    return ()
+
+
+def run_size(host_class, dialogs, size, repeat):
+    root = tempfile.mkdtemp(prefix=f'pzmm-bench-{size}-')
+    presets = make_dataset(root, size)
+    cwd = os.getcwd()
+    os.chdir(root)  # modpacks/ ищется в текущей папке
+    host = host_class(root)
+    try:
+        host.load_active_mods()
+        host.load_inactive_mods()
+        results = {}
+        for operation in OPERATIONS:
+            timings = []
+            for run in range(repeat):
+                args = prepare(host, operation, {'dialogs': dialogs, 'presets': presets, 'run': run})
+                started = time.perf_counter()
+                getattr(host, operation)(*args)
+                timings.append((time.perf_counter() - started) * 1000)
+                host.mod_store_timer.stop()
+                host.flush_mod_store()  # в окне это делает таймер после последнего изменения
+            results[operation] = {'median_ms': round(statistics.median(timings), 3),
+                                  'min_ms': round(min(timings), 3), 'runs': repeat}
+        return results
+    finally:
+        host.mod_store.close()
+        host.deleteLater()
+        os.chdir(cwd)
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(BENCH_DIR),
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def load_json(path, default):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    return default
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """[(размер, операция, базовая медиана, текущая)] для операций, ставших медленнее порога."""
+    regressions = []
+    for size, operations in results.items():
+        for operation, timing in operations.items():
+            base = baseline.get(size, {}).get(operation)
+            if base is None:
+                continue
+            current, previous = timing['median_ms'], base['median_ms']
+            if current > previous * (1 + threshold) and current - previous > min_delta_ms:
+                regressions.append((size, operation, previous, current))
+    return regressions
+
+
+def print_table(results, baseline):
+    print(f"{'operation':30}" + ''.join(f"{size + ' mods':>20}" for size in results))
+    for operation in OPERATIONS:
+        row = f"{operation:30}"
+        for size, operations in results.items():
+            current = operations[operation]['median_ms']
+            base = baseline.get(size, {}).get(operation)
+            ratio = f" x{current / base['median_ms']:.2f}" if base and base['median_ms'] else ''
+            row += f"{current:>12.2f} ms{ratio:>6}"
+        print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default=','.join(map(str, SIZES)))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--history', default=HISTORY_PATH)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help="записать этот запуск как базовый")
+    parser.add_argument('--threshold', type=float, default=0.25, help="допустимое замедление, доля")
+    parser.add_argument('--min-delta-ms', type=float, default=2.0, help="меньшая разница считается шумом")
+    args = parser.parse_args()
+
+    from PySide6 import __version__ as pyside_version
+    from PySide6.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])  # noqa: F841
+    # ui_main пишет app.log в текущую папку при импорте
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix='pzmm-bench-'))
+    try:
+        host_class, dialogs = create_host_class()
+    finally:
+        os.chdir(cwd)
+
+    results = {}
+    for size in (int(size) for size in args.sizes.split(',')):
+        started = time.perf_counter()
+        results[str(size)] = run_size(host_class, dialogs, size, args.repeat)
+        print(f"{size} mods: {time.perf_counter() - started:.1f} s")
+
+    baseline_run = load_json(args.baseline, None)
+    baseline = baseline_run['results'] if baseline_run else {}
+    print_table(results, baseline)
+
+    entry = {'time': datetime.now().isoformat(timespec='seconds'), 'revision': git_revision(),
+             'python': platform.python_version(), 'pyside': pyside_version, 'platform': platform.platform(),
+             'repeat': args.repeat, 'results': results}
+    history = load_json(args.history, [])
+    history.append(entry)
+    with open(args.history, 'w', encoding='utf-8') as file:
+        json.dump(history, file, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump(entry, file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not baseline_run:
+        print(f"No baseline at {args.baseline}, run with --save-baseline to create one")
+        return 0
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+    for size, operation, previous, current in regressions:
+        print(f"REGRESSION {operation} @ {size} mods: {previous:.2f} ms -> {current:.2f} ms")
+    if not regressions:
+        print(f"No regressions against baseline {baseline_run.get('revision')} ({baseline_run.get('time')})")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+# benchmarks/bench_mod_search.py
+
+# Задержка поиска по каталогу: python benchmarks/bench_mod_search.py [--mods 20000]
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mod_search import TrigramIndex  # noqa: E402
+
+WORDS = ['better', 'zombie', 'car', 'vehicle', 'gun', 'military', 'clothing', 'food', 'map', 'town', 'farm',
+         'hydro', 'craft', 'brita', 'armor', 'weapon', 'ui', 'tweaks', 'loot', 'expanded', 'survivor', 'base',
+         'radio', 'police', 'fire', 'medical', 'skill', 'book', 'trait', 'fix', 'pack', 'kentucky', 'louisville']
+
+
+def make_catalog(count, seed=1):
+    rng = random.Random(seed)
+    mods = []
+    for i in range(count):
+        words = rng.sample(WORDS, rng.randint(2, 4))
+        name = ' '.join(word.capitalize() for word in words) + f" {i}"
+        mods.append({'name': name, 'Workshop ID': [str(2000000000 + i)],
+                     'Mod ID': [''.join(words[:2]) + str(i)],
+                     'Map Folder': [f"{words[0]}map{i}"] if rng.random() < 0.1 else []})
+    return mods
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mods', type=int, default=20000)
+    parser.add_argument('--budget-ms', type=float, default=10.0)
+    args = parser.parse_args()
+
+    mods = make_catalog(args.mods)
+    index = TrigramIndex()
+    started = time.perf_counter()
+    index.sync(mods)
+    print(f"build {args.mods} mods: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    started = time.perf_counter()
+    mods[10] = dict(mods[10], name='Renamed Mod')
+    changed = index.sync(mods)
+    print(f"incremental sync ({changed} changed): {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    # Запрос набирается по буквам, как в поле поиска
+    worst = 0.0
+    for query in ('hydrocraft', 'brita weapon', 'militry', '2000012345', 'kentuckymap'):
+        for length in range(1, len(query) + 1):
+            started = time.perf_counter()
+            results = index.search(query[:length])
+            matched = len(index.match(query[:length]))
+            elapsed = (time.perf_counter() - started) * 1000
+            worst = max(worst, elapsed)
+        print(f"{query!r}: {matched} matches, top: {results[:3]}")
+    print(f"worst keystroke latency: {worst:.2f} ms (budget {args.budget_ms} ms)")
+    return 0 if worst <= args.budget_ms else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
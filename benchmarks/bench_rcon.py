@@ -0,0 +1,65 @@
+# benchmarks/bench_rcon.py
+
+# Рассылка пачки команд по RCON на несколько локальных серверов-заглушек:
+# python benchmarks/bench_rcon.py [--servers 10] [--commands 5] [--latency-ms 20]
+# Заглушка сервера - tests/rcon_stub.py; на ней же поведение пула проверяет tests/test_rcon_client.py.
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'tests'))
+from rcon_client import RconConnection, RconPool  # noqa: E402
+from rcon_stub import PASSWORD, start_stub_server  # noqa: E402
+
+async def naive_broadcast(servers, commands):
+    """Как без пула: новое соединение и ожидание ответа на каждую команду, серверы по очереди."""
+    for server in servers:
+        for command in commands:
+            connection = RconConnection(server['host'], server['port'], server['password'])
+            await connection.connect()
+            await connection.execute(command)
+            await connection.close()
+
+
+async def run(args):
+    latency = args.latency_ms / 1000
+    stubs = [await start_stub_server(latency) for _ in range(args.servers)]
+    servers = [{'host': '127.0.0.1', 'port': port, 'password': PASSWORD} for _, port in stubs]
+    commands = [f'servermsg "Restart in {index} minutes"' for index in range(args.commands)]
+
+    started = time.perf_counter()
+    await naive_broadcast(servers, commands)
+    naive = time.perf_counter() - started
+
+    pool = RconPool()
+    started = time.perf_counter()
+    await pool.broadcast(servers, commands)
+    cold = time.perf_counter() - started
+    started = time.perf_counter()
+    await pool.broadcast(servers, commands)
+    warm = time.perf_counter() - started
+
+    print(f"{args.servers} servers x {args.commands} commands, {args.latency_ms:.0f} ms per response")
+    print(f"  sequential, connection per command: {naive * 1000:8.1f} ms")
+    print(f"  pool, cold (connect + batch):       {cold * 1000:8.1f} ms")
+    print(f"  pool, warm (one round-trip each):   {warm * 1000:8.1f} ms")
+    await pool.close_all()
+    for server, _ in stubs:
+        server.close()
+        await server.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--servers', type=int, default=10)
+    parser.add_argument('--commands', type=int, default=5)
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
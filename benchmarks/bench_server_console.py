@@ -0,0 +1,340 @@
+# benchmarks/bench_server_console.py
+
+# Консоль сервера под нагрузкой: start_server запускает fake_pz_server.py вместо StartServer64.bat,
+# поток строк идет через display_output, save и quit отправляются send_command_to_server и save_and_quit.
+# python benchmarks/bench_server_console.py [--rates 1000,5000,10000,25000,50000] [--duration 5] [--crash]
+# Для каждой скорости: задержка цикла событий UI, время в display_output, задержка ответа на save,
+# рост памяти, потерянные и разорванные строки (сравнение с тем, что отправил сервер). Qt без окна (offscreen).
+import os
+import sys
+import time
+import shlex
+import inspect
+import argparse
+import tempfile
+import statistics
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+from console_events import LineSplitter  # noqa: E402
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+RATES = [1000, 5000, 10000, 25000, 50000]
+SERVER_OPTION = 'StartServer64'
+HEARTBEAT_MS = 10
+SAVE_MARKER = 'World saved'
+LOOKAHEAD = 1000
+# Методы окна, которые не нужны консоли или требуют остального окна
+SKIPPED_METHODS = {'__init__', 'closeEvent', 'refresh_schedule_table'}
+
+
+class RecordingSplitter(LineSplitter):
+    """LineSplitter окна, который запоминает выданные строки и время первой строки с ожидаемым маркером."""
+
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+        self.waiting = None
+        self.seen_at = None
+
+    def feed_timed(self, text, received=None):
+        # display_output и feed идут через feed_timed: перехват здесь видит каждую строку один раз
+        timed = super().feed_timed(text, received)
+        self._record([line for line, _ in timed])
+        return timed
+
+    def flush(self):
+        return self._record(super().flush())
+
+    def _record(self, lines):
+        self.lines.extend(lines)
+        if self.waiting and any(self.waiting in line for line in lines):
+            self.waiting, self.seen_at = None, time.perf_counter()
+        return lines
+
+
+def compare_lines(expected, received):
+    """
+    (совпало, разорвано, потеряно, лишних): полученные строки сверяются с отправленными по порядку.
+    Строка, пришедшая несколькими кусками, считается разорванной, пропущенная - потерянной.
+    """
+    matched = split = dropped = extra = 0
+    i = j = 0
+    while i < len(expected) and j < len(received):
+        if received[j] == expected[i]:
+            matched += 1
+            i += 1
+            j += 1
+            continue
+        if received[j] and expected[i].startswith(received[j]):
+            joined, k = received[j], j + 1
+            while k < len(received) and len(joined) < len(expected[i]) and expected[i].startswith(joined + received[k]):
+                joined += received[k]
+                k += 1
+            if joined == expected[i]:
+                split += 1
+                i += 1
+                j = k
+                continue
+        try:
+            skipped = expected.index(received[j], i, i + LOOKAHEAD) - i
+        except ValueError:
+            extra += 1
+            j += 1
+            continue
+        dropped += skipped
+        i += skipped
+    return matched, split, dropped + len(expected) - i, extra + len(received) - j
+
+
+def rss():
+    return psutil.Process().memory_info().rss if psutil is not None else None
+
+
+def write_start_script(server_directory, fake_args):
+    """StartServer64.bat, который запускает fake_pz_server.py (на Linux/macOS - sh-скрипт с тем же именем)."""
+    fake_server = os.path.join(BENCH_DIR, 'fake_pz_server.py')
+    path = os.path.join(server_directory, f"{SERVER_OPTION}.bat")
+    if os.name == 'nt':
+        arguments = ' '.join(f'"{argument}"' for argument in fake_args)
+        with open(path, 'w', encoding='utf-8', newline='\r\n') as file:
+            file.write(f'@echo off\n"{sys.executable}" "{fake_server}" {arguments}\n')
+    else:
+        command = ' '.join(shlex.quote(argument) for argument in [sys.executable, fake_server] + fake_args)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(f'#!/bin/sh\nexec {command}\n')
+        os.chmod(path, 0o755)
+
+
+def create_host_class():
+    """
+    Класс с методами MainWindow и только теми виджетами, которые трогают запуск сервера и консоль:
+    замеряется тот же код, что вызывают кнопки Start Server, Send и Save and Quit.
+    """
+    import configparser
+    import ui_main
+    from PySide6.QtCore import QTimer
+    from PySide6.QtWidgets import QWidget, QVBoxLayout, QTextEdit, QLineEdit, QComboBox, QListWidget, QLabel
+    from command_scheduler import CommandScheduler
+    from console_archive import ConsoleArchive
+    from lua_errors import LuaErrorAggregator
+    from process_monitor import MetricsHistory
+
+    def __init__(self, directory):
+        QWidget.__init__(self)
+        self.config_path = os.path.join(directory, 'config.ini')
+        self.config = configparser.ConfigParser()
+        self.server_directory = os.path.join(directory, 'pzserver')
+        self.zomboid_directory = os.path.join(directory, 'Zomboid')
+        layout = QVBoxLayout(self)
+        self.console = QTextEdit()
+        self.console.setReadOnly(True)
+        self.server_setup_console = QTextEdit()
+        self.server_setup_console.setReadOnly(True)
+        self.console_input = QLineEdit()
+        self.server_start_combobox_server_tab = QComboBox()
+        self.server_start_combobox_server_tab.addItems(ui_main.SERVER_START_OPTIONS)
+        self.server_start_combobox_server_tab.setCurrentText(SERVER_OPTION)
+        self.player_list = QListWidget()
+        self.resources_label = QLabel()
+        for widget in (self.console, self.server_setup_console, self.console_input,
+                       self.server_start_combobox_server_tab, self.player_list, self.resources_label):
+            layout.addWidget(widget)
+        self.metrics_history = MetricsHistory()
+        self.resource_sampler = None
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.timeout.connect(self.sample_resources)
+        self.scheduler = CommandScheduler(os.path.join(directory, 'schedules.json'), ui_main.DEFAULT_SERVER_NAME)
+        self.console_archive = ConsoleArchive(os.path.join(directory, 'console_archive'))
+        self.console_server_name = ui_main.DEFAULT_SERVER_NAME
+        self.process = None
+        self.backup_pending = False
+        self.quit_after_start = False
+        self.restart_after_exit = False
+        self.console_lines = RecordingSplitter()
+        self.online_players = set()
+        self.server_start_count = 0
+        self.boot_profiler = None
+        self.last_boot_profile = (None, None)
+        self.lua_errors = LuaErrorAggregator()
+        self.output_timings = []
+
+    def display_output(self):
+        started = time.perf_counter()
+        ui_main.MainWindow.display_output(self)
+        self.output_timings.append(time.perf_counter() - started)
+
+    def refresh_schedule_table(self):
+        pass  # вкладки Scheduler нет
+
+    methods = {name: value for name, value in vars(ui_main.MainWindow).items()
+               if inspect.isfunction(value) and name not in SKIPPED_METHODS}
+    methods.update(__init__=__init__, display_output=display_output, refresh_schedule_table=refresh_schedule_table)
+    return type('ServerConsoleHost', (QWidget,), methods)
+
+
+class Heartbeat:
+    """Таймер на HEARTBEAT_MS: насколько позже срабатывает, настолько UI не отвечал."""
+
+    def __init__(self):
+        from PySide6.QtCore import QTimer, Qt
+        self.delays = []
+        self.peak_rss = rss()
+        self.timer = QTimer()
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.tick)
+        self.last = None
+
+    def start(self):
+        self.last = time.perf_counter()
+        self.timer.start(HEARTBEAT_MS)
+
+    def tick(self):
+        now = time.perf_counter()
+        self.delays.append(max(0.0, now - self.last - HEARTBEAT_MS / 1000))
+        self.last = now
+        if len(self.delays) % 50 == 0 and self.peak_rss is not None:
+            self.peak_rss = max(self.peak_rss, rss())
+
+    def stop(self):
+        self.timer.stop()
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_scenario(host_class, rate, args, crash=False):
+    from PySide6.QtCore import QEventLoop, QProcess, QTimer
+    root = tempfile.mkdtemp(prefix=f'pzmm-console-{rate}-')
+    host = host_class(root)
+    os.makedirs(host.server_directory)
+    transcript = os.path.join(root, 'transcript.txt')
+    fake_args = ['--rate', str(rate), '--duration', str(args.duration), '--boot-mods', str(args.boot_mods),
+                 '--boot-seconds', str(args.boot_seconds), '--storm-every', str(args.storm_every),
+                 '--transcript', transcript]
+    if crash:
+        fake_args += ['--crash-after', str(args.duration / 2)]
+    write_start_script(host.server_directory, fake_args)
+
+    cwd = os.getcwd()
+    os.chdir(root)  # история профилей загрузки и config.ini пишутся в текущую папку
+    loop = QEventLoop()
+    heartbeat = Heartbeat()
+    rss_before = rss()
+    marks = {}
+
+    def send_save():
+        host.console_lines.waiting = SAVE_MARKER
+        host.console_input.setText('save')
+        marks['save_sent'] = time.perf_counter()
+        host.send_command_to_server()
+
+    def quit_server():
+        marks['quit_sent'] = time.perf_counter()
+        host.save_and_quit()
+
+    try:
+        marks['started'] = time.perf_counter()
+        host.start_server()
+        if host.process is None:
+            raise RuntimeError(host.console.toPlainText())
+        host.process.finished.connect(loop.quit)
+        heartbeat.start()
+        traffic_end_ms = int((args.boot_seconds + args.duration) * 1000)
+        QTimer.singleShot(traffic_end_ms // 2, send_save)
+        if not crash:
+            QTimer.singleShot(traffic_end_ms + 500, quit_server)
+        QTimer.singleShot(traffic_end_ms + int(args.timeout * 1000), loop.quit)
+        loop.exec()
+        marks['finished'] = time.perf_counter()
+        heartbeat.stop()
+        timed_out = host.process.state() != QProcess.NotRunning
+        if timed_out:
+            host.process.kill()
+            host.process.waitForFinished(5000)
+        with open(transcript, 'r', encoding='utf-8') as file:
+            expected = file.read().split('\n')[:-1]
+        matched, split, dropped, extra = compare_lines(expected, host.console_lines.lines)
+        received = len(host.console_lines.lines)
+        save_latency = host.console_lines.seen_at - marks['save_sent'] if host.console_lines.seen_at else None
+        return {
+            'rate': rate, 'crash': crash, 'timed_out': timed_out,
+            'lines': received, 'achieved_rate': received / max(1e-9, marks['finished'] - marks['started']),
+            'heartbeat_p50_ms': percentile(heartbeat.delays, 0.5) * 1000,
+            'heartbeat_p99_ms': percentile(heartbeat.delays, 0.99) * 1000,
+            'heartbeat_max_ms': max(heartbeat.delays, default=0.0) * 1000,
+            'display_output_calls': len(host.output_timings),
+            'display_output_total_ms': sum(host.output_timings) * 1000,
+            'display_output_median_ms': statistics.median(host.output_timings) * 1000 if host.output_timings else 0,
+            'save_latency_ms': save_latency * 1000 if save_latency is not None else None,
+            'quit_ms': (marks['finished'] - marks['quit_sent']) * 1000 if 'quit_sent' in marks else None,
+            'rss_growth_mb': ((heartbeat.peak_rss - rss_before) / 1024 / 1024) if rss_before is not None else None,
+            'console_blocks': host.console.document().blockCount(),
+            'matched': matched, 'split': split, 'dropped': dropped, 'extra': extra,
+        }
+    finally:
+        host.console_archive.close()
+        host.deleteLater()
+        os.chdir(cwd)
+
+
+def print_results(results):
+    def number(value, digits=1):
+        return '-' if value is None else f"{value:.{digits}f}"
+
+    print(f"{'rate':>7} {'got/s':>8} {'hb p50':>7} {'hb p99':>7} {'hb max':>7} {'output':>8} {'save':>7} "
+          f"{'quit':>7} {'rss MB':>7} {'lines':>8} {'split':>6} {'drop':>6} {'extra':>6}")
+    for result in results:
+        label = f"{result['rate']}{'!' if result['crash'] else ''}"
+        print(f"{label:>7} {result['achieved_rate']:8.0f} {result['heartbeat_p50_ms']:7.1f} "
+              f"{result['heartbeat_p99_ms']:7.1f} {result['heartbeat_max_ms']:7.1f} "
+              f"{result['display_output_total_ms']:8.0f} {number(result['save_latency_ms']):>7} "
+              f"{number(result['quit_ms']):>7} {number(result['rss_growth_mb']):>7} {result['lines']:8d} "
+              f"{result['split']:6d} {result['dropped']:6d} {result['extra']:6d}")
+    print("hb - задержка таймера UI (мс), output - всего в display_output (мс), save/quit - ответ сервера (мс), "
+          "! - сценарий с падением")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rates', default=','.join(map(str, RATES)))
+    parser.add_argument('--duration', type=float, default=5.0, help="секунд потока строк на каждую скорость")
+    parser.add_argument('--boot-mods', type=int, default=40)
+    parser.add_argument('--boot-seconds', type=float, default=1.0)
+    parser.add_argument('--storm-every', type=float, default=2.0)
+    parser.add_argument('--timeout', type=float, default=30.0, help="сколько ждать выхода сервера после quit")
+    parser.add_argument('--crash', action='store_true', help="добавить прогон с падением сервера")
+    args = parser.parse_args()
+
+    from PySide6.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])  # noqa: F841
+    # ui_main пишет app.log в текущую папку при импорте
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix='pzmm-console-'))
+    try:
+        host_class = create_host_class()
+    finally:
+        os.chdir(cwd)
+
+    results = [run_scenario(host_class, int(rate), args) for rate in args.rates.split(',')]
+    if args.crash:
+        results.append(run_scenario(host_class, int(args.rates.split(',')[0]), args, crash=True))
+    print_results(results)
+    if psutil is None:
+        print("psutil is not installed: memory growth is not measured")
+    broken = [result for result in results if result['split'] or result['dropped'] or result['extra']
+              or result['timed_out']]
+    return 1 if broken else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,207 @@
+# benchmarks/fake_pz_server.py
+
+# Заменитель выделенного сервера PZ для бенчмарков консоли: загрузка модов, SERVER STARTED, поток строк
+# (вход/выход игроков, чат, Lua ошибки пачками) с заданной скоростью, команды save/quit/players из stdin, падение.
+# python benchmarks/fake_pz_server.py [--rate 5000] [--duration 10] [--boot-mods 40] [--crash-after 0]
+#                                     [--transcript lines.txt]
+# --transcript пишет каждую отправленную строку (utf-8), чтобы сравнить с тем, что получил менеджер.
+import os
+import sys
+import time
+import queue
+import random
+import argparse
+import threading
+
+TICK = 0.01
+MAX_LINES_PER_TICK = 5000  # если потребитель не успевает, скорость падает, а не копится очередь
+PLAYERS = ['Survivor', 'Kate', 'Baldspot', 'Иван', 'Spiffo', 'Nomad', 'Dasha', 'Trapper']
+CHAT = ['anyone near Muldraugh?', 'need a car battery', 'base at the police station', 'привет всем',
+        'lag again', 'who took the sledgehammer', 'helicopter event!', 'selling nails for food']
+GENERAL = ['Zombie count: {n}', 'Chunk map saved in {n} ms', 'Loaded {n} cells', 'Vehicle id={n} spawned',
+           'Sending world state to {n} players', 'Meta grid updated ({n} zones)']
+# Блок Lua ошибки как в server-console.txt: ERROR, java стек с отступом, разделители и кадры Lua
+LUA_ERROR_BLOCK = [
+    ('ERROR', 'ExceptionLogger.logException> Exception thrown java.lang.RuntimeException: '
+              'attempted index: {field} of non-table: null at KahluaThread.tableget line:1689.'),
+    (None, '\tat se.krka.kahlua.vm.KahluaThread.tableget(KahluaThread.java:1689)'),
+    (None, '\tat se.krka.kahlua.vm.KahluaThread.luaMainloop(KahluaThread.java:641)'),
+    ('LOG', '-----------------------------------------'),
+    (None, 'STACK TRACE'),
+    (None, '-----------------------------------------'),
+    (None, 'function: {function} -- file: {file} line # {line} | MOD: {mod}'),
+    (None, 'function: OnTick -- file: Events.lua line # 44 | Vanilla'),
+]
+LUA_ERRORS = [('onPlayerUpdate', 'BetterLoot.lua', 120, 'Better Loot', 'items'),
+              ('OnZombieDead', 'ZombieDrops.lua', 58, 'Zombie Drops', 'modData'),
+              ('renderTooltip', 'ISToolTipInv.lua', 301, 'Tooltip Tweaks', 'fluidContainer')]
+SAVE_TEXTS = ['Saving world...', 'World saved']
+JVM_CRASH = ['#', '# A fatal error has been detected by the Java Runtime Environment:', '#',
+             '#  EXCEPTION_ACCESS_VIOLATION (0xc0000005) at pc=0x00007ffb2c1d3a40, pid=4242, tid=4243', '#']
+
+
+class FakeServer:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.out = sys.stdout.buffer
+        self.transcript = open(args.transcript, 'w', encoding='utf-8', newline='\n') if args.transcript else None
+        self.commands = queue.Queue()
+        self.counter = 0
+        self.online = []
+        self.pending = []  # когда закончатся начатые save (ответ приходит с задержкой)
+
+    def prefixed(self, text, level='LOG', category='General'):
+        self.counter += 1
+        return f"{level:5}: {category:12}, {int(time.time() * 1000)}> {self.counter:,}> {text}"
+
+    def emit(self, lines, newline=True):
+        text = '\n'.join(lines) + ('\n' if newline else '')
+        self.out.write(text.encode(self.args.encoding, errors='replace'))
+        self.out.flush()
+        if self.transcript:
+            self.transcript.write('\n'.join(lines) + '\n')
+
+    # --- поток строк ---
+
+    def boot(self):
+        lines = [self.prefixed('versionNumber=41.78.16 demo=false'),
+                 self.prefixed('server is listening on port 16261', category='Network')]
+        self.emit(lines)
+        pause = self.args.boot_seconds / max(1, self.args.boot_mods)
+        for index in range(self.args.boot_mods):
+            mod = f"FakeMod{index:03d}"
+            self.emit([self.prefixed(f"loading {mod}", category='Mod'),
+                       self.prefixed(f"Loading: /mods/{mod}/media/lua/shared/{mod}.lua", category='Lua')])
+            time.sleep(pause)
+        self.emit([self.prefixed('*** SERVER STARTED ****')])
+
+    def traffic_line(self):
+        roll = self.rng.random()
+        if roll < 0.05 or not self.online:
+            name = self.rng.choice(PLAYERS)
+            if name in self.online:
+                self.online.remove(name)
+                return self.prefixed(f'Disconnected player "{name}" {self.rng.randrange(10 ** 17)}',
+                                     category='Network')
+            self.online.append(name)
+            return self.prefixed(f'"{name}" fully connected ({self.rng.randrange(1000)},{self.rng.randrange(1000)},0)',
+                                 category='Network')
+        if roll < 0.6:
+            return self.prefixed(f"Got message:ChatMessage{{chat=General, author='{self.rng.choice(self.online)}', "
+                                 f"text='{self.rng.choice(CHAT)}'}}", category='Chat')
+        return self.prefixed(self.rng.choice(GENERAL).format(n=self.rng.randrange(10000)))
+
+    def lua_storm(self):
+        lines = []
+        for _ in range(self.args.storm_blocks):
+            function, file, line, mod, field = self.rng.choice(LUA_ERRORS)
+            for level, template in LUA_ERROR_BLOCK:
+                text = template.format(field=field, function=function, file=f"/mods/{mod}/{file}",
+                                       line=line, mod=mod)
+                lines.append(self.prefixed(text, level) if level else text)
+        return lines
+
+    # --- команды ---
+
+    def read_stdin(self):
+        # os.read, а не sys.stdin: заблокированный буферизованный stdin роняет интерпретатор при выходе
+        pending = b''
+        while True:
+            chunk = os.read(sys.stdin.fileno(), 4096)
+            if not chunk:
+                break
+            *lines, pending = (pending + chunk).split(b'\n')
+            for raw in lines:
+                self.commands.put(raw.decode(self.args.encoding, errors='replace').strip())
+        self.commands.put(None)  # менеджер закрыл stdin
+
+    def save_lines(self):
+        return [self.prefixed(text) for text in SAVE_TEXTS]
+
+    def handle(self, command):
+        """False, если сервер должен завершиться."""
+        if command is None:
+            return False
+        name = command.split(' ', 1)[0].lower()
+        if name == 'save':
+            self.pending.append(time.monotonic() + self.args.save_ms / 1000)
+        elif name == 'quit':
+            self.emit(self.save_lines() + [self.prefixed('Server shutting down'), self.prefixed('Server stopped')])
+            return False
+        elif name == 'players':
+            self.emit([self.prefixed(f"Players connected ({len(self.online)}):")] +
+                      [self.prefixed(f"-{player}") for player in self.online])
+        elif name == 'servermsg':
+            self.emit([self.prefixed(f"servermsg: {command[10:]}", category='Chat')])
+        elif name == 'crash':
+            self.crash()
+        elif command:
+            self.emit([self.prefixed(f"Unknown command: {command}")])
+        return True
+
+    def crash(self):
+        """Падение JVM: отчет в консоль, последняя строка без перевода строки, код выхода 1."""
+        self.emit(JVM_CRASH)
+        self.emit(['# Problematic frame: [libjvm.so+0x6b5a40]'], newline=False)
+        if self.transcript:
+            self.transcript.close()
+        os._exit(1)
+
+    # --- главный цикл ---
+
+    def run(self):
+        threading.Thread(target=self.read_stdin, daemon=True).start()
+        self.boot()
+        started = time.monotonic()
+        sent = 0
+        next_storm = started + self.args.storm_every if self.args.storm_every else None
+        while True:
+            now = time.monotonic()
+            try:
+                while True:
+                    if not self.handle(self.commands.get_nowait()):
+                        return 0
+            except queue.Empty:
+                pass
+            while self.pending and self.pending[0] <= now:
+                self.pending.pop(0)
+                self.emit(self.save_lines())
+            if self.args.crash_after and now - started >= self.args.crash_after:
+                self.crash()
+            elapsed = now - started
+            if not self.args.duration or elapsed < self.args.duration:
+                count = min(int(elapsed * self.args.rate) - sent, MAX_LINES_PER_TICK)
+                lines = [self.traffic_line() for _ in range(count)]
+                sent += max(0, count)
+                if next_storm is not None and now >= next_storm:
+                    lines += self.lua_storm()
+                    next_storm += self.args.storm_every
+                if lines:
+                    self.emit(lines)
+            time.sleep(TICK)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rate', type=float, default=1000, help="строк в секунду после SERVER STARTED")
+    parser.add_argument('--duration', type=float, default=0, help="секунд потока строк (0 - до quit)")
+    parser.add_argument('--boot-mods', type=int, default=40)
+    parser.add_argument('--boot-seconds', type=float, default=1.0)
+    parser.add_argument('--storm-every', type=float, default=2.0, help="пачка Lua ошибок раз в N секунд (0 - нет)")
+    parser.add_argument('--storm-blocks', type=int, default=200)
+    parser.add_argument('--save-ms', type=float, default=200, help="сколько длится save")
+    parser.add_argument('--crash-after', type=float, default=0, help="упасть через N секунд после старта")
+    parser.add_argument('--encoding', default='cp1251', help="кодировка консоли (сервер на Windows - cp1251)")
+    parser.add_argument('--transcript')
+    parser.add_argument('--seed', type=int, default=1)
+    server = FakeServer(parser.parse_args())
+    try:
+        return server.run()
+    finally:
+        if server.transcript:
+            server.transcript.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+# boot_profiler.py
+
+# Профилирование загрузки сервера по логам: сколько времени уходит на каждый мод и фазу
+import os
+import re
+import json
+import time
+import logging
+from file_manager import atomic_write_text
+
+HISTORY_PATH = 'boot_profiles.json'
+HISTORY_SIZE = 20
+SERVER_STARTED_MARKER = 'SERVER STARTED'
+
+# "LOG  : General     , 1697012345678> 12,345,678> ..." - первое число перед '>' это время в мс
+LOG_TIMESTAMP_RE = re.compile(r'^\w+\s*:\s*\w+\s*,\s*(\d{10,})>')
+MOD_LOADING_RE = re.compile(r'\bloading (?P<mod>[^\s/\\]+)\s*$')
+LUA_FILE_RE = re.compile(r'(?:Loading|loading|require)[:\s]+(?P<path>\S+\.lua)\b')
+MOD_PATH_RE = re.compile(r'[/\\]mods[/\\](?P<mod>[^/\\]+)[/\\]')
+PHASE_MARKERS = (
+    ('Loading world', 'world'),
+    ('LoadWorld', 'world'),
+    ('initializing lua', 'lua'),
+    ('Server Steam ID', 'network'),
+    ('server is listening on port', 'network'),
+)
+VANILLA = '(vanilla)'
+
+
+def get_console_log_candidates(zomboid_directory):
+    """Логи сервера в папке Zomboid: server-console.txt и DebugLog-server*.txt, новые первыми."""
+    candidates = [os.path.join(zomboid_directory, 'server-console.txt')]
+    logs_dir = os.path.join(zomboid_directory, 'Logs')
+    if os.path.isdir(logs_dir):
+        for dirpath, _, filenames in os.walk(logs_dir):
+            candidates.extend(os.path.join(dirpath, name) for name in filenames
+                              if name.startswith('DebugLog-server') and name.endswith('.txt'))
+    existing = [path for path in candidates if os.path.exists(path)]
+    return sorted(existing, key=os.path.getmtime, reverse=True)
+
+
+def classify_line(line):
+    """(phase, mod) для строки лога или None, если строка не меняет контекст загрузки."""
+    match = MOD_LOADING_RE.search(line)
+    if match:
+        return 'mod_load', match.group('mod')
+    match = LUA_FILE_RE.search(line)
+    if match:
+        mod_match = MOD_PATH_RE.search(match.group('path'))
+        return 'lua', mod_match.group('mod') if mod_match else VANILLA
+    for marker, phase in PHASE_MARKERS:
+        if marker in line:
+            return phase, None
+    return None
+
+
+class BootProfiler:
+    """
+    Время между соседними строками лога относится к последнему замеченному контексту (фаза, мод).
+    Используется время из строки. Строка без времени (продолжение записи, стек) получает время
+    предыдущей записи, а если времени в логе нет вовсе - время получения этой строки.
+    """
+
+    def __init__(self):
+        self.started_at = None
+        self.finished = False
+        self.mods = {}  # mod -> {'mod_load': сек, 'lua': сек, 'files': n}
+        self.phases = {}
+        self._context = ('startup', None)
+        self._last_time = None
+        self._log_clock = False  # в строках встречалось время лога: часы менеджера больше не смешиваются
+
+    def _attribute(self, now):
+        if self._last_time is None:
+            self.started_at = now
+        else:
+            elapsed = max(0.0, now - self._last_time)
+            phase, mod = self._context
+            self.phases[phase] = self.phases.get(phase, 0.0) + elapsed
+            if mod:
+                stats = self.mods.setdefault(mod, {'mod_load': 0.0, 'lua': 0.0, 'files': 0})
+                stats[phase] = stats.get(phase, 0.0) + elapsed
+        self._last_time = now
+
+    def feed_line(self, line, received=None):
+        """Учитывает одну строку. Возвращает True, когда встречен маркер SERVER STARTED."""
+        if self.finished:
+            return True
+        match = LOG_TIMESTAMP_RE.match(line)
+        if match:
+            now = int(match.group(1)) / 1000
+            self._log_clock = True
+        elif self._log_clock:
+            now = self._last_time
+        else:
+            now = received if received is not None else time.time()
+        self._attribute(now)
+
+        if SERVER_STARTED_MARKER in line:
+            self.finished = True
+            return True
+        context = classify_line(line)
+        if context:
+            self._context = context
+            phase, mod = context
+            if phase == 'lua':
+                self.mods.setdefault(mod, {'mod_load': 0.0, 'lua': 0.0, 'files': 0})['files'] += 1
+        return False
+
+    @property
+    def total(self):
+        return (self._last_time - self.started_at) if self.started_at is not None else 0.0
+
+    def result(self):
+        return {'time': time.time(), 'total': self.total, 'complete': self.finished,
+                'phases': dict(self.phases), 'mods': {mod: dict(stats) for mod, stats in self.mods.items()}}
+
+
+def profile_log_file(path):
+    """Профиль последней загрузки в файле лога (файл может содержать несколько запусков)."""
+    profiler = BootProfiler()
+    last_complete = None
+    with open(path, 'r', encoding='utf-8', errors='ignore') as file:
+        for line in file:
+            if profiler.feed_line(line.rstrip('\n')):
+                last_complete = profiler
+                profiler = BootProfiler()
+    return (last_complete or profiler).result()
+
+
+def rank_mods(profile, previous=None, min_delta=1.0, min_ratio=0.25):
+    """
+    Строки таблицы, от самых медленных модов: mod, mod_load, lua, files, total, delta, regression.
+    Регрессия - рост больше чем на min_delta секунд и на min_ratio относительно прошлой загрузки.
+    """
+    previous_mods = previous['mods'] if previous else {}
+    rows = []
+    for mod, stats in profile['mods'].items():
+        total = stats.get('mod_load', 0.0) + stats.get('lua', 0.0)
+        delta = None
+        regression = False
+        if mod in previous_mods:
+            before = previous_mods[mod].get('mod_load', 0.0) + previous_mods[mod].get('lua', 0.0)
+            delta = total - before
+            regression = delta >= min_delta and delta >= before * min_ratio
+        rows.append({'mod': mod, 'mod_load': stats.get('mod_load', 0.0), 'lua': stats.get('lua', 0.0),
+                     'files': stats.get('files', 0), 'total': total, 'delta': delta, 'regression': regression})
+    rows.sort(key=lambda row: row['total'], reverse=True)
+    return rows
+
+
+def load_history(path=HISTORY_PATH):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as file:
+            try:
+                return json.load(file)
+            except json.JSONDecodeError:
+                return []
+    return []
+
+
+def latest_profile(path=HISTORY_PATH):
+    """Последний полный профиль загрузки из истории (или None)."""
+    return next((item for item in reversed(load_history(path)) if item.get('complete')), None)
+
+
+def record_profile(profile, path=HISTORY_PATH, keep=HISTORY_SIZE):
+    """Сохраняет профиль в историю. Возвращает предыдущий полный профиль для сравнения (или None)."""
+    history = load_history(path)
+    previous = next((item for item in reversed(history) if item.get('complete')), None)
+    history = (history + [profile])[-keep:]
+    atomic_write_text(path, json.dumps(history))
+    logging.info(f"Recorded boot profile: {profile['total']:.1f}s, {len(profile['mods'])} mods")
+    return previous
@@ -0,0 +1,147 @@
+# chunk_pruner.py
+
+# Удаление чанков мира (map_X_Y.bin) вне защищенных областей и сейфхаусов
+import os
+import re
+import csv
+import shutil
+import sqlite3
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+CHUNK_RE = re.compile(r'^map_(-?\d+)_(-?\d+)\.bin$')
+CHUNK_SIZE = 10  # клеток в чанке (B41)
+INDEX_CELL_SIZE = 300
+
+
+def parse_regions(text):
+    """'x1,y1,x2,y2; x1,y1,x2,y2' (координаты клеток мира) -> список прямоугольников."""
+    regions = []
+    for part in text.split(';'):
+        values = [value.strip() for value in part.split(',') if value.strip()]
+        if len(values) == 4:
+            x1, y1, x2, y2 = map(int, values)
+            regions.append((min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)))
+    return regions
+
+
+def load_safehouse_regions(db_path):
+    """Прямоугольники сейфхаусов из таблиц servertest.db с колонками x, y, w, h (если такие есть)."""
+    regions = []
+    if not os.path.exists(db_path):
+        return regions
+    connection = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        tables = [row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+        for table in tables:
+            if 'safehouse' not in table.lower():
+                continue
+            columns = {row[1].lower() for row in connection.execute(f"PRAGMA table_info({table})")}
+            if not {'x', 'y', 'w', 'h'} <= columns:
+                continue
+            for x, y, w, h in connection.execute(f"SELECT x, y, w, h FROM {table}"):
+                regions.append((int(x), int(y), int(x) + int(w), int(y) + int(h)))
+    finally:
+        connection.close()
+    return regions
+
+
+class RegionIndex:
+    """Сеточный пространственный индекс прямоугольников для быстрой проверки чанков."""
+
+    def __init__(self, regions, margin=0, cell_size=INDEX_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        for x1, y1, x2, y2 in regions:
+            rect = (x1 - margin, y1 - margin, x2 + margin, y2 + margin)
+            for cell_x in range(rect[0] // cell_size, rect[2] // cell_size + 1):
+                for cell_y in range(rect[1] // cell_size, rect[3] // cell_size + 1):
+                    self.cells.setdefault((cell_x, cell_y), []).append(rect)
+
+    def is_protected(self, chunk_x, chunk_y):
+        x1, y1 = chunk_x * CHUNK_SIZE, chunk_y * CHUNK_SIZE
+        x2, y2 = x1 + CHUNK_SIZE - 1, y1 + CHUNK_SIZE - 1
+        for cell_x in range(x1 // self.cell_size, x2 // self.cell_size + 1):
+            for cell_y in range(y1 // self.cell_size, y2 // self.cell_size + 1):
+                for rx1, ry1, rx2, ry2 in self.cells.get((cell_x, cell_y), ()):
+                    if x1 <= rx2 and rx1 <= x2 and y1 <= ry2 and ry1 <= y2:
+                        return True
+        return False
+
+
+def iter_chunk_batches(save_dir, batch_size=5000):
+    """Потоково отдает пачки (имя, путь) файлов чанков, не загружая весь каталог в память."""
+    batch = []
+    with os.scandir(save_dir) as entries:
+        for entry in entries:
+            if entry.name.startswith('map_') and CHUNK_RE.match(entry.name):
+                batch.append((entry.name, entry.path))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+
+def _process_batch(batch, index, dry_run, backup_dir):
+    rows = []
+    for name, path in batch:
+        match = CHUNK_RE.match(name)
+        chunk_x, chunk_y = int(match.group(1)), int(match.group(2))
+        if index.is_protected(chunk_x, chunk_y):
+            continue
+        try:
+            size = os.path.getsize(path)
+            if not dry_run:
+                shutil.move(path, os.path.join(backup_dir, name))
+        except OSError as e:
+            logging.warning(f"Failed to prune {path}: {e}")
+            continue
+        rows.append((chunk_x, chunk_y, size))
+    return len(batch), rows
+
+
+def prune_chunks(save_dir, regions, dry_run=True, backup_dir=None, report_path=None, margin=0,
+                 max_workers=4, batch_size=5000):
+    """
+    Удаляет (переносит в backup_dir) чанки вне regions. При dry_run только считает.
+    Отчет (x, y, size) пишется построчно в report_path. Возвращает статистику.
+    """
+    if not dry_run:
+        if not backup_dir:
+            raise ValueError("backup_dir is required when not in dry-run mode")
+        os.makedirs(backup_dir, exist_ok=True)
+    index = RegionIndex(regions, margin)
+    stats = {'scanned': 0, 'pruned': 0, 'bytes': 0, 'dry_run': dry_run}
+
+    report_file = open(report_path, 'w', newline='', encoding='utf-8') if report_path else None
+    writer = csv.writer(report_file) if report_file else None
+    if writer:
+        writer.writerow(['chunk_x', 'chunk_y', 'size'])
+
+    def collect(future):
+        scanned, rows = future.result()
+        stats['scanned'] += scanned
+        stats['pruned'] += len(rows)
+        stats['bytes'] += sum(size for _, _, size in rows)
+        if writer:
+            writer.writerows(rows)
+
+    try:
+        # Ограничиваем число пачек в работе, чтобы память не росла вместе с размером каталога
+        in_flight = deque()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Перенос файлов из папки во время scandir безопасен (POSIX, NTFS): список не копится в памяти
+            for batch in iter_chunk_batches(save_dir, batch_size):
+                in_flight.append(executor.submit(_process_batch, batch, index, dry_run, backup_dir))
+                if len(in_flight) >= max_workers * 2:
+                    collect(in_flight.popleft())
+            while in_flight:
+                collect(in_flight.popleft())
+    finally:
+        if report_file:
+            report_file.close()
+
+    logging.info(f"Chunk prune of {save_dir}: {stats}")
+    return stats
@@ -0,0 +1,337 @@
+# command_scheduler.py
+
+# Расписание команд сервера: автосохранения, объявления, перезапуски с обратным отсчетом.
+# Задачи задаются интервалом или cron-выражением и хранятся в schedules.json; все срабатывания
+# (включая предупреждения перед перезапуском) идут через одно колесо таймеров, которое крутит один QTimer.
+import os
+import json
+import time
+import logging
+import itertools
+from datetime import datetime, timedelta
+from file_manager import atomic_write_text
+
+SCHEDULE_PATH = 'schedules.json'
+TICK_SECONDS = 1.0
+WHEEL_SLOTS = 512
+
+ACTIONS = ('save', 'command', 'broadcast', 'restart', 'restart_if_mods_updated')
+RESTART_ACTIONS = ('restart', 'restart_if_mods_updated')
+DEFAULT_WARNINGS = [600, 300, 60, 10]
+DEFAULT_RESTART_MESSAGE = "Server restart in {time}"
+MAX_GRACE_SECONDS = 300
+
+UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+CRON_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+def parse_cron_field(text, low, high):
+    values = set()
+    for part in text.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"Bad cron step: {text}")
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(value) for value in part.split('-', 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"Cron value out of range {low}-{high}: {text}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def parse_cron(expression):
+    """'m h dom mon dow' -> (минуты, часы, дни, месяцы, дни недели, день ограничен, день недели ограничен)."""
+    parts = expression.split()
+    if len(parts) != 5:
+        raise ValueError(f"Cron expression must have 5 fields: {expression}")
+    fields = [parse_cron_field(part, low, high) for part, (low, high) in zip(parts, CRON_RANGES)]
+    if 7 in fields[4]:
+        fields[4] = (fields[4] - {7}) | {0}
+    return (*fields, parts[2] != '*', parts[4] != '*')
+
+
+def _cron_day_matches(cron, moment):
+    _, _, days, months, weekdays, days_restricted, weekdays_restricted = cron
+    if moment.month not in months:
+        return False
+    day_ok = moment.day in days
+    weekday_ok = (moment.weekday() + 1) % 7 in weekdays
+    if days_restricted and weekdays_restricted:
+        return day_ok or weekday_ok  # как в cron: достаточно одного из двух
+    return day_ok and weekday_ok
+
+
+def next_cron_time(cron, after):
+    """Ближайший момент (локальное время) строго после after. Неподходящие дни и часы пропускаются целиком."""
+    minutes, hours = cron[0], cron[1]
+    moment = datetime.fromtimestamp(after).replace(second=0, microsecond=0) + timedelta(minutes=1)
+    limit = moment + timedelta(days=366 * 5)
+    while moment < limit:
+        if not _cron_day_matches(cron, moment):
+            moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+        elif moment.hour not in hours:
+            moment = (moment + timedelta(hours=1)).replace(minute=0)
+        elif moment.minute not in minutes:
+            moment += timedelta(minutes=1)
+        else:
+            return moment.timestamp()
+    raise ValueError("Cron expression never matches")
+
+
+def parse_schedule(text):
+    """'every 30m' / '2h' -> {'every': секунды}; пять полей -> {'cron': выражение}."""
+    text = text.strip()
+    if len(text.split()) == 5:
+        parse_cron(text)
+        return {'cron': text}
+    value = text[len('every'):].strip() if text.lower().startswith('every') else text
+    unit = value[-1:].lower()
+    if unit not in UNITS:
+        raise ValueError(f"Unknown schedule: {text}")
+    seconds = int(float(value[:-1]) * UNITS[unit])
+    if seconds < 10:
+        raise ValueError(f"Interval too short: {text}")
+    return {'every': seconds}
+
+
+def describe_schedule(job):
+    if job.get('cron'):
+        return f"cron {job['cron']}"
+    seconds = job['every']
+    for unit, size in (('d', 86400), ('h', 3600), ('m', 60)):
+        if seconds % size == 0:
+            return f"every {seconds // size}{unit}"
+    return f"every {seconds}s"
+
+
+def format_countdown(seconds):
+    seconds = int(round(seconds))
+    if seconds >= 60 and seconds % 60 == 0:
+        minutes = seconds // 60
+        return f"{minutes} minute{'s' if minutes != 1 else ''}"
+    return f"{seconds} second{'s' if seconds != 1 else ''}"
+
+
+class TimerWheel:
+    """
+    Хешированное колесо таймеров: слот = номер тика по модулю числа слотов. За тик разбирается
+    только свой слот, поэтому стоимость не зависит от числа задач. Отмена - по поколению ключа.
+    """
+
+    def __init__(self, tick=TICK_SECONDS, slots=WHEEL_SLOTS, now=None):
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.current = int((time.time() if now is None else now) // tick)
+        self.generations = {}
+        self._seq = itertools.count()
+        self.size = 0
+
+    def schedule(self, when, key, payload):
+        tick = max(int(when // self.tick), self.current + 1)
+        self.slots[tick % len(self.slots)].append((when, next(self._seq), key, self.generations.get(key, 0), payload))
+        self.size += 1
+
+    def cancel(self, key):
+        """Отменяет все срабатывания ключа; старые записи выбрасываются, когда до них дойдет колесо."""
+        self.generations[key] = self.generations.get(key, 0) + 1
+
+    def advance(self, now):
+        """Срабатывания с моментом <= now, по времени."""
+        target = int(now // self.tick)
+        if target <= self.current:
+            return []
+        # После долгого простоя (сон, перевод часов) каждый слот достаточно просмотреть один раз
+        ticks = range(self.current + 1, target + 1) if target - self.current < len(self.slots) else \
+            range(target - len(self.slots) + 1, target + 1)
+        self.current = target
+        due = []
+        for tick in ticks:
+            slot = self.slots[tick % len(self.slots)]
+            if not slot:
+                continue
+            keep = []
+            for entry in slot:
+                if entry[3] != self.generations.get(entry[2], 0):
+                    self.size -= 1
+                elif entry[0] <= now:
+                    due.append(entry)
+                    self.size -= 1
+                else:
+                    keep.append(entry)
+            slot[:] = keep
+        due.sort(key=lambda entry: (entry[0], entry[1]))
+        return [(entry[2], entry[4]) for entry in due]
+
+
+class CommandScheduler:
+    """
+    Задачи всех серверов в одном файле, активны задачи текущего сервера (Server/name).
+    tick() возвращает события для UI: ('run', job), ('warn', job, секунд до перезапуска),
+    ('restart', job) после обратного отсчета и ('call', функция) для разовых вызовов call_later.
+    """
+
+    def __init__(self, path=SCHEDULE_PATH, server=None, now=None):
+        self.path = path
+        self.server = server
+        self.jobs = {}
+        self.next_runs = {}
+        now = time.time() if now is None else now
+        self.wheel = TimerWheel(now=now)
+        self._once_ids = itertools.count(1)
+        self.load()
+        self.reschedule_all(now)
+
+    # --- хранение ---
+
+    def load(self):
+        self.jobs = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as file:
+                    data = json.load(file)
+            except (OSError, json.JSONDecodeError) as e:
+                logging.error(f"Failed to read {self.path}: {e}")
+                data = {}
+            for job in data.get('jobs', []):
+                self.jobs[job['id']] = job
+
+    def save(self):
+        data = {'jobs': sorted(self.jobs.values(), key=lambda job: job['id'])}
+        atomic_write_text(self.path, json.dumps(data, ensure_ascii=False, indent=4))
+
+    def server_jobs(self):
+        return [job for job in sorted(self.jobs.values(), key=lambda job: job['id'])
+                if job.get('server') == self.server]
+
+    def set_server(self, server, now=None):
+        if server != self.server:
+            self.server = server
+            self.reschedule_all(time.time() if now is None else now)
+
+    # --- задачи ---
+
+    def add_job(self, action, schedule, argument='', warnings=None, now=None):
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown action: {action}")
+        job_id = max(self.jobs, default=0) + 1
+        job = {'id': job_id, 'server': self.server, 'action': action, 'enabled': True, 'last_run': None}
+        job.update(parse_schedule(schedule) if isinstance(schedule, str) else schedule)
+        if action == 'command':
+            job['command'] = argument
+        elif action == 'broadcast':
+            job['message'] = argument
+        elif action in RESTART_ACTIONS:
+            job['message'] = argument or DEFAULT_RESTART_MESSAGE
+            job['warnings'] = sorted(warnings or DEFAULT_WARNINGS, reverse=True)
+        self.jobs[job_id] = job
+        self.save()
+        self._schedule_job(job, time.time() if now is None else now)
+        return job
+
+    def remove_job(self, job_id):
+        if self.jobs.pop(job_id, None) is not None:
+            self.wheel.cancel(job_id)
+            self.next_runs.pop(job_id, None)
+            self.save()
+
+    def set_enabled(self, job_id, enabled, now=None):
+        job = self.jobs[job_id]
+        job['enabled'] = enabled
+        self.save()
+        self._schedule_job(job, time.time() if now is None else now)
+
+    def call_later(self, delay, callback, now=None):
+        """Разовый вызов через delay секунд (не сохраняется)."""
+        now = time.time() if now is None else now
+        self.wheel.schedule(now + delay, ('once', next(self._once_ids)), ('call', callback))
+
+    def reschedule_all(self, now):
+        for job_id in list(self.next_runs):
+            self.wheel.cancel(job_id)
+        self.next_runs.clear()
+        for job in self.jobs.values():
+            self._schedule_job(job, now)
+
+    def _grace(self, job):
+        """Насколько можно опоздать с запуском (приложение было закрыто, компьютер спал)."""
+        if job.get('every'):
+            return min(job['every'] / 2, MAX_GRACE_SECONDS)
+        return MAX_GRACE_SECONDS
+
+    def _next_after(self, job, moment):
+        if job.get('cron'):
+            return next_cron_time(parse_cron(job['cron']), moment)
+        anchor = job.get('last_run') or moment
+        periods = max(1, int((moment - anchor) // job['every']) + 1)
+        return anchor + periods * job['every']
+
+    def _schedule_job(self, job, now):
+        """
+        Ставит ближайший запуск и предупреждения перед ним. Пропущенные запуски не навёрстываются:
+        если последний пропущенный опоздал не больше grace - один запуск сейчас, иначе ждем следующего.
+        """
+        job_id = job['id']
+        self.wheel.cancel(job_id)
+        self.next_runs.pop(job_id, None)
+        if not job.get('enabled', True) or job.get('server') != self.server:
+            return
+
+        last_run = job.get('last_run')
+        if last_run is not None and last_run < now:
+            # Достаточно узнать, был ли пропущен запуск в окне grace: ближайший запуск после его начала,
+            # без перебора всех пропусков (минутный cron за год - полмиллиона шагов)
+            missed = self._next_after(job, max(last_run, now - self._grace(job)))
+            if missed <= now:
+                # Для перезапуска опоздание не повод перезапускать без предупреждения
+                when = now + (job['warnings'][0] if job['action'] == 'restart' and job.get('warnings') else 0)
+                self._put(job, when, now)
+                return
+        self._put(job, self._next_after(job, now), now)
+
+    def _put(self, job, when, now):
+        self.next_runs[job['id']] = when
+        self.wheel.schedule(when, job['id'], ('run', job))
+        if job['action'] == 'restart':
+            self._put_warnings(job['id'], job, when, now)
+
+    def _put_warnings(self, key, job, restart_at, now):
+        for seconds in job.get('warnings', []):
+            if restart_at - seconds > now:
+                self.wheel.schedule(restart_at - seconds, key, ('warn', job, seconds))
+
+    def start_countdown(self, job, now=None):
+        """Перезапуск через самое длинное предупреждение (для restart_if_mods_updated после проверки)."""
+        now = time.time() if now is None else now
+        lead = job['warnings'][0] if job.get('warnings') else 0
+        key = ('countdown', job['id'])
+        self.wheel.cancel(key)
+        self.wheel.schedule(now + lead, key, ('restart', job))
+        self._put_warnings(key, job, now + lead, now)
+        return now + lead
+
+    def tick(self, now=None):
+        """Срабатывания до now; после запуска задача сразу ставится на следующий раз."""
+        now = time.time() if now is None else now
+        events = self.wheel.advance(now)
+        changed = False
+        for _, event in events:
+            if event[0] == 'run':
+                job = event[1]
+                # Интервалы отсчитываются от плановых моментов, чтобы запуски не уплывали на тик
+                job['last_run'] = min(self.next_runs.get(job['id'], now), now)
+                changed = True
+                self._put(job, self._next_after(job, now), now)
+        if changed:
+            self.save()
+        return [event for _, event in events]
+
+    def restart_message(self, job, seconds):
+        return job.get('message', DEFAULT_RESTART_MESSAGE).replace('{time}', format_countdown(seconds))
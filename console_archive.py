@@ -0,0 +1,371 @@
+# console_archive.py
+
+# Архив консоли сервера: строки пишутся в сегменты (ротация по размеру и возрасту, закрытые сжимаются gzip)
+# и индексируются в SQLite FTS5 без копии текста: индекс хранит только время и место строки в сегменте.
+# Поток вывода только кладет строки в очередь, запись на диск и индексация идут в фоновом потоке пачками.
+import os
+import gzip
+import time
+import shutil
+import sqlite3
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+ARCHIVE_DIR = 'console_archive'
+DB_NAME = 'archive.db'
+SEGMENTS_DIR = 'segments'
+MAX_SEGMENT_BYTES = 16 * 1024 * 1024
+MAX_SEGMENT_SECONDS = 24 * 3600
+FLUSH_INTERVAL = 1.0
+SEARCH_LIMIT = 200
+
+SCHEMA_VERSION = 2
+# lines - время и место строки (сегмент, смещение в байтах несжатого файла); текст только в сегменте,
+# FTS5 без содержимого (content='') хранит лишь индекс слов
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY, server TEXT NOT NULL, path TEXT NOT NULL,
+    started REAL NOT NULL, ended REAL, lines INTEGER NOT NULL DEFAULT 0, compressed INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS lines (
+    id INTEGER PRIMARY KEY, ts REAL NOT NULL, segment INTEGER NOT NULL, position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lines_ts ON lines(ts);
+CREATE VIRTUAL TABLE IF NOT EXISTS lines_fts USING fts5(
+    text, content='', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+STAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def connect(db_path):
+    connection = sqlite3.connect(db_path, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+def fts_query(text):
+    """Слова запроса как фразы FTS5 (все должны встретиться), чтобы кавычки и операторы не ломали поиск."""
+    return ' '.join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+def compress_segment(path):
+    """Сжимает закрытый сегмент рядом (.gz) и удаляет исходник. Возвращает новый путь."""
+    compressed_path = path + '.gz'
+    with open(path, 'rb') as source, gzip.open(compressed_path + '.tmp', 'wb', compresslevel=6) as target:
+        shutil.copyfileobj(source, target, 1024 * 1024)
+    os.replace(compressed_path + '.tmp', compressed_path)
+    os.remove(path)
+    return compressed_path
+
+
+def open_segment_file(path):
+    """Сегмент для чтения: несжатый или уже сжатый (путь в базе мог устареть после сжатия)."""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    try:
+        return open(path, 'rb')
+    except FileNotFoundError:
+        return gzip.open(path + '.gz', 'rb')
+
+
+def read_lines_at(path, positions):
+    """{смещение: строка} для смещений в одном сегменте; gzip читается за один проход вперед."""
+    texts = {}
+    with open_segment_file(path) as file:
+        for position in sorted(positions):
+            file.seek(position)
+            raw = file.readline()
+            texts[position] = raw.decode('utf-8', errors='ignore').rstrip('\n').partition('\t')[2]
+    return texts
+
+
+class _Segment:
+    def __init__(self, segment_id, path, started):
+        self.id = segment_id
+        self.path = path
+        self.started = started
+        self.file = open(path, 'ab')
+        self.size = self.file.tell()
+        self.lines = 0
+
+
+class ConsoleArchive:
+    """
+    append() вызывается из display_output и стоит одну вставку в deque. Фоновый поток раз в
+    flush_interval дописывает накопленное в сегмент сервера и в индекс одной транзакцией.
+    """
+
+    def __init__(self, directory=ARCHIVE_DIR, max_segment_bytes=MAX_SEGMENT_BYTES,
+                 max_segment_seconds=MAX_SEGMENT_SECONDS, flush_interval=FLUSH_INTERVAL):
+        self.directory = directory
+        self.segments_dir = os.path.join(directory, SEGMENTS_DIR)
+        self.db_path = os.path.join(directory, DB_NAME)
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+        self.flush_interval = flush_interval
+        os.makedirs(self.segments_dir, exist_ok=True)
+        connection = connect(self.db_path)
+        with connection:
+            reindex = self._migrate(connection)
+            connection.executescript(SCHEMA)
+            connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            # Сегменты прошлых запусков закрыты, но могли остаться несжатыми (сжатие при выходе не ждем)
+            leftovers = connection.execute("SELECT id, path FROM segments WHERE compressed = 0").fetchall()
+            connection.execute("UPDATE segments SET ended = started WHERE ended IS NULL")
+        connection.close()
+        self._reindex = deque(reindex)
+        self._queue = deque()
+        # Переиндексируемые сегменты считаются добавленными: flush(timeout) ждет и их
+        self._appended = len(reindex)
+        self._written = 0
+        self._written_changed = threading.Condition()
+        self._segments = {}  # server -> _Segment
+        self._compress_queue = deque(leftovers)
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._local = threading.local()
+        self._writer = threading.Thread(target=self._run, name='console-archive', daemon=True)
+        self._compressor = None
+        self._writer.start()
+        self._start_compressor()
+
+    @staticmethod
+    def _migrate(connection):
+        """
+        Архив версии 1 хранил текст каждой строки в базе: таблицы индекса пересоздаются,
+        а существующие сегменты переиндексируются фоновым потоком. Возвращает [(id, путь)] сегментов.
+        """
+        if connection.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return []
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(lines)")}
+        if 'text' not in columns:
+            return []
+        connection.execute("DROP TABLE IF EXISTS lines_fts")
+        connection.execute("DROP TABLE lines")
+        logging.info("Console archive index is rebuilt without line text")
+        return connection.execute("SELECT id, path FROM segments ORDER BY id").fetchall()
+
+    # --- запись ---
+
+    def append(self, server, lines, received=None):
+        if lines:
+            self._queue.append((server, time.time() if received is None else received, lines))
+            self._appended += 1
+
+    def _run(self):
+        connection = connect(self.db_path)
+        try:
+            # Переиндексация после обновления доводится до конца даже при закрытии: иначе строки пропадут из поиска
+            while self._reindex:
+                segment_id, path = self._reindex.popleft()
+                try:
+                    self._reindex_segment(connection, segment_id, path)
+                except (OSError, EOFError, sqlite3.Error) as e:
+                    logging.error(f"Failed to reindex console segment {path}: {e}")
+                with self._written_changed:
+                    self._written += 1
+                    self._written_changed.notify_all()
+            while True:
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                stopping = self._stopping
+                try:
+                    self._write_batch(connection)
+                except (OSError, sqlite3.Error) as e:
+                    logging.error(f"Console archive write failed: {e}")
+                if stopping:
+                    break
+            for server in list(self._segments):
+                self._close_segment(connection, server, compress=False)
+        finally:
+            connection.close()
+
+    def _write_batch(self, connection):
+        batch = []
+        while self._queue:
+            batch.append(self._queue.popleft())
+        if not batch:
+            return
+        try:
+            self._write_lines(connection, batch)
+        finally:
+            with self._written_changed:
+                self._written += len(batch)
+                self._written_changed.notify_all()
+
+    def _write_lines(self, connection, batch):
+        rows = []
+        for server, received, lines in batch:
+            segment = self._segment(connection, server, received)
+            stamp = datetime.fromtimestamp(received).strftime(STAMP_FORMAT)
+            data = bytearray()
+            for line in lines:
+                rows.append((received, segment.id, segment.size + len(data), line))
+                data += f"{stamp}\t{line}\n".encode('utf-8')
+            segment.file.write(data)
+            segment.size += len(data)
+            segment.lines += len(lines)
+        # Сначала строки на диске, потом индекс: найденное поиском всегда можно прочитать
+        for segment in self._segments.values():
+            segment.file.flush()
+        self._index_rows(connection, rows)
+        for server, segment in list(self._segments.items()):
+            if segment.size >= self.max_segment_bytes or time.time() - segment.started >= self.max_segment_seconds:
+                self._close_segment(connection, server)
+
+    @staticmethod
+    def _index_rows(connection, rows):
+        """rows: [(время, сегмент, смещение, текст)]."""
+        with connection:
+            first_id = (connection.execute("SELECT COALESCE(MAX(id), 0) FROM lines").fetchone()[0]) + 1
+            connection.executemany("INSERT INTO lines (id, ts, segment, position) VALUES (?, ?, ?, ?)",
+                                   ((first_id + index, ts, segment, position)
+                                    for index, (ts, segment, position, _) in enumerate(rows)))
+            connection.executemany("INSERT INTO lines_fts (rowid, text) VALUES (?, ?)",
+                                   ((first_id + index, row[3]) for index, row in enumerate(rows)))
+
+    def _reindex_segment(self, connection, segment_id, path):
+        rows = []
+        with open_segment_file(path) as file:
+            position = 0
+            for raw in file:
+                stamp, _, text = raw.decode('utf-8', errors='ignore').rstrip('\n').partition('\t')
+                try:
+                    ts = datetime.strptime(stamp, STAMP_FORMAT).timestamp()
+                except ValueError:
+                    ts = None
+                if ts is not None:
+                    rows.append((ts, segment_id, position, text))
+                position += len(raw)
+        self._index_rows(connection, rows)
+
+    def _segment(self, connection, server, received):
+        segment = self._segments.get(server)
+        if segment is None:
+            safe_name = ''.join(char if char.isalnum() or char in '-_' else '_' for char in server)
+            stamp = datetime.fromtimestamp(received).strftime('%Y%m%d-%H%M%S')
+            with connection:
+                segment_id = connection.execute("INSERT INTO segments (server, path, started) VALUES (?, '', ?)",
+                                                (server, received)).lastrowid
+                # id в имени: сегменты, открытые в одну секунду, не пересекаются
+                path = os.path.join(self.segments_dir, f"{safe_name}-{stamp}-{segment_id}.log")
+                connection.execute("UPDATE segments SET path = ? WHERE id = ?", (path, segment_id))
+            segment = self._segments[server] = _Segment(segment_id, path, received)
+        return segment
+
+    def _close_segment(self, connection, server, compress=True):
+        segment = self._segments.pop(server)
+        segment.file.close()
+        with connection:
+            connection.execute("UPDATE segments SET ended = ?, lines = lines + ? WHERE id = ?",
+                               (time.time(), segment.lines, segment.id))
+        if compress:
+            self._compress_queue.append((segment.id, segment.path))
+            self._start_compressor()
+
+    # --- сжатие ---
+
+    def _start_compressor(self):
+        if self._compress_queue and (self._compressor is None or not self._compressor.is_alive()):
+            self._compressor = threading.Thread(target=self._compress_pending, name='console-archive-gzip',
+                                                daemon=True)
+            self._compressor.start()
+
+    def _compress_pending(self):
+        connection = connect(self.db_path)
+        try:
+            while self._compress_queue:
+                segment_id, path = self._compress_queue.popleft()
+                if not os.path.exists(path):
+                    continue
+                try:
+                    compressed_path = compress_segment(path)
+                except OSError as e:
+                    logging.error(f"Failed to compress {path}: {e}")
+                    continue
+                with connection:
+                    connection.execute("UPDATE segments SET path = ?, compressed = 1 WHERE id = ?",
+                                       (compressed_path, segment_id))
+                logging.info(f"Compressed console segment {compressed_path}")
+        finally:
+            connection.close()
+
+    # --- поиск ---
+
+    def _reader(self):
+        """Отдельное соединение на поток: поиск из UI не ждет фоновую запись (WAL)."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = connect(self.db_path)
+        return connection
+
+    def search(self, text, server=None, since=None, until=None, limit=SEARCH_LIMIT):
+        """
+        Последние limit строк со всеми словами запроса: [(время, сервер, строка)], новые первыми.
+        id строк растут вместе со временем, поэтому период превращается в диапазон rowid для FTS.
+        Читает сегменты, поэтому вызывается не из потока интерфейса.
+        """
+        query = fts_query(text)
+        if not query:
+            return []
+        connection = self._reader()
+        low, high = connection.execute(
+            "SELECT (SELECT id FROM lines WHERE ts >= ? ORDER BY ts LIMIT 1), "
+            "(SELECT id FROM lines WHERE ts <= ? ORDER BY ts DESC LIMIT 1)",
+            (since if since is not None else 0, until if until is not None else 1e12)).fetchone()
+        if low is None or high is None:
+            return []
+        sql = ("SELECT lines.ts, segments.server, segments.path, lines.position FROM lines_fts "
+               "JOIN lines ON lines.id = lines_fts.rowid JOIN segments ON segments.id = lines.segment "
+               "WHERE lines_fts MATCH ? AND lines_fts.rowid BETWEEN ? AND ?")
+        parameters = [query, low, high]
+        if server:
+            sql += " AND segments.server = ?"
+            parameters.append(server)
+        sql += " ORDER BY lines_fts.rowid DESC LIMIT ?"
+        parameters.append(limit)
+        found = connection.execute(sql, parameters).fetchall()
+
+        # Текст строк читается из сегментов, по одному открытию на сегмент
+        positions = {}
+        for _, _, path, position in found:
+            positions.setdefault(path, []).append(position)
+        texts = {}
+        for path, segment_positions in positions.items():
+            try:
+                texts[path] = read_lines_at(path, segment_positions)
+            except (OSError, EOFError) as e:
+                logging.error(f"Failed to read console segment {path}: {e}")
+                texts[path] = {}
+        return [(ts, server_name, texts[path].get(position, ''))
+                for ts, server_name, path, position in found]
+
+    def servers(self):
+        return [row[0] for row in self._reader().execute("SELECT DISTINCT server FROM segments ORDER BY server")]
+
+    def flush(self, timeout=None):
+        """Будит фоновый поток; с timeout ждет, пока будет записано все добавленное до вызова."""
+        target = self._appended
+        self._wakeup.set()
+        if timeout is not None:
+            with self._written_changed:
+                self._written_changed.wait_for(lambda: self._written >= target, timeout)
+
+    def close_reader(self):
+        """Закрывает соединение текущего потока (для потоков, которые искали один раз)."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def close(self):
+        self._stopping = True
+        self._wakeup.set()
+        self._writer.join()
+        if self._compressor is not None:
+            self._compressor.join()
+        self.close_reader()
@@ -0,0 +1,47 @@
+# console_events.py
+
+# Разбор строк консоли сервера: сборка строк из кусков вывода и события игроков
+import re
+
+JOIN_RE = re.compile(r'"(?P<name>[^"]+)" fully connected')
+LEAVE_RE = re.compile(r'[Dd]isconnected player "(?P<name>[^"]+)"')
+
+
+class LineSplitter:
+    """QProcess отдает вывод кусками: копит неполную последнюю строку до следующего куска."""
+
+    def __init__(self):
+        self._partial = ''
+        self._partial_time = None
+
+    def feed(self, text):
+        return [line for line, _ in self.feed_timed(text)]
+
+    def feed_timed(self, text, received=None):
+        """Как feed, но каждая строка с временем прихода ее начала: [(строка, время)]."""
+        started = self._partial_time if self._partial else received
+        text = self._partial + text.replace('\r\n', '\n').replace('\r', '\n')
+        lines = text.split('\n')
+        self._partial = lines.pop()
+        if lines:
+            self._partial_time = received
+        else:
+            self._partial_time = started
+            return []
+        return [(lines[0], started)] + [(line, received) for line in lines[1:]]
+
+    def flush(self):
+        line, self._partial = self._partial, ''
+        self._partial_time = None
+        return [line] if line else []
+
+
+def parse_player_event(line):
+    """('join', имя), ('leave', имя) или None."""
+    match = JOIN_RE.search(line)
+    if match:
+        return 'join', match.group('name')
+    match = LEAVE_RE.search(line)
+    if match:
+        return 'leave', match.group('name')
+    return None
@@ -0,0 +1,291 @@
+# content_store.py
+
+# Общее хранилище содержимого для нескольких установок сервера: одинаковые файлы заменяются
+# жесткими ссылками (или reflink) на объект в хранилище
+import os
+import sys
+import json
+import shutil
+import hashlib
+import logging
+import configparser
+from concurrent.futures import ThreadPoolExecutor
+from file_manager import atomic_write_text
+
+INDEX_NAME = 'index.json'
+MIN_FILE_SIZE = 4096
+FICLONE = 0x40049409  # ioctl для reflink на Linux (btrfs, xfs)
+
+
+def get_content_store_dir(config_path):
+    """Папка хранилища из секции [ContentStore] config.ini или None, если дедупликация не настроена."""
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    path = config.get('ContentStore', 'path', fallback='')
+    return path or None
+
+
+def get_content_store_roots(config_path):
+    """Дополнительные установки сервера, которые делят хранилище (ContentStore.roots, через ';')."""
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    return [root.strip() for root in config.get('ContentStore', 'roots', fallback='').split(';') if root.strip()]
+
+
+def get_content_store_reflink(config_path):
+    """ContentStore.reflink = true: reflink-копии вместо жестких ссылок (btrfs/xfs на Linux)."""
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    return config.getboolean('ContentStore', 'reflink', fallback=False)
+
+
+def hash_file(path):
+    digest = hashlib.blake2b(digest_size=32)
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def object_path(store_dir, file_hash):
+    return os.path.join(store_dir, 'objects', file_hash[:2], file_hash)
+
+
+def load_index(store_dir):
+    index_path = os.path.join(store_dir, INDEX_NAME)
+    if os.path.exists(index_path):
+        with open(index_path, 'r', encoding='utf-8') as index_file:
+            try:
+                return json.load(index_file)
+            except json.JSONDecodeError:
+                return {}
+    return {}
+
+
+def save_index(store_dir, index):
+    atomic_write_text(os.path.join(store_dir, INDEX_NAME), json.dumps(index))
+
+
+def iter_files(root, exclude=None):
+    if os.path.isfile(root):
+        yield root
+        return
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        if exclude and os.path.abspath(current) == exclude:
+            continue
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry.path
+        except OSError as e:
+            logging.warning(f"Skipping {current}: {e}")
+
+
+def _reflink(src, dst):
+    import fcntl
+    with open(src, 'rb') as src_file, open(dst, 'wb') as dst_file:
+        fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+
+
+def _replace_with_object(path, obj_path, use_reflink):
+    tmp_path = f"{path}.dedupe_tmp"
+    try:
+        if use_reflink:
+            _reflink(obj_path, tmp_path)
+            shutil.copystat(path, tmp_path)
+        else:
+            os.link(obj_path, tmp_path)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _hash_if_needed(path, entry):
+    st = os.stat(path)
+    if st.st_size < MIN_FILE_SIZE:
+        return None
+    if entry and entry['size'] == st.st_size and entry['mtime'] == st.st_mtime_ns and entry['ino'] == st.st_ino:
+        return entry['hash'], st, True
+    return hash_file(path), st, False
+
+
+def dedupe_tree(root, store_dir, use_reflink=False, max_workers=8):
+    """
+    Переносит содержимое файлов root в хранилище и заменяет дубликаты ссылками на объект.
+    Возвращает статистику: files, linked, bytes_saved.
+    """
+    return dedupe_paths([root], store_dir, use_reflink, max_workers)
+
+
+def dedupe_paths(roots, store_dir, use_reflink=False, max_workers=8):
+    """dedupe_tree для нескольких папок или файлов с одной загрузкой индекса."""
+    if use_reflink and not sys.platform.startswith('linux'):
+        use_reflink = False
+    store_dir = os.path.abspath(store_dir)
+    os.makedirs(os.path.join(store_dir, 'objects'), exist_ok=True)
+    index = load_index(store_dir)
+    paths = [os.path.abspath(path) for root in roots for path in iter_files(root, exclude=store_dir)]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        hashed = list(executor.map(lambda path: _hash_if_needed(path, index.get(path)), paths))
+
+    stats = {'files': 0, 'linked': 0, 'bytes_saved': 0}
+    for path, result in zip(paths, hashed):
+        if result is None:
+            continue
+        file_hash, st, unchanged = result
+        stats['files'] += 1
+        if unchanged:
+            continue
+        obj_path = object_path(store_dir, file_hash)
+        try:
+            if not os.path.exists(obj_path):
+                os.makedirs(os.path.dirname(obj_path), exist_ok=True)
+                if use_reflink:
+                    _reflink(path, obj_path)
+                else:
+                    os.link(path, obj_path)
+            elif os.stat(obj_path).st_ino != st.st_ino:
+                _replace_with_object(path, obj_path, use_reflink)
+                stats['linked'] += 1
+                stats['bytes_saved'] += st.st_size
+        except OSError as e:
+            logging.warning(f"Failed to dedupe {path}: {e}")
+            continue
+        st = os.stat(path)
+        index[path] = {'hash': file_hash, 'size': st.st_size, 'mtime': st.st_mtime_ns, 'ino': st.st_ino}
+
+    save_index(store_dir, index)
+    logging.info(f"Deduplicated {', '.join(roots)} into {store_dir}: {stats}")
+    return stats
+
+
+def unshare_tree(root, store_dir):
+    """
+    Copy-on-update: заменяет общие жесткие ссылки под root на собственные копии, чтобы запись
+    в файлы на месте не меняла другие установки. Возвращает число скопированных файлов.
+    """
+    return unshare_paths([root], store_dir)
+
+
+def unshare_paths(paths, store_dir):
+    """unshare_tree только для перечисленных папок или файлов (то, во что будет писать SteamCMD)."""
+    store_dir = os.path.abspath(store_dir)
+    index = load_index(store_dir)
+    copied = 0
+    for root in paths:
+        if not os.path.exists(root):
+            continue
+        for path in iter_files(root, exclude=store_dir):
+            try:
+                # Reflink-копии и так независимы: у них одна ссылка
+                if os.stat(path).st_nlink < 2:
+                    continue
+                tmp_path = f"{path}.unshare_tmp"
+                shutil.copy2(path, tmp_path)
+                os.replace(tmp_path, path)
+                copied += 1
+                index.pop(os.path.abspath(path), None)
+            except OSError as e:
+                logging.warning(f"Failed to unshare {path}: {e}")
+    save_index(store_dir, index)
+    logging.info(f"Unshared {copied} files under {', '.join(paths)}")
+    return copied
+
+
+def snapshot_shared(root, store_dir):
+    """
+    Общие файлы root из индекса: path -> (ino, size, mtime). Только stat, без чтения содержимого:
+    по снимку после обновления видно, в какие общие файлы SteamCMD записал на месте.
+    """
+    store_dir = os.path.abspath(store_dir)
+    index = load_index(store_dir)
+    snapshot = {}
+    for path in iter_files(root, exclude=store_dir):
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if st.st_nlink >= 2 and path in index:
+            snapshot[path] = (st.st_ino, st.st_size, st.st_mtime_ns)
+    return snapshot
+
+
+def release_written_in_place(snapshot, store_dir):
+    """
+    Находит общие файлы из снимка, измененные на месте (тот же inode, другие размер или время),
+    удаляет их объекты и записи индекса. Возвращает другие файлы, делившие эти объекты:
+    их содержимое тоже изменилось, и их установки нужно проверить через validate.
+    """
+    store_dir = os.path.abspath(store_dir)
+    index = load_index(store_dir)
+    written = set()
+    for path, (ino, size, mtime) in snapshot.items():
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if st.st_ino == ino and (st.st_size, st.st_mtime_ns) != (size, mtime) and path in index:
+            written.add(index[path]['hash'])
+    if not written:
+        return []
+    affected = sorted(path for path, entry in index.items() if entry['hash'] in written and path not in snapshot)
+    for file_hash in written:
+        try:
+            os.remove(object_path(store_dir, file_hash))
+        except OSError:
+            pass
+    for path, entry in list(index.items()):
+        if entry['hash'] in written:
+            index.pop(path)
+    save_index(store_dir, index)
+    logging.warning(f"SteamCMD wrote {len(written)} shared objects in place, affected files: {affected}")
+    return affected
+
+
+def verify_store(store_dir, repair=False, max_workers=8):
+    """
+    Перепроверяет хеши объектов хранилища. С repair=True удаляет поврежденные объекты и записи индекса,
+    которые на них указывают (эти файлы нужно перепроверить через SteamCMD validate), а также
+    объекты, на которые больше не ссылается ни одна установка.
+    """
+    store_dir = os.path.abspath(store_dir)
+    objects = list(iter_files(os.path.join(store_dir, 'objects')))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        hashes = list(executor.map(hash_file, objects))
+
+    corrupt = {os.path.basename(path) for path, file_hash in zip(objects, hashes)
+               if os.path.basename(path) != file_hash}
+    index = load_index(store_dir)
+    affected = sorted(path for path, entry in index.items() if entry['hash'] in corrupt)
+    referenced = {entry['hash'] for entry in index.values()}
+    unreferenced = [path for path in objects if os.path.basename(path) not in referenced | corrupt]
+
+    if repair:
+        for file_hash in corrupt:
+            os.remove(object_path(store_dir, file_hash))
+        for path in unreferenced:
+            os.remove(path)
+        for path in affected:
+            index.pop(path, None)
+        # Записи, файлы которых исчезли или были заменены после дедупликации
+        for path, entry in list(index.items()):
+            try:
+                if os.stat(path).st_ino != entry['ino']:
+                    index.pop(path)
+            except OSError:
+                index.pop(path)
+        save_index(store_dir, index)
+
+    result = {'objects': len(objects), 'corrupt': sorted(corrupt), 'affected_files': affected,
+              'unreferenced': len(unreferenced)}
+    logging.info(f"Verified content store {store_dir}: {len(objects)} objects, {len(corrupt)} corrupt")
+    return result
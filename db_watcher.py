@@ -0,0 +1,169 @@
+# db_watcher.py
+
+# Отслеживание изменений servertest.db (whitelist, баны) без перечитывания таблиц:
+# os.stat файлов базы -> PRAGMA data_version -> журнал изменений, который ведут триггеры.
+import os
+import sqlite3
+import logging
+
+CHANGES_TABLE = 'pzmm_changes'
+PRUNE_AFTER = 10000
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class DatabaseWatcher:
+    """
+    Триггеры AFTER INSERT/UPDATE/DELETE пишут (таблица, rowid) в pzmm_changes, poll() возвращает
+    только затронутые rowid. Если триггеры поставить нельзя (база занята, нет прав),
+    poll() сообщает, что изменилось все, и таблицы перечитываются целиком.
+    Триггеры живут только пока открыт менеджер: close() их удаляет, иначе журнал рос бы без чтения.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path, timeout=5)
+        self.tables = [row[0] for row in self.connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' AND name != ? "
+            "ORDER BY rowid", (CHANGES_TABLE,))]
+        self.change_log = False
+        self.last_change_id = 0
+        self._pruned_up_to = 0
+        self._untracked = []  # таблицы WITHOUT ROWID: триггеру нечего записать, перечитываются целиком
+        self._stat = self._file_stat()
+        self._data_version = self._read_data_version()
+
+    def _file_stat(self):
+        stat = []
+        for path in (self.db_path, self.db_path + '-wal'):
+            try:
+                st = os.stat(path)
+                stat.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stat.append(None)
+        return stat
+
+    def _read_data_version(self):
+        return self.connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def install_change_log(self):
+        """Создает журнал изменений и триггеры (один раз, IF NOT EXISTS). Возвращает, удалось ли."""
+        try:
+            with self.connection:
+                self.connection.execute(f"CREATE TABLE IF NOT EXISTS {CHANGES_TABLE} "
+                                        "(id INTEGER PRIMARY KEY, tbl TEXT NOT NULL, row_id INTEGER NOT NULL)")
+                self._untracked = []
+                for table in self.tables:
+                    if self._without_rowid(table):
+                        self._untracked.append(table)
+                        continue
+                    name = quote(table)
+                    literal = "'" + table.replace("'", "''") + "'"
+                    for event, rows in (('INSERT', ['NEW']), ('UPDATE', ['OLD', 'NEW']), ('DELETE', ['OLD'])):
+                        values = ', '.join(f"({literal}, {row}.rowid)" for row in rows)
+                        self.connection.execute(
+                            f"CREATE TRIGGER IF NOT EXISTS {quote(f'pzmm_{table}_{event.lower()}')} "
+                            f"AFTER {event} ON {name} BEGIN "
+                            f"INSERT INTO {CHANGES_TABLE} (tbl, row_id) VALUES {values}; END")
+                # Записи прошлых запусков (например, после падения) не нужны: таблицы сейчас читаются целиком
+                self.connection.execute(f"DELETE FROM {CHANGES_TABLE}")
+            self.last_change_id = 0
+            self._pruned_up_to = 0
+            self.change_log = True
+        except sqlite3.Error as e:
+            logging.warning(f"Change log for {self.db_path} not installed, falling back to full reloads: {e}")
+            self.change_log = False
+        self._stat = self._file_stat()
+        self._data_version = self._read_data_version()
+        return self.change_log
+
+    def _without_rowid(self, table):
+        sql = self.connection.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                      (table,)).fetchone()[0] or ''
+        return 'WITHOUT ROWID' in sql.upper()
+
+    def columns(self, table):
+        return [column[1] for column in self.connection.execute(f"PRAGMA table_info({quote(table)})")]
+
+    def load_table(self, table):
+        """[(rowid, значения)] всей таблицы."""
+        if self._without_rowid(table):
+            return [(None, row) for row in self.connection.execute(f"SELECT * FROM {quote(table)}")]
+        return [(row[0], row[1:]) for row in self.connection.execute(f"SELECT rowid, * FROM {quote(table)}")]
+
+    def fetch_rows(self, table, rowids):
+        """rowid -> значения или None, если строка удалена."""
+        rowids = list(rowids)
+        result = dict.fromkeys(rowids)
+        for start in range(0, len(rowids), 500):
+            chunk = rowids[start:start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            for row in self.connection.execute(
+                    f"SELECT rowid, * FROM {quote(table)} WHERE rowid IN ({placeholders})", chunk):
+                result[row[0]] = row[1:]
+        return result
+
+    def poll(self):
+        """
+        {таблица: множество rowid или None (перечитать целиком)}; пустой словарь, если ничего не менялось.
+        В простое это два os.stat и ни одного запроса к базе.
+        """
+        stat = self._file_stat()
+        if stat == self._stat:
+            return {}
+        self._stat = stat
+        data_version = self._read_data_version()
+        if data_version == self._data_version:
+            return {}  # наши собственные записи или checkpoint WAL
+        self._data_version = data_version
+        return self._read_changes()
+
+    def changes_since_own_write(self):
+        """Изменения после записи через это же соединение (data_version на нее не реагирует)."""
+        self._stat = self._file_stat()
+        return self._read_changes()
+
+    def _read_changes(self):
+        if not self.change_log:
+            return dict.fromkeys(self.tables)
+        changed = dict.fromkeys(self._untracked)
+        rows = self.connection.execute(f"SELECT id, tbl, row_id FROM {CHANGES_TABLE} WHERE id > ? ORDER BY id",
+                                       (self.last_change_id,)).fetchall()
+        for change_id, table, row_id in rows:
+            if table not in self._untracked:
+                changed.setdefault(table, set()).add(row_id)
+            self.last_change_id = change_id
+        if self.last_change_id - self._pruned_up_to > PRUNE_AFTER:
+            self._prune()
+        return changed
+
+    def _prune(self):
+        """Журнал нужен только для еще не прочитанных записей; старые удаляются пачкой."""
+        try:
+            with self.connection:
+                self.connection.execute(f"DELETE FROM {CHANGES_TABLE} WHERE id <= ?", (self.last_change_id,))
+            self._pruned_up_to = self.last_change_id
+        except sqlite3.Error as e:
+            logging.warning(f"Failed to prune {CHANGES_TABLE}: {e}")
+
+    def uninstall_change_log(self):
+        """Удаляет триггеры и журнал из базы сервера."""
+        try:
+            with self.connection:
+                triggers = [row[0] for row in self.connection.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'trigger' AND sql LIKE ?",
+                    (f"%INSERT INTO {CHANGES_TABLE} %",))]
+                for trigger in triggers:
+                    self.connection.execute(f"DROP TRIGGER IF EXISTS {quote(trigger)}")
+                self.connection.execute(f"DROP TABLE IF EXISTS {CHANGES_TABLE}")
+        except sqlite3.Error as e:
+            # Не удалось (база занята): при следующем запуске журнал будет очищен в install_change_log
+            logging.warning(f"Change log for {self.db_path} not removed: {e}")
+        self.change_log = False
+
+    def close(self):
+        if self.change_log:
+            self.uninstall_change_log()
+        self.connection.close()
@@ -1,10 +1,15 @@
 # file_manager.py
 
 import os
+import tempfile
 import configparser
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+# umask читается один раз при импорте: os.umask меняет его для всего процесса, а запись идет из потоков
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
 def ensure_config_exists(config_path):
     config = configparser.ConfigParser()
 
@@ -74,4 +79,28 @@ def start_modpack_observer(modpacks_list_widget, modpacks_dir):
     modpack_handler = ModpackFolderHandler(modpacks_list_widget, modpacks_dir)
     observer.schedule(modpack_handler, modpacks_dir, recursive=False)
     observer.start()
-    return observer
\ No newline at end of file
+    return observer
+
+
+def atomic_write_text(path, text, encoding='utf-8'):
+    """
+    Атомарно записывает текст: временный файл в той же папке + os.replace. Права заменяемого файла
+    сохраняются (mkstemp создает файл с 0600), новый файл получает обычные права с учетом umask.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp_', dir=directory)
+    try:
+        os.chmod(tmp_path, mode)
+        with os.fdopen(fd, 'w', encoding=encoding, newline='') as tmp_file:
+            tmp_file.write(text)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
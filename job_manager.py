@@ -0,0 +1,222 @@
+# job_manager.py
+
+# Очередь фоновых задач (установки, загрузки, сканирования) с приоритетами, лимитами по ресурсам,
+# отменой и повтором с backoff. Каждая задача выполняется своим QObject-воркером в отдельном QThread.
+import time
+import logging
+import itertools
+import threading
+from PySide6.QtCore import QObject, QThread, QTimer, Signal, Qt
+
+# Лимит одновременных задач на один ключ ресурса: 'steamcmd:<папка>' - одна SteamCMD на папку установки
+DEFAULT_LIMITS = {'steamcmd': 1, 'http': 4, 'disk': 2}
+
+QUEUED = 'queued'
+RUNNING = 'running'
+RETRY_WAIT = 'retry wait'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINAL_STATES = (DONE, FAILED, CANCELLED)
+
+# Потоки, не остановившиеся при выходе: Qt аварийно завершает процесс, если удалить работающий QThread
+_abandoned = []
+
+
+class CancelToken:
+    """Флаг отмены, который воркер проверяет между шагами своей работы."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    def is_cancelled(self):
+        return self._event.is_set()
+
+
+class Job:
+    def __init__(self, job_id, title, worker_factory, resources, priority, retries, backoff):
+        self.id = job_id
+        self.title = title
+        self.worker_factory = worker_factory  # (CancelToken) -> QObject с run(), finished, log (и по желанию failed, progress)
+        self.resources = tuple(resources)
+        self.priority = priority
+        self.retries = retries
+        self.backoff = backoff
+        self.state = QUEUED
+        self.attempts = 0
+        self.progress = None
+        self.error = None
+        self.token = CancelToken()
+        self.submitted_at = time.time()
+        self.not_before = 0.0
+
+
+class _JobRunner(QObject):
+    """Живет в главном потоке: сигналы воркера доходят сюда через очередь событий Qt."""
+
+    def __init__(self, manager, job):
+        super().__init__(manager)
+        self.manager = manager
+        self.job = job
+        self.error = None
+        self.thread = QThread()
+        self.worker = job.worker_factory(job.token)
+        self.worker.moveToThread(self.thread)
+
+        self.thread.started.connect(self.worker.run)
+        # Напрямую из потока воркера: при shutdown главный поток ждет в wait() и очередь событий не крутится
+        self.worker.finished.connect(self.thread.quit, Qt.DirectConnection)
+        self.worker.finished.connect(self.worker.deleteLater)
+        self.thread.finished.connect(self.thread.deleteLater)
+        self.worker.finished.connect(self.on_finished)
+        self.worker.log.connect(self.manager.log)
+        if hasattr(self.worker, 'failed'):
+            self.worker.failed.connect(self.on_failed)
+        if hasattr(self.worker, 'progress'):
+            self.worker.progress.connect(self.on_progress)
+
+    def start(self):
+        self.thread.start()
+
+    def on_failed(self, message):
+        self.error = message
+
+    def on_progress(self, value):
+        self.job.progress = value
+        self.manager.job_changed.emit(self.job)
+
+    def on_finished(self):
+        self.manager._on_finished(self, self.error)
+
+
+class JobManager(QObject):
+    job_changed = Signal(object)
+    log = Signal(str)
+
+    def __init__(self, limits=None, parent=None):
+        super().__init__(parent)
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.jobs = {}
+        self._ids = itertools.count(1)
+        self._running = {}  # job_id -> _JobRunner
+        self._in_use = {}  # ключ ресурса -> число запущенных задач
+        self._retry_timer = QTimer(self)
+        self._retry_timer.setSingleShot(True)
+        self._retry_timer.timeout.connect(self._schedule)
+
+    def submit(self, title, worker_factory, resources=(), priority=0, retries=0, backoff=5.0):
+        """Ставит задачу в очередь. Больший priority запускается раньше, при равном - в порядке постановки."""
+        job = Job(next(self._ids), title, worker_factory, resources, priority, retries, backoff)
+        self.jobs[job.id] = job
+        logging.info(f"Job {job.id} queued: {title} {list(job.resources)}")
+        self.job_changed.emit(job)
+        self._schedule()
+        return job
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None or job.state in FINAL_STATES:
+            return
+        job.token.cancel()
+        if job.state != RUNNING:
+            job.state = CANCELLED
+            self.job_changed.emit(job)
+            self._schedule()
+        else:
+            self.log.emit(f"Cancelling job: {job.title}")
+
+    def clear_finished(self):
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.state in FINAL_STATES]:
+            del self.jobs[job_id]
+
+    def active_jobs(self):
+        return [job for job in self.jobs.values() if job.state not in FINAL_STATES]
+
+    def _limit(self, resource):
+        return self.limits.get(resource.split(':', 1)[0], 1)
+
+    def _available(self, job):
+        return all(self._in_use.get(resource, 0) < self._limit(resource) for resource in job.resources)
+
+    def _schedule(self):
+        now = time.time()
+        waiting = sorted((job for job in self.jobs.values() if job.state in (QUEUED, RETRY_WAIT)),
+                         key=lambda job: (-job.priority, job.id))
+        next_retry = None
+        for job in waiting:
+            if job.not_before > now:
+                next_retry = min(next_retry or job.not_before, job.not_before)
+                continue
+            if self._available(job):
+                self._start(job)
+        if next_retry is not None:
+            self._retry_timer.start(max(0, int((next_retry - now) * 1000)))
+
+    def _start(self, job):
+        for resource in job.resources:
+            self._in_use[resource] = self._in_use.get(resource, 0) + 1
+        job.state = RUNNING
+        job.attempts += 1
+        job.error = None
+        runner = _JobRunner(self, job)
+        self._running[job.id] = runner
+        logging.info(f"Job {job.id} started (attempt {job.attempts}): {job.title}")
+        self.job_changed.emit(job)
+        runner.start()
+
+    def _on_finished(self, runner, error):
+        job = runner.job
+        self._running.pop(job.id, None)
+        runner.deleteLater()
+        for resource in job.resources:
+            self._in_use[resource] -= 1
+
+        if job.token.is_cancelled():
+            job.state = CANCELLED
+        elif error is None:
+            job.state = DONE
+        elif job.attempts <= job.retries:
+            # Повтор через backoff, удваивающийся с каждой попыткой
+            job.state = RETRY_WAIT
+            job.error = error
+            job.not_before = time.time() + job.backoff * 2 ** (job.attempts - 1)
+            self.log.emit(f"{job.title} failed ({error}), retrying in {job.not_before - time.time():.0f}s")
+        else:
+            job.state = FAILED
+            job.error = error
+        logging.info(f"Job {job.id} {job.state}: {job.title}")
+        self.job_changed.emit(job)
+        self._schedule()
+
+    def shutdown(self, timeout_ms=5000, unblock=None):
+        """
+        Отменяет все задачи и ждет завершения запущенных потоков. Если за timeout_ms остались
+        заблокированные воркеры, вызывает unblock() (например, убить процессы SteamCMD) и ждет еще раз.
+        Не остановившиеся потоки не удаляются. Возвращает их задачи.
+        """
+        for job in self.active_jobs():
+            self.cancel(job.id)
+        for runner in self._running.values():
+            runner.thread.quit()  # цикл событий потока завершится, как только run() вернется
+        stuck = self._wait_running(list(self._running.values()), timeout_ms)
+        if stuck and unblock is not None:
+            logging.warning(f"{len(stuck)} jobs still running after {timeout_ms} ms, unblocking them")
+            unblock()
+            stuck = self._wait_running(stuck, timeout_ms)
+        for runner in stuck:
+            logging.error(f"Job {runner.job.id} did not stop before exit: {runner.job.title}")
+            _abandoned.append((runner.thread, runner.worker))
+        return [runner.job for runner in stuck]
+
+    @staticmethod
+    def _wait_running(runners, timeout_ms):
+        deadline = time.monotonic() + timeout_ms / 1000
+        stuck = []
+        for runner in runners:
+            remaining = max(0, int((deadline - time.monotonic()) * 1000))
+            if not runner.thread.wait(remaining):
+                stuck.append(runner)
+        return stuck
@@ -0,0 +1,135 @@
+# launch_profile.py
+
+# Профили запуска JVM сервера: редактирование ProjectZomboid64.json и прямой запуск java без StartServer64.bat
+import os
+import sys
+import json
+import logging
+from file_manager import atomic_write_text
+
+PROFILES_PATH = 'launch_profiles.json'
+GC_OPTIONS = {
+    'Default': [],
+    'G1': ['-XX:+UseG1GC'],
+    'ZGC': ['-XX:+UseZGC'],
+    'Shenandoah': ['-XX:+UseShenandoahGC'],
+}
+MANAGED_PREFIXES = ('-Xms', '-Xmx', '-XX:MaxGCPauseMillis=', '-Djava.awt.headless=') + \
+    tuple(arg for args in GC_OPTIONS.values() for arg in args) + ('-XX:+UseParallelGC', '-XX:+UseSerialGC')
+
+DEFAULT_PROFILE = {
+    'xms': '',
+    'xmx': '4g',
+    'gc': 'Default',
+    'max_gc_pause_ms': '',
+    'headless': True,
+    'extra_args': [],
+    'server_args': []
+}
+
+
+def get_jvm_config_path(server_directory):
+    return os.path.join(server_directory, 'ProjectZomboid64.json')
+
+
+def read_jvm_config(server_directory):
+    with open(get_jvm_config_path(server_directory), 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def profile_from_vm_args(vm_args):
+    """Разбирает vmArgs из ProjectZomboid64.json в профиль."""
+    profile = dict(DEFAULT_PROFILE, extra_args=[], server_args=[], headless=False, xmx='')
+    for arg in vm_args:
+        if arg.startswith('-Xms'):
+            profile['xms'] = arg[4:]
+        elif arg.startswith('-Xmx'):
+            profile['xmx'] = arg[4:]
+        elif arg.startswith('-XX:MaxGCPauseMillis='):
+            profile['max_gc_pause_ms'] = arg.split('=', 1)[1]
+        elif arg.startswith('-Djava.awt.headless='):
+            profile['headless'] = arg.split('=', 1)[1] == 'true'
+        elif any(arg in args for args in GC_OPTIONS.values() if args):
+            profile['gc'] = next(name for name, args in GC_OPTIONS.items() if arg in args)
+    return profile
+
+
+def build_vm_args(vm_args, profile):
+    """Заменяет в vmArgs только то, чем управляет профиль, остальное (library path и т.п.) сохраняется."""
+    args = [arg for arg in vm_args if not arg.startswith(MANAGED_PREFIXES)]
+    if profile.get('headless'):
+        args.insert(0, '-Djava.awt.headless=true')
+    if profile.get('xms'):
+        args.append(f"-Xms{profile['xms']}")
+    if profile.get('xmx'):
+        args.append(f"-Xmx{profile['xmx']}")
+    args += GC_OPTIONS.get(profile.get('gc', 'Default'), [])
+    if profile.get('max_gc_pause_ms') and profile.get('gc') in ('G1', 'ZGC', 'Shenandoah'):
+        args.append(f"-XX:MaxGCPauseMillis={profile['max_gc_pause_ms']}")
+    args += [arg for arg in profile.get('extra_args', []) if arg not in args]
+    return args
+
+
+def write_jvm_config(server_directory, profile):
+    """Записывает профиль в vmArgs ProjectZomboid64.json (для запуска через StartServer64.bat)."""
+    config = read_jvm_config(server_directory)
+    config['vmArgs'] = build_vm_args(config.get('vmArgs', []), profile)
+    atomic_write_text(get_jvm_config_path(server_directory), json.dumps(config, indent=4))
+    logging.info(f"Updated JVM arguments in {get_jvm_config_path(server_directory)}")
+
+
+def build_java_command(server_directory, profile, platform=sys.platform):
+    """
+    Команда прямого запуска java, эквивалентная StartServer64.bat / start-server.sh.
+    Возвращает (program, arguments, environment).
+    """
+    config = read_jvm_config(server_directory)
+    windows = platform == 'win32'
+    java = os.path.join(server_directory, 'jre64', 'bin', 'java.exe' if windows else 'java')
+    classpath = (';' if windows else ':').join(config.get('classpath', []))
+    arguments = build_vm_args(config.get('vmArgs', []), profile)
+    arguments += ['-cp', classpath, config.get('mainClass', 'zombie/network/GameServer')]
+    arguments += profile.get('server_args', [])
+
+    environment = {}
+    if windows:
+        environment['PATH'] = os.pathsep.join([os.path.join(server_directory, 'jre64', 'bin'),
+                                               os.environ.get('PATH', '')])
+    else:
+        # Как в start-server.sh: libjsig.so (цепочка сигналов JVM) нужен, потому что нативные библиотеки
+        # сервера (Steam API, RakNet) ставят свои обработчики сигналов
+        environment['PATH'] = os.pathsep.join([os.path.join(server_directory, 'jre64', 'bin'),
+                                               os.environ.get('PATH', '')])
+        environment['LD_LIBRARY_PATH'] = ':'.join([
+            os.path.join(server_directory, 'linux64'), os.path.join(server_directory, 'natives'), server_directory,
+            os.path.join(server_directory, 'jre64', 'lib', 'amd64'), os.environ.get('LD_LIBRARY_PATH', '')])
+        environment['LD_PRELOAD'] = ':'.join(filter(None, [os.environ.get('LD_PRELOAD', ''), 'libjsig.so']))
+    return java, arguments, environment
+
+
+def load_profiles(path=PROFILES_PATH):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as file:
+            try:
+                return json.load(file)
+            except json.JSONDecodeError:
+                return {}
+    return {}
+
+
+def get_profile(server_directory, path=PROFILES_PATH):
+    """Сохраненный профиль установки сервера или профиль из текущего ProjectZomboid64.json."""
+    profiles = load_profiles(path)
+    key = os.path.normcase(os.path.abspath(server_directory))
+    if key in profiles:
+        return dict(DEFAULT_PROFILE, **profiles[key])
+    try:
+        return profile_from_vm_args(read_jvm_config(server_directory).get('vmArgs', []))
+    except (OSError, json.JSONDecodeError):
+        return dict(DEFAULT_PROFILE)
+
+
+def save_profile(server_directory, profile, path=PROFILES_PATH):
+    profiles = load_profiles(path)
+    profiles[os.path.normcase(os.path.abspath(server_directory))] = profile
+    atomic_write_text(path, json.dumps(profiles, ensure_ascii=False, indent=4))
@@ -0,0 +1,187 @@
+# lua_errors.py
+
+# Агрегация повторяющихся Lua ошибок из консоли и DebugLog: одна запись на уникальный стек
+import re
+import time
+import hashlib
+from collections import OrderedDict
+
+LOG_PREFIX_RE = re.compile(r'^\w+\s*:\s*\w+\s*,\s*\d+>\s*(?:[\d,]+>\s*)?')
+ERROR_START_RE = re.compile(r'^ERROR\s*:.*(?:Exception thrown|attempted index|Object tried to call nil|'
+                            r'RuntimeException|non-table|LuaException)')
+FRAME_RE = re.compile(r'function:\s*(?P<function>\S+)\s*--\s*file:\s*(?P<file>\S+)\s*line\s*#\s*(?P<line>\d+)'
+                      r'(?:\s*\|\s*(?:MOD:\s*(?P<mod>.+?)|Vanilla))?\s*$')
+MOD_PATH_RE = re.compile(r'[/\\]mods[/\\](?P<mod>[^/\\]+)[/\\]')
+VOLATILE_RE = re.compile(r'0x[0-9a-fA-F]+|@[0-9a-fA-F]+|\b\d+(?:\.\d+)?\b')
+VANILLA = '(vanilla)'
+
+MAX_ERRORS = 500
+MAX_FRAMES = 20
+MAX_BLOCK_LINES = 200
+
+
+def strip_log_prefix(line):
+    return LOG_PREFIX_RE.sub('', line, count=1)
+
+
+def normalize_message(message):
+    """Убирает из текста ошибки числа и адреса объектов, которые меняются между повторами."""
+    return VOLATILE_RE.sub('#', message).strip()
+
+
+def parse_frame(line):
+    """(function, file, line, mod) для строки стека Lua или None."""
+    match = FRAME_RE.search(line)
+    if not match:
+        return None
+    mod = match.group('mod')
+    if not mod:
+        path_match = MOD_PATH_RE.search(match.group('file'))
+        mod = path_match.group('mod') if path_match else VANILLA
+    return match.group('function'), match.group('file'), int(match.group('line')), mod.strip()
+
+
+def is_continuation(line):
+    """Строка продолжает блок ошибки: java стек, разделители, STACK TRACE и кадры Lua."""
+    if not line.strip():
+        return False
+    if line[0] in ' \t':
+        return True
+    text = strip_log_prefix(line).strip()
+    return (text.startswith(('at ', 'Caused by', 'STACK TRACE', 'function:', 'Callframe', '...'))
+            or set(text) == {'-'} or FRAME_RE.search(text) is not None)
+
+
+def fingerprint(message, frames):
+    """Отпечаток ошибки по нормализованному сообщению и кадрам (функция + файл, без номеров строк)."""
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(normalize_message(message).encode('utf-8', errors='ignore'))
+    for function, file, _, _ in frames:
+        digest.update(f"\0{function}\0{file}".encode('utf-8', errors='ignore'))
+    return digest.hexdigest()
+
+
+class LuaErrorAggregator:
+    """
+    Принимает строки по одной. Первое появление ошибки пропускается в консоль целиком,
+    повторы подавляются и только увеличивают счетчик. Число ошибок и размер блока ограничены.
+    """
+
+    def __init__(self, max_errors=MAX_ERRORS):
+        self.max_errors = max_errors
+        self.errors = OrderedDict()  # fingerprint -> запись, последние увиденные в конце
+        self.total = 0
+        self.suppressed = 0
+        self.version = 0  # растет при каждом изменении, чтобы UI обновлял таблицу только при нужде
+        self._block = None
+
+    def feed_line(self, line, now=None):
+        """Возвращает строки, которые нужно показать в консоли (ошибки придерживаются до конца блока)."""
+        if self._block is not None:
+            if is_continuation(line) and len(self._block['lines']) < MAX_BLOCK_LINES:
+                self._add_to_block(line)
+                return []
+            shown = self._finish_block()
+        else:
+            shown = []
+
+        if ERROR_START_RE.match(line):
+            self._block = {'message': strip_log_prefix(line), 'frames': [], 'lines': [line],
+                           'time': now if now is not None else time.time()}
+        else:
+            shown.append(line)
+        return shown
+
+    @property
+    def pending_block(self):
+        """Блок ошибки начат, но еще не завершен следующей строкой."""
+        return self._block is not None
+
+    def flush(self):
+        """Завершает незаконченный блок (конец потока или файла)."""
+        return self._finish_block() if self._block is not None else []
+
+    def _add_to_block(self, line):
+        self._block['lines'].append(line)
+        frame = parse_frame(line)
+        if frame and len(self._block['frames']) < MAX_FRAMES:
+            self._block['frames'].append(frame)
+
+    def _finish_block(self):
+        block, self._block = self._block, None
+        key = fingerprint(block['message'], block['frames'])
+        self.total += 1
+        self.version += 1
+        entry = self.errors.get(key)
+        if entry is not None:
+            entry['count'] += 1
+            entry['last_seen'] = block['time']
+            self.errors.move_to_end(key)
+            self.suppressed += len(block['lines'])
+            return []
+
+        mods = [frame[3] for frame in block['frames'] if frame[3] != VANILLA]
+        self.errors[key] = {
+            'fingerprint': key,
+            'message': block['message'],
+            'frames': block['frames'],
+            'mod': mods[0] if mods else VANILLA,
+            'count': 1,
+            'first_seen': block['time'],
+            'last_seen': block['time']
+        }
+        while len(self.errors) > self.max_errors:
+            self.errors.popitem(last=False)
+        return block['lines']
+
+    def merge(self, other):
+        """Добавляет ошибки, собранные другим агрегатором (например, в потоке чтения DebugLog)."""
+        if not other.total:
+            return
+        for key, other_entry in other.errors.items():
+            entry = self.errors.get(key)
+            if entry is None:
+                self.errors[key] = dict(other_entry)
+            else:
+                entry['count'] += other_entry['count']
+                entry['first_seen'] = min(entry['first_seen'], other_entry['first_seen'])
+                entry['last_seen'] = max(entry['last_seen'], other_entry['last_seen'])
+                self.errors.move_to_end(key)
+        while len(self.errors) > self.max_errors:
+            self.errors.popitem(last=False)
+        self.total += other.total
+        self.suppressed += other.suppressed
+        self.version += 1
+
+    def summary(self):
+        """Ошибки, от самых частых."""
+        return sorted(self.errors.values(), key=lambda entry: entry['count'], reverse=True)
+
+    def clear(self):
+        self.errors.clear()
+        self.total = 0
+        self.suppressed = 0
+        self.version += 1
+
+
+def read_log_increment(path, aggregator, offset=0):
+    """
+    Дочитывает файл лога с offset и передает строки агрегатору. Возвращает новый offset.
+    Незаконченный блок ошибки в конце файла не завершается: offset остается на его начале,
+    и в следующий раз блок дочитывается целиком.
+    """
+    block_start = offset
+    with open(path, 'rb') as file:
+        file.seek(0, 2)
+        if file.tell() < offset:  # файл пересоздан сервером
+            offset = block_start = 0
+        file.seek(offset)
+        for raw_line in file:
+            if not raw_line.endswith(b'\n'):
+                break  # неполная строка, дочитаем в следующий раз
+            line = raw_line.decode('utf-8', errors='ignore').rstrip('\r\n')
+            aggregator.feed_line(line)
+            if aggregator.pending_block and ERROR_START_RE.match(line):
+                block_start = offset
+            offset += len(raw_line)
+    return block_start if aggregator.pending_block else offset
@@ -0,0 +1,126 @@
+# metrics_exporter.py
+
+# Локальный HTTP endpoint с метриками в формате Prometheus
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    items = ','.join(
+        f'{key}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for key, value in labels)
+    return '{' + items + '}'
+
+
+class MetricsRegistry:
+    """
+    Счетчики и gauge обновляются из любых потоков за O(1) под блокировкой.
+    Текст для /metrics собирается только после изменений и кешируется между запросами.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}  # name -> (type, help, {labels: value})
+        self._version = 0
+        self._rendered_version = -1
+        self._rendered = ''
+        self._started_at = None
+
+    def _update(self, name, metric_type, help_text, labels, func):
+        key = tuple(sorted(labels.items())) if labels else ()
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = (metric_type, help_text, {})
+            elif help_text and not metric[1]:
+                # Первый вызов мог быть без описания: HELP берется из первого вызова, где оно есть
+                metric = self._metrics[name] = (metric[0], help_text, metric[2])
+            values = metric[2]
+            values[key] = func(values.get(key, 0))
+            self._version += 1
+
+    def set_gauge(self, name, value, help_text='', **labels):
+        self._update(name, 'gauge', help_text, labels, lambda old: value)
+
+    def inc_counter(self, name, amount=1, help_text='', **labels):
+        self._update(name, 'counter', help_text, labels, lambda old: old + amount)
+
+    def observe(self, name, seconds, help_text='', **labels):
+        """Summary без квантилей: одно семейство <name> с рядами <name>_sum и <name>_count."""
+        def add(old):
+            total, count = old or (0, 0)
+            return total + seconds, count + 1
+        self._update(name, 'summary', help_text, labels, add)
+
+    def set_server_started(self, started):
+        """Время запуска сервера; uptime считается при каждом запросе без пересборки всего текста."""
+        with self._lock:
+            self._started_at = time.time() if started else None
+        self.set_gauge('pz_server_up', 1 if started else 0, 'Whether the managed server process is running')
+
+    def render(self):
+        with self._lock:
+            if self._rendered_version != self._version:
+                lines = []
+                for name, (metric_type, help_text, values) in sorted(self._metrics.items()):
+                    if help_text:
+                        lines.append(f"# HELP {name} {help_text}")
+                    lines.append(f"# TYPE {name} {metric_type}")
+                    for labels, value in values.items():
+                        if metric_type == 'summary':
+                            lines.append(f"{name}_sum{_format_labels(labels)} {value[0]}")
+                            lines.append(f"{name}_count{_format_labels(labels)} {value[1]}")
+                        else:
+                            lines.append(f"{name}{_format_labels(labels)} {value}")
+                self._rendered = '\n'.join(lines) + '\n'
+                self._rendered_version = self._version
+            uptime = time.time() - self._started_at if self._started_at else 0
+            return (f"{self._rendered}# HELP pz_server_uptime_seconds Seconds since the managed server started\n"
+                    f"# TYPE pz_server_uptime_seconds gauge\n"
+                    f"pz_server_uptime_seconds {uptime:.0f}\n")
+
+
+registry = MetricsRegistry()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(f"Metrics request: {format % args}")
+
+
+class MetricsExporter:
+    """HTTP сервер в отдельном daemon-потоке, поэтому цикл Qt никогда не ждет запросов Prometheus."""
+
+    def __init__(self, host='127.0.0.1', port=9108):
+        self.host = host
+        self.port = port
+        self.server = None
+
+    def start(self):
+        self.server = ThreadingHTTPServer((self.host, self.port), _MetricsHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        logging.info(f"Metrics exporter listening on http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,140 @@
+# mod_conflicts.py
+
+# Поиск файловых конфликтов между активными модами (одинаковые пути в media/)
+import os
+import json
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+FILES_CACHE_PATH = 'modfiles_cache.json'
+
+
+def hash_file(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_mod_files(mod_path):
+    """Относительные пути (media/...) всех файлов мода -> (размер, mtime)."""
+    files = {}
+    media_dir = os.path.join(mod_path, 'media')
+    stack = [media_dir]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        stat = entry.stat()
+                        rel_path = os.path.relpath(entry.path, mod_path).replace(os.sep, '/')
+                        files[rel_path] = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            continue
+    return files
+
+
+def folder_signature(mod_path, files):
+    """
+    Сигнатура папки мода: список файлов media/ на любой глубине с размерами и mtime, плюс mod.info.
+    Меняется при правке, добавлении или удалении любого файла; содержимое не читается.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        digest.update(str(os.stat(os.path.join(mod_path, 'mod.info')).st_mtime_ns).encode())
+    except OSError:
+        pass
+    for rel_path in sorted(files):
+        size, mtime = files[rel_path]
+        digest.update(f"\0{rel_path}\0{size}\0{mtime}".encode('utf-8', errors='ignore'))
+    return digest.hexdigest()
+
+
+def load_files_cache(cache_path=FILES_CACHE_PATH):
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as file:
+            try:
+                return json.load(file)
+            except json.JSONDecodeError:
+                return {}
+    return {}
+
+
+def save_files_cache(cache, cache_path=FILES_CACHE_PATH):
+    with open(cache_path, 'w', encoding='utf-8') as file:
+        json.dump(cache, file, ensure_ascii=False)
+
+
+def _index_mod(mod_path, cached, with_hashes):
+    files = scan_mod_files(mod_path)
+    signature = folder_signature(mod_path, files)
+    if cached and cached.get('signature') == signature and (cached.get('hashed') or not with_hashes):
+        return cached, False
+    hashes = {rel_path: hash_file(os.path.join(mod_path, rel_path)) if with_hashes else None for rel_path in files}
+    return {'signature': signature, 'hashed': with_hashes, 'files': hashes}, True
+
+
+def build_path_index(mod_paths, with_hashes=False, cache_path=FILES_CACHE_PATH, max_workers=None):
+    """
+    mod_paths - список (mod_id, путь к папке мода) в порядке загрузки.
+    Возвращает путь (в нижнем регистре) -> список (mod_id, исходный путь, хеш) в порядке загрузки.
+    """
+    cache = load_files_cache(cache_path)
+    max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(
+            lambda item: _index_mod(item[1], cache.get(item[1]), with_hashes), mod_paths))
+
+    index = {}
+    changed = False
+    for (mod_id, mod_path), (entry, rebuilt) in zip(mod_paths, results):
+        changed = changed or rebuilt
+        cache[mod_path] = entry
+        for rel_path, file_hash in entry['files'].items():
+            index.setdefault(rel_path.lower(), []).append((mod_id, rel_path, file_hash))
+
+    if changed:
+        save_files_cache(cache, cache_path)
+    return index
+
+
+def find_conflicts(index, with_hashes=False):
+    """
+    Возвращает список пересечений, упорядоченный по позиции первого мода в порядке загрузки.
+    kind: 'conflict' - содержимое различается, 'duplicate' - содержимое одинаковое,
+    'override' - содержимое не сравнивалось. Побеждает последний мод в порядке загрузки.
+    """
+    report = []
+    for providers in index.values():
+        if len(providers) < 2:
+            continue
+        if with_hashes:
+            kind = 'conflict' if len({file_hash for _, _, file_hash in providers}) > 1 else 'duplicate'
+        else:
+            kind = 'override'
+        report.append({
+            'path': providers[0][1],
+            'kind': kind,
+            'mods': [mod_id for mod_id, _, _ in providers],
+            'winner': providers[-1][0]
+        })
+    return report
+
+
+def check_active_mods(load_order, local_paths, with_hashes=False, cache_path=FILES_CACHE_PATH):
+    """load_order - Mod ID в порядке загрузки, local_paths - Mod ID -> папка мода."""
+    mod_paths = [(mod_id, local_paths[mod_id]) for mod_id in load_order if mod_id in local_paths]
+    skipped = [mod_id for mod_id in load_order if mod_id not in local_paths]
+    if skipped:
+        logging.info(f"Skipped mods without local files: {skipped}")
+
+    index = build_path_index(mod_paths, with_hashes, cache_path)
+    position = {mod_id: i for i, mod_id in enumerate(load_order)}
+    report = find_conflicts(index, with_hashes)
+    report.sort(key=lambda item: (position[item['mods'][0]], item['path']))
+    return report
@@ -0,0 +1,168 @@
+# mod_dependencies.py
+
+# Граф зависимостей модов (require= из mod.info) и вычисление порядка загрузки
+import logging
+from collections import deque
+
+
+def build_requires_map(mods_db):
+    """Mod ID -> список требуемых Mod ID по данным каталога."""
+    requires = {}
+    for mod in mods_db:
+        mod_requires = mod.get('require', {})
+        for mod_id in mod.get('Mod ID', []):
+            requires.setdefault(mod_id, list(mod_requires.get(mod_id, [])))
+    return requires
+
+
+def build_providers_map(mods_db):
+    """Mod ID -> первая запись каталога, которая его содержит."""
+    providers = {}
+    for mod in mods_db:
+        for mod_id in mod.get('Mod ID', []):
+            providers.setdefault(mod_id, mod)
+    return providers
+
+
+def topological_sort(nodes, edges):
+    """
+    Стабильная топологическая сортировка за O(V + E).
+    nodes - узлы в желаемом порядке, edges - узел -> список узлов, которые должны идти раньше.
+    Ребра на узлы вне nodes игнорируются. Возвращает (order, cycles): при цикле обратное
+    ребро отбрасывается, а в cycles попадает по одному циклу на компоненту сильной связности.
+    """
+    node_set = set(nodes)
+    state = {}  # 1 - в обработке, 2 - готов
+    order = []
+    # Тарьян в том же обходе: компоненты сильной связности без второго прохода по графу
+    index = {}
+    low = {}
+    parent = {}
+    component = {}
+    scc_stack = []
+    on_scc_stack = set()
+    back_edges = []
+
+    for root in nodes:
+        if root in state:
+            continue
+        state[root] = 1
+        index[root] = low[root] = len(index)
+        scc_stack.append(root)
+        on_scc_stack.add(root)
+        stack = [(root, iter(edges.get(root, ())))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if child not in node_set:
+                    continue
+                child_state = state.get(child)
+                if child_state is None:
+                    state[child] = 1
+                    parent[child] = node
+                    index[child] = low[child] = len(index)
+                    scc_stack.append(child)
+                    on_scc_stack.add(child)
+                    stack.append((child, iter(edges.get(child, ()))))
+                    break
+                if child_state == 1:
+                    back_edges.append((node, child))
+                if child in on_scc_stack:
+                    low[node] = min(low[node], index[child])
+            else:
+                stack.pop()
+                state[node] = 2
+                order.append(node)
+                if stack:
+                    low[stack[-1][0]] = min(low[stack[-1][0]], low[node])
+                if low[node] == index[node]:
+                    while True:
+                        member = scc_stack.pop()
+                        on_scc_stack.discard(member)
+                        component[member] = node
+                        if member == node:
+                            break
+
+    # Обратное ребро node -> child замыкает путь дерева обхода child -> ... -> node, который лежит
+    # внутри одной компоненты: по одному такому пути на компоненту, всего не больше V шагов
+    cycles = []
+    reported = set()
+    for node, child in back_edges:
+        if component[child] in reported:
+            continue
+        reported.add(component[child])
+        cycle = [node]
+        while cycle[-1] != child:
+            cycle.append(parent[cycle[-1]])
+        cycle.reverse()
+        cycles.append(cycle + [child])
+
+    return order, cycles
+
+
+def missing_requirements(mod_ids, active_ids, requires):
+    """Транзитивное замыкание требований mod_ids, которых нет среди active_ids (в порядке обхода)."""
+    active_ids = set(active_ids)
+    seen = set(mod_ids)
+    missing = []
+    queue = deque(mod_ids)
+    while queue:
+        for required in requires.get(queue.popleft(), ()):
+            if required in seen:
+                continue
+            seen.add(required)
+            if required not in active_ids:
+                missing.append(required)
+            queue.append(required)
+    return missing
+
+
+def enabled_mod_ids(mod):
+    disabled = set(mod.get('disabled_mod_ids', []))
+    return [mod_id for mod_id in mod.get('Mod ID', []) if mod_id not in disabled]
+
+
+def compute_load_order(active_mods, mods_db):
+    """
+    Вычисляет порядок загрузки активных модов.
+    Возвращает словарь: mods - записи activemods.json в порядке загрузки, mod_ids - включенные Mod ID
+    в порядке загрузки, missing - Mod ID -> требования вне активного набора, cycles - найденные циклы.
+    """
+    requires = build_requires_map(active_mods)
+    for mod_id, mod_requires in build_requires_map(mods_db).items():
+        if not requires.get(mod_id):
+            requires[mod_id] = mod_requires
+
+    mod_ids = []
+    for mod in active_mods:
+        mod_ids.extend(enabled_mod_ids(mod))
+    id_order, cycles = topological_sort(list(dict.fromkeys(mod_ids)), requires)
+
+    active_set = set(id_order)
+    missing = {}
+    for mod_id in id_order:
+        absent = [required for required in requires.get(mod_id, ()) if required not in active_set]
+        if absent:
+            missing[mod_id] = absent
+
+    # Порядок записей: запись зависит от записей, которые предоставляют её требования
+    owner = {}
+    for index, mod in enumerate(active_mods):
+        for mod_id in mod.get('Mod ID', []):
+            owner.setdefault(mod_id, index)
+    record_edges = {}
+    for index, mod in enumerate(active_mods):
+        record_edges[index] = [owner[required] for mod_id in enabled_mod_ids(mod)
+                               for required in requires.get(mod_id, ())
+                               if required in owner and owner[required] != index]
+    record_order, _ = topological_sort(list(range(len(active_mods))), record_edges)
+
+    if cycles:
+        logging.warning(f"Dependency cycles detected: {cycles}")
+
+    return {
+        'mods': [active_mods[index] for index in record_order],
+        'mod_ids': id_order,
+        'missing': missing,
+        'cycles': cycles
+    }
@@ -0,0 +1,217 @@
+# mod_indexer.py
+
+# Индексатор локально установленных модов Workshop (файлы mod.info)
+import os
+import re
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+PZ_APP_ID = "108600"
+INDEX_CACHE_PATH = 'modindex_cache.json'
+
+
+def get_workshop_content_dir(server_directory):
+    """Возвращает путь к папке Workshop контента рядом с установкой сервера."""
+    return os.path.join(server_directory, 'steamapps', 'workshop', 'content', PZ_APP_ID)
+
+
+def read_installed_workshop_times(server_directory):
+    """Время обновления скачанных сервером предметов из appworkshop_108600.acf: workshop_id -> unix time."""
+    acf_path = os.path.join(server_directory, 'steamapps', 'workshop', f"appworkshop_{PZ_APP_ID}.acf")
+    if not os.path.exists(acf_path):
+        return {}
+    with open(acf_path, 'r', encoding='utf-8', errors='ignore') as acf_file:
+        content = acf_file.read()
+    start = content.find('"WorkshopItemsInstalled"')
+    if start == -1:
+        return {}
+    end = content.find('"WorkshopItemDetails"', start)
+    section = content[start:end if end != -1 else len(content)]
+    times = {}
+    for workshop_id, body in re.findall(r'"(\d+)"\s*\{([^{}]*)\}', section):
+        match = re.search(r'"timeupdated"\s+"(\d+)"', body)
+        if match:
+            times[workshop_id] = int(match.group(1))
+    return times
+
+
+def parse_mod_info(path):
+    """Разбирает mod.info в словарь ключ -> значение."""
+    info = {}
+    with open(path, 'r', encoding='utf-8', errors='ignore') as file:
+        for line in file:
+            if '=' not in line:
+                continue
+            key, value = line.split('=', 1)
+            key = key.strip().lower()
+            if key and key not in info:
+                info[key] = value.strip()
+    return info
+
+
+def parse_require(value):
+    """require=ModA,ModB (B41) или require=\\ModA;\\ModB (B42) -> ['ModA', 'ModB']."""
+    if not value:
+        return []
+    return [item.strip().lstrip('\\').strip() for item in re.split(r'[,;]', value) if item.strip().lstrip('\\').strip()]
+
+
+def _stat_key(path):
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def workshop_item_signature(item_dir):
+    """Сигнатура папки Workshop: mtime/size папки mods и всех mod.info внутри неё."""
+    mods_dir = os.path.join(item_dir, 'mods')
+    signature = {'mods': _stat_key(mods_dir)}
+    with os.scandir(mods_dir) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                mod_info = os.path.join(entry.path, 'mod.info')
+                if os.path.exists(mod_info):
+                    signature[entry.name] = _stat_key(mod_info)
+    return signature
+
+
+def index_workshop_item(item_dir):
+    """Разбирает все mod.info одной папки Workshop в запись каталога."""
+    workshop_id = os.path.basename(item_dir)
+    mods_dir = os.path.join(item_dir, 'mods')
+    mod_ids = []
+    map_folders = []
+    require = {}
+    local_path = {}
+    names = []
+
+    for mod_folder in sorted(os.listdir(mods_dir)):
+        mod_path = os.path.join(mods_dir, mod_folder)
+        mod_info_path = os.path.join(mod_path, 'mod.info')
+        if not os.path.isfile(mod_info_path):
+            continue
+        info = parse_mod_info(mod_info_path)
+        mod_id = info.get('id') or mod_folder
+        if mod_id in local_path:
+            continue
+        mod_ids.append(mod_id)
+        names.append(info.get('name') or mod_id)
+        require[mod_id] = parse_require(info.get('require', ''))
+        local_path[mod_id] = mod_path
+
+        maps_dir = os.path.join(mod_path, 'media', 'maps')
+        if os.path.isdir(maps_dir):
+            for map_folder in sorted(os.listdir(maps_dir)):
+                if os.path.isdir(os.path.join(maps_dir, map_folder)) and map_folder not in map_folders:
+                    map_folders.append(map_folder)
+
+    if not mod_ids:
+        return None
+
+    return {
+        'type': 'map' if map_folders else 'mod',
+        'name': names[0],
+        'Workshop ID': [workshop_id],
+        'Mod ID': mod_ids,
+        'Map Folder': map_folders,
+        'require': require,
+        'local_path': local_path
+    }
+
+
+def load_index_cache(cache_path=INDEX_CACHE_PATH):
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as file:
+            try:
+                return json.load(file)
+            except json.JSONDecodeError:
+                return {}
+    return {}
+
+
+def save_index_cache(cache, cache_path=INDEX_CACHE_PATH):
+    with open(cache_path, 'w', encoding='utf-8') as file:
+        json.dump(cache, file, ensure_ascii=False)
+
+
+def _scan_item(item_dir, cached):
+    try:
+        signature = workshop_item_signature(item_dir)
+    except OSError:
+        return None, None, False
+    if cached and cached.get('signature') == signature:
+        return signature, cached.get('entry'), True
+    try:
+        return signature, index_workshop_item(item_dir), False
+    except OSError as e:
+        logging.error(f"Failed to index {item_dir}: {e}")
+        return None, None, False
+
+
+def scan_workshop_content(content_dir, cache_path=INDEX_CACHE_PATH, max_workers=None):
+    """
+    Параллельно сканирует папку Workshop контента и возвращает (entries, stats).
+    Папки, чья сигнатура совпадает с кешем, повторно не разбираются.
+    """
+    cache = load_index_cache(cache_path)
+    if not os.path.isdir(content_dir):
+        logging.warning(f"Workshop content directory not found: {content_dir}")
+        return [], {'total': 0, 'parsed': 0, 'cached': 0, 'removed': len(cache)}
+
+    with os.scandir(content_dir) as entries:
+        item_dirs = sorted(entry.path for entry in entries if entry.is_dir() and entry.name.isdigit())
+
+    max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(
+            lambda item_dir: _scan_item(item_dir, cache.get(os.path.basename(item_dir))), item_dirs))
+
+    new_cache = {}
+    indexed = []
+    parsed = cached_count = 0
+    for item_dir, (signature, entry, reused) in zip(item_dirs, results):
+        if signature is None:
+            continue
+        new_cache[os.path.basename(item_dir)] = {'signature': signature, 'entry': entry}
+        if reused:
+            cached_count += 1
+        else:
+            parsed += 1
+        if entry:
+            indexed.append(entry)
+
+    stats = {'total': len(item_dirs), 'parsed': parsed, 'cached': cached_count,
+             'removed': len(set(cache) - set(new_cache))}
+    if parsed or stats['removed']:
+        save_index_cache(new_cache, cache_path)
+    logging.info(f"Indexed workshop content in {content_dir}: {stats}")
+    return indexed, stats
+
+
+def merge_into_catalog(mods_db, entries):
+    """Дополняет каталог (modsdb.json) данными из mod.info. Возвращает (added, updated)."""
+    by_workshop_id = {}
+    for mod in mods_db:
+        for workshop_id in mod.get('Workshop ID', []):
+            by_workshop_id.setdefault(workshop_id, mod)
+
+    added = updated = 0
+    for entry in entries:
+        workshop_id = entry['Workshop ID'][0]
+        mod = by_workshop_id.get(workshop_id)
+        if mod is None:
+            mods_db.append(dict(entry))
+            by_workshop_id[workshop_id] = mods_db[-1]
+            added += 1
+            continue
+
+        # mod.info - источник истины для Mod ID / Map Folder, имя и url со страницы сохраняем
+        changed = False
+        for key in ('Mod ID', 'Map Folder', 'require', 'local_path'):
+            if mod.get(key) != entry[key]:
+                mod[key] = entry[key]
+                changed = True
+        if changed:
+            updated += 1
+
+    return added, updated
@@ -0,0 +1,316 @@
+# mod_journal.py
+
+# Каталог модов и активные моды в памяти: изменения пишутся в журнал (только добавление в конец),
+# периодически сворачиваются в снапшот в фоне. Отмена/повтор действий строятся на тех же операциях.
+import os
+import json
+import logging
+import threading
+from file_manager import atomic_write_text
+
+STORE_DIR = 'modstore'
+SNAPSHOT_NAME = 'snapshot.json'
+JOURNAL_PREFIX = 'journal-'
+LISTS = ('catalog', 'active')
+LEGACY_PATHS = {'catalog': 'modsdb.json', 'active': 'activemods.json'}
+COMPACT_AFTER_OPS = 500
+UNDO_LIMIT = 100
+
+
+def _load_json_list(path):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as file:
+            try:
+                data = json.load(file)
+                return data if isinstance(data, list) else []
+            except json.JSONDecodeError:
+                return []
+    return []
+
+
+class Transaction:
+    """
+    Операции над списками по индексу. Каждая сразу применяется к состоянию и запоминает обратную,
+    при исключении внутри with все изменения откатываются.
+    """
+
+    def __init__(self, store, label):
+        self.store = store
+        self.label = label
+        self.ops = []
+        self.inverse = []
+
+    def _do(self, op):
+        self.inverse.append(self.store._apply(op))
+        self.ops.append(op)
+
+    def insert(self, list_name, index, mod):
+        self._do(['insert', list_name, index, mod])
+
+    def append(self, list_name, mod):
+        self.insert(list_name, len(self.store.lists[list_name]), mod)
+
+    def delete(self, list_name, index):
+        self._do(['delete', list_name, index])
+
+    def update(self, list_name, index, mod):
+        self._do(['update', list_name, index, mod])
+
+    def replace(self, list_name, mods):
+        self._do(['replace', list_name, list(mods)])
+
+    def assign(self, list_name, mods):
+        """Новое содержимое списка: если старые записи сохранили порядок, пишутся только вставки."""
+        old = self.store.lists[list_name]
+        position = 0
+        inserts = []
+        for index, mod in enumerate(mods):
+            if position < len(old) and (mod is old[position] or mod == old[position]):
+                position += 1
+            else:
+                inserts.append((index, mod))
+        if position != len(old):
+            self.replace(list_name, mods)
+            return
+        for index, mod in inserts:
+            self.insert(list_name, index, mod)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            for op in reversed(self.inverse):
+                self.store._apply(op)
+            return False
+        if self.ops:
+            self.store._commit(self.label, self.ops, self.inverse)
+        return False
+
+
+class ModStore:
+    """
+    Состояние = последний снапшот + хвост журнала. Записи модов не изменяются на месте
+    (update кладет новый dict), поэтому для фонового снапшота достаточно поверхностной копии списков.
+    """
+
+    def __init__(self, directory=STORE_DIR, legacy_paths=None, compact_after=COMPACT_AFTER_OPS):
+        self.directory = directory
+        self.legacy_paths = LEGACY_PATHS if legacy_paths is None else legacy_paths
+        self.compact_after = compact_after
+        self.lists = {name: [] for name in LISTS}
+        self.seq = 0
+        self.undo_stack = []
+        self.redo_stack = []
+        self._journal = None
+        self._journal_ops = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._compaction = None
+        self._export = None
+        self._exported_seq = 0  # seq, на котором modsdb.json / activemods.json совпадают с состоянием
+        self._load()
+
+    @property
+    def catalog(self):
+        return self.lists['catalog']
+
+    @property
+    def active(self):
+        return self.lists['active']
+
+    # --- загрузка ---
+
+    def _journal_segments(self):
+        if not os.path.isdir(self.directory):
+            return []
+        names = [name for name in os.listdir(self.directory)
+                 if name.startswith(JOURNAL_PREFIX) and name.endswith('.jsonl')]
+        return sorted(names, key=lambda name: int(name[len(JOURNAL_PREFIX):-6]))
+
+    def _load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        snapshot_path = os.path.join(self.directory, SNAPSHOT_NAME)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, 'r', encoding='utf-8') as file:
+                snapshot = json.load(file)
+            self.seq = snapshot['seq']
+            for name in LISTS:
+                self.lists[name] = snapshot[name]
+        else:
+            # Первый запуск: берем существующие modsdb.json / activemods.json
+            for name in LISTS:
+                self.lists[name] = _load_json_list(self.legacy_paths.get(name, ''))
+
+        # Старые файлы выгружены не раньше последнего сворачивания, записи журнала после него - неизвестно
+        exported_seq = self.seq
+        replayed = 0
+        for segment in self._journal_segments():
+            path = os.path.join(self.directory, segment)
+            with open(path, 'rb') as file:
+                offset = 0
+                for line in file:
+                    try:
+                        if not line.endswith(b'\n'):
+                            raise ValueError("no newline")
+                        record = json.loads(line.decode('utf-8'))
+                    except ValueError:
+                        # Оборванная после сбоя запись: обрезаем, иначе новые записи допишутся за ней
+                        # и при следующей загрузке потеряются
+                        logging.warning(f"Truncating torn journal tail in {segment} at byte {offset}")
+                        file.close()
+                        os.truncate(path, offset)
+                        break
+                    offset += len(line)
+                    if record['seq'] <= self.seq:
+                        continue
+                    for op in record['ops']:
+                        self._apply(op)
+                    self.seq = record['seq']
+                    replayed += 1
+        self._journal_ops = replayed
+        self._exported_seq = exported_seq
+        self._open_segment()
+        logging.info(f"Mod store loaded: {len(self.catalog)} catalog, {len(self.active)} active, "
+                      f"{replayed} journal records replayed")
+
+    def _open_segment(self):
+        path = os.path.join(self.directory, f"{JOURNAL_PREFIX}{self.seq + 1}.jsonl")
+        self._journal = open(path, 'a', encoding='utf-8')
+
+    # --- операции ---
+
+    def _apply(self, op):
+        """Применяет операцию и возвращает обратную."""
+        kind, list_name = op[0], op[1]
+        items = self.lists[list_name]
+        if kind == 'insert':
+            items.insert(op[2], op[3])
+            return ['delete', list_name, op[2]]
+        if kind == 'delete':
+            old = items.pop(op[2])
+            return ['insert', list_name, op[2], old]
+        if kind == 'update':
+            old = items[op[2]]
+            items[op[2]] = op[3]
+            return ['update', list_name, op[2], old]
+        if kind == 'replace':
+            old = self.lists[list_name]
+            self.lists[list_name] = list(op[2])
+            return ['replace', list_name, old]
+        raise ValueError(f"Unknown journal operation: {kind}")
+
+    def transaction(self, label):
+        return Transaction(self, label)
+
+    def _commit(self, label, ops, inverse, undoable=True):
+        self.seq += 1
+        self._journal.write(json.dumps({'seq': self.seq, 'label': label, 'ops': ops}, ensure_ascii=False) + '\n')
+        self._journal.flush()
+        self._dirty = True
+        self._journal_ops += 1
+        if undoable:
+            self.undo_stack.append((label, ops, inverse))
+            del self.undo_stack[:-UNDO_LIMIT]
+            self.redo_stack.clear()
+
+    def undo(self):
+        """Отменяет последнее действие (записывается в журнал как новое). Возвращает его название или None."""
+        if not self.undo_stack:
+            return None
+        label, ops, inverse = self.undo_stack.pop()
+        redo_inverse = [self._apply(op) for op in reversed(inverse)]
+        self._commit(f"undo {label}", list(reversed(inverse)), redo_inverse, undoable=False)
+        self.redo_stack.append((label, ops, inverse))
+        return label
+
+    def redo(self):
+        if not self.redo_stack:
+            return None
+        label, ops, _ = self.redo_stack.pop()
+        inverse = [self._apply(op) for op in ops]
+        self._commit(label, ops, inverse, undoable=False)
+        self.undo_stack.append((label, ops, inverse))
+        return label
+
+    # --- долговечность ---
+
+    def sync(self):
+        """fsync журнала; вызывается пачкой после нескольких изменений, а не на каждый клик."""
+        if self._dirty and self._journal:
+            os.fsync(self._journal.fileno())
+            self._dirty = False
+
+    def needs_compaction(self):
+        running = self._compaction is not None and self._compaction.is_alive()
+        return self._journal_ops >= self.compact_after and not running
+
+    def export_legacy(self, background=True):
+        """
+        Переписывает modsdb.json / activemods.json, если состояние изменилось с прошлой выгрузки:
+        их читают внешние инструменты, и ждать сворачивания журнала им не нужно.
+        """
+        if self.seq == self._exported_seq or (self._export is not None and self._export.is_alive()):
+            return
+        seq = self.seq
+        lists = {name: list(items) for name, items in self.lists.items()}
+
+        def write():
+            with self._lock:
+                for name, path in self.legacy_paths.items():
+                    atomic_write_text(path, json.dumps(lists[name], ensure_ascii=False, indent=4))
+            self._exported_seq = max(self._exported_seq, seq)
+
+        if background:
+            self._export = threading.Thread(target=write, daemon=True)
+            self._export.start()
+        else:
+            write()
+
+    def compact(self, background=True, export_legacy=True):
+        """
+        Переключает журнал на новый сегмент и в фоне пишет снапшот состояния на момент переключения,
+        после чего удаляет старые сегменты. Заодно обновляет modsdb.json / activemods.json.
+        """
+        if self._compaction is not None and self._compaction.is_alive():
+            return
+        self.sync()
+        self._journal.close()
+        old_segments = self._journal_segments()
+        seq = self.seq
+        lists = {name: list(items) for name, items in self.lists.items()}
+        self._open_segment()
+        self._journal_ops = 0
+
+        def write():
+            with self._lock:
+                snapshot = dict(lists, seq=seq)
+                atomic_write_text(os.path.join(self.directory, SNAPSHOT_NAME),
+                                  json.dumps(snapshot, ensure_ascii=False))
+                for segment in old_segments:
+                    path = os.path.join(self.directory, segment)
+                    if os.path.exists(path) and os.path.abspath(path) != os.path.abspath(self._journal.name):
+                        os.remove(path)
+                if export_legacy:
+                    for name, path in self.legacy_paths.items():
+                        atomic_write_text(path, json.dumps(lists[name], ensure_ascii=False, indent=4))
+                    self._exported_seq = max(self._exported_seq, seq)
+            logging.info(f"Mod store compacted at seq {seq}")
+
+        if background:
+            self._compaction = threading.Thread(target=write, daemon=True)
+            self._compaction.start()
+        else:
+            write()
+
+    def close(self):
+        """Сохраняет все на диск: сворачивает журнал, если в нем что-то есть, и ждет фоновой записи."""
+        for thread in (self._compaction, self._export):
+            if thread is not None:
+                thread.join()
+        if self._journal_ops:
+            self.compact(background=False)
+        else:
+            self.export_legacy(background=False)
+        self.sync()
+        self._journal.close()
@@ -0,0 +1,186 @@
+# mod_search.py
+
+# Нечеткий поиск по каталогу модов: триграммный индекс по имени, Mod ID, Map Folder и Workshop ID
+import math
+from collections import Counter
+
+SEARCH_FIELDS = ('Mod ID', 'Map Folder', 'Workshop ID')
+MIN_MATCH_RATIO = 0.5
+RANK_LIMIT = 1000
+
+
+def mod_search_fields(mod):
+    """Строки мода, по которым идет поиск (в нижнем регистре)."""
+    fields = [mod.get('name', '')]
+    for key in SEARCH_FIELDS:
+        fields.extend(str(value) for value in mod.get(key) or [])
+    return [field.lower() for field in fields if field]
+
+
+def trigrams(text, pad=True):
+    """Триграммы строки; с pad=True начало строки тоже дает триграммы (для совпадений по префиксу)."""
+    if pad:
+        text = f"  {text}"
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Документ - мод (ключ - имя, как в списках Mod Manager). Индекс обновляется по одному моду.
+    Поиск сначала пересекает списки триграмм запроса (быстро, все триграммы есть в моде),
+    и только если ничего не нашлось - считает частичные совпадения по редким триграммам (опечатки).
+    """
+
+    def __init__(self):
+        self.docs = {}  # name -> (mod, [поля])
+        self.postings = {}  # trigram -> set(name)
+        self.exact = {}  # поле целиком -> set(name), для точных совпадений Mod ID / Workshop ID
+        self._last = (None, None, None)  # (запрос, его триграммы, результат) для набора по буквам
+        self._fuzzy_counts = {}  # совпавшие триграммы последнего нечеткого поиска, для ранжирования
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, mod):
+        name = mod.get('name', '')
+        self._last = (None, None, None)
+        if name in self.docs:
+            self.remove(name)
+        fields = mod_search_fields(mod)
+        self.docs[name] = (mod, fields)
+        postings = self.postings
+        grams = set()
+        for field in fields:
+            grams.update(trigrams(field))
+            self.exact.setdefault(field, set()).add(name)
+        for gram in grams:
+            names = postings.get(gram)
+            if names is None:
+                postings[gram] = {name}
+            else:
+                names.add(name)
+
+    def remove(self, name):
+        entry = self.docs.pop(name, None)
+        if entry is None:
+            return
+        self._last = (None, None, None)
+        for field in entry[1]:
+            names = self.exact.get(field)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self.exact[field]
+            for gram in trigrams(field):
+                names = self.postings.get(gram)
+                if names is not None:
+                    names.discard(name)
+                    if not names:
+                        del self.postings[gram]
+
+    def sync(self, mods):
+        """
+        Приводит индекс к списку модов: переиндексирует только новые и замененные записи
+        (записи каталога не меняются на месте, поэтому достаточно сравнения по identity).
+        """
+        current = {}
+        for mod in mods:
+            current.setdefault(mod.get('name', ''), mod)
+        for name in [name for name in self.docs if name not in current]:
+            self.remove(name)
+        changed = 0
+        for name, mod in current.items():
+            entry = self.docs.get(name)
+            if entry is None or entry[0] is not mod:
+                self.add(mod)
+                changed += 1
+        return changed
+
+    def _short_query(self, query):
+        """1-2 символа: совпадение с началом поля или слова (готовый список триграммы, без копирования)."""
+        return self.postings.get(f"  {query}" if len(query) == 1 else f" {query}", set())
+
+    def _fuzzy(self, gram_sets):
+        """Моды, в которых есть хотя бы половина информативных триграмм запроса."""
+        common = max(50, len(self.docs) // 4)
+        informative = [names for names in gram_sets if names and len(names) <= common]
+        if not informative:
+            return set()
+        counts = Counter()
+        for names in informative:
+            counts.update(names)
+        needed = max(1, math.ceil(len(gram_sets) * MIN_MATCH_RATIO) - (len(gram_sets) - len(informative)))
+        self._fuzzy_counts = {name: matched for name, matched in counts.items() if matched >= needed}
+        return set(self._fuzzy_counts)
+
+    def match(self, query):
+        """
+        Множество подходящих имен без ранжирования (не изменять: может быть внутренним множеством индекса).
+        При наборе по буквам пересекается только с новыми триграммами предыдущего результата.
+        """
+        query = query.strip().lower()
+        self._fuzzy_counts = {}
+        if not query:
+            return set()
+        if len(query) < 3:
+            return self._short_query(query)
+
+        grams = trigrams(query)
+        previous_query, previous_grams, previous_matches = self._last
+        if previous_query and query.startswith(previous_query) and len(previous_query) >= 3:
+            base, grams = previous_matches, grams - previous_grams
+        else:
+            base = None
+
+        empty = set()
+        total = len(self.docs)
+        # Триграммы, которые есть во всех модах, ничего не отсекают
+        gram_sets = sorted((self.postings.get(gram, empty) for gram in grams), key=len)
+        selective = [names for names in gram_sets if len(names) < total]
+        if gram_sets and not gram_sets[0]:
+            matches = set()
+        elif isinstance(base, set):
+            matches = base.intersection(*selective) if selective else base
+        elif selective:
+            matches = selective[0].intersection(*selective[1:])
+        else:
+            matches = self.docs.keys()
+
+        if matches:
+            self._last = (query, trigrams(query), matches)
+            return matches
+        self._last = (None, None, None)
+        all_sets = sorted((self.postings.get(gram, empty) for gram in trigrams(query)), key=len)
+        return self._fuzzy(all_sets)
+
+    def search(self, query, limit=50, rank_limit=RANK_LIMIT):
+        """
+        Лучшие limit имен по убыванию релевантности: точное совпадение поля, префикс, подстрока.
+        Если совпадений больше rank_limit, вперед ставятся только точные совпадения.
+        """
+        matches = self.match(query)
+        query = query.strip().lower()
+        exact = self.exact.get(query, set()) & matches
+        if len(matches) > rank_limit:
+            names = sorted(exact)
+            for name in matches:
+                if len(names) >= limit:
+                    break
+                if name not in exact:
+                    names.append(name)
+            return names[:limit]
+
+        results = []
+        for name in matches:
+            fields = self.docs[name][1]
+            if name in exact:
+                score = 3
+            elif any(field.startswith(query) for field in fields):
+                score = 2
+            elif any(query in field for field in fields):
+                score = 1
+            else:
+                score = 0
+            results.append((-score, -self._fuzzy_counts.get(name, 0), len(name), name))
+        results.sort()
+        return [result[-1] for result in results[:limit]]
@@ -22,6 +22,19 @@ def download_steamcmd(download_path, progress_callback):
     return local_zip_path
 
 
+def fetch_workshop_update_times(workshop_ids, timeout=30):
+    """Время последнего обновления предметов Workshop по Steam Web API: workshop_id -> unix time."""
+    url = "https://api.steampowered.com/ISteamRemoteStorage/GetPublishedFileDetails/v1/"
+    data = {'itemcount': len(workshop_ids)}
+    for index, workshop_id in enumerate(workshop_ids):
+        data[f'publishedfileids[{index}]'] = workshop_id
+    response = requests.post(url, data=data, timeout=timeout)
+    response.raise_for_status()
+    details = response.json().get('response', {}).get('publishedfiledetails', [])
+    return {str(item['publishedfileid']): int(item.get('time_updated', 0)) for item in details
+            if item.get('result') == 1}
+
+
 def extract_zip(zip_path, extract_to):
     with zipfile.ZipFile(zip_path, 'r') as zip_ref:
         zip_ref.extractall(extract_to)
@@ -0,0 +1,159 @@
+# preset_store.py
+
+# Пресеты как ссылки на записи каталога (по Workshop ID) + переопределения, общие записи хранятся один раз
+import os
+import json
+import hashlib
+import logging
+from file_manager import atomic_write_text
+
+PRESET_FORMAT = 2
+RECORDS_DIR = 'records'
+OVERRIDE_KEYS = ('disabled_mod_ids', 'disabled_map_folders')
+
+
+def mod_key(mod):
+    """Ключ мода: Workshop ID, а для модов без него - имя."""
+    workshop_ids = mod.get('Workshop ID') or []
+    if workshop_ids:
+        return 'workshop:' + ','.join(sorted(str(workshop_id) for workshop_id in workshop_ids))
+    return 'name:' + mod.get('name', '')
+
+
+def split_record(mod):
+    """Делит запись активного мода на общую часть (как в каталоге) и переопределения пресета."""
+    record = {key: value for key, value in mod.items() if key not in OVERRIDE_KEYS}
+    overrides = {key: list(mod[key]) for key in OVERRIDE_KEYS if mod.get(key)}
+    return record, overrides
+
+
+def apply_overrides(record, overrides):
+    mod = dict(record)
+    for key in OVERRIDE_KEYS:
+        mod[key] = list(overrides.get(key, []))
+    return mod
+
+
+def record_hash(record):
+    canonical = json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _record_path(modpacks_dir, digest):
+    return os.path.join(modpacks_dir, RECORDS_DIR, f"{digest}.json")
+
+
+def store_record(modpacks_dir, record):
+    """Сохраняет запись по хешу содержимого; одинаковые записи разных пресетов хранятся один раз."""
+    digest = record_hash(record)
+    path = _record_path(modpacks_dir, digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write_text(path, json.dumps(record, ensure_ascii=False, indent=4))
+    return digest
+
+
+def write_preset(preset_path, active_mods):
+    """Пишет пресет формата 2: ключ мода, хеш записи и только непустые переопределения."""
+    modpacks_dir = os.path.dirname(os.path.abspath(preset_path))
+    entries = []
+    for mod in active_mods:
+        record, overrides = split_record(mod)
+        entry = {'key': mod_key(mod), 'name': mod.get('name', ''), 'record': store_record(modpacks_dir, record)}
+        if overrides:
+            entry['overrides'] = overrides
+        entries.append(entry)
+    atomic_write_text(preset_path, json.dumps({'format': PRESET_FORMAT, 'mods': entries},
+                                              ensure_ascii=False, indent=4))
+    # Перезаписанный пресет мог быть последним, кто ссылался на старые записи
+    collect_records(modpacks_dir)
+    return entries
+
+
+def collect_records(modpacks_dir):
+    """
+    Удаляет из modpacks/records записи, на которые не ссылается ни один пресет папки.
+    Если какой-то пресет не читается, ничего не удаляет. Возвращает число удаленных записей.
+    """
+    records_dir = os.path.join(modpacks_dir, RECORDS_DIR)
+    if not os.path.isdir(records_dir):
+        return 0
+    referenced = set()
+    for name in os.listdir(modpacks_dir):
+        path = os.path.join(modpacks_dir, name)
+        if not name.endswith('.json') or not os.path.isfile(path):
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                preset = json.load(file)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Skipping record cleanup, failed to read preset {path}: {e}")
+            return 0
+        if isinstance(preset, dict):
+            referenced.update(entry['record'] for entry in preset.get('mods', []) if 'record' in entry)
+    removed = 0
+    for name in os.listdir(records_dir):
+        if name.endswith('.json') and name[:-len('.json')] not in referenced:
+            try:
+                os.remove(os.path.join(records_dir, name))
+                removed += 1
+            except OSError as e:
+                logging.warning(f"Failed to remove preset record {name}: {e}")
+    if removed:
+        logging.info(f"Removed {removed} unreferenced preset records from {records_dir}")
+    return removed
+
+
+def read_preset(preset_path, mods_db):
+    """
+    Возвращает (моды пресета, моды которых нет в каталоге). Запись берется из каталога по ключу,
+    а если мода там нет - из хранилища записей. Поддерживает старый формат (полный список записей);
+    файл при этом не меняется, в новый формат он переходит при сохранении пресета.
+    """
+    with open(preset_path, 'r', encoding='utf-8') as file:
+        preset = json.load(file)
+
+    catalog = {}
+    for mod in mods_db:
+        catalog.setdefault(mod_key(mod), mod)
+
+    if isinstance(preset, list):
+        mods = [apply_overrides(*split_record(mod)) for mod in preset]
+        return mods, [mod for mod in mods if mod_key(mod) not in catalog]
+
+    modpacks_dir = os.path.dirname(os.path.abspath(preset_path))
+    mods = []
+    missing = []
+    for entry in preset.get('mods', []):
+        record = catalog.get(entry['key'])
+        if record is None:
+            with open(_record_path(modpacks_dir, entry['record']), 'r', encoding='utf-8') as file:
+                record = json.load(file)
+            missing.append(record)
+        else:
+            record = split_record(record)[0]
+        mods.append(apply_overrides(record, entry.get('overrides', {})))
+    return mods, missing
+
+
+def diff_active_mods(current, target):
+    """
+    Разница между текущими активными модами и пресетом по имени мода:
+    add/remove/toggle (изменились отключенные Mod ID / Map Folder) и изменился ли порядок.
+    """
+    current_by_name = {mod.get('name'): mod for mod in current}
+    target_by_name = {mod.get('name'): mod for mod in target}
+    add = [mod for mod in target if mod.get('name') not in current_by_name]
+    remove = [name for name in current_by_name if name not in target_by_name]
+    toggle = []
+    for mod in target:
+        old = current_by_name.get(mod.get('name'))
+        if old is not None and any(sorted(old.get(key) or []) != sorted(mod.get(key) or []) for key in OVERRIDE_KEYS):
+            toggle.append(mod)
+    kept_current = [name for name in current_by_name if name in target_by_name]
+    kept_target = [mod.get('name') for mod in target if mod.get('name') in current_by_name]
+    return {'add': add, 'remove': remove, 'toggle': toggle, 'reordered': kept_current != kept_target}
+
+
+def is_empty_diff(diff):
+    return not (diff['add'] or diff['remove'] or diff['toggle'] or diff['reordered'])
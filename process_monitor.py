@@ -0,0 +1,128 @@
+# process_monitor.py
+
+# Сбор метрик процесса сервера (вся ветка процессов от PID QProcess) в кольцевой буфер
+import csv
+import time
+import logging
+from collections import deque
+
+try:
+    import psutil
+except ImportError:  # psutil необязателен: без него мониторинг просто отключен
+    psutil = None
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+FIELDS = ['time', 'cpu_percent', 'rss', 'threads', 'open_files', 'read_bytes_per_sec', 'write_bytes_per_sec']
+
+
+def is_available():
+    return psutil is not None
+
+
+class MetricsHistory:
+    """
+    Последние raw_size выборок хранятся как есть, вытесняемые из них усредняются по downsample штук
+    и попадают в грубую историю фиксированного размера.
+    """
+
+    def __init__(self, raw_size=300, coarse_size=720, downsample=10):
+        self.raw = deque(maxlen=raw_size)
+        self.coarse = deque(maxlen=coarse_size)
+        self.downsample = downsample
+        self._pending = []
+
+    def append(self, sample):
+        if len(self.raw) == self.raw.maxlen:
+            self._pending.append(self.raw[0])
+            if len(self._pending) >= self.downsample:
+                self.coarse.append(self._average(self._pending))
+                self._pending = []
+        self.raw.append(sample)
+
+    @staticmethod
+    def _average(samples):
+        return {field: sum(sample[field] for sample in samples) / len(samples) for field in FIELDS}
+
+    def samples(self):
+        return list(self.coarse) + list(self.raw)
+
+    def values(self, field, count=None):
+        values = [sample[field] for sample in self.raw]
+        return values[-count:] if count else values
+
+    def export_csv(self, path):
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(self.samples())
+
+
+class ProcessTreeSampler:
+    """Суммирует CPU, RSS, потоки, открытые файлы и скорость I/O по процессу и всем его потомкам."""
+
+    def __init__(self, pid):
+        self.root = psutil.Process(pid)
+        self._processes = {}
+        self._last_io = None
+        self._last_time = None
+
+    def _tree(self):
+        try:
+            tree = [self.root] + self.root.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return []
+        # Переиспользуем объекты Process, иначе cpu_percent() не сможет считать разницу
+        current = {}
+        for process in tree:
+            current[process.pid] = self._processes.get(process.pid, process)
+        self._processes = current
+        return list(current.values())
+
+    def sample(self):
+        cpu = 0.0
+        rss = threads = open_files = read_bytes = write_bytes = 0
+        for process in self._tree():
+            try:
+                with process.oneshot():
+                    cpu += process.cpu_percent(None)
+                    rss += process.memory_info().rss
+                    threads += process.num_threads()
+                    open_files += process.num_handles() if hasattr(process, 'num_handles') else process.num_fds()
+                    if hasattr(process, 'io_counters'):
+                        io = process.io_counters()
+                        read_bytes += io.read_bytes
+                        write_bytes += io.write_bytes
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+
+        now = time.time()
+        read_rate = write_rate = 0.0
+        if self._last_io is not None and now > self._last_time:
+            elapsed = now - self._last_time
+            read_rate = max(0, read_bytes - self._last_io[0]) / elapsed
+            write_rate = max(0, write_bytes - self._last_io[1]) / elapsed
+        self._last_io = (read_bytes, write_bytes)
+        self._last_time = now
+
+        return {'time': now, 'cpu_percent': cpu, 'rss': rss, 'threads': threads, 'open_files': open_files,
+                'read_bytes_per_sec': read_rate, 'write_bytes_per_sec': write_rate}
+
+
+def sparkline(values, width=40):
+    values = values[-width:]
+    if not values:
+        return ''
+    low, high = min(values), max(values)
+    span = (high - low) or 1
+    return ''.join(SPARK_CHARS[int((value - low) / span * (len(SPARK_CHARS) - 1))] for value in values)
+
+
+def create_sampler(pid):
+    """ProcessTreeSampler для pid или None, если psutil не установлен или процесса уже нет."""
+    if psutil is None:
+        logging.warning("psutil is not installed, process metrics are disabled")
+        return None
+    try:
+        return ProcessTreeSampler(pid)
+    except psutil.NoSuchProcess:
+        return None
@@ -0,0 +1,257 @@
+# rcon_client.py
+
+# Клиент Source RCON (RCONPort / RCONPassword в servertest.ini) для серверов, запущенных не менеджером:
+# постоянное соединение на сервер, пачка команд отправляется одним конвейером, ответы сопоставляются по id.
+# Ядро на asyncio в отдельном потоке, см. RconLoop; в UI результаты приходят через RconBridge (workers.py).
+import struct
+import asyncio
+import logging
+import itertools
+import threading
+
+SERVERDATA_AUTH = 3
+SERVERDATA_AUTH_RESPONSE = 2
+SERVERDATA_EXECCOMMAND = 2
+SERVERDATA_RESPONSE_VALUE = 0
+
+DEFAULT_RCON_PORT = 27015
+MAX_PACKET_SIZE = 1024 * 1024
+CONNECT_TIMEOUT = 10.0
+COMMAND_TIMEOUT = 10.0
+RECONNECT_BASE_DELAY = 1.0
+RECONNECT_MAX_DELAY = 30.0
+
+
+class RconError(Exception):
+    pass
+
+
+class RconAuthError(RconError):
+    pass
+
+
+class RconSendError(RconError):
+    """Команды не ушли на сервер (соединение уже закрыто или запись не удалась): пачку можно отправить заново."""
+
+
+def encode_packet(request_id, packet_type, body):
+    payload = struct.pack('<ii', request_id, packet_type) + body.encode('utf-8') + b'\x00\x00'
+    return struct.pack('<i', len(payload)) + payload
+
+
+async def read_packet(reader):
+    """(id, type, body) следующего пакета."""
+    size = struct.unpack('<i', await reader.readexactly(4))[0]
+    if size < 10 or size > MAX_PACKET_SIZE:
+        raise RconError(f"Bad RCON packet size: {size}")
+    data = await reader.readexactly(size)
+    request_id, packet_type = struct.unpack('<ii', data[:8])
+    return request_id, packet_type, data[8:-2].decode('utf-8', errors='ignore')
+
+
+def server_key(server):
+    return f"{server['host']}:{server['port']}"
+
+
+class RconConnection:
+    """
+    Одно авторизованное соединение. Команды пишутся без ожидания ответов на предыдущие;
+    фоновая задача читает ответы и завершает future по id запроса.
+    PZ отвечает на команду одним пакетом, поэтому первый пакет с id и есть ответ.
+    """
+
+    def __init__(self, host, port, password, timeout=COMMAND_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._reader_task = None
+
+    @property
+    def connected(self):
+        return self._reader_task is not None and not self._reader_task.done()
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port),
+                                                          CONNECT_TIMEOUT)
+        auth_id = next(self._ids)
+        self.writer.write(encode_packet(auth_id, SERVERDATA_AUTH, self.password))
+        await self.writer.drain()
+        while True:
+            request_id, packet_type, _ = await asyncio.wait_for(read_packet(self.reader), CONNECT_TIMEOUT)
+            # Перед ответом авторизации Source-серверы присылают пустой RESPONSE_VALUE
+            if packet_type == SERVERDATA_AUTH_RESPONSE:
+                break
+        if request_id == -1:
+            await self.close()
+            raise RconAuthError(f"RCON authentication failed for {self.host}:{self.port}")
+        self._reader_task = asyncio.ensure_future(self._read_loop())
+
+    async def _read_loop(self):
+        error = RconError(f"RCON connection to {self.host}:{self.port} closed")
+        try:
+            while True:
+                request_id, _, body = await read_packet(self.reader)
+                future = self._pending.pop(request_id, None)
+                if future is not None and not future.done():
+                    future.set_result(body)
+        except (asyncio.IncompleteReadError, OSError, RconError) as e:
+            error = RconError(f"RCON connection to {self.host}:{self.port} lost: {e}")
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._pending.clear()
+
+    async def execute_many(self, commands):
+        """Отправляет все команды одной записью и ждет ответы; порядок ответов - как у команд."""
+        if not self.connected:
+            raise RconSendError(f"RCON connection to {self.host}:{self.port} is not open")
+        loop = asyncio.get_running_loop()
+        futures = []
+        data = bytearray()
+        for command in commands:
+            request_id = next(self._ids)
+            future = loop.create_future()
+            self._pending[request_id] = future
+            futures.append(future)
+            data += encode_packet(request_id, SERVERDATA_EXECCOMMAND, command)
+        try:
+            self.writer.write(bytes(data))
+            await self.writer.drain()
+        except OSError as e:
+            # Сброшенное сервером соединение из пула: пул выбросит его и отправит пачку заново
+            for future in futures:
+                future.cancel()
+            await self.close()
+            raise RconSendError(f"RCON connection to {self.host}:{self.port} lost: {e}")
+        try:
+            return await asyncio.wait_for(asyncio.gather(*futures), self.timeout)
+        except asyncio.TimeoutError:
+            await self.close()
+            raise RconError(f"RCON command timed out on {self.host}:{self.port}")
+
+    async def execute(self, command):
+        return (await self.execute_many([command]))[0]
+
+    async def close(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.writer = None
+
+
+class RconPool:
+    """
+    Соединения по серверу (host:port) живут между вызовами. Оборванное соединение открывается заново
+    с удваивающейся паузой; при неверном пароле повторов нет.
+    """
+
+    def __init__(self, retries=2, base_delay=RECONNECT_BASE_DELAY, max_delay=RECONNECT_MAX_DELAY):
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.connections = {}
+        self.failures = {}  # host:port -> подряд неудачных подключений
+        self._locks = {}
+
+    async def _connection(self, server):
+        key = server_key(server)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            connection = self.connections.get(key)
+            if connection is not None and connection.connected:
+                return connection, True
+            failures = self.failures.get(key, 0)
+            if failures:
+                await asyncio.sleep(min(self.max_delay, self.base_delay * 2 ** (failures - 1)))
+            connection = RconConnection(server['host'], server['port'], server.get('password', ''))
+            try:
+                await connection.connect()
+            except RconAuthError:
+                raise
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, RconError) as e:
+                self.failures[key] = failures + 1
+                raise RconError(f"Cannot connect to RCON {key}: {e}")
+            self.failures[key] = 0
+            self.connections[key] = connection
+            logging.info(f"RCON connected to {key}")
+            return connection, False
+
+    async def execute(self, server, commands):
+        """
+        Ответы на команды одного сервера. Пачка отправляется заново, только если не удалось подключиться
+        или записать ее в старое соединение из пула (сервер перезапускался). Ошибка после записи
+        (таймаут, обрыв при чтении ответов) не повторяется: servermsg, save или quit могли уже выполниться.
+        """
+        key = server_key(server)
+        for attempt in range(self.retries + 1):
+            try:
+                connection, reused = await self._connection(server)
+            except RconAuthError:
+                raise
+            except RconError as e:
+                if attempt == self.retries:
+                    raise
+                logging.warning(f"{e}, retrying")
+                continue
+            try:
+                return await connection.execute_many(commands)
+            except RconSendError as e:
+                self.connections.pop(key, None)
+                if not reused or attempt == self.retries:
+                    raise
+                logging.warning(f"{e}, reconnecting")
+            except RconError:
+                self.connections.pop(key, None)
+                raise
+
+    async def broadcast(self, servers, commands):
+        """Одна и та же пачка на все серверы параллельно: {host:port: ответы или исключение}."""
+        results = await asyncio.gather(*(self.execute(server, commands) for server in servers),
+                                       return_exceptions=True)
+        return {server_key(server): result for server, result in zip(servers, results)}
+
+    async def close_all(self):
+        for connection in list(self.connections.values()):
+            await connection.close()
+        self.connections.clear()
+
+
+class RconLoop:
+    """Цикл asyncio в фоновом потоке; submit() принимает корутину из любого потока."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name='rcon-loop', daemon=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def start(self):
+        self.thread.start()
+
+    def submit(self, coroutine):
+        """concurrent.futures.Future с результатом корутины."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def stop(self, cleanup=None, timeout=5.0):
+        if not self.thread.is_alive():
+            return
+        if cleanup is not None:
+            try:
+                self.submit(cleanup).result(timeout)
+            except Exception as e:
+                logging.error(f"RCON cleanup failed: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
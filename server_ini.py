@@ -0,0 +1,102 @@
+# server_ini.py
+
+# Компиляция активного набора модов в строки Mods= / WorkshopItems= / Map= серверного ini
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from file_manager import atomic_write_text
+from mod_dependencies import compute_load_order, enabled_mod_ids
+
+DEFAULT_SERVER_NAME = 'servertest'
+VANILLA_MAP = 'Muldraugh, KY'
+
+
+def get_server_ini_path(zomboid_directory, server_name=DEFAULT_SERVER_NAME):
+    return os.path.join(zomboid_directory, 'Server', f"{server_name}.ini")
+
+
+def read_ini_values(ini_path, keys):
+    """Значения указанных ключей серверного ini (отсутствующие ключи не попадают в результат)."""
+    values = {}
+    with open(ini_path, 'r', encoding='utf-8', errors='ignore') as ini_file:
+        for line in ini_file:
+            if '=' in line:
+                key, value = line.split('=', 1)
+                if key.strip() in keys:
+                    values[key.strip()] = value.strip()
+    return values
+
+
+def compile_mod_settings(active_mods, mods_db):
+    """Возвращает словарь ключ -> значение для Mods=, WorkshopItems= и Map= в порядке загрузки."""
+    load_order = compute_load_order(active_mods, mods_db)
+
+    workshop_ids = []
+    map_folders = []
+    for mod in load_order['mods']:
+        # Мод, у которого выключены все Mod ID, сервер не грузит: его предмет Workshop и карты не нужны
+        if mod.get('Mod ID') and not enabled_mod_ids(mod):
+            continue
+        disabled_maps = set(mod.get('disabled_map_folders', []))
+        for workshop_id in mod.get('Workshop ID', []):
+            if workshop_id not in workshop_ids:
+                workshop_ids.append(workshop_id)
+        for map_folder in mod.get('Map Folder', []):
+            if map_folder not in disabled_maps and map_folder not in map_folders and map_folder != VANILLA_MAP:
+                map_folders.append(map_folder)
+
+    # Ванильная карта должна идти последней
+    map_folders.append(VANILLA_MAP)
+
+    return {
+        'Mods': ';'.join(load_order['mod_ids']),
+        'WorkshopItems': ';'.join(workshop_ids),
+        'Map': ';'.join(map_folders)
+    }
+
+
+def patch_ini_text(text, settings):
+    """Заменяет только указанные ключи, остальные строки ini остаются без изменений."""
+    newline = '\r\n' if '\r\n' in text else '\n'
+    lines = text.splitlines()
+    remaining = dict(settings)
+    for index, line in enumerate(lines):
+        key = line.split('=', 1)[0].strip()
+        if '=' in line and key in remaining:
+            lines[index] = f"{key}={remaining.pop(key)}"
+    for key, value in remaining.items():
+        lines.append(f"{key}={value}")
+    return newline.join(lines) + newline
+
+
+def write_server_ini(ini_path, settings):
+    """Патчит ini атомарно. Возвращает 'written', 'unchanged' или 'created'."""
+    if os.path.exists(ini_path):
+        with open(ini_path, 'r', encoding='utf-8', newline='') as ini_file:
+            text = ini_file.read()
+        status = 'written'
+    else:
+        os.makedirs(os.path.dirname(ini_path), exist_ok=True)
+        text = ''
+        status = 'created'
+
+    patched = patch_ini_text(text, settings)
+    if patched == text:
+        return 'unchanged'
+
+    atomic_write_text(ini_path, patched)
+    logging.info(f"Updated mod settings in {ini_path}")
+    return status
+
+
+def write_server_configs(ini_paths, settings, max_workers=8):
+    """Записывает один и тот же набор в несколько серверных ini параллельно. Путь -> статус."""
+    def write(path):
+        try:
+            return write_server_ini(path, settings)
+        except (OSError, ValueError) as e:  # ValueError - в т.ч. UnicodeDecodeError для ini не в utf-8
+            logging.error(f"Failed to update {path}: {e}")
+            return f"error: {e}"
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(ini_paths, executor.map(write, ini_paths)))
@@ -1,6 +1,7 @@
 # setup.py
 
 import os
+import re
 import subprocess
 import shutil
 import threading
@@ -8,6 +9,16 @@ import time
 import configparser
 from elevate import elevate
 from network_manager import download_steamcmd, extract_zip
+from steamcmd_downloader import get_steamcmd_executable
+from steamcmd_session import session_pool, SteamCMDSessionError
+from content_store import (get_content_store_dir, get_content_store_reflink, unshare_tree, dedupe_tree,
+                           snapshot_shared, release_written_in_place)
+
+PZ_SERVER_APP_ID = "380870"
+
+# Флаги StateFlags из appmanifest
+STATE_UPDATE_REQUIRED = 2
+STATE_FULLY_INSTALLED = 4
 
 def tail_log_file(log_file_path, interval, console_output_func):
     time.sleep(5)  # Задержка перед началом чтения лог-файла
@@ -27,6 +38,7 @@ def stream_output(process, console_output_func):
         console_output_func(line.strip())
     for line in iter(process.stderr.readline, ''):
         console_output_func(line.strip())
+    return process.wait()
 
 def save_path(config_path, section, key, value):
     config = configparser.ConfigParser()
@@ -38,6 +50,7 @@ def save_path(config_path, section, key, value):
         config.write(configfile)
 
 def install_steamcmd(console_output_func, program_directory, user_directory, config_path):
+    """Скачивает и устанавливает SteamCMD. Возвращает True при успехе."""
     try:
         console_output_func("Downloading SteamCMD...")
         zip_path = download_steamcmd(program_directory, lambda x, y: None)
@@ -68,7 +81,7 @@ def install_steamcmd(console_output_func, program_directory, user_directory, con
 
         if not os.path.exists(steamcmd_path):
             console_output_func(f"SteamCMD not found at path {steamcmd_path}")
-            return
+            return False
 
         threading.Thread(target=tail_log_file, args=(log_file_path, 1, console_output_func)).start()
 
@@ -76,7 +89,8 @@ def install_steamcmd(console_output_func, program_directory, user_directory, con
                                    encoding='cp1251')
         stream_output(process, console_output_func)
 
-        if process.returncode == 0:
+        success = process.returncode == 0
+        if success:
             console_output_func(f"SteamCMD installed at: {user_directory}")
         else:
             console_output_func(f"SteamCMD installation failed with code: {process.returncode}")
@@ -86,46 +100,158 @@ def install_steamcmd(console_output_func, program_directory, user_directory, con
         os.remove(zip_path)
         shutil.rmtree(extract_dir)
         console_output_func("Cleanup complete.")
+        return success
 
     except Exception as e:
         console_output_func(f"Error: {str(e)}")
+        return False
     finally:
         console_output_func("quit")
 
-def create_install_bat(install_dir, steamcmd_path):
+def read_app_manifest(install_dir):
+    """Читает buildid и StateFlags из steamapps/appmanifest_380870.acf или возвращает None."""
+    manifest_path = os.path.join(install_dir, 'steamapps', f"appmanifest_{PZ_SERVER_APP_ID}.acf")
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r', encoding='utf-8', errors='ignore') as manifest_file:
+        content = manifest_file.read()
+    values = {}
+    for key, value in re.findall(r'"(\w+)"\s+"([^"]*)"', content):
+        values.setdefault(key.lower(), value)
+    try:
+        return {'buildid': values.get('buildid', ''), 'stateflags': int(values.get('stateflags', 0))}
+    except ValueError:
+        return {'buildid': values.get('buildid', ''), 'stateflags': 0}
+
+def parse_available_build_id(app_info_output, branch='public'):
+    """Достает buildid ветки из вывода app_info_print."""
+    branches_index = app_info_output.find('"branches"')
+    if branches_index == -1:
+        return None
+    branch_index = app_info_output.find(f'"{branch}"', branches_index)
+    if branch_index == -1:
+        return None
+    match = re.search(r'"buildid"\s+"(\d+)"', app_info_output[branch_index:])
+    return match.group(1) if match else None
+
+def get_available_build_id(session):
+    session.run("app_info_update 1", timeout=120)
+    return parse_available_build_id(session.run(f"app_info_print {PZ_SERVER_APP_ID}", timeout=120))
+
+def choose_update_mode(manifest, available_build_id, force_validate=False):
+    """
+    'noop' - установлена актуальная сборка, 'update' - обычный app_update,
+    'validate' - app_update с полной проверкой файлов (нет манифеста, прерванное обновление или по запросу).
+    """
+    if force_validate or manifest is None:
+        return 'validate'
+    flags = manifest['stateflags']
+    if not flags & STATE_FULLY_INSTALLED or flags & ~(STATE_FULLY_INSTALLED | STATE_UPDATE_REQUIRED):
+        return 'validate'
+    if available_build_id and manifest['buildid'] == available_build_id and not flags & STATE_UPDATE_REQUIRED:
+        return 'noop'
+    return 'update'
+
+def create_install_bat(install_dir, steamcmd_path, validate=True):
+    app_update = f"+app_update {PZ_SERVER_APP_ID}" + (" validate" if validate else "")
     bat_content = f"""
 @echo off
-"{steamcmd_path}\steamcmd.exe" +force_install_dir "{install_dir}" +login anonymous +app_update 380870 validate +quit
+"{get_steamcmd_executable(steamcmd_path)}" +force_install_dir "{install_dir}" +login anonymous {app_update} +quit
 """
     bat_path = os.path.join(install_dir, "install_pz_server.bat")
     with open(bat_path, 'w') as bat_file:
         bat_file.write(bat_content)
     return bat_path
 
-def install_pz_server(console_output_func, steamcmd_path, install_dir, config_path):
+def prepare_store_for_update(console_output_func, install_dir, store_dir, mode):
+    """
+    Copy-on-update: validate может переписать любой файл на месте, поэтому общие файлы копируются.
+    Обычное обновление SteamCMD собирает в steamapps/downloading и переносит поверх старых файлов
+    (новый inode), так что достаточно снимка: по нему потом находятся файлы, измененные на месте.
+    """
+    if mode == 'validate':
+        copied = unshare_tree(install_dir, store_dir)
+        console_output_func(f"Unshared {copied} deduplicated files before validate.")
+    return snapshot_shared(install_dir, store_dir)
+
+def finish_store_update(console_output_func, install_dir, store_dir, snapshot, use_reflink):
+    for path in release_written_in_place(snapshot, store_dir):
+        console_output_func(f"Shared file changed by update, run Force validate for: {path}")
+    stats = dedupe_tree(install_dir, store_dir, use_reflink=use_reflink)
+    console_output_func(f"Deduplicated server files: {stats['linked']} linked, {stats['bytes_saved']} bytes saved.")
+
+def app_update_in_session(console_output_func, steamcmd_path, install_dir, force_validate=False, store_dir=None,
+                          use_reflink=False):
+    session = session_pool.get(get_steamcmd_executable(steamcmd_path), install_dir)
+    manifest = read_app_manifest(install_dir)
+    available_build_id = get_available_build_id(session) if manifest and not force_validate else None
+    mode = choose_update_mode(manifest, available_build_id, force_validate)
+    console_output_func(f"Installed build: {manifest['buildid'] if manifest else 'none'}, "
+                        f"available build: {available_build_id or 'unknown'}, mode: {mode}")
+    if mode == 'noop':
+        console_output_func("Project Zomboid Dedicated Server is up to date.")
+        return True
+
+    snapshot = prepare_store_for_update(console_output_func, install_dir, store_dir, mode) if store_dir else None
+
+    command = f"app_update {PZ_SERVER_APP_ID}" + (" validate" if mode == 'validate' else "")
+    output = session.run(command, output_func=console_output_func)
+    # "fully installed" после загрузки или "already up to date", если сборку не удалось узнать заранее
+    success = f"Success! App '{PZ_SERVER_APP_ID}'" in output
+
+    if success and store_dir:
+        finish_store_update(console_output_func, install_dir, store_dir, snapshot, use_reflink)
+    return success
+
+def install_pz_server(console_output_func, steamcmd_path, install_dir, config_path, force_validate=False,
+                      cancel_token=None):
+    """Устанавливает или обновляет сервер. Возвращает True при успехе."""
     try:
         console_output_func("Installing Project Zomboid Dedicated Server...")
         os.makedirs(install_dir, exist_ok=True)
-
-        bat_path = create_install_bat(install_dir, steamcmd_path)
-        console_output_func(f"Created install script: {bat_path}")
+        store_dir = get_content_store_dir(config_path)
+        use_reflink = get_content_store_reflink(config_path)
 
         elevate()  # Elevate the process to run with administrator privileges
 
+        try:
+            # Переиспользуем запущенный SteamCMD, чтобы не платить за bootstrap и login каждый раз
+            if app_update_in_session(console_output_func, steamcmd_path, install_dir, force_validate,
+                                     store_dir, use_reflink):
+                console_output_func(f"Project Zomboid Dedicated Server installed at: {install_dir}")
+                return True
+            console_output_func("Installation failed, see SteamCMD output above.")
+            return False
+        except (OSError, TimeoutError, SteamCMDSessionError) as e:
+            if cancel_token is not None and cancel_token.is_cancelled():
+                console_output_func("Installation cancelled.")
+                return False
+            console_output_func(f"SteamCMD session unavailable ({e}), falling back to install script.")
+
+        # Без сессии версию на сервере не узнать: полная проверка только если установка не в порядке
+        mode = choose_update_mode(read_app_manifest(install_dir), None, force_validate)
+        validate = mode == 'validate'
+        snapshot = prepare_store_for_update(console_output_func, install_dir, store_dir, mode) if store_dir else None
+        bat_path = create_install_bat(install_dir, steamcmd_path, validate)
+        console_output_func(f"Created install script: {bat_path}")
+
         process = subprocess.Popen(bat_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=True)
         stream_output(process, console_output_func)
 
         if process.returncode == 0:
             console_output_func(f"Project Zomboid Dedicated Server installed at: {install_dir}")
             # Удаляем install_pz_server.bat после успешной установки
-            bat_path = bat_path+"/install_pz_server.bat"
             os.remove(bat_path)
             console_output_func(f"Deleted install script: {bat_path}")
-        else:
-            console_output_func(f"Installation failed with code: {process.returncode}")
+            if store_dir:
+                finish_store_update(console_output_func, install_dir, store_dir, snapshot, use_reflink)
+            return True
+        console_output_func(f"Installation failed with code: {process.returncode}")
+        return False
 
     except Exception as e:
         console_output_func(f"Error: {str(e)}")
+        return False
     finally:
         save_path(config_path, 'Paths', 'PZServer', install_dir)  # Сохраняем путь установки сервера перед завершением
         console_output_func("quit")
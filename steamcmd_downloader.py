@@ -0,0 +1,115 @@
+# steamcmd_downloader.py
+
+# Пакетная загрузка предметов Workshop через SteamCMD: много workshop_download_item за одну сессию
+import os
+import re
+import sys
+import logging
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+PZ_APP_ID = "108600"
+
+SUCCESS_RE = re.compile(r'Success\. Downloaded item (\d+)')
+ERROR_RE = re.compile(r'ERROR! Download item (\d+) failed \(([^)]*)\)')
+
+
+def get_steamcmd_executable(steamcmd_path):
+    """Путь из config.ini может указывать как на папку SteamCMD, так и на сам исполняемый файл."""
+    if os.path.isfile(steamcmd_path):
+        return steamcmd_path
+    name = 'steamcmd.exe' if sys.platform == 'win32' else 'steamcmd.sh'
+    return os.path.join(steamcmd_path, name)
+
+
+def build_download_command(steamcmd_exe, install_dir, workshop_ids, login='anonymous'):
+    command = [steamcmd_exe, '+force_install_dir', install_dir, '+login', login]
+    for workshop_id in workshop_ids:
+        command += ['+workshop_download_item', PZ_APP_ID, str(workshop_id)]
+    command.append('+quit')
+    return command
+
+
+def parse_download_line(line):
+    """Возвращает (workshop_id, ok, message) для строки результата загрузки или None."""
+    match = SUCCESS_RE.search(line)
+    if match:
+        return match.group(1), True, line.strip()
+    match = ERROR_RE.search(line)
+    if match:
+        return match.group(1), False, match.group(2)
+    return None
+
+
+def run_download_session(steamcmd_exe, install_dir, workshop_ids, console_output_func=None, login='anonymous'):
+    """Одна сессия SteamCMD на пачку предметов. Возвращает workshop_id -> (ok, message)."""
+    console_output_func = console_output_func or (lambda text: None)
+    results = {}
+    command = build_download_command(steamcmd_exe, install_dir, workshop_ids, login)
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                               text=True, encoding='utf-8', errors='ignore')
+    for line in iter(process.stdout.readline, ''):
+        parsed = parse_download_line(line)
+        if parsed:
+            workshop_id, ok, message = parsed
+            results[workshop_id] = (ok, message)
+            console_output_func(f"Workshop item {workshop_id}: {'downloaded' if ok else 'failed (' + message + ')'}")
+    process.wait()
+
+    for workshop_id in map(str, workshop_ids):
+        if workshop_id not in results:
+            results[workshop_id] = (False, f"no result (exit code {process.returncode})")
+    return results
+
+
+def download_workshop_items(steamcmd_exe, install_dir, workshop_ids, console_output_func=None,
+                            login='anonymous', batch_size=50, max_sessions=2):
+    """
+    Делит Workshop ID на пачки и запускает по одной сессии SteamCMD на пачку,
+    не более max_sessions одновременно. Возвращает workshop_id -> (ok, message).
+    """
+    workshop_ids = list(dict.fromkeys(str(workshop_id) for workshop_id in workshop_ids))
+    if not workshop_ids:
+        return {}
+    batches = [workshop_ids[i:i + batch_size] for i in range(0, len(workshop_ids), batch_size)]
+    logging.info(f"Downloading {len(workshop_ids)} Workshop items in {len(batches)} SteamCMD sessions")
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_sessions, len(batches)))) as executor:
+        futures = [executor.submit(run_download_session, steamcmd_exe, install_dir, batch, console_output_func, login)
+                   for batch in batches]
+        for future in futures:
+            results.update(future.result())
+    return results
+
+
+def download_items_in_session(session, workshop_ids, console_output_func=None, cancel_token=None, batch_size=50):
+    """
+    Загрузка через уже запущенную сессию SteamCMD (см. steamcmd_session): команды пачки пишутся в stdin
+    разом, результат каждого предмета сообщается, как только появилась его строка. workshop_id -> (ok, message).
+    cancel_token проверяется между пачками.
+    """
+    console_output_func = console_output_func or (lambda text: None)
+    workshop_ids = list(dict.fromkeys(str(workshop_id) for workshop_id in workshop_ids))
+    results = {}
+
+    def report(workshop_id, ok, message):
+        results[workshop_id] = (ok, message)
+        console_output_func(f"Workshop item {workshop_id}: {'downloaded' if ok else 'failed (' + message + ')'}")
+
+    def on_line(line):
+        parsed = parse_download_line(line)
+        if parsed and parsed[0] in pending and parsed[0] not in results:
+            report(*parsed)
+
+    for start in range(0, len(workshop_ids), batch_size):
+        if cancel_token is not None and cancel_token.is_cancelled():
+            console_output_func("Workshop download cancelled.")
+            break
+        pending = set(workshop_ids[start:start + batch_size])
+        session.run_many([f"workshop_download_item {PZ_APP_ID} {workshop_id}"
+                          for workshop_id in workshop_ids[start:start + batch_size]], output_func=on_line)
+        for workshop_id in workshop_ids[start:start + batch_size]:
+            if workshop_id not in results:
+                report(workshop_id, False, 'no result')
+    return results
@@ -0,0 +1,191 @@
+# steamcmd_session.py
+
+# Долгоживущий интерактивный процесс SteamCMD, переиспользуемый между операциями
+import os
+import time
+import logging
+import threading
+import subprocess
+
+PROMPT = 'Steam>'
+STARTUP_TIMEOUT = 300
+IDLE_TIMEOUT = 600
+
+
+class SteamCMDSessionError(Exception):
+    pass
+
+
+class SteamCMDSession:
+    """
+    Один процесс SteamCMD (force_install_dir + login задаются при запуске).
+    Команды пишутся в stdin, конец результата команды определяется по приглашению Steam>.
+    """
+
+    def __init__(self, steamcmd_exe, install_dir=None, login='anonymous'):
+        self.steamcmd_exe = steamcmd_exe
+        self.install_dir = install_dir
+        self.login = login
+        self.process = None
+        self.last_used = time.monotonic()
+        self._buffer = ''
+        self._condition = threading.Condition()
+        self._lock = threading.Lock()  # одна команда за раз
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self, output_func=None):
+        command = [self.steamcmd_exe]
+        if self.install_dir:
+            command += ['+force_install_dir', self.install_dir]
+        command += ['+login', self.login]
+        logging.info(f"Starting SteamCMD session: {' '.join(command)}")
+
+        self._buffer = ''
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT, bufsize=0)
+        threading.Thread(target=self._read_output, args=(self.process,), daemon=True).start()
+        output = self._wait_for_prompt(STARTUP_TIMEOUT, output_func)
+        if 'FAILED' in output and 'Logging in' in output:
+            self.close()
+            raise SteamCMDSessionError(f"SteamCMD login failed for {self.login}")
+        return output
+
+    def _read_output(self, process):
+        fd = process.stdout.fileno()
+        while True:
+            try:
+                chunk = os.read(fd, 65536)
+            except OSError:
+                chunk = b''
+            with self._condition:
+                if not chunk:
+                    self._condition.notify_all()
+                    return
+                self._buffer += chunk.decode('utf-8', errors='ignore').replace('\r\n', '\n')
+                self._condition.notify_all()
+
+    def _wait_for_prompt(self, timeout, output_func=None):
+        """Ждет приглашения Steam>, передавая завершенные строки в output_func. Возвращает вывод команды."""
+        deadline = time.monotonic() + timeout if timeout else None
+        collected = []
+        with self._condition:
+            while True:
+                prompt_index = self._buffer.find(PROMPT)
+                chunk_end = prompt_index if prompt_index != -1 else self._buffer.rfind('\n') + 1
+                if chunk_end > 0:
+                    text = self._buffer[:chunk_end]
+                    self._buffer = self._buffer[chunk_end:]
+                    collected.append(text)
+                    if output_func:
+                        for line in text.splitlines():
+                            if line.strip():
+                                output_func(line.strip())
+                if prompt_index != -1:
+                    self._buffer = self._buffer[len(PROMPT):]
+                    return ''.join(collected)
+                if self.process.poll() is not None:
+                    raise SteamCMDSessionError(f"SteamCMD exited with code {self.process.returncode}")
+                remaining = deadline - time.monotonic() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("Timed out waiting for SteamCMD prompt")
+                self._condition.wait(remaining if remaining is not None else 1)
+
+    def run(self, command, timeout=None, output_func=None):
+        """Выполняет команду и возвращает ее вывод. При ошибке процесс перезапускается при следующем вызове."""
+        return self.run_many([command], timeout, output_func)[0]
+
+    def run_many(self, commands, timeout=None, output_func=None):
+        """
+        Пишет все команды в stdin одной записью и возвращает вывод каждой (по приглашению Steam> на команду).
+        timeout - на каждую команду. Если процесс не запустился или команда не завершилась, он закрывается.
+        """
+        with self._lock:
+            try:
+                if not self.is_alive():
+                    self.start(output_func)
+                self.process.stdin.write(''.join(f"{command}\n" for command in commands).encode())
+                self.process.stdin.flush()
+                return [self._wait_for_prompt(timeout, output_func) for _ in commands]
+            except (OSError, TimeoutError, SteamCMDSessionError):
+                logging.error(f"SteamCMD session failed, recycling it: {commands[0]}")
+                self.close(graceful=False)
+                raise
+            finally:
+                self.last_used = time.monotonic()
+
+    def close(self, graceful=True):
+        """graceful - отправить quit и подождать; иначе (процесс завис или не запустился) сразу kill."""
+        if self.process is None:
+            return
+        if self.process.poll() is None and not graceful:
+            self.process.kill()
+            self.process.wait()
+        elif self.process.poll() is None:
+            try:
+                self.process.stdin.write(b"quit\n")
+                self.process.stdin.flush()
+                self.process.wait(timeout=10)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+                self.process.wait()
+        logging.info(f"SteamCMD session closed (code {self.process.returncode})")
+        self.process = None
+
+
+class SteamCMDSessionPool:
+    """Сессии по ключу (steamcmd, папка установки, логин) с закрытием простаивающих."""
+
+    def __init__(self, idle_timeout=IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self.sessions = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    def get(self, steamcmd_exe, install_dir=None, login='anonymous'):
+        key = (os.path.abspath(steamcmd_exe), os.path.abspath(install_dir) if install_dir else None, login)
+        with self._lock:
+            session = self.sessions.get(key)
+            if session is None:
+                session = SteamCMDSession(steamcmd_exe, install_dir, login)
+                self.sessions[key] = session
+            if self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap_idle, daemon=True)
+                self._reaper.start()
+            return session
+
+    def _reap_idle(self):
+        while True:
+            time.sleep(min(30, self.idle_timeout))
+            now = time.monotonic()
+            with self._lock:
+                sessions = list(self.sessions.values())
+            for session in sessions:
+                if session.is_alive() and now - session.last_used > self.idle_timeout \
+                        and session._lock.acquire(blocking=False):
+                    try:
+                        logging.info("Closing idle SteamCMD session")
+                        session.close()
+                    finally:
+                        session._lock.release()
+
+    def kill_all(self):
+        """Убивает процессы сессий, не дожидаясь их команд: заблокированный в run_many воркер получит ошибку."""
+        with self._lock:
+            sessions = list(self.sessions.values())
+        for session in sessions:
+            process = session.process
+            if process is not None and process.poll() is None:
+                process.kill()
+
+    def close_all(self):
+        with self._lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+        for session in sessions:
+            with session._lock:
+                session.close()
+
+
+session_pool = SteamCMDSessionPool()
@@ -0,0 +1,74 @@
+# tests/fake_steamcmd.py
+
+# Заменитель SteamCMD для тестов: выполняет +команды из аргументов и печатает строки результата как настоящий.
+# FAKE_STEAMCMD_LOG - файл, куда дописывается JSON со списком аргументов каждого запуска;
+# FAKE_STEAMCMD_FAIL - Workshop ID через запятую, загрузка которых завершается ошибкой;
+# FAKE_STEAMCMD_SILENT - Workshop ID, для которых не печатается ничего (нет строки результата);
+# FAKE_STEAMCMD_HANG_LOGIN=1 - login зависает и приглашение не появляется.
+# Без +quit в аргументах работает интерактивно: приглашение Steam> и команды из stdin.
+import os
+import sys
+import json
+import time
+
+
+def id_list(name):
+    return set(filter(None, os.environ.get(name, '').split(',')))
+
+
+def download(workshop_id):
+    if workshop_id in id_list('FAKE_STEAMCMD_SILENT'):
+        return
+    if workshop_id in id_list('FAKE_STEAMCMD_FAIL'):
+        print(f"ERROR! Download item {workshop_id} failed (Failure).")
+    else:
+        print(f'Success. Downloaded item {workshop_id} to "/steamapps/workshop/content/108600/{workshop_id}" '
+              f'(1024 bytes)')
+
+
+def split_commands(arguments):
+    commands = []
+    for argument in arguments:
+        if argument.startswith('+'):
+            commands.append([argument[1:]])
+        elif commands:
+            commands[-1].append(argument)
+    return commands
+
+
+def run(command):
+    name, args = command[0], command[1:]
+    if name == 'login':
+        print(f"Logging in user '{args[0]}' to Steam Public...", end='')
+        sys.stdout.flush()
+        if os.environ.get('FAKE_STEAMCMD_HANG_LOGIN'):
+            time.sleep(3600)
+        print("OK")
+    elif name == 'workshop_download_item':
+        download(args[1])
+    elif name == 'quit':
+        sys.exit(0)
+
+
+def main():
+    log_path = os.environ.get('FAKE_STEAMCMD_LOG')
+    if log_path:
+        with open(log_path, 'a', encoding='utf-8') as log:
+            log.write(json.dumps(sys.argv[1:]) + '\n')
+    print("Redirecting stderr to 'logs/stderr.txt'")
+    print("Loading Steam API...OK")
+    for command in split_commands(sys.argv[1:]):
+        run(command)
+        sys.stdout.flush()
+    while True:
+        sys.stdout.write("\nSteam>")
+        sys.stdout.flush()
+        line = sys.stdin.readline()
+        if not line:
+            return 0
+        if line.split():
+            run(line.split())
+
+
+if __name__ == '__main__':
+    sys.exit(main())
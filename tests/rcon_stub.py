@@ -0,0 +1,39 @@
+# tests/rcon_stub.py
+
+# Заглушка RCON-сервера для тестов пула и benchmarks/bench_rcon.py.
+import asyncio
+
+from rcon_client import (
+    SERVERDATA_AUTH, SERVERDATA_AUTH_RESPONSE, SERVERDATA_RESPONSE_VALUE, encode_packet, read_packet
+)
+
+PASSWORD = 'bench'
+
+
+async def start_stub_server(latency):
+    """Заглушка RCON: проверяет пароль и отвечает на каждую команду с задержкой latency (как сеть до сервера)."""
+
+    def reply(writer, packets):
+        if not writer.is_closing():
+            for packet in packets:
+                writer.write(packet)
+
+    async def handle(reader, writer):
+        loop = asyncio.get_running_loop()
+        clients.append(writer)
+        try:
+            while True:
+                request_id, packet_type, body = await read_packet(reader)
+                if packet_type == SERVERDATA_AUTH:
+                    packets = [encode_packet(request_id, SERVERDATA_RESPONSE_VALUE, ''),
+                               encode_packet(request_id if body == PASSWORD else -1, SERVERDATA_AUTH_RESPONSE, '')]
+                else:
+                    packets = [encode_packet(request_id, SERVERDATA_RESPONSE_VALUE, f"ok: {body}")]
+                loop.call_later(latency, reply, writer, packets)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    clients = []
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    server.clients = clients
+    return server, server.sockets[0].getsockname()[1]
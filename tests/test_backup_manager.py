@@ -0,0 +1,111 @@
+# tests/test_backup_manager.py
+import os
+
+import pytest
+
+import backup_manager
+from backup_manager import create_snapshot, list_snapshots, load_manifest, prune_snapshots, restore_snapshot
+
+
+def make_world(save_dir):
+    (save_dir / 'map').mkdir(parents=True)
+    (save_dir / 'map_t.bin').write_bytes(b'meta' * 100)
+    (save_dir / 'map' / 'map_0_0.bin').write_bytes(b'chunk' * 1000)
+    (save_dir / 'map' / 'map_0_1.bin').write_bytes(b'chunk' * 1000)  # то же содержимое
+    (save_dir / 'players.db').write_bytes(os.urandom(4096))
+
+
+def read_tree(root):
+    return {os.path.relpath(os.path.join(dirpath, name), root): open(os.path.join(dirpath, name), 'rb').read()
+            for dirpath, _, names in os.walk(root) for name in names}
+
+
+def objects(backup_root):
+    return [name for _, _, names in os.walk(backup_root / 'objects') for name in names]
+
+
+def test_snapshot_round_trip_and_dedupe(tmp_path):
+    save_dir, backup_root = tmp_path / 'save', tmp_path / 'backups'
+    make_world(save_dir)
+    original = read_tree(save_dir)
+
+    stats = create_snapshot(str(save_dir), str(backup_root))
+    assert (stats['files'], stats['changed']) == (4, 4)
+    # Одинаковые чанки хранятся одним объектом
+    assert len(objects(backup_root)) == 3
+
+    # Без изменений файлы не перечитываются
+    again = create_snapshot(str(save_dir), str(backup_root))
+    assert (again['changed'], again['stored_bytes']) == (0, 0)
+
+    (save_dir / 'map' / 'map_0_0.bin').write_bytes(b'changed')
+    (save_dir / 'new.bin').write_bytes(b'new')
+    restore_snapshot(str(backup_root), stats['id'], str(save_dir))
+    assert read_tree(save_dir) == original
+    assert sorted(os.listdir(tmp_path)) == ['backups', 'save']
+
+
+def test_failed_restore_keeps_current_world(tmp_path):
+    save_dir, backup_root = tmp_path / 'save', tmp_path / 'backups'
+    make_world(save_dir)
+    stats = create_snapshot(str(save_dir), str(backup_root))
+    (save_dir / 'players.db').write_bytes(b'current')
+    current = read_tree(save_dir)
+
+    file_hash = load_manifest(str(backup_root), stats['id'])['files']['players.db'][0]
+    os.remove(backup_manager._object_path(str(backup_root), file_hash))
+    with pytest.raises(OSError):
+        restore_snapshot(str(backup_root), stats['id'], str(save_dir))
+    assert read_tree(save_dir) == current
+    assert sorted(os.listdir(tmp_path)) == ['backups', 'save']
+
+
+def test_interrupted_swap_is_recovered(tmp_path):
+    save_dir, backup_root = tmp_path / 'save', tmp_path / 'backups'
+    make_world(save_dir)
+    stats = create_snapshot(str(save_dir), str(backup_root))
+    original = read_tree(save_dir)
+    # Процесс упал между переименованиями: мир отложен, новая копия не дописана
+    os.replace(save_dir, str(save_dir) + backup_manager.REPLACED_SUFFIX)
+    os.makedirs(str(save_dir) + backup_manager.RESTORE_SUFFIX)
+
+    backup_manager._recover_interrupted_restore(str(save_dir))
+    assert read_tree(save_dir) == original
+    restore_snapshot(str(backup_root), stats['id'], str(save_dir))
+    assert sorted(os.listdir(tmp_path)) == ['backups', 'save']
+
+
+def test_store_failure_leaves_no_temp_file(tmp_path, monkeypatch):
+    save_dir, backup_root = tmp_path / 'save', tmp_path / 'backups'
+    make_world(save_dir)
+
+    class BrokenCompressor:
+        def compress(self, chunk):
+            raise OSError("disk full")
+
+    monkeypatch.setattr(backup_manager.zlib, 'compressobj', lambda level: BrokenCompressor())
+    with pytest.raises(OSError):
+        create_snapshot(str(save_dir), str(backup_root))
+    assert objects(backup_root) == []
+
+
+def test_prune_frees_unreferenced_objects(tmp_path):
+    save_dir, backup_root = tmp_path / 'save', tmp_path / 'backups'
+    make_world(save_dir)
+    for index in range(3):
+        (save_dir / 'players.db').write_bytes(f"players {index}".encode())
+        create_snapshot(str(save_dir), str(backup_root))
+    snapshots = list_snapshots(str(backup_root))
+    assert len(snapshots) == 3
+    stale = backup_root / 'objects' / '.tmp_1_1'
+    stale.write_bytes(b'partial')
+    os.utime(stale, (0, 0))
+
+    removed, freed = prune_snapshots(str(backup_root), keep_last=1, keep_daily=0)
+    assert sorted(removed) == sorted(snapshots[:2])
+    assert list_snapshots(str(backup_root)) == snapshots[2:]
+    assert freed > 0
+    # Остались объекты последнего снапшота: мета, общий чанк и последний players.db
+    assert len(objects(backup_root)) == 3
+    restore_snapshot(str(backup_root), snapshots[2], str(save_dir))
+    assert (save_dir / 'players.db').read_bytes() == b'players 2'
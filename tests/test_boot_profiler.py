@@ -0,0 +1,38 @@
+# tests/test_boot_profiler.py
+from boot_profiler import BootProfiler, profile_log_file, latest_profile
+from console_events import LineSplitter
+
+
+def stamped(ms, text, category='General'):
+    return f"LOG  : {category:12}, {ms}> 1> {text}"
+
+
+def test_lines_without_log_time_keep_log_clock():
+    profiler = BootProfiler()
+    profiler.feed_line(stamped(1_700_000_000_000, 'loading ModA', 'Mod'), received=10.0)
+    # Строка стека без времени пришла позже по часам менеджера - не должна давать десятки секунд
+    profiler.feed_line('\tat se.krka.kahlua.vm.KahluaThread.tableget', received=99.0)
+    profiler.feed_line(stamped(1_700_000_002_000, 'loading ModB', 'Mod'), received=99.5)
+    assert profiler.feed_line(stamped(1_700_000_003_000, '*** SERVER STARTED ****'), received=100.0)
+    result = profiler.result()
+    assert result['total'] == 3.0
+    assert result['mods']['ModA']['mod_load'] == 2.0
+    assert result['mods']['ModB']['mod_load'] == 1.0
+
+
+def test_line_splitter_times_each_line():
+    splitter = LineSplitter()
+    assert splitter.feed_timed('loading Mo', 1.0) == []
+    assert splitter.feed_timed('dA\nloading ModB\nlo', 2.0) == [('loading ModA', 1.0), ('loading ModB', 2.0)]
+    assert splitter.feed_timed('ading ModC\n', 3.0) == [('loading ModC', 2.0)]
+    assert splitter.feed('x\n') == ['x']
+
+
+def test_profile_log_file_does_not_touch_history(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    log_path = tmp_path / 'server-console.txt'
+    log_path.write_text('\n'.join([stamped(1_700_000_000_000, 'loading ModA', 'Mod'),
+                                   stamped(1_700_000_001_000, '*** SERVER STARTED ****')]) + '\n')
+    assert profile_log_file(str(log_path))['total'] == 1.0
+    assert latest_profile() is None
+    assert not (tmp_path / 'boot_profiles.json').exists()
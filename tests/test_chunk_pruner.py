@@ -0,0 +1,26 @@
+# tests/test_chunk_pruner.py
+import os
+
+from chunk_pruner import prune_chunks
+
+
+def test_prune_moves_every_unprotected_chunk(tmp_path):
+    save_dir = tmp_path / 'save'
+    save_dir.mkdir()
+    for x in range(40):
+        for y in range(40):
+            (save_dir / f"map_{x}_{y}.bin").write_bytes(b'c')
+    (save_dir / 'map_t.bin').write_bytes(b'meta')
+    # Защищены чанки 0..9 по обеим осям
+    regions = [(0, 0, 99, 99)]
+
+    dry = prune_chunks(str(save_dir), regions, dry_run=True, batch_size=50)
+    assert (dry['scanned'], dry['pruned']) == (1600, 1500)
+    assert len(os.listdir(save_dir)) == 1601
+
+    backup_dir = tmp_path / 'backup'
+    stats = prune_chunks(str(save_dir), regions, dry_run=False, backup_dir=str(backup_dir), batch_size=50)
+    assert (stats['scanned'], stats['pruned']) == (1600, 1500)
+    assert sorted(os.listdir(save_dir)) == sorted(['map_t.bin'] + [f"map_{x}_{y}.bin"
+                                                                   for x in range(10) for y in range(10)])
+    assert len(os.listdir(backup_dir)) == 1500
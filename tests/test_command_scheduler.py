@@ -0,0 +1,110 @@
+# tests/test_command_scheduler.py
+import json
+import time
+from datetime import datetime
+
+import pytest
+
+from command_scheduler import (
+    CommandScheduler, TimerWheel, MAX_GRACE_SECONDS, next_cron_time, parse_cron, parse_cron_field, parse_schedule,
+)
+
+# Понедельник, 2024-01-01 12:00:00 по локальному времени
+NOW = datetime(2024, 1, 1, 12, 0).timestamp()
+
+
+def local(*args):
+    return datetime(*args).timestamp()
+
+
+def test_parse_cron_fields():
+    assert parse_cron_field('*/15', 0, 59) == {0, 15, 30, 45}
+    assert parse_cron_field('1-3,10', 0, 59) == {1, 2, 3, 10}
+    assert parse_cron_field('50/5', 0, 59) == {50, 55}
+    cron = parse_cron('0 4 * * 7')
+    assert cron[4] == {0}  # 7 - тоже воскресенье
+    assert cron[5:] == (False, True)
+    for expression in ('* * * *', '60 * * * *', '* * * * 8', '*/0 * * * *', '5-1 * * * *'):
+        with pytest.raises(ValueError):
+            parse_cron(expression)
+
+
+def test_next_cron_time():
+    assert next_cron_time(parse_cron('30 * * * *'), NOW) == local(2024, 1, 1, 12, 30)
+    # Строго после: совпадающая минута не возвращается
+    assert next_cron_time(parse_cron('0 12 * * *'), NOW) == local(2024, 1, 2, 12, 0)
+    assert next_cron_time(parse_cron('0 4 * * 0'), NOW) == local(2024, 1, 7, 4, 0)
+    # День месяца и день недели вместе: достаточно одного
+    assert next_cron_time(parse_cron('0 0 15 * 3'), NOW) == local(2024, 1, 3, 0, 0)
+    assert next_cron_time(parse_cron('0 0 29 2 *'), NOW) == local(2024, 2, 29, 0, 0)
+    with pytest.raises(ValueError):
+        next_cron_time(parse_cron('0 0 31 2 *'), NOW)
+
+
+def test_parse_schedule():
+    assert parse_schedule('every 30m') == {'every': 1800}
+    assert parse_schedule('2h') == {'every': 7200}
+    assert parse_schedule('*/5 * * * *') == {'cron': '*/5 * * * *'}
+    for text in ('5s', 'every 3x', 'soon'):
+        with pytest.raises(ValueError):
+            parse_schedule(text)
+
+
+def test_timer_wheel_order_cancel_and_long_gap():
+    wheel = TimerWheel(tick=1.0, slots=8, now=0)
+    wheel.schedule(3.5, 'b', 'second')
+    wheel.schedule(2.0, 'a', 'first')
+    wheel.schedule(20.0, 'c', 'far')  # тот же слот, что и тик 4, но позже
+    wheel.schedule(5.0, 'd', 'cancelled')
+    wheel.cancel('d')
+    assert wheel.advance(1.5) == []
+    assert wheel.advance(5.0) == [('a', 'first'), ('b', 'second')]
+    assert wheel.size == 1
+    # Пропуск больше оборота колеса: каждый слот просматривается один раз
+    assert wheel.advance(1000.0) == [('c', 'far')]
+    assert wheel.size == 0
+
+
+def make_scheduler(tmp_path, jobs):
+    path = tmp_path / 'schedules.json'
+    path.write_text('{"jobs": [%s]}' % ', '.join(jobs), encoding='utf-8')
+    return CommandScheduler(str(path), server='servertest', now=NOW)
+
+
+def job_json(schedule, last_run, action='save', **extra):
+    fields = {'id': 1, 'server': 'servertest', 'action': action, 'enabled': True, 'last_run': last_run}
+    fields.update(schedule, **extra)
+    return json.dumps(fields)
+
+
+def test_missed_run_within_grace_runs_now(tmp_path):
+    # Запуск каждые 10 минут, последний 11 минут назад: пропущенный опоздал на минуту
+    scheduler = make_scheduler(tmp_path, [job_json({'every': 600}, NOW - 660)])
+    assert scheduler.next_runs[1] == NOW
+    # Колесо срабатывает не раньше следующего тика
+    assert scheduler.tick(NOW + 1)[0][0] == 'run'
+    assert scheduler.jobs[1]['last_run'] == NOW
+    assert scheduler.next_runs[1] == NOW + 600
+
+
+def test_missed_run_past_grace_waits(tmp_path):
+    # Пропущенный запуск был 500 с назад, grace для 10 минут - 300 с
+    scheduler = make_scheduler(tmp_path, [job_json({'every': 600}, NOW - 1100)])
+    assert scheduler.next_runs[1] == NOW + 100
+    assert scheduler.tick(NOW) == []
+
+
+def test_missed_restart_keeps_warning(tmp_path):
+    scheduler = make_scheduler(tmp_path, [job_json({'cron': '58 11 * * *'}, NOW - 86400, action='restart',
+                                                   warnings=[60, 10])])
+    assert scheduler.next_runs[1] == NOW + 60
+    assert [event[0] for event in scheduler.tick(NOW + 50)] == ['warn']
+
+
+def test_year_old_minute_cron_schedules_quickly(tmp_path):
+    started = time.perf_counter()
+    scheduler = make_scheduler(tmp_path, [job_json({'cron': '* * * * *'}, NOW - 366 * 86400)])
+    assert time.perf_counter() - started < 1
+    # Последняя пропущенная минута в пределах grace - запуск сейчас
+    assert scheduler.next_runs[1] == NOW
+    assert MAX_GRACE_SECONDS >= 60
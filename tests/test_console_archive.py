@@ -0,0 +1,64 @@
+# tests/test_console_archive.py
+import sqlite3
+
+from console_archive import ConsoleArchive, SCHEMA_VERSION, connect
+
+DAY = 86400
+START = 1700000000.0
+
+
+def test_search_reads_text_from_segments(tmp_path):
+    # Маленькие сегменты: часть строк окажется в закрытых и сжатых файлах
+    archive = ConsoleArchive(str(tmp_path), max_segment_bytes=200, flush_interval=0.05)
+    for index in range(20):
+        archive.append('alpha', [f"Chat: [Kate] helicopter {index}", f"Zombie count: {index}"], START + index)
+        archive.append('beta', [f"Chat: [Иван] helicopter {index}"], START + index)
+    archive.flush(timeout=10)
+    archive.close()
+
+    archive = ConsoleArchive(str(tmp_path))
+    try:
+        with connect(archive.db_path) as connection:
+            assert connection.execute("SELECT COUNT(*) FROM segments WHERE compressed = 1").fetchone()[0] > 0
+            # Текст строк в базе не хранится
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(lines)")}
+            assert 'text' not in columns
+
+        rows = archive.search('helicopter', limit=100)
+        assert len(rows) == 40
+        assert rows[0][0] == START + 19
+        assert {line for _, server, line in rows if server == 'alpha'} == {
+            f"Chat: [Kate] helicopter {index}" for index in range(20)}
+
+        rows = archive.search('helicopter', server='beta', since=START + 5, until=START + 7)
+        assert [line for _, _, line in rows] == [f"Chat: [Иван] helicopter {index}" for index in (7, 6, 5)]
+        assert archive.search('nosuchword') == []
+    finally:
+        archive.close()
+
+
+def test_version_one_archive_is_reindexed(tmp_path):
+    archive = ConsoleArchive(str(tmp_path), flush_interval=0.05)
+    archive.append('alpha', ["Saving world... 10 chunks", "Player Bob disconnected"], START)
+    archive.append('alpha', ["Saving world... 12 chunks"], START + DAY)
+    archive.close()
+
+    # Схема первой версии: текст строк лежал в таблице lines
+    connection = sqlite3.connect(str(tmp_path / 'archive.db'))
+    with connection:
+        connection.execute("DROP TABLE lines_fts")
+        connection.execute("DROP TABLE lines")
+        connection.execute("CREATE TABLE lines (id INTEGER PRIMARY KEY, ts REAL, server TEXT, segment INTEGER, "
+                           "text TEXT)")
+        connection.execute("PRAGMA user_version = 0")
+    connection.close()
+
+    archive = ConsoleArchive(str(tmp_path))
+    try:
+        archive.flush(timeout=10)
+        rows = archive.search('saving')
+        assert [line for _, _, line in rows] == ["Saving world... 12 chunks", "Saving world... 10 chunks"]
+        with connect(archive.db_path) as connection:
+            assert connection.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    finally:
+        archive.close()
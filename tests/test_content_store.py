@@ -0,0 +1,65 @@
+# tests/test_content_store.py
+import os
+
+from content_store import (dedupe_tree, unshare_paths, snapshot_shared, release_written_in_place, load_index,
+                           object_path, get_content_store_reflink)
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(data)
+
+
+def make_installs(tmp_path):
+    """Две установки с одинаковыми файлами, сведенные в одно хранилище."""
+    store = str(tmp_path / 'store')
+    installs = [str(tmp_path / name) for name in ('a', 'b')]
+    for root in installs:
+        write(os.path.join(root, 'java', 'server.jar'), b'j' * 8192)
+        write(os.path.join(root, 'steamapps', 'workshop', 'content', '108600', '1', 'mod.bin'), b'm' * 8192)
+        dedupe_tree(root, store)
+    return store, installs
+
+
+def test_dedupe_links_identical_files(tmp_path):
+    store, (a, b) = make_installs(tmp_path)
+    jar_a, jar_b = os.path.join(a, 'java', 'server.jar'), os.path.join(b, 'java', 'server.jar')
+    assert os.stat(jar_a).st_ino == os.stat(jar_b).st_ino
+    assert len(load_index(store)) == 4
+
+
+def test_unshare_paths_copies_only_given_items(tmp_path):
+    store, (a, b) = make_installs(tmp_path)
+    item = os.path.join(a, 'steamapps', 'workshop', 'content', '108600', '1')
+    assert unshare_paths([item, os.path.join(a, 'missing')], store) == 1
+    assert os.stat(os.path.join(item, 'mod.bin')).st_nlink == 1
+    # Остальные файлы установки остаются общими
+    assert os.stat(os.path.join(a, 'java', 'server.jar')).st_nlink == 3
+    # Запись в копию не меняет вторую установку
+    write(os.path.join(item, 'mod.bin'), b'x' * 8192)
+    with open(os.path.join(b, 'steamapps', 'workshop', 'content', '108600', '1', 'mod.bin'), 'rb') as file:
+        assert file.read() == b'm' * 8192
+
+
+def test_release_written_in_place(tmp_path):
+    store, (a, b) = make_installs(tmp_path)
+    snapshot = snapshot_shared(a, store)
+    jar_a = os.path.join(a, 'java', 'server.jar')
+    entry = load_index(store)[os.path.abspath(jar_a)]
+    # Запись на месте, как при патче файла без переноса
+    with open(jar_a, 'r+b') as file:
+        file.write(b'patched')
+    affected = release_written_in_place(snapshot, store)
+    assert affected == [os.path.abspath(os.path.join(b, 'java', 'server.jar'))]
+    assert not os.path.exists(object_path(os.path.abspath(store), entry['hash']))
+    assert all(item['hash'] != entry['hash'] for item in load_index(store).values())
+    # Без новых записей на месте снимок ничего не находит
+    assert release_written_in_place(snapshot_shared(a, store), store) == []
+
+
+def test_reflink_setting(tmp_path):
+    config_path = tmp_path / 'config.ini'
+    assert get_content_store_reflink(str(config_path)) is False
+    config_path.write_text("[ContentStore]\npath = store\nreflink = true\n")
+    assert get_content_store_reflink(str(config_path)) is True
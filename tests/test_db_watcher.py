@@ -0,0 +1,54 @@
+# tests/test_db_watcher.py
+import sqlite3
+
+from db_watcher import CHANGES_TABLE, DatabaseWatcher
+
+
+def make_db(path):
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute("CREATE TABLE whitelist (id INTEGER PRIMARY KEY, username TEXT)")
+        connection.execute("INSERT INTO whitelist (username) VALUES ('Kate')")
+    return connection
+
+
+def schema_objects(connection):
+    return {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE name LIKE 'pzmm_%'")}
+
+
+def test_close_removes_change_log(tmp_path):
+    path = str(tmp_path / 'servertest.db')
+    server = make_db(path)
+    watcher = DatabaseWatcher(path)
+    assert watcher.install_change_log()
+    with server:
+        server.execute("INSERT INTO whitelist (username) VALUES ('Bob')")
+    assert watcher.poll() == {'whitelist': {2}}
+    watcher.close()
+
+    assert schema_objects(server) == set()
+    # Сервер продолжает писать без менеджера, журнал не растет
+    with server:
+        server.execute("INSERT INTO whitelist (username) VALUES ('Ivan')")
+    server.close()
+
+
+def test_stale_changes_are_dropped_on_start(tmp_path):
+    path = str(tmp_path / 'servertest.db')
+    server = make_db(path)
+    # Журнал остался от запуска, который не смог его удалить
+    watcher = DatabaseWatcher(path)
+    watcher.install_change_log()
+    watcher.connection.close()
+    with server:
+        server.executemany("INSERT INTO whitelist (username) VALUES (?)", [(f"player{index}",) for index in range(50)])
+    assert server.execute(f"SELECT COUNT(*) FROM {CHANGES_TABLE}").fetchone()[0] == 50
+
+    watcher = DatabaseWatcher(path)
+    watcher.install_change_log()
+    assert server.execute(f"SELECT COUNT(*) FROM {CHANGES_TABLE}").fetchone()[0] == 0
+    with server:
+        server.execute("DELETE FROM whitelist WHERE username = 'Kate'")
+    assert watcher.poll() == {'whitelist': {1}}
+    watcher.close()
+    server.close()
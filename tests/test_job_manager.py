@@ -0,0 +1,85 @@
+# tests/test_job_manager.py
+import time
+import threading
+
+import pytest
+
+QtCore = pytest.importorskip('PySide6.QtCore')
+from job_manager import JobManager, DONE, _abandoned  # noqa: E402
+
+
+class BlockingWorker(QtCore.QObject):
+    """Воркер, который не проверяет отмену: ждет события, как ожидание ответа SteamCMD."""
+    finished = QtCore.Signal()
+    log = QtCore.Signal(str)
+    failed = QtCore.Signal(str)
+
+    def __init__(self, release, attempts=None, fail_first=0):
+        super().__init__()
+        self.release = release
+        self.attempts = attempts
+        self.fail_first = fail_first
+
+    def run(self):
+        self.release.wait(10)
+        if self.attempts is not None:
+            self.attempts.append(1)
+            if len(self.attempts) <= self.fail_first:
+                self.failed.emit("boom")
+        self.finished.emit()
+
+
+# Менеджеры живут до конца модуля, как у окна: удаление посреди отложенных deleteLater роняет Qt
+MANAGERS = []
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+
+def make_manager():
+    manager = JobManager()
+    MANAGERS.append(manager)
+    return manager
+
+
+def wait_for(app, condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    return condition()
+
+
+def test_shutdown_unblocks_stuck_workers(app):
+    manager = make_manager()
+    release = threading.Event()
+    manager.submit("blocked", lambda token: BlockingWorker(release))
+    runner = next(iter(manager._running.values()))
+    assert manager.shutdown(timeout_ms=200, unblock=release.set) == []
+    assert runner.thread.isFinished()
+    assert wait_for(app, lambda: not manager._running)
+
+
+def test_shutdown_keeps_threads_that_do_not_stop(app):
+    manager = make_manager()
+    release = threading.Event()
+    job = manager.submit("stuck", lambda token: BlockingWorker(release))
+    runner = next(iter(manager._running.values()))
+    assert manager.shutdown(timeout_ms=100) == [job]
+    assert _abandoned[-1][0] is runner.thread
+    release.set()
+    assert runner.thread.wait(5000)
+    assert wait_for(app, lambda: not manager._running)
+
+
+def test_failed_signal_triggers_retry(app):
+    manager = make_manager()
+    release = threading.Event()
+    release.set()
+    attempts = []
+    job = manager.submit("flaky", lambda token: BlockingWorker(release, attempts, fail_first=1),
+                         retries=1, backoff=0.01)
+    assert wait_for(app, lambda: job.state == DONE)
+    assert len(attempts) == 2
@@ -0,0 +1,58 @@
+# tests/test_launch_profile.py
+import json
+import os
+
+from launch_profile import build_java_command, build_vm_args, profile_from_vm_args, write_jvm_config
+
+VM_ARGS = ['-Djava.awt.headless=true', '-Xmx8g', '-Dzomboid.steam=1', '-Dzomboid.znetlog=1',
+           '-Djava.library.path=linux64/:natives/', '-XX:+UseZGC', '-XX:-OmitStackTraceInFastThrow']
+
+
+def make_server(tmp_path):
+    config = {'mainClass': 'zombie/network/GameServer', 'classpath': ['java/.', 'java/istack-commons-runtime.jar'],
+              'vmArgs': VM_ARGS}
+    (tmp_path / 'ProjectZomboid64.json').write_text(json.dumps(config), encoding='utf-8')
+    return str(tmp_path)
+
+
+def test_vm_args_round_trip_keeps_unmanaged_args():
+    profile = profile_from_vm_args(VM_ARGS)
+    assert (profile['xmx'], profile['gc'], profile['headless']) == ('8g', 'ZGC', True)
+    assert build_vm_args(VM_ARGS, profile) == [
+        '-Djava.awt.headless=true', '-Dzomboid.steam=1', '-Dzomboid.znetlog=1',
+        '-Djava.library.path=linux64/:natives/', '-XX:-OmitStackTraceInFastThrow', '-Xmx8g', '-XX:+UseZGC']
+    assert profile_from_vm_args(build_vm_args(VM_ARGS, profile)) == profile
+
+
+def test_profile_change_replaces_managed_args():
+    profile = dict(profile_from_vm_args(VM_ARGS), xms='2g', xmx='12g', gc='G1', max_gc_pause_ms='50',
+                   headless=False, extra_args=['-XX:+AlwaysPreTouch'])
+    args = build_vm_args(VM_ARGS, profile)
+    assert '-XX:+UseZGC' not in args and '-Djava.awt.headless=true' not in args
+    assert args[-5:] == ['-Xms2g', '-Xmx12g', '-XX:+UseG1GC', '-XX:MaxGCPauseMillis=50', '-XX:+AlwaysPreTouch']
+
+
+def test_write_jvm_config_keeps_other_keys(tmp_path):
+    server_directory = make_server(tmp_path)
+    write_jvm_config(server_directory, dict(profile_from_vm_args(VM_ARGS), xmx='16g'))
+    config = json.loads((tmp_path / 'ProjectZomboid64.json').read_text(encoding='utf-8'))
+    assert config['mainClass'] == 'zombie/network/GameServer'
+    assert '-Xmx16g' in config['vmArgs'] and '-Xmx8g' not in config['vmArgs']
+
+
+def test_java_command_matches_start_scripts(tmp_path, monkeypatch):
+    server_directory = make_server(tmp_path)
+    profile = dict(profile_from_vm_args(VM_ARGS), server_args=['-servername', 'pvp'])
+    monkeypatch.setenv('LD_PRELOAD', 'libfoo.so')
+
+    program, arguments, environment = build_java_command(server_directory, profile, platform='linux')
+    assert program == os.path.join(server_directory, 'jre64', 'bin', 'java')
+    assert arguments[-5:] == ['-cp', 'java/.:java/istack-commons-runtime.jar', 'zombie/network/GameServer',
+                              '-servername', 'pvp']
+    assert environment['LD_PRELOAD'] == 'libfoo.so:libjsig.so'
+    assert environment['LD_LIBRARY_PATH'].startswith(os.path.join(server_directory, 'linux64') + ':')
+
+    program, arguments, environment = build_java_command(server_directory, profile, platform='win32')
+    assert program.endswith('java.exe')
+    assert 'java/.;java/istack-commons-runtime.jar' in arguments
+    assert 'LD_PRELOAD' not in environment
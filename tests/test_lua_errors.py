@@ -0,0 +1,42 @@
+# tests/test_lua_errors.py
+from lua_errors import LuaErrorAggregator, read_log_increment
+
+ERROR = ("ERROR: General     , 1700000000000> 1> ExceptionLogger.logException> Exception thrown "
+         "java.lang.RuntimeException: attempted index: items of non-table: null")
+FRAMES = ["\tat se.krka.kahlua.vm.KahluaThread.tableget(KahluaThread.java:1689)",
+          "LOG  : General     , 1700000000001> 2> -----------------------------------------",
+          "function: onPlayerUpdate -- file: /mods/BetterLoot/BetterLoot.lua line # 120 | MOD: Better Loot"]
+NEXT = "LOG  : General     , 1700000000002> 3> Zombie count: 10"
+
+
+def test_increment_does_not_split_error_block(tmp_path):
+    path = tmp_path / 'DebugLog-server.txt'
+    # Сервер успел записать только начало блока
+    path.write_text(NEXT + '\n' + ERROR + '\n' + FRAMES[0] + '\n')
+    first = LuaErrorAggregator()
+    offset = read_log_increment(str(path), first)
+    assert first.total == 0
+    assert offset == len(NEXT) + 1
+
+    with open(path, 'a') as file:
+        file.write('\n'.join(FRAMES[1:] + [NEXT]) + '\n')
+    second = LuaErrorAggregator()
+    offset = read_log_increment(str(path), second, offset)
+    assert offset == path.stat().st_size
+    assert second.total == 1
+    entry = second.summary()[0]
+    assert entry['mod'] == 'Better Loot'
+    assert len(entry['frames']) == 1
+
+
+def test_merge_counts_repeats():
+    lines = [ERROR] + FRAMES + [NEXT]
+    main, scanned = LuaErrorAggregator(), LuaErrorAggregator()
+    for aggregator in (main, scanned, scanned):
+        for line in lines:
+            aggregator.feed_line(line, now=1.0)
+    version = main.version
+    main.merge(scanned)
+    assert main.total == 3
+    assert main.summary()[0]['count'] == 3
+    assert main.version > version
@@ -0,0 +1,24 @@
+# tests/test_metrics_exporter.py
+from metrics_exporter import MetricsRegistry
+
+
+def test_observe_renders_one_summary_family():
+    registry = MetricsRegistry()
+    registry.observe('pz_op_seconds', 1.5, 'Operation duration', operation='a')
+    registry.observe('pz_op_seconds', 0.5, 'Operation duration', operation='a')
+    lines = registry.render().splitlines()
+    assert lines[:4] == ['# HELP pz_op_seconds Operation duration',
+                         '# TYPE pz_op_seconds summary',
+                         'pz_op_seconds_sum{operation="a"} 2.0',
+                         'pz_op_seconds_count{operation="a"} 2']
+    assert not any('_sum counter' in line or '_count counter' in line for line in lines)
+
+
+def test_help_is_filled_in_by_a_later_call():
+    registry = MetricsRegistry()
+    registry.inc_counter('pz_events_total')
+    assert '# HELP pz_events_total' not in registry.render()
+    registry.inc_counter('pz_events_total', help_text='Events seen')
+    registry.inc_counter('pz_events_total', help_text='Ignored: help is already set')
+    lines = registry.render().splitlines()
+    assert lines[:3] == ['# HELP pz_events_total Events seen', '# TYPE pz_events_total counter', 'pz_events_total 3']
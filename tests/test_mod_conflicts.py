@@ -0,0 +1,28 @@
+# tests/test_mod_conflicts.py
+import os
+
+from mod_conflicts import check_active_mods
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(text)
+
+
+def test_nested_file_change_invalidates_cache(tmp_path):
+    paths = {mod: str(tmp_path / mod) for mod in ('A', 'B')}
+    write(os.path.join(paths['A'], 'media', 'lua', 'client', 'x.lua'), 'one')
+    write(os.path.join(paths['B'], 'media', 'lua', 'client', 'x.lua'), 'two')
+    cache_path = str(tmp_path / 'cache.json')
+
+    report = check_active_mods(['A', 'B'], paths, with_hashes=True, cache_path=cache_path)
+    assert [item['kind'] for item in report] == ['conflict']
+
+    # Правка файла глубоко в media/ не меняет mtime папки мода и media/
+    nested = os.path.join(paths['B'], 'media', 'lua', 'client', 'x.lua')
+    stat = os.stat(nested)
+    write(nested, 'one')
+    os.utime(nested, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    report = check_active_mods(['A', 'B'], paths, with_hashes=True, cache_path=cache_path)
+    assert [item['kind'] for item in report] == ['duplicate']
@@ -0,0 +1,108 @@
+# tests/test_mod_dependencies.py
+import random
+
+from mod_dependencies import compute_load_order, missing_requirements, topological_sort
+
+
+def assert_respects_edges(order, edges):
+    position = {node: index for index, node in enumerate(order)}
+    for node, required in edges.items():
+        for other in required:
+            if node in position and other in position:
+                assert position[other] < position[node], (other, node)
+
+
+def test_requirements_come_first_and_order_is_stable():
+    order, cycles = topological_sort(['c', 'a', 'b', 'd'], {'c': ['b'], 'b': ['a']})
+    assert order == ['a', 'b', 'c', 'd']
+    assert cycles == []
+
+
+def test_edges_to_unknown_nodes_are_ignored():
+    order, cycles = topological_sort(['a', 'b'], {'a': ['missing'], 'b': ['a']})
+    assert order == ['a', 'b']
+    assert cycles == []
+
+
+def test_cycle_is_reported_and_broken():
+    order, cycles = topological_sort(['a', 'b', 'c'], {'a': ['b'], 'b': ['c'], 'c': ['a']})
+    assert sorted(order) == ['a', 'b', 'c']
+    assert cycles == [['a', 'b', 'c', 'a']]
+
+
+def test_self_dependency_is_a_cycle():
+    order, cycles = topological_sort(['a'], {'a': ['a']})
+    assert order == ['a']
+    assert cycles == [['a', 'a']]
+
+
+def test_long_chain_of_10k_nodes():
+    count = 10000
+    nodes = [f"mod{index}" for index in reversed(range(count))]
+    edges = {f"mod{index}": [f"mod{index - 1}"] for index in range(1, count)}
+    order, cycles = topological_sort(nodes, edges)
+    assert order == [f"mod{index}" for index in range(count)]
+    assert cycles == []
+
+
+def test_random_dag_of_10k_nodes():
+    rng = random.Random(7)
+    count = 10000
+    nodes = [f"mod{index}" for index in range(count)]
+    edges = {f"mod{index}": [f"mod{rng.randrange(index)}" for _ in range(rng.randint(0, 3))]
+             for index in range(1, count)}
+    shuffled = nodes[:]
+    rng.shuffle(shuffled)
+    order, cycles = topological_sort(shuffled, edges)
+    assert sorted(order) == sorted(nodes)
+    assert cycles == []
+    assert_respects_edges(order, edges)
+
+
+def test_10k_nodes_with_cycles():
+    rng = random.Random(11)
+    count = 10000
+    nodes = [f"mod{index}" for index in range(count)]
+    # Цепочка с ребрами вперед по случайным узлам, плюс три ребра назад, замыкающие циклы
+    edges = {f"mod{index}": [f"mod{index - 1}", f"mod{rng.randrange(index)}"] for index in range(1, count)}
+    for start, end in ((10, 500), (2000, 2100), (9000, 9999)):
+        edges[f"mod{start}"] = edges.get(f"mod{start}", []) + [f"mod{end}"]
+    order, cycles = topological_sort(nodes, edges)
+    assert sorted(order) == sorted(nodes)
+    assert len(cycles) >= 3
+    for cycle in cycles:
+        assert cycle[0] == cycle[-1]
+        for node, required in zip(cycle, cycle[1:]):
+            assert required in edges[node]
+
+
+def test_missing_requirements_are_transitive():
+    requires = {'a': ['b'], 'b': ['c', 'd'], 'c': [], 'd': ['a']}
+    assert missing_requirements(['a'], ['d'], requires) == ['b', 'c']
+
+
+def test_compute_load_order_orders_records_and_reports_missing():
+    catalog = [
+        {'name': 'Base', 'Mod ID': ['base'], 'require': {}},
+        {'name': 'Addon', 'Mod ID': ['addon'], 'require': {'addon': ['base', 'absent']}},
+    ]
+    result = compute_load_order([catalog[1], catalog[0]], catalog)
+    assert [mod['name'] for mod in result['mods']] == ['Base', 'Addon']
+    assert result['mod_ids'] == ['base', 'addon']
+    assert result['missing'] == {'addon': ['absent']}
+    assert result['cycles'] == []
+
+
+def test_one_cycle_per_component_with_many_back_edges():
+    # Каждый узел цепочки требует m0: 10k обратных ребер в одной компоненте
+    count = 10000
+    nodes = [f"m{index}" for index in range(count)]
+    edges = {f"m{index}": [f"m{index + 1}", 'm0'] for index in range(count - 1)}
+    edges[f"m{count - 1}"] = ['m0']
+    order, cycles = topological_sort(nodes, edges)
+    assert sorted(order) == sorted(nodes)
+    assert len(cycles) == 1
+    cycle = cycles[0]
+    assert cycle[0] == cycle[-1] == 'm0'
+    for node, required in zip(cycle, cycle[1:]):
+        assert required in edges[node]
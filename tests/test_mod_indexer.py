@@ -0,0 +1,50 @@
+# tests/test_mod_indexer.py
+import os
+import shutil
+
+from mod_indexer import scan_workshop_content
+
+
+def write_mod(content_dir, workshop_id, folder, text):
+    mod_dir = content_dir / workshop_id / 'mods' / folder
+    mod_dir.mkdir(parents=True, exist_ok=True)
+    (mod_dir / 'mod.info').write_text(text, encoding='utf-8')
+    return mod_dir / 'mod.info'
+
+
+def by_workshop_id(entries):
+    return {entry['Workshop ID'][0]: entry for entry in entries}
+
+
+def test_cache_hit_miss_and_invalidation(tmp_path):
+    content_dir = tmp_path / 'content'
+    cache_path = str(tmp_path / 'modindex_cache.json')
+    write_mod(content_dir, '111', 'Loot', 'name=Better Loot\nid=BetterLoot\n')
+    info = write_mod(content_dir, '222', 'Cars', 'name=Cars\nid=Cars\nrequire=BetterLoot\n')
+
+    entries, stats = scan_workshop_content(str(content_dir), cache_path)
+    assert (stats['parsed'], stats['cached']) == (2, 0)
+    assert by_workshop_id(entries)['222']['require'] == {'Cars': ['BetterLoot']}
+
+    # Без изменений все берется из кеша
+    cached_entries, stats = scan_workshop_content(str(content_dir), cache_path)
+    assert (stats['parsed'], stats['cached']) == (0, 2)
+    assert by_workshop_id(cached_entries) == by_workshop_id(entries)
+
+    # Измененный mod.info разбирается заново
+    info.write_text('name=Cars\nid=Cars\nrequire=BetterLoot,Engines\n', encoding='utf-8')
+    mtime = os.stat(info).st_mtime_ns + 10 ** 9
+    os.utime(info, ns=(mtime, mtime))
+    entries, stats = scan_workshop_content(str(content_dir), cache_path)
+    assert (stats['parsed'], stats['cached']) == (1, 1)
+    assert by_workshop_id(entries)['222']['require'] == {'Cars': ['BetterLoot', 'Engines']}
+
+    # Новый мод в папке предмета меняет сигнатуру, удаленный предмет пропадает из кеша
+    write_mod(content_dir, '111', 'LootExtra', 'name=Loot Extra\nid=LootExtra\n')
+    mods_dir = content_dir / '111' / 'mods'
+    mtime = os.stat(mods_dir).st_mtime_ns + 10 ** 9
+    os.utime(mods_dir, ns=(mtime, mtime))
+    shutil.rmtree(content_dir / '222')
+    entries, stats = scan_workshop_content(str(content_dir), cache_path)
+    assert (stats['total'], stats['parsed'], stats['cached'], stats['removed']) == (1, 1, 0, 1)
+    assert by_workshop_id(entries)['111']['Mod ID'] == ['BetterLoot', 'LootExtra']
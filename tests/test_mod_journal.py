@@ -0,0 +1,51 @@
+# tests/test_mod_journal.py
+import os
+import json
+
+from mod_journal import ModStore
+
+
+def open_store(tmp_path):
+    legacy = {'catalog': str(tmp_path / 'modsdb.json'), 'active': str(tmp_path / 'activemods.json')}
+    return ModStore(str(tmp_path / 'modstore'), legacy)
+
+
+def test_records_after_torn_tail_survive_reload(tmp_path):
+    store = open_store(tmp_path)
+    with store.transaction("add A") as tx:
+        tx.append('catalog', {'name': 'A'})
+    store.sync()
+    store._journal.close()
+    # После перезапуска открыт свежий journal-2; сбой посреди первой же записи в него
+    store = open_store(tmp_path)
+    segment = store._journal.name
+    store._journal.write('{"seq": 2, "label": "add B", "op')
+    store._journal.flush()
+    store._journal.close()
+
+    store = open_store(tmp_path)
+    assert [mod['name'] for mod in store.catalog] == ['A']
+    # Новые записи идут в тот же сегмент, обрезанный до последней целой записи
+    assert store._journal.name == segment
+    assert os.path.getsize(segment) == 0
+    with store.transaction("add C") as tx:
+        tx.append('catalog', {'name': 'C'})
+    store.sync()
+    store._journal.close()
+
+    store = open_store(tmp_path)
+    assert [mod['name'] for mod in store.catalog] == ['A', 'C']
+    store.close()
+
+
+def test_legacy_files_follow_flushes(tmp_path):
+    store = open_store(tmp_path)
+    with store.transaction("add A") as tx:
+        tx.append('active', {'name': 'A'})
+    store.export_legacy(background=False)
+    with open(tmp_path / 'activemods.json', encoding='utf-8') as file:
+        assert [mod['name'] for mod in json.load(file)] == ['A']
+    mtime = os.stat(tmp_path / 'activemods.json').st_mtime_ns
+    store.export_legacy(background=False)  # без изменений файл не переписывается
+    assert os.stat(tmp_path / 'activemods.json').st_mtime_ns == mtime
+    store.close()
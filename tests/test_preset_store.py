@@ -0,0 +1,34 @@
+# tests/test_preset_store.py
+import os
+import json
+
+from preset_store import write_preset, read_preset, RECORDS_DIR
+
+
+def make_mod(name, workshop_id, disabled=()):
+    return {'name': name, 'Workshop ID': [workshop_id], 'Mod ID': [name], 'Map Folder': [],
+            'disabled_mod_ids': list(disabled), 'disabled_map_folders': []}
+
+
+def test_legacy_preset_is_not_rewritten_on_read(tmp_path):
+    path = tmp_path / 'old.json'
+    legacy = [make_mod('A', '1', disabled=['A'])]
+    path.write_text(json.dumps(legacy))
+    before = path.read_text()
+    mods, missing = read_preset(str(path), [])
+    assert mods[0]['disabled_mod_ids'] == ['A']
+    assert [mod['name'] for mod in missing] == ['A']
+    assert path.read_text() == before
+    assert not (tmp_path / RECORDS_DIR).exists()
+
+
+def test_unreferenced_records_are_collected(tmp_path):
+    records_dir = tmp_path / RECORDS_DIR
+    write_preset(str(tmp_path / 'a.json'), [make_mod('A', '1'), make_mod('B', '2')])
+    write_preset(str(tmp_path / 'b.json'), [make_mod('B', '2')])
+    assert len(os.listdir(records_dir)) == 2
+    # Пресет a перезаписан без мода A: его запись больше никому не нужна
+    write_preset(str(tmp_path / 'a.json'), [make_mod('B', '2')])
+    assert len(os.listdir(records_dir)) == 1
+    mods, missing = read_preset(str(tmp_path / 'b.json'), [])
+    assert [mod['name'] for mod in mods] == ['B']
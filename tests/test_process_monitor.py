@@ -0,0 +1,48 @@
+# tests/test_process_monitor.py
+import csv
+
+from process_monitor import FIELDS, MetricsHistory, sparkline
+
+
+def sample(index):
+    return {field: float(index) for field in FIELDS}
+
+
+def test_ring_buffer_downsamples_evicted_samples():
+    history = MetricsHistory(raw_size=5, coarse_size=3, downsample=2)
+    for index in range(5):
+        history.append(sample(index))
+    assert not history.coarse
+    assert history.values('cpu_percent') == [0, 1, 2, 3, 4]
+
+    for index in range(5, 10):
+        history.append(sample(index))
+    # Вытеснены 0..4: пары (0, 1) и (2, 3) усреднены, 4 ждет пары
+    assert [point['time'] for point in history.coarse] == [0.5, 2.5]
+    assert history.values('time') == [5, 6, 7, 8, 9]
+    assert history.values('time', count=2) == [8, 9]
+
+    for index in range(10, 20):
+        history.append(sample(index))
+    # Грубая история тоже ограничена: остаются три последних усреднения
+    assert [point['time'] for point in history.coarse] == [8.5, 10.5, 12.5]
+    assert [point['time'] for point in history.samples()] == [8.5, 10.5, 12.5, 15, 16, 17, 18, 19]
+
+
+def test_export_csv(tmp_path):
+    history = MetricsHistory(raw_size=2, coarse_size=4, downsample=2)
+    for index in range(4):
+        history.append(sample(index))
+    path = tmp_path / 'metrics.csv'
+    history.export_csv(str(path))
+    with open(path, newline='', encoding='utf-8') as file:
+        rows = list(csv.DictReader(file))
+    assert list(rows[0]) == FIELDS
+    assert [float(row['rss']) for row in rows] == [0.5, 2, 3]
+
+
+def test_sparkline():
+    assert sparkline([]) == ''
+    assert sparkline([0, 7, 14]) == '▁▄█'
+    assert sparkline([5, 5]) == '▁▁'
+    assert len(sparkline(list(range(100)), width=10)) == 10
@@ -0,0 +1,87 @@
+# tests/test_rcon_client.py
+import asyncio
+
+import pytest
+
+from rcon_client import RconPool, RconAuthError, RconError
+from rcon_stub import PASSWORD, start_stub_server
+
+COMMANDS = [f'servermsg "Restart in {index} minutes"' for index in range(5)]
+EXPECTED = [f"ok: {command}" for command in COMMANDS]
+
+
+async def with_stubs(count, check, latency=0.001):
+    stubs = [await start_stub_server(latency) for _ in range(count)]
+    servers = [{'host': '127.0.0.1', 'port': port, 'password': PASSWORD} for _, port in stubs]
+    pool = RconPool(base_delay=0.01)
+    try:
+        await check(pool, servers, stubs)
+    finally:
+        await pool.close_all()
+        for server, _ in stubs:
+            server.close()
+            await server.wait_closed()
+
+
+def test_broadcast_matches_responses_to_commands():
+    async def check(pool, servers, stubs):
+        for _ in range(2):  # холодный пул и повторно по тем же соединениям
+            results = await pool.broadcast(servers, COMMANDS)
+            assert all(result == EXPECTED for result in results.values()), results
+        assert len(pool.connections) == 3
+
+    asyncio.run(with_stubs(3, check))
+
+
+def test_wrong_password_is_not_retried():
+    async def check(pool, servers, stubs):
+        with pytest.raises(RconAuthError):
+            await pool.execute(dict(servers[0], password='wrong'), COMMANDS)
+
+    asyncio.run(with_stubs(1, check))
+
+
+def test_pool_reconnects_after_server_drops_connection():
+    async def check(pool, servers, stubs):
+        await pool.broadcast(servers, COMMANDS)
+        # Обрыв со стороны сервера (перезапуск): пул переподключается и отправляет пачку заново
+        for server, _ in stubs:
+            for client in server.clients:
+                client.transport.abort()
+        await asyncio.sleep(0.05)  # клиент замечает обрыв до следующей рассылки
+        results = await pool.broadcast(servers, COMMANDS)
+        assert all(result == EXPECTED for result in results.values()), results
+
+    asyncio.run(with_stubs(2, check))
+
+
+def test_write_error_on_pooled_connection_resends_batch():
+    async def check(pool, servers, stubs):
+        server = servers[0]
+        await pool.execute(server, COMMANDS)
+        stale = pool.connections[f"{server['host']}:{server['port']}"]
+
+        def reset(data):
+            raise ConnectionResetError("connection reset by peer")
+
+        # Чтение еще не заметило сброс: соединение считается открытым, падает запись
+        stale.writer.write = reset
+        assert stale.connected
+        assert await pool.execute(server, COMMANDS) == EXPECTED
+        assert pool.connections[f"{server['host']}:{server['port']}"] is not stale
+
+    asyncio.run(with_stubs(1, check))
+
+
+def test_read_timeout_after_write_is_not_resent():
+    async def check(pool, servers, stubs):
+        server = servers[0]
+        await pool.execute(server, COMMANDS[:1])
+        # Команды записаны, но ответы не успевают: повтор выполнил бы servermsg второй раз
+        pool.connections[f"{server['host']}:{server['port']}"].timeout = 0.05
+        with pytest.raises(RconError):
+            await pool.execute(server, COMMANDS)
+        assert len(stubs[0][0].clients) == 1
+        assert not pool.connections
+
+    asyncio.run(with_stubs(1, check, latency=0.3))
@@ -0,0 +1,39 @@
+# tests/test_server_ini.py
+import os
+import stat
+
+from server_ini import VANILLA_MAP, compile_mod_settings, patch_ini_text, write_server_configs
+
+
+def test_fully_disabled_mod_is_left_out_of_workshop_items():
+    active = [
+        {'name': 'On', 'Workshop ID': ['111'], 'Mod ID': ['on'], 'Map Folder': []},
+        {'name': 'Off', 'Workshop ID': ['222'], 'Mod ID': ['off1', 'off2'], 'Map Folder': ['OffMap'],
+         'disabled_mod_ids': ['off1', 'off2']},
+        {'name': 'Half', 'Workshop ID': ['333'], 'Mod ID': ['half1', 'half2'], 'Map Folder': [],
+         'disabled_mod_ids': ['half1']},
+    ]
+    settings = compile_mod_settings(active, active)
+    assert settings['WorkshopItems'] == '111;333'
+    assert settings['Mods'] == 'on;half2'
+    assert settings['Map'] == VANILLA_MAP
+
+
+def test_patch_keeps_other_keys_and_newlines():
+    text = 'PVP=true\r\nMods=old\r\n'
+    assert patch_ini_text(text, {'Mods': 'a;b', 'Map': VANILLA_MAP}) == \
+        f'PVP=true\r\nMods=a;b\r\nMap={VANILLA_MAP}\r\n'
+
+
+def test_write_keeps_file_mode_and_reports_bad_encoding(tmp_path):
+    good = tmp_path / 'good.ini'
+    good.write_text('Mods=old\n')
+    os.chmod(good, 0o640)
+    bad = tmp_path / 'bad.ini'
+    bad.write_bytes('Public=true\nPublicName=Сервер\n'.encode('cp1251'))
+
+    results = write_server_configs([str(good), str(bad)], {'Mods': 'a'})
+    assert results[str(good)] == 'written'
+    assert results[str(bad)].startswith('error:')
+    assert stat.S_IMODE(os.stat(good).st_mode) == 0o640
+    assert good.read_text() == 'Mods=a\n'
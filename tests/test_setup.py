@@ -0,0 +1,117 @@
+# tests/test_setup.py
+import pytest
+
+# setup.py повышает права через elevate при установке сервера
+pytest.importorskip('elevate')
+import setup  # noqa: E402
+from setup import choose_update_mode, parse_available_build_id, read_app_manifest  # noqa: E402
+
+MANIFEST = '''"AppState"
+{
+\t"appid"\t\t"380870"
+\t"Universe"\t\t"1"
+\t"name"\t\t"Project Zomboid Dedicated Server"
+\t"StateFlags"\t\t"%d"
+\t"installdir"\t\t"Project Zomboid Dedicated Server"
+\t"buildid"\t\t"14566730"
+\t"InstalledDepots"
+\t{
+\t\t"380873"
+\t\t{
+\t\t\t"manifest"\t\t"5330145282931339120"
+\t\t}
+\t}
+}
+'''
+
+APP_INFO = '''AppID : 380870, change number : 23661405/0, last change : Thu Apr 18 09:12:42 2024
+"380870"
+{
+\t"common"
+\t{
+\t\t"name"\t\t"Project Zomboid Dedicated Server"
+\t}
+\t"depots"
+\t{
+\t\t"branches"
+\t\t{
+\t\t\t"public"
+\t\t\t{
+\t\t\t\t"buildid"\t\t"14566731"
+\t\t\t\t"timeupdated"\t\t"1702051432"
+\t\t\t}
+\t\t\t"unstable"
+\t\t\t{
+\t\t\t\t"buildid"\t\t"15000000"
+\t\t\t\t"description"\t\t"Build 42"
+\t\t\t}
+\t\t}
+\t}
+}
+'''
+
+
+def write_manifest(install_dir, flags):
+    steamapps = install_dir / 'steamapps'
+    steamapps.mkdir(exist_ok=True)
+    (steamapps / 'appmanifest_380870.acf').write_text(MANIFEST % flags, encoding='utf-8')
+
+
+def test_read_app_manifest(tmp_path):
+    assert read_app_manifest(str(tmp_path)) is None
+    write_manifest(tmp_path, 4)
+    assert read_app_manifest(str(tmp_path)) == {'buildid': '14566730', 'stateflags': 4}
+
+
+def test_parse_available_build_id():
+    assert parse_available_build_id(APP_INFO) == '14566731'
+    assert parse_available_build_id(APP_INFO, branch='unstable') == '15000000'
+    assert parse_available_build_id('No app info for AppID 380870 found') is None
+
+
+def test_choose_update_mode():
+    current = {'buildid': '14566731', 'stateflags': 4}
+    assert choose_update_mode(current, '14566731') == 'noop'
+    assert choose_update_mode(current, '14566731', force_validate=True) == 'validate'
+    assert choose_update_mode(None, '14566731') == 'validate'
+    assert choose_update_mode({'buildid': '14566730', 'stateflags': 4}, '14566731') == 'update'
+    # Сборку узнать не удалось: обычное обновление, SteamCMD сам ответит "already up to date"
+    assert choose_update_mode(current, None) == 'update'
+    assert choose_update_mode({'buildid': '14566731', 'stateflags': 6}, '14566731') == 'update'
+    # Прерванное обновление (1026 = UpdateRequired | UpdateStarted) проверяется целиком
+    assert choose_update_mode({'buildid': '14566731', 'stateflags': 1026}, '14566731') == 'validate'
+
+
+class FakeSession:
+    def __init__(self, outputs):
+        self.outputs = outputs
+        self.commands = []
+
+    def run(self, command, timeout=None, output_func=None):
+        self.commands.append(command)
+        return next((output for prefix, output in self.outputs if command.startswith(prefix)), '')
+
+
+@pytest.mark.parametrize('update_output, expected', [
+    ("Success! App '380870' already up to date.", True),
+    ("Update state (0x61) downloading, progress: 100.00\nSuccess! App '380870' fully installed.", True),
+    ("Error! App '380870' state is 0x202 after update job.", False),
+])
+def test_app_update_result(tmp_path, monkeypatch, update_output, expected):
+    write_manifest(tmp_path, 4)
+    # app_info_print без ветки public: сборка неизвестна, идет обычный app_update
+    session = FakeSession([('app_info_print', 'AppID : 380870'), ('app_update', update_output)])
+    monkeypatch.setattr(setup.session_pool, 'get', lambda executable, install_dir: session)
+    lines = []
+    assert setup.app_update_in_session(lines.append, str(tmp_path), str(tmp_path)) is expected
+    assert session.commands[-1] == 'app_update 380870'
+
+
+def test_current_build_skips_app_update(tmp_path, monkeypatch):
+    write_manifest(tmp_path, 4)
+    (tmp_path / 'steamapps' / 'appmanifest_380870.acf').write_text(
+        (MANIFEST % 4).replace('14566730', '14566731'), encoding='utf-8')
+    session = FakeSession([('app_info_print', APP_INFO)])
+    monkeypatch.setattr(setup.session_pool, 'get', lambda executable, install_dir: session)
+    assert setup.app_update_in_session(lambda line: None, str(tmp_path), str(tmp_path)) is True
+    assert not any(command.startswith('app_update ') for command in session.commands)
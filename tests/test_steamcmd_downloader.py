@@ -0,0 +1,79 @@
+# tests/test_steamcmd_downloader.py
+import os
+import sys
+import json
+
+import pytest
+
+from steamcmd_downloader import build_download_command, download_workshop_items, parse_download_line
+
+FAKE_STEAMCMD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_steamcmd.py')
+
+
+@pytest.fixture
+def steamcmd(tmp_path, monkeypatch):
+    """Исполняемый файл, запускающий fake_steamcmd.py; возвращает (путь, функция чтения журнала запусков)."""
+    if os.name == 'nt':
+        path = tmp_path / 'steamcmd.bat'
+        path.write_text(f'@echo off\r\n"{sys.executable}" "{FAKE_STEAMCMD}" %*\r\n')
+    else:
+        path = tmp_path / 'steamcmd.sh'
+        path.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_STEAMCMD}" "$@"\n')
+        path.chmod(0o755)
+    log_path = tmp_path / 'runs.jsonl'
+    monkeypatch.setenv('FAKE_STEAMCMD_LOG', str(log_path))
+
+    def runs():
+        if not log_path.exists():
+            return []
+        return [json.loads(line) for line in log_path.read_text().splitlines()]
+
+    return str(path), runs
+
+
+def downloaded_ids(arguments):
+    return [arguments[index + 2] for index, argument in enumerate(arguments) if argument == '+workshop_download_item']
+
+
+def test_parse_download_line():
+    assert parse_download_line('Success. Downloaded item 123 to "x" (5 bytes)')[:2] == ('123', True)
+    assert parse_download_line('ERROR! Download item 456 failed (Timeout).') == ('456', False, 'Timeout')
+    assert parse_download_line('Loading Steam API...OK') is None
+
+
+def test_build_download_command():
+    command = build_download_command('steamcmd', '/srv', ['1', '2'])
+    assert command == ['steamcmd', '+force_install_dir', '/srv', '+login', 'anonymous',
+                       '+workshop_download_item', '108600', '1', '+workshop_download_item', '108600', '2', '+quit']
+
+
+def test_items_are_split_into_batches_one_session_each(steamcmd, tmp_path):
+    exe, runs = steamcmd
+    ids = [str(1000 + index) for index in range(7)] + ['1000']  # дубликат скачивается один раз
+    results = download_workshop_items(exe, str(tmp_path), ids, batch_size=3, max_sessions=2)
+
+    assert sorted(results) == sorted(set(ids))
+    assert all(ok for ok, _ in results.values())
+    sessions = sorted(downloaded_ids(arguments) for arguments in runs())
+    assert sessions == [['1000', '1001', '1002'], ['1003', '1004', '1005'], ['1006']]
+    assert all(arguments[-1] == '+quit' for arguments in runs())
+
+
+def test_partial_failures_are_reported_per_item(steamcmd, tmp_path, monkeypatch):
+    exe, _ = steamcmd
+    monkeypatch.setenv('FAKE_STEAMCMD_FAIL', '2002')
+    monkeypatch.setenv('FAKE_STEAMCMD_SILENT', '2003')
+    lines = []
+    results = download_workshop_items(exe, str(tmp_path), ['2001', '2002', '2003', '2004'], lines.append,
+                                      batch_size=2)
+
+    assert results['2001'][0] and results['2004'][0]
+    assert results['2002'] == (False, 'Failure')
+    assert results['2003'][0] is False and results['2003'][1].startswith('no result')
+    assert 'Workshop item 2002: failed (Failure)' in lines
+
+
+def test_empty_list_starts_no_session(steamcmd, tmp_path):
+    exe, runs = steamcmd
+    assert download_workshop_items(exe, str(tmp_path), []) == {}
+    assert runs() == []
@@ -0,0 +1,63 @@
+# tests/test_steamcmd_session.py
+import os
+import sys
+import json
+
+import pytest
+
+import steamcmd_session
+from steamcmd_downloader import download_items_in_session
+from steamcmd_session import SteamCMDSession
+
+FAKE_STEAMCMD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_steamcmd.py')
+
+
+@pytest.fixture
+def steamcmd(tmp_path, monkeypatch):
+    if os.name == 'nt':
+        path = tmp_path / 'steamcmd.bat'
+        path.write_text(f'@echo off\r\n"{sys.executable}" "{FAKE_STEAMCMD}" %*\r\n')
+    else:
+        path = tmp_path / 'steamcmd.sh'
+        path.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_STEAMCMD}" "$@"\n')
+        path.chmod(0o755)
+    log_path = tmp_path / 'runs.jsonl'
+    monkeypatch.setenv('FAKE_STEAMCMD_LOG', str(log_path))
+    return str(path), lambda: [json.loads(line) for line in log_path.read_text().splitlines()]
+
+
+@pytest.fixture
+def session(steamcmd, tmp_path):
+    session = SteamCMDSession(steamcmd[0], str(tmp_path))
+    yield session
+    session.close()
+
+
+def test_batches_run_in_one_process(session, steamcmd, monkeypatch):
+    monkeypatch.setenv('FAKE_STEAMCMD_FAIL', '12')
+    lines = []
+    results = download_items_in_session(session, [str(index) for index in range(10, 15)], lines.append,
+                                        batch_size=2)
+
+    assert results['12'] == (False, 'Failure')
+    assert all(results[workshop_id][0] for workshop_id in ('10', '11', '13', '14'))
+    assert len(lines) == 5
+    assert len(steamcmd[1]()) == 1  # SteamCMD запущен один раз на все пачки
+
+
+def test_outputs_are_framed_per_command(session):
+    outputs = session.run_many(['workshop_download_item 108600 1', 'workshop_download_item 108600 2'])
+    assert 'item 1 ' in outputs[0] and 'item 2 ' not in outputs[0]
+    assert 'item 2 ' in outputs[1]
+
+
+def test_startup_timeout_closes_the_process(session, monkeypatch):
+    monkeypatch.setenv('FAKE_STEAMCMD_HANG_LOGIN', '1')
+    monkeypatch.setattr(steamcmd_session, 'STARTUP_TIMEOUT', 0.5)
+    with pytest.raises(TimeoutError):
+        session.run('workshop_download_item 108600 1')
+    assert not session.is_alive()
+
+    # Следующая команда запускает новый процесс, а не пишет в полузапущенный
+    monkeypatch.delenv('FAKE_STEAMCMD_HANG_LOGIN')
+    assert 'Downloaded item 1 ' in session.run('workshop_download_item 108600 1')
@@ -1,23 +1,58 @@
 import logging
-import json
 import os
 import sqlite3
+import time
+from datetime import datetime
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QMenuBar, QTabWidget, QWidget, QVBoxLayout, QLabel, QDialog,
     QRadioButton, QPushButton, QTextEdit, QComboBox, QHBoxLayout, QLineEdit, QTreeWidget, QTreeWidgetItem,
     QFileDialog, QSpacerItem, QSizePolicy, QTableWidget, QTableWidgetItem, QMessageBox, QFormLayout, QInputDialog,
-    QListWidget, QListWidgetItem, QStyle
+    QListWidget, QListWidgetItem, QStyle, QCheckBox
 )
-from PySide6.QtCore import QThread, Signal, QObject, QUrl, QProcess, QTimer, Qt
+from PySide6.QtCore import Signal, QObject, QUrl, QProcess, QProcessEnvironment, QTimer, Qt
 from PySide6.QtGui import QAction, QBrush, QColor
 import configparser
 from setup import install_steamcmd, install_pz_server
 from browser_engine import BrowserEngine
 from file_manager import ensure_config_exists, start_modpack_observer
 from page_analizer import SteamWorkshopIdentifier
-from workers import Worker, PZServerWorker
+from server_ini import DEFAULT_SERVER_NAME, get_server_ini_path, compile_mod_settings, write_server_configs, read_ini_values
+from rcon_client import DEFAULT_RCON_PORT, server_key
+from console_archive import ARCHIVE_DIR, ConsoleArchive
+from db_watcher import DatabaseWatcher
+from steamcmd_session import session_pool
+from content_store import get_content_store_dir, get_content_store_roots, get_content_store_reflink
+from backup_manager import SAVE_COMPLETE_MARKERS, get_world_save_dir, list_snapshots
+from workers import (
+    Worker, PZServerWorker, ModIndexWorker, ModConflictWorker, WorkshopDownloadWorker, ContentStoreWorker,
+    BackupWorker, RestoreWorker, ChunkPruneWorker, ModUpdateCheckWorker, LuaLogScanWorker, ArchiveSearchWorker,
+    RconBridge
+)
+from chunk_pruner import parse_regions, load_safehouse_regions
+from metrics_exporter import MetricsExporter, registry
+from launch_profile import GC_OPTIONS, get_profile, save_profile, write_jvm_config, build_java_command
+from console_events import LineSplitter, parse_player_event
+from lua_errors import LuaErrorAggregator
+from preset_store import write_preset, read_preset, diff_active_mods, is_empty_diff
+from mod_journal import ModStore
+from mod_search import TrigramIndex
+from job_manager import JobManager
+from command_scheduler import ACTIONS, CommandScheduler, describe_schedule
+from boot_profiler import (BootProfiler, get_console_log_candidates, profile_log_file, rank_mods, record_profile,
+                           latest_profile)
+from process_monitor import MetricsHistory, create_sampler, sparkline, is_available as metrics_available
+from mod_indexer import get_workshop_content_dir, merge_into_catalog
+from mod_dependencies import (
+    build_requires_map, build_providers_map, missing_requirements, enabled_mod_ids, compute_load_order
+)
 import getpass
 
+DIRECT_JAVA_OPTION = "Java (launch profile)"
+SERVER_START_OPTIONS = ["StartServer32", "StartServer64", "StartServer64_nosteam", DIRECT_JAVA_OPTION]
+# Периоды поиска по архиву консоли, секунды (None - за все время)
+ARCHIVE_PERIODS = {"Any time": None, "Last hour": 3600, "Last 24 hours": 86400,
+                   "Last 7 days": 7 * 86400, "Last 30 days": 30 * 86400}
+
 # Настройка логирования
 logging.basicConfig(level=logging.DEBUG, filename='app.log', filemode='w',
                     format='%(name)s - %(levelname)s - %(message)s')
@@ -34,6 +69,15 @@ class MainWindow(QMainWindow):
                                                                     fallback="C:/default/server/directory")
         self.zomboid_directory = self.get_zomboid_directory()  # Получаем путь к папке Zomboid
         self.setWindowTitle('Project Zomboid Mod Manager')
+
+        # Каталог и активные моды: в памяти + журнал изменений (modstore/), modsdb.json и activemods.json
+        # обновляются при сворачивании журнала
+        self.mod_store = ModStore()
+        self.mod_store_timer = QTimer(self)
+        self.mod_store_timer.setSingleShot(True)
+        self.mod_store_timer.timeout.connect(self.flush_mod_store)
+        self.mod_search_index = TrigramIndex()
+        self.mod_search_seq = None  # seq журнала, на котором индекс поиска был синхронизирован
         self.setGeometry(100, 100, 1440, 720)
 
         # История навигации
@@ -68,6 +112,44 @@ class MainWindow(QMainWindow):
         self.exit_action.triggered.connect(self.exit_app)
         self.file_menu.addAction(self.exit_action)
 
+        # Adding Edit menu: отмена/повтор действий Mod Manager
+        self.edit_menu = self.menu_bar.addMenu('Edit')
+        self.undo_action = QAction('Undo', self)
+        self.undo_action.setShortcut('Ctrl+Z')
+        self.undo_action.triggered.connect(self.undo_mod_change)
+        self.edit_menu.addAction(self.undo_action)
+        self.redo_action = QAction('Redo', self)
+        self.redo_action.setShortcut('Ctrl+Y')
+        self.redo_action.triggered.connect(self.redo_mod_change)
+        self.edit_menu.addAction(self.redo_action)
+
+        # Очередь фоновых задач: установки, загрузки и сканирования не перетирают потоки друг друга
+        self.jobs = JobManager(parent=self)
+        self.jobs.log.connect(self.append_to_console)
+        self.job_rows = {}  # job id -> строка таблицы Jobs
+
+        # Расписание команд сервера: одно колесо таймеров, тик раз в секунду
+        self.scheduler = CommandScheduler(server=self.config.get('Server', 'name', fallback=DEFAULT_SERVER_NAME))
+        self.scheduler_timer = QTimer(self)
+        self.scheduler_timer.timeout.connect(self.run_scheduler)
+        self.scheduler_timer.start(1000)
+        self.restart_after_exit = False  # Запустить сервер снова после quit (плановый перезапуск)
+        self.quit_after_start = False  # Тестовый запуск: quit через 10 секунд после SERVER STARTED
+        self.update_check_job = None  # Задача restart_if_mods_updated, ждущая результата проверки
+
+        # RCON для серверов, запущенных не менеджером (вкладка LocalNet)
+        self.rcon = RconBridge(self)
+        self.rcon.result.connect(self.on_rcon_result)
+        self.rcon.error.connect(self.on_rcon_error)
+        self.rcon_status = {}  # host:port -> последний результат
+
+        # Архив консоли с полнотекстовым поиском: в потоке вывода только постановка в очередь
+        self.console_archive = ConsoleArchive(
+            self.config.get('ConsoleArchive', 'path', fallback=ARCHIVE_DIR),
+            max_segment_bytes=self.config.getint('ConsoleArchive', 'max_segment_mb', fallback=16) * 1024 * 1024,
+            max_segment_seconds=self.config.getint('ConsoleArchive', 'max_segment_hours', fallback=24) * 3600)
+        self.console_server_name = self.config.get('Server', 'name', fallback=DEFAULT_SERVER_NAME)
+
         # Creating tabs
         self.tabs = QTabWidget()
         self.setCentralWidget(self.tabs)
@@ -76,13 +158,41 @@ class MainWindow(QMainWindow):
         self.add_tab("Server", self.create_server_tab)
         self.add_tab("Mod Manager", self.create_mod_manager_tab)
         self.add_tab("Steam Workshop", self.create_steam_workshop_tab)
-        self.add_tab("LocalNet")
+        self.add_tab("LocalNet", self.create_localnet_tab)
         self.add_tab("Players Database", self.create_players_database_tab)
 
         # Подключение сигнала для очистки списка при смене вкладки
         self.tabs.currentChanged.connect(self.on_tab_changed)
 
         self.process = None  # Переменная для процесса сервера
+        self.backup_pending = False  # Бэкап ждет завершения команды save
+        # Один таймер на ожидание save: новый бэкап перезапускает его, старый не может отменить новый
+        self.backup_save_timer = QTimer(self)
+        self.backup_save_timer.setSingleShot(True)
+        self.backup_save_timer.timeout.connect(self.backup_save_timeout)
+        self.console_lines = LineSplitter()
+        self.online_players = set()
+        self.server_start_count = 0
+        self.boot_profiler = None
+        self.last_boot_profile = (None, None)  # (профиль, предыдущий профиль)
+        self.lua_errors = LuaErrorAggregator()
+        self.lua_log_offsets = {}  # путь DebugLog -> сколько байт уже разобрано
+        self.lua_errors_shown_version = -1
+        self.lua_errors_summary = []
+        self.lua_errors_timer = QTimer(self)
+        self.lua_errors_timer.timeout.connect(self.refresh_lua_errors)
+        self.lua_errors_timer.start(1000)
+
+        # Необязательный endpoint /metrics для Prometheus (только localhost)
+        self.metrics_exporter = None
+        if self.config.getboolean('Metrics', 'enabled', fallback=False):
+            self.metrics_exporter = MetricsExporter(self.config.get('Metrics', 'host', fallback='127.0.0.1'),
+                                                    self.config.getint('Metrics', 'port', fallback=9108))
+            try:
+                self.metrics_exporter.start()
+            except OSError as e:
+                logger.error(f"Failed to start metrics exporter: {e}")
+                self.metrics_exporter = None
 
         # Запускаем наблюдатель за папкой с модпаками
         self.modpacks_dir = os.path.join(os.getcwd(), 'modpacks')
@@ -205,12 +315,21 @@ class MainWindow(QMainWindow):
         install_pz_server_button.clicked.connect(self.install_pz_server)
         button_layout.addWidget(install_pz_server_button)
 
+        self.force_validate_checkbox = QCheckBox("Force validate")
+        self.force_validate_checkbox.setToolTip("Re-hash all server files even if the installed build is current")
+        button_layout.addWidget(self.force_validate_checkbox)
+
+        dedupe_button = QPushButton("Deduplicate Server Files")
+        dedupe_button.setFixedWidth(200)
+        dedupe_button.clicked.connect(self.dedupe_server_files)
+        button_layout.addWidget(dedupe_button)
+
         test_start_pz_server_button = QPushButton("Test start Project Zomboid Dedicated Server")
         test_start_pz_server_button.setFixedWidth(200)
         button_layout.addWidget(test_start_pz_server_button)
 
         self.server_start_combobox = QComboBox()
-        self.server_start_combobox.addItems(["StartServer32", "StartServer64", "StartServer64_nosteam"])
+        self.server_start_combobox.addItems(SERVER_START_OPTIONS)
         self.server_start_combobox.setCurrentIndex(1)
         self.server_start_combobox.setFixedWidth(200)
         button_layout.addWidget(self.server_start_combobox)
@@ -233,6 +352,22 @@ class MainWindow(QMainWindow):
         self.console_input.returnPressed.connect(self.send_command_to_server)  # Обработка ввода команд
         console_layout.addWidget(self.console_input)
 
+        # Очередь фоновых задач
+        self.jobs_table = QTableWidget()
+        self.jobs_table.setColumnCount(6)
+        self.jobs_table.setHorizontalHeaderLabels(["ID", "Job", "State", "Attempts", "Progress", "Error"])
+        self.jobs_table.setMaximumHeight(160)
+        console_layout.addWidget(self.jobs_table)
+        jobs_buttons_layout = QHBoxLayout()
+        cancel_job_button = QPushButton("Cancel Job")
+        clear_jobs_button = QPushButton("Clear Finished")
+        cancel_job_button.clicked.connect(self.cancel_selected_job)
+        clear_jobs_button.clicked.connect(self.clear_finished_jobs)
+        jobs_buttons_layout.addWidget(cancel_job_button)
+        jobs_buttons_layout.addWidget(clear_jobs_button)
+        console_layout.addLayout(jobs_buttons_layout)
+        self.jobs.job_changed.connect(self.update_job_row)
+
         # Добавляем console_layout к правому краю top_layout
         top_layout.addLayout(console_layout, stretch=3)
 
@@ -250,18 +385,9 @@ class MainWindow(QMainWindow):
         logger.info(f"Installing SteamCMD to {user_directory}")
         self.save_path_to_config('Paths', 'SteamCMD', user_directory)
 
-        self.thread = QThread()
-        self.worker = Worker(program_directory, user_directory, self.config_path)
-        self.worker.moveToThread(self.thread)
-
-        self.thread.started.connect(self.worker.run)
-        self.worker.finished.connect(self.thread.quit)
-        self.worker.finished.connect(self.worker.deleteLater)
-        self.thread.finished.connect(self.thread.deleteLater)
-
-        self.worker.log.connect(self.append_to_console)
-
-        self.thread.start()
+        self.jobs.submit("Install SteamCMD",
+                         lambda token: Worker(program_directory, user_directory, self.config_path),
+                         resources=('steamcmd:' + user_directory, 'http'), priority=1, retries=1, backoff=10.0)
 
     def install_pz_server(self):
         user_directory = self.get_user_directory()
@@ -280,18 +406,53 @@ class MainWindow(QMainWindow):
 
         self.server_directory = user_directory  # Обновляем путь к серверу
 
-        self.thread = QThread()
-        self.pz_worker = PZServerWorker(steamcmd_path, user_directory, self.config_path)
-        self.pz_worker.moveToThread(self.thread)
-
-        self.thread.started.connect(self.pz_worker.run)
-        self.pz_worker.finished.connect(self.thread.quit)
-        self.pz_worker.finished.connect(self.pz_worker.deleteLater)
-        self.thread.finished.connect(self.thread.deleteLater)
+        force_validate = self.force_validate_checkbox.isChecked()
+        # Одна SteamCMD на папку: установка сервера встает в очередь за установкой SteamCMD туда же
+        self.jobs.submit("Install Project Zomboid server",
+                         lambda token: PZServerWorker(steamcmd_path, user_directory, self.config_path,
+                                                      force_validate, token),
+                         resources=('steamcmd:' + user_directory,), retries=1, backoff=10.0)
+
+    def dedupe_server_files(self):
+        """Дедуплицирует файлы установок сервера через общее хранилище [ContentStore]."""
+        store_dir = get_content_store_dir(self.config_path)
+        if not store_dir:
+            self.append_to_console("Content store not configured: set [ContentStore] path in config.ini.")
+            return
 
-        self.pz_worker.log.connect(self.append_to_console)
+        roots = [self.server_directory] + [root for root in get_content_store_roots(self.config_path)
+                                           if root != self.server_directory]
+
+        # Не дедуплицируем папки, в которые сейчас пишет SteamCMD
+        self.jobs.submit("Deduplicate server files",
+                         lambda token: ContentStoreWorker(roots, store_dir, cancel_token=token,
+                                                          use_reflink=get_content_store_reflink(self.config_path)),
+                         resources=('disk',) + tuple('steamcmd:' + root for root in roots), priority=-1)
+
+    def update_job_row(self, job):
+        """Обновляет строку задачи в таблице Jobs."""
+        row = self.job_rows.get(job.id)
+        if row is None:
+            row = self.jobs_table.rowCount()
+            self.jobs_table.insertRow(row)
+            self.job_rows[job.id] = row
+        progress = '' if job.progress is None else f"{job.progress}%"
+        values = [str(job.id), job.title, job.state, str(job.attempts), progress, job.error or '']
+        for column, value in enumerate(values):
+            self.jobs_table.setItem(row, column, QTableWidgetItem(value))
+
+    def cancel_selected_job(self):
+        row = self.jobs_table.currentRow()
+        if row < 0:
+            return
+        self.jobs.cancel(int(self.jobs_table.item(row, 0).text()))
 
-        self.thread.start()
+    def clear_finished_jobs(self):
+        self.jobs.clear_finished()
+        self.jobs_table.setRowCount(0)
+        self.job_rows = {}
+        for job in self.jobs.jobs.values():
+            self.update_job_row(job)
 
     def save_path_to_config(self, section, option, path):
         if not self.config.has_section(section):
@@ -325,18 +486,30 @@ class MainWindow(QMainWindow):
         start_server_button = QPushButton("Start Server")
         save_and_quit_button = QPushButton("Save and Quit")
         terminate_server_button = QPushButton("Terminate Server")
+        backup_world_button = QPushButton("Backup World")
+        restore_backup_button = QPushButton("Restore Backup")
+        prune_chunks_button = QPushButton("Prune Chunks")
+        boot_profile_button = QPushButton("Boot Profile")
 
         start_server_button.clicked.connect(self.start_server)
         save_and_quit_button.clicked.connect(self.save_and_quit)
         terminate_server_button.clicked.connect(self.terminate_server)
+        backup_world_button.clicked.connect(self.backup_world)
+        restore_backup_button.clicked.connect(self.restore_backup)
+        prune_chunks_button.clicked.connect(self.prune_world_chunks)
+        boot_profile_button.clicked.connect(self.profile_boot_log)
 
         self.server_start_combobox_server_tab = QComboBox()
-        self.server_start_combobox_server_tab.addItems(["StartServer32", "StartServer64", "StartServer64_nosteam"])
+        self.server_start_combobox_server_tab.addItems(SERVER_START_OPTIONS)
         self.server_start_combobox_server_tab.setCurrentIndex(1)
 
         left_layout.addWidget(start_server_button)
         left_layout.addWidget(save_and_quit_button)
         left_layout.addWidget(terminate_server_button)
+        left_layout.addWidget(backup_world_button)
+        left_layout.addWidget(restore_backup_button)
+        left_layout.addWidget(prune_chunks_button)
+        left_layout.addWidget(boot_profile_button)
         left_layout.addWidget(self.server_start_combobox_server_tab)
 
         player_list_label = QLabel("Player List")
@@ -344,6 +517,20 @@ class MainWindow(QMainWindow):
         left_layout.addWidget(player_list_label)
         left_layout.addWidget(self.player_list)
 
+        # Метрики процесса сервера
+        left_layout.addWidget(QLabel("Resources"))
+        self.resources_label = QLabel("Server not running" if metrics_available() else "Install psutil to enable")
+        self.resources_label.setStyleSheet("font-family: monospace;")
+        left_layout.addWidget(self.resources_label)
+        export_metrics_button = QPushButton("Export Metrics CSV")
+        export_metrics_button.clicked.connect(self.export_metrics)
+        left_layout.addWidget(export_metrics_button)
+
+        self.metrics_history = MetricsHistory()
+        self.resource_sampler = None
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.timeout.connect(self.sample_resources)
+
         server_layout.addLayout(left_layout)
 
         console_layout = QVBoxLayout()
@@ -360,13 +547,103 @@ class MainWindow(QMainWindow):
         server_tab.setLayout(server_layout)
         server_tabs.addTab(server_tab, "Server")
 
-        # Advanced Settings Tab
+        # Advanced Settings Tab - профиль запуска JVM
         advanced_settings_tab = QWidget()
         advanced_settings_layout = QVBoxLayout()
-        advanced_settings_layout.addWidget(QLabel("This is the Advanced Settings tab"))
+        advanced_settings_layout.addWidget(QLabel("JVM Launch Profile"))
+        self.create_launch_profile_form(advanced_settings_layout)
+        advanced_settings_layout.addStretch(1)
         advanced_settings_tab.setLayout(advanced_settings_layout)
         server_tabs.addTab(advanced_settings_tab, "Advanced Settings")
 
+        # Lua Errors Tab - одна строка на уникальную ошибку
+        lua_errors_tab = QWidget()
+        lua_errors_layout = QVBoxLayout()
+        self.lua_errors_label = QLabel("No Lua errors")
+        lua_errors_layout.addWidget(self.lua_errors_label)
+        self.lua_errors_table = QTableWidget()
+        self.lua_errors_table.setColumnCount(5)
+        self.lua_errors_table.setHorizontalHeaderLabels(["Count", "Mod", "Error", "First Seen", "Last Seen"])
+        self.lua_errors_table.itemSelectionChanged.connect(self.show_lua_error_details)
+        lua_errors_layout.addWidget(self.lua_errors_table, stretch=1)
+        self.lua_error_details = QTextEdit()
+        self.lua_error_details.setReadOnly(True)
+        lua_errors_layout.addWidget(self.lua_error_details)
+        lua_errors_buttons_layout = QHBoxLayout()
+        scan_debug_log_button = QPushButton("Scan DebugLog")
+        clear_lua_errors_button = QPushButton("Clear")
+        scan_debug_log_button.clicked.connect(self.scan_debug_logs)
+        clear_lua_errors_button.clicked.connect(self.clear_lua_errors)
+        lua_errors_buttons_layout.addWidget(scan_debug_log_button)
+        lua_errors_buttons_layout.addWidget(clear_lua_errors_button)
+        lua_errors_layout.addLayout(lua_errors_buttons_layout)
+        lua_errors_tab.setLayout(lua_errors_layout)
+        server_tabs.addTab(lua_errors_tab, "Lua Errors")
+
+        # Console Archive Tab - поиск по всем сохраненным логам консоли
+        archive_tab = QWidget()
+        archive_layout = QVBoxLayout()
+        archive_search_layout = QHBoxLayout()
+        self.archive_query_edit = QLineEdit()
+        self.archive_query_edit.setPlaceholderText("Words to find (all must match)")
+        self.archive_query_edit.returnPressed.connect(self.search_console_archive)
+        self.archive_period_combobox = QComboBox()
+        self.archive_period_combobox.addItems(list(ARCHIVE_PERIODS))
+        self.archive_day_edit = QLineEdit()
+        self.archive_day_edit.setPlaceholderText("YYYY-MM-DD")
+        self.archive_day_edit.setFixedWidth(100)
+        self.archive_server_combobox = QComboBox()
+        archive_search_button = QPushButton("Search")
+        archive_search_button.clicked.connect(self.search_console_archive)
+        archive_search_layout.addWidget(self.archive_query_edit, stretch=1)
+        archive_search_layout.addWidget(self.archive_period_combobox)
+        archive_search_layout.addWidget(self.archive_day_edit)
+        archive_search_layout.addWidget(self.archive_server_combobox)
+        archive_search_layout.addWidget(archive_search_button)
+        archive_layout.addLayout(archive_search_layout)
+        self.archive_status_label = QLabel("")
+        archive_layout.addWidget(self.archive_status_label)
+        self.archive_table = QTableWidget()
+        self.archive_table.setColumnCount(3)
+        self.archive_table.setHorizontalHeaderLabels(["Time", "Server", "Line"])
+        archive_layout.addWidget(self.archive_table, stretch=1)
+        archive_tab.setLayout(archive_layout)
+        server_tabs.addTab(archive_tab, "Console Archive")
+        self.refresh_archive_servers()
+
+        # Scheduler Tab - автосохранения, объявления и перезапуски по расписанию
+        scheduler_tab = QWidget()
+        scheduler_layout = QVBoxLayout()
+        self.schedule_table = QTableWidget()
+        self.schedule_table.setColumnCount(6)
+        self.schedule_table.setHorizontalHeaderLabels(["ID", "Action", "Schedule", "Argument", "Next Run", "Enabled"])
+        scheduler_layout.addWidget(self.schedule_table, stretch=1)
+        schedule_form_layout = QHBoxLayout()
+        self.schedule_action_combobox = QComboBox()
+        self.schedule_action_combobox.addItems(ACTIONS)
+        self.schedule_when_edit = QLineEdit()
+        self.schedule_when_edit.setPlaceholderText("every 30m or cron: 0 */6 * * *")
+        self.schedule_argument_edit = QLineEdit()
+        self.schedule_argument_edit.setPlaceholderText("command / message ({time} - countdown)")
+        schedule_form_layout.addWidget(self.schedule_action_combobox)
+        schedule_form_layout.addWidget(self.schedule_when_edit)
+        schedule_form_layout.addWidget(self.schedule_argument_edit, stretch=1)
+        scheduler_layout.addLayout(schedule_form_layout)
+        schedule_buttons_layout = QHBoxLayout()
+        add_schedule_button = QPushButton("Add")
+        toggle_schedule_button = QPushButton("Enable/Disable")
+        remove_schedule_button = QPushButton("Remove")
+        add_schedule_button.clicked.connect(self.add_schedule_job)
+        toggle_schedule_button.clicked.connect(self.toggle_schedule_job)
+        remove_schedule_button.clicked.connect(self.remove_schedule_job)
+        schedule_buttons_layout.addWidget(add_schedule_button)
+        schedule_buttons_layout.addWidget(toggle_schedule_button)
+        schedule_buttons_layout.addWidget(remove_schedule_button)
+        scheduler_layout.addLayout(schedule_buttons_layout)
+        scheduler_tab.setLayout(scheduler_layout)
+        server_tabs.addTab(scheduler_tab, "Scheduler")
+        self.refresh_schedule_table()
+
         # Config Settings Tab
         config_settings_tab = QWidget()
         config_settings_layout = QVBoxLayout()
@@ -376,6 +653,71 @@ class MainWindow(QMainWindow):
 
         layout.addWidget(server_tabs)
 
+    def create_launch_profile_form(self, layout):
+        form_layout = QFormLayout()
+        self.xms_edit = QLineEdit()
+        self.xmx_edit = QLineEdit()
+        self.gc_combobox = QComboBox()
+        self.gc_combobox.addItems(list(GC_OPTIONS))
+        self.gc_pause_edit = QLineEdit()
+        self.headless_checkbox = QCheckBox("-Djava.awt.headless=true")
+        self.extra_jvm_args_edit = QLineEdit()
+        self.server_args_edit = QLineEdit()
+        form_layout.addRow(QLabel("Initial heap (-Xms)"), self.xms_edit)
+        form_layout.addRow(QLabel("Max heap (-Xmx)"), self.xmx_edit)
+        form_layout.addRow(QLabel("Garbage collector"), self.gc_combobox)
+        form_layout.addRow(QLabel("Max GC pause, ms"), self.gc_pause_edit)
+        form_layout.addRow(QLabel("Headless"), self.headless_checkbox)
+        form_layout.addRow(QLabel("Extra JVM args"), self.extra_jvm_args_edit)
+        form_layout.addRow(QLabel("Server args"), self.server_args_edit)
+        layout.addLayout(form_layout)
+
+        profile_buttons_layout = QHBoxLayout()
+        save_profile_button = QPushButton("Save Profile")
+        write_jvm_config_button = QPushButton("Write ProjectZomboid64.json")
+        save_profile_button.clicked.connect(self.save_launch_profile)
+        write_jvm_config_button.clicked.connect(self.write_launch_profile_to_server)
+        profile_buttons_layout.addWidget(save_profile_button)
+        profile_buttons_layout.addWidget(write_jvm_config_button)
+        layout.addLayout(profile_buttons_layout)
+
+        self.fill_launch_profile_form(get_profile(self.server_directory))
+
+    def fill_launch_profile_form(self, profile):
+        self.xms_edit.setText(profile.get('xms', ''))
+        self.xmx_edit.setText(profile.get('xmx', ''))
+        self.gc_combobox.setCurrentText(profile.get('gc', 'Default'))
+        self.gc_pause_edit.setText(str(profile.get('max_gc_pause_ms', '')))
+        self.headless_checkbox.setChecked(profile.get('headless', True))
+        self.extra_jvm_args_edit.setText(' '.join(profile.get('extra_args', [])))
+        self.server_args_edit.setText(' '.join(profile.get('server_args', [])))
+
+    def read_launch_profile_form(self):
+        return {
+            'xms': self.xms_edit.text().strip(),
+            'xmx': self.xmx_edit.text().strip(),
+            'gc': self.gc_combobox.currentText(),
+            'max_gc_pause_ms': self.gc_pause_edit.text().strip(),
+            'headless': self.headless_checkbox.isChecked(),
+            'extra_args': self.extra_jvm_args_edit.text().split(),
+            'server_args': self.server_args_edit.text().split()
+        }
+
+    def save_launch_profile(self):
+        """Сохраняет профиль запуска для текущей установки сервера."""
+        save_profile(self.server_directory, self.read_launch_profile_form())
+        logger.info(f"Saved launch profile for {self.server_directory}")
+
+    def write_launch_profile_to_server(self):
+        """Записывает профиль в ProjectZomboid64.json, чтобы его использовали и .bat скрипты."""
+        self.save_launch_profile()
+        try:
+            write_jvm_config(self.server_directory, self.read_launch_profile_form())
+            self.console.append("JVM arguments written to ProjectZomboid64.json.")
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Error", f"Failed to update ProjectZomboid64.json: {str(e)}")
+            logger.error(f"Failed to update ProjectZomboid64.json: {str(e)}")
+
     def create_mod_manager_tab(self, layout):
         # Left spacer
         left_spacer = QVBoxLayout()
@@ -406,10 +748,15 @@ class MainWindow(QMainWindow):
         reset_to_default_button = QPushButton("Reset To Default")
         remove_mod_button = QPushButton("Remove Mod")
         remove_all_mods_button = QPushButton("Remove All Mods")
+        scan_local_mods_button = QPushButton("Scan Local Mods")
+        check_conflicts_button = QPushButton("Check Conflicts")
+        apply_to_server_button = QPushButton("Apply To Server")
+        download_mods_button = QPushButton("Download Mods")
 
         # Find the widest button and set a fixed width for all buttons
         buttons = [move_left_button, move_right_button, save_preset_button, load_preset_button,
-                   reset_to_default_button, remove_mod_button, remove_all_mods_button]
+                   reset_to_default_button, remove_mod_button, remove_all_mods_button, scan_local_mods_button,
+                   check_conflicts_button, apply_to_server_button, download_mods_button]
         max_button_width = max(button.sizeHint().width() for button in buttons)
         for button in buttons:
             button.setFixedWidth(max_button_width)
@@ -421,12 +768,20 @@ class MainWindow(QMainWindow):
         button_layout.addWidget(reset_to_default_button)
         button_layout.addWidget(remove_mod_button)
         button_layout.addWidget(remove_all_mods_button)
+        button_layout.addWidget(scan_local_mods_button)
+        button_layout.addWidget(check_conflicts_button)
+        button_layout.addWidget(apply_to_server_button)
+        button_layout.addWidget(download_mods_button)
 
         layout.addLayout(button_layout, stretch=1)
 
         # Right list and label for Inactive Mods
         right_layout = QVBoxLayout()
         right_layout.addWidget(QLabel("Inactive Mods"))
+        self.mod_search_edit = QLineEdit()
+        self.mod_search_edit.setPlaceholderText("Search name, Mod ID, Map Folder, Workshop ID...")
+        self.mod_search_edit.textChanged.connect(self.filter_mods)
+        right_layout.addWidget(self.mod_search_edit)
         self.inactive_mods_list = QListWidget()
         right_layout.addWidget(self.inactive_mods_list)
         layout.addLayout(right_layout, stretch=2)
@@ -438,6 +793,10 @@ class MainWindow(QMainWindow):
         reset_to_default_button.clicked.connect(self.reset_to_default)
         remove_mod_button.clicked.connect(self.remove_selected_mod)
         remove_all_mods_button.clicked.connect(self.remove_all_mods)
+        scan_local_mods_button.clicked.connect(self.scan_local_mods)
+        check_conflicts_button.clicked.connect(self.check_conflicts)
+        apply_to_server_button.clicked.connect(self.apply_mods_to_server)
+        download_mods_button.clicked.connect(self.download_active_mods)
 
         self.modpacks_list.itemDoubleClicked.connect(self.load_selected_modpack)  # Обработка двойного клика
 
@@ -454,58 +813,122 @@ class MainWindow(QMainWindow):
             self.load_preset_from_path(modpack_path)
 
     def load_preset_from_path(self, preset_file):
-        """Загружает пресет из указанного файла и обновляет списки модов."""
+        """Загружает пресет и применяет к активным модам только разницу (добавления, удаления, переключения)."""
+        mods_db = self.mod_store.catalog
+
         # Загрузка пресета из выбранного файла
         try:
-            with open(preset_file, 'r', encoding='utf-8') as file:
-                preset_mods = json.load(file)
+            preset_mods, missing_mods = read_preset(preset_file, mods_db)
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Failed to load preset: {str(e)}")
             logger.error(f"Failed to load preset: {str(e)}")
             return
 
-        # Загрузка базы данных модов
-        mods_db_path = 'modsdb.json'
-        if os.path.exists(mods_db_path):
-            with open(mods_db_path, 'r', encoding='utf-8') as mods_file:
-                try:
-                    mods_db = json.load(mods_file)
-                except json.JSONDecodeError:
-                    mods_db = []
-        else:
-            mods_db = []
+        diff = diff_active_mods(self.mod_store.active, preset_mods)
+        if is_empty_diff(diff) and not missing_mods:
+            QMessageBox.information(self, "Preset Loaded", "Preset is already active.")
+            return
 
-        existing_mods = {mod.get('name') for mod in mods_db}
+        with self.mod_store.transaction(f"load preset {os.path.basename(preset_file)}") as tx:
+            # В каталог добавляются только моды из пресета, которых в нем нет
+            for mod in missing_mods:
+                tx.append('catalog', mod)
+                logger.info(f"Added missing mod to catalog: {mod.get('name')}")
+            if diff['reordered']:
+                tx.replace('active', preset_mods)
+            else:
+                self.apply_active_diff(tx, diff, preset_mods)
+        self.schedule_mod_store_flush()
+        self.patch_active_mods(diff, preset_mods)
 
-        # Проверка наличия модов в modsdb.json и добавление недостающих
-        for mod in preset_mods:
-            mod_name = mod.get('name')
-            if mod_name not in existing_mods:
-                mods_db.append(mod)
-                logger.info(f"Added missing mod to modsdb.json: {mod_name}")
+        QMessageBox.information(self, "Preset Loaded", "Preset loaded successfully!")
+        logger.info(f"Preset loaded from {preset_file}: {len(diff['add'])} added, {len(diff['remove'])} removed, "
+                    f"{len(diff['toggle'])} toggled")
+
+    def apply_active_diff(self, tx, diff, preset_mods):
+        """Записывает в журнал только удаления, переключения и добавления активных модов."""
+        removed = set(diff['remove'])
+        for index in reversed(range(len(self.mod_store.active))):
+            if self.mod_store.active[index].get('name') in removed:
+                tx.delete('active', index)
+        toggled = {mod.get('name'): mod for mod in diff['toggle']}
+        for index, mod in enumerate(self.mod_store.active):
+            if mod.get('name') in toggled:
+                tx.update('active', index, toggled[mod.get('name')])
+        added = {mod.get('name') for mod in diff['add']}
+        for index, mod in enumerate(preset_mods):
+            if mod.get('name') in added:
+                tx.insert('active', index, mod)
+
+    def patch_active_mods(self, diff, active_mods_db):
+        """Обновляет списки Active/Inactive Mods на месте по разнице, без полной перестройки."""
+        if diff['reordered']:
+            self.load_active_mods()
+            self.load_inactive_mods()
+            return
 
-        # Сохранение обновленного списка модов в modsdb.json
-        with open(mods_db_path, 'w', encoding='utf-8') as mods_file:
-            json.dump(mods_db, mods_file, ensure_ascii=False, indent=4)
+        changed_names = set(diff['remove']) | {mod.get('name') for mod in diff['toggle']}
+        for i in reversed(range(self.active_mods_tree.topLevelItemCount())):
+            if self.active_mods_tree.topLevelItem(i).text(0) in changed_names:
+                self.active_mods_tree.takeTopLevelItem(i)
+
+        inserted_names = {mod.get('name') for mod in diff['add']} | changed_names
+        for index, mod in enumerate(active_mods_db):
+            if mod.get('name') in inserted_names:
+                self.active_mods_tree.insertTopLevelItem(index, self.create_active_mod_item(mod))
+
+        removed = set(diff['remove'])
+        existing_inactive = {self.inactive_mods_list.item(i).text() for i in range(self.inactive_mods_list.count())}
+        self.inactive_mods_list.addItems([name for name in diff['remove'] if name not in existing_inactive])
+        if removed:
+            logger.info(f"Returned {len(removed)} mods to Inactive Mods")
+        self.check_for_duplicates()
 
-        # Загрузка активных модов из пресета
-        active_mods_db_path = 'activemods.json'
-        with open(active_mods_db_path, 'w', encoding='utf-8') as active_mods_file:
-            json.dump(preset_mods, active_mods_file, ensure_ascii=False, indent=4)
+    def schedule_mod_store_flush(self):
+        """Изменения копятся и сбрасываются на диск одним fsync через полсекунды после последнего."""
+        self.mod_store_timer.start(500)
 
-        # Обновление UI списка активных модов
-        self.load_active_mods()
+    def flush_mod_store(self):
+        self.mod_store.sync()
+        if self.mod_store.needs_compaction():
+            self.mod_store.compact()
+        else:
+            self.mod_store.export_legacy()
 
-        # Проверка на дубликаты между списками Active и Inactive Mods
-        self.check_for_duplicates()
+    def undo_mod_change(self):
+        label = self.mod_store.undo()
+        if label is None:
+            return
+        self.schedule_mod_store_flush()
+        self.load_active_mods()
+        self.load_inactive_mods()
+        self.append_to_console(f"Undone: {label}")
+        logger.info(f"Undone mod change: {label}")
 
-        QMessageBox.information(self, "Preset Loaded", "Preset loaded successfully!")
-        logger.info(f"Preset loaded from {preset_file}")
+    def redo_mod_change(self):
+        label = self.mod_store.redo()
+        if label is None:
+            return
+        self.schedule_mod_store_flush()
+        self.load_active_mods()
+        self.load_inactive_mods()
+        self.append_to_console(f"Redone: {label}")
+        logger.info(f"Redone mod change: {label}")
 
     def closeEvent(self, event):
         """Останавливаем наблюдателя при закрытии приложения."""
         self.observer.stop()
         self.observer.join()
+        # Воркер, ждущий ответа SteamCMD, не видит отмену: через 5 с процессы SteamCMD убиваются
+        self.jobs.shutdown(unblock=session_pool.kill_all)
+        self.rcon.close()
+        self.console_archive.close()
+        if self.db_watcher:
+            self.db_watcher.close()
+        session_pool.close_all()  # Закрываем постоянные сессии SteamCMD
+        self.mod_store.close()
+        if self.metrics_exporter:
+            self.metrics_exporter.stop()
         event.accept()
 
     def load_modpacks(self):
@@ -522,100 +945,113 @@ class MainWindow(QMainWindow):
             logger.warning(f"Modpacks directory not found: {modpacks_dir}")
 
     def load_inactive_mods(self):
-        """Загружает моды из базы данных и добавляет их в список Inactive Mods, исключая те, что уже в Active Mods."""
-        mods_db_path = 'modsdb.json'
-        active_mods_db_path = 'activemods.json'
-
-        # Загружаем активные моды, чтобы исключить их из списка неактивных
-        active_mods_names = set()
-        if os.path.exists(active_mods_db_path):
-            with open(active_mods_db_path, 'r', encoding='utf-8') as active_file:
-                try:
-                    active_mods_db = json.load(active_file)
-                    active_mods_names = {mod.get('name') for mod in active_mods_db}
-                except json.JSONDecodeError:
-                    active_mods_db = []
-
-        if os.path.exists(mods_db_path):
-            with open(mods_db_path, 'r', encoding='utf-8') as file:
-                try:
-                    mods_db = json.load(file)
-                except json.JSONDecodeError:
-                    mods_db = []
-
-            self.inactive_mods_list.clear()  # Очищаем текущий список
+        """Загружает моды из каталога и добавляет их в список Inactive Mods, исключая те, что уже в Active Mods."""
+        # Исключаем активные моды из списка неактивных
+        active_mods_names = {mod.get('name') for mod in self.mod_store.active}
+        mods_db = self.mod_store.catalog
 
-            for mod in mods_db:
-                mod_name = mod.get('name', 'Unknown Mod')
-                if mod_name not in active_mods_names:
-                    self.inactive_mods_list.addItem(mod_name)
-                    logger.info(f"Loaded mod into Inactive Mods: {mod_name}")
-                else:
-                    logger.info(f"Skipped mod already in Active Mods: {mod_name}")
+        self.inactive_mods_list.clear()  # Очищаем текущий список
+        registry.set_gauge('pz_catalog_mods', len(mods_db), 'Mods in modsdb.json')
 
-        else:
-            logger.warning(f"Mods database not found: {mods_db_path}")
+        for mod in mods_db:
+            mod_name = mod.get('name', 'Unknown Mod')
+            if mod_name not in active_mods_names:
+                self.inactive_mods_list.addItem(mod_name)
+                logger.info(f"Loaded mod into Inactive Mods: {mod_name}")
+            else:
+                logger.info(f"Skipped mod already in Active Mods: {mod_name}")
+
+        if self.mod_search_edit.text().strip():
+            self.filter_mods(self.mod_search_edit.text())
+
+    def filter_mods(self, text):
+        """Скрывает в Active/Inactive Mods моды, не подходящие под запрос, и выделяет лучший результат."""
+        query = text.strip()
+        matches = None
+        if query:
+            if self.mod_search_seq != self.mod_store.seq:
+                self.mod_search_index.sync(self.mod_store.catalog + self.mod_store.active)
+                self.mod_search_seq = self.mod_store.seq
+            matches = self.mod_search_index.match(query)
+
+        # Меняем только строки, у которых поменялась видимость
+        for i in range(self.inactive_mods_list.count()):
+            item = self.inactive_mods_list.item(i)
+            hidden = matches is not None and item.text() not in matches
+            if item.isHidden() != hidden:
+                item.setHidden(hidden)
+        for i in range(self.active_mods_tree.topLevelItemCount()):
+            item = self.active_mods_tree.topLevelItem(i)
+            hidden = matches is not None and item.text(0) not in matches
+            if item.isHidden() != hidden:
+                item.setHidden(hidden)
+
+        if matches:
+            for name in self.mod_search_index.search(query, limit=20):
+                found = self.inactive_mods_list.findItems(name, Qt.MatchExactly)
+                if found:
+                    self.inactive_mods_list.setCurrentItem(found[0])
+                    self.inactive_mods_list.scrollToItem(found[0])
+                    break
 
     def load_active_mods(self):
-        """Загружает активные моды из activemods.json и добавляет их в список Active Mods."""
-        active_mods_db_path = 'activemods.json'
-        if os.path.exists(active_mods_db_path):
-            with open(active_mods_db_path, 'r', encoding='utf-8') as file:
-                try:
-                    active_mods_db = json.load(file)
-                except json.JSONDecodeError:
-                    active_mods_db = []
-
-            self.active_mods_tree.clear()  # Очищаем текущий список
-            active_mods_names = set()  # Создаем набор для хранения уникальных имен модов
-            for mod in active_mods_db:
-                mod_name = mod.get('name', 'Unknown Mod')
-                if mod_name not in active_mods_names:
-                    # Создаем элемент дерева для мода
-                    mod_item = QTreeWidgetItem([mod_name])
-                    mod_item.setExpanded(True)  # Оставляем поддерево открытым
-
-                    # Добавляем подэлементы для Mod ID и Map Folder
-                    mod_ids = mod.get('Mod ID', [])
-                    disabled_mod_ids = mod.get('disabled_mod_ids', [])
-                    map_folders = mod.get('Map Folder', [])
-                    disabled_map_folders = mod.get('disabled_map_folders', [])
-
-                    if mod_ids:
-                        mod_id_item = QTreeWidgetItem(mod_item, ["Mod ID"])
-                        for mod_id in mod_ids:
-                            id_item = QTreeWidgetItem(mod_id_item, [mod_id])
-                            if mod_id in disabled_mod_ids:
-                                id_item.setIcon(0, QApplication.style().standardIcon(
-                                    QStyle.SP_DialogCloseButton))  # Иконка крестика
-                            else:
-                                id_item.setIcon(0, QApplication.style().standardIcon(
-                                    QStyle.SP_DialogApplyButton))  # Иконка галочки
-                            id_item.setData(0, Qt.UserRole, 'Mod ID')
-                        mod_id_item.setExpanded(True)
-
-                    if map_folders:
-                        map_folder_item = QTreeWidgetItem(mod_item, ["Map Folder"])
-                        for map_folder in map_folders:
-                            folder_item = QTreeWidgetItem(map_folder_item, [map_folder])
-                            if map_folder in disabled_map_folders:
-                                folder_item.setIcon(0, QApplication.style().standardIcon(
-                                    QStyle.SP_DialogCloseButton))  # Иконка крестика
-                            else:
-                                folder_item.setIcon(0, QApplication.style().standardIcon(
-                                    QStyle.SP_DialogApplyButton))  # Иконка галочки
-                            folder_item.setData(0, Qt.UserRole, 'Map Folder')
-                        map_folder_item.setExpanded(True)
-
-                    self.active_mods_tree.addTopLevelItem(mod_item)
-                    active_mods_names.add(mod_name)
-                    logger.info(f"Loaded active mod: {mod_name}")
-        else:
-            logger.warning(f"Active mods database not found: {active_mods_db_path}")
+        """Загружает активные моды и добавляет их в список Active Mods."""
+        active_mods_db = self.mod_store.active
+
+        self.active_mods_tree.clear()  # Очищаем текущий список
+        registry.set_gauge('pz_active_mods', len(active_mods_db), 'Mods in activemods.json')
+        active_mods_names = set()  # Создаем набор для хранения уникальных имен модов
+        for mod in active_mods_db:
+            mod_name = mod.get('name', 'Unknown Mod')
+            if mod_name not in active_mods_names:
+                mod_item = self.create_active_mod_item(mod)
+                self.active_mods_tree.addTopLevelItem(mod_item)
+                active_mods_names.add(mod_name)
+                logger.info(f"Loaded active mod: {mod_name}")
 
         # Подключение сигнала для обработки двойного клика
         self.active_mods_tree.itemDoubleClicked.connect(self.toggle_mod_item)
 
+    def create_active_mod_item(self, mod):
+        """Создает элемент дерева Active Mods с Mod ID и Map Folder и их состоянием."""
+        mod_name = mod.get('name', 'Unknown Mod')
+        # Создаем элемент дерева для мода
+        mod_item = QTreeWidgetItem([mod_name])
+        mod_item.setExpanded(True)  # Оставляем поддерево открытым
+
+        # Добавляем подэлементы для Mod ID и Map Folder
+        mod_ids = mod.get('Mod ID', [])
+        disabled_mod_ids = mod.get('disabled_mod_ids', [])
+        map_folders = mod.get('Map Folder', [])
+        disabled_map_folders = mod.get('disabled_map_folders', [])
+
+        if mod_ids:
+            mod_id_item = QTreeWidgetItem(mod_item, ["Mod ID"])
+            for mod_id in mod_ids:
+                id_item = QTreeWidgetItem(mod_id_item, [mod_id])
+                if mod_id in disabled_mod_ids:
+                    id_item.setIcon(0, QApplication.style().standardIcon(
+                        QStyle.SP_DialogCloseButton))  # Иконка крестика
+                else:
+                    id_item.setIcon(0, QApplication.style().standardIcon(
+                        QStyle.SP_DialogApplyButton))  # Иконка галочки
+                id_item.setData(0, Qt.UserRole, 'Mod ID')
+            mod_id_item.setExpanded(True)
+
+        if map_folders:
+            map_folder_item = QTreeWidgetItem(mod_item, ["Map Folder"])
+            for map_folder in map_folders:
+                folder_item = QTreeWidgetItem(map_folder_item, [map_folder])
+                if map_folder in disabled_map_folders:
+                    folder_item.setIcon(0, QApplication.style().standardIcon(
+                        QStyle.SP_DialogCloseButton))  # Иконка крестика
+                else:
+                    folder_item.setIcon(0, QApplication.style().standardIcon(
+                        QStyle.SP_DialogApplyButton))  # Иконка галочки
+                folder_item.setData(0, Qt.UserRole, 'Map Folder')
+            map_folder_item.setExpanded(True)
+        return mod_item
+
     def move_mod_to_active(self):
         current_item = self.inactive_mods_list.takeItem(self.inactive_mods_list.currentRow())
         if current_item:
@@ -626,37 +1062,56 @@ class MainWindow(QMainWindow):
                     logger.info(f"Mod {mod_name} already in active mods list.")
                     return
 
-            # Копируем данные мода из modsdb.json в activemods.json
-            mods_db_path = 'modsdb.json'
-            active_mods_db_path = 'activemods.json'
+            # Копируем данные мода из каталога в активные моды
             try:
-                with open(mods_db_path, 'r', encoding='utf-8') as mods_file:
-                    mods_db = json.load(mods_file)
-
+                mods_db = self.mod_store.catalog
                 mod_data = next((mod for mod in mods_db if mod.get('name') == mod_name), None)
                 if mod_data:
-                    if os.path.exists(active_mods_db_path):
-                        with open(active_mods_db_path, 'r', encoding='utf-8') as active_mods_file:
-                            try:
-                                active_mods_db = json.load(active_mods_file)
-                            except json.JSONDecodeError:
-                                active_mods_db = []
-                    else:
-                        active_mods_db = []
+                    active_mods_db = list(self.mod_store.active)
 
                     # Проверяем, если мод уже существует в базе активных модов, не добавляем его снова
                     if mod_name not in {mod.get('name') for mod in active_mods_db}:
                         active_mods_db.append(mod_data)
-                        with open(active_mods_db_path, 'w', encoding='utf-8') as active_mods_file:
-                            json.dump(active_mods_db, active_mods_file, ensure_ascii=False, indent=4)
+                        self.add_missing_requirements(mod_data, active_mods_db, mods_db)
+
+                        # Пересчитываем порядок загрузки с учетом require=
+                        load_order = compute_load_order(active_mods_db, mods_db)
+                        active_mods_db = load_order['mods']
+                        for cycle in load_order['cycles']:
+                            self.append_to_console(f"Dependency cycle: {' -> '.join(cycle)}")
+
+                        with self.mod_store.transaction(f"activate {mod_name}") as tx:
+                            tx.assign('active', active_mods_db)
+                        self.schedule_mod_store_flush()
                         logger.info(f"Copied mod to active mods: {mod_name}")
 
                     # Обновляем UI
                     self.load_active_mods()
+                    self.check_for_duplicates()
 
             except Exception as e:
                 logger.error(f"Failed to move mod to active: {str(e)}")
 
+    def add_missing_requirements(self, mod_data, active_mods_db, mods_db):
+        """Добавляет в активные моды все недостающие зависимости (транзитивно) из каталога."""
+        active_ids = [mod_id for mod in active_mods_db for mod_id in enabled_mod_ids(mod)]
+        missing = missing_requirements(enabled_mod_ids(mod_data), active_ids, build_requires_map(mods_db))
+        if not missing:
+            return
+
+        providers = build_providers_map(mods_db)
+        active_names = {mod.get('name') for mod in active_mods_db}
+        for required in missing:
+            provider = providers.get(required)
+            if provider is None:
+                self.append_to_console(f"Missing requirement for {mod_data.get('name')}: {required} (not in catalog)")
+                logger.warning(f"Missing requirement not found in catalog: {required}")
+            elif provider.get('name') not in active_names:
+                active_mods_db.append(provider)
+                active_names.add(provider.get('name'))
+                self.append_to_console(f"Added required mod: {provider.get('name')} ({required})")
+                logger.info(f"Added required mod to active mods: {provider.get('name')}")
+
     def move_mod_to_inactive(self):
         current_item = self.active_mods_tree.currentItem()
         if current_item and current_item.parent() is None:  # Проверяем, что выбран верхний элемент
@@ -670,22 +1125,14 @@ class MainWindow(QMainWindow):
                     return
             self.inactive_mods_list.addItem(mod_name)
 
-            # Удаляем мод из activemods.json
-            active_mods_db_path = 'activemods.json'
+            # Удаляем мод из активных
             try:
-                if os.path.exists(active_mods_db_path):
-                    with open(active_mods_db_path, 'r', encoding='utf-8') as active_mods_file:
-                        try:
-                            active_mods_db = json.load(active_mods_file)
-                        except json.JSONDecodeError:
-                            active_mods_db = []
-
-                    active_mods_db = [mod for mod in active_mods_db if mod.get('name') != mod_name]
-
-                    with open(active_mods_db_path, 'w', encoding='utf-8') as active_mods_file:
-                        json.dump(active_mods_db, active_mods_file, ensure_ascii=False, indent=4)
-
-                    logger.info(f"Removed mod from active mods: {mod_name}")
+                with self.mod_store.transaction(f"deactivate {mod_name}") as tx:
+                    for index in reversed(range(len(self.mod_store.active))):
+                        if self.mod_store.active[index].get('name') == mod_name:
+                            tx.delete('active', index)
+                self.schedule_mod_store_flush()
+                logger.info(f"Removed mod from active mods: {mod_name}")
 
             except Exception as e:
                 logger.error(f"Failed to remove mod from active: {str(e)}")
@@ -707,22 +1154,23 @@ class MainWindow(QMainWindow):
             item_type = item.data(0, Qt.UserRole)
             mod_name = parent.parent().text(0) if parent.parent() else parent.text(0)
 
-            mods_db_path = 'activemods.json'
-            with open(mods_db_path, 'r', encoding='utf-8') as file:
-                active_mods_db = json.load(file)
-
-            mod_data = next((mod for mod in active_mods_db if mod['name'] == mod_name), None)
-            if not mod_data:
-                logger.warning(f"Mod {mod_name} not found in activemods.json.")
+            active_mods_db = self.mod_store.active
+            mod_index = next((index for index, mod in enumerate(active_mods_db) if mod['name'] == mod_name), None)
+            if mod_index is None:
+                logger.warning(f"Mod {mod_name} not found in active mods.")
                 return
 
             if item_type == 'Mod ID':
-                target_list = mod_data.setdefault('disabled_mod_ids', [])
+                list_key = 'disabled_mod_ids'
             elif item_type == 'Map Folder':
-                target_list = mod_data.setdefault('disabled_map_folders', [])
+                list_key = 'disabled_map_folders'
             else:
                 return
 
+            # Запись не меняется на месте: в журнал уходит новая версия мода
+            mod_data = dict(active_mods_db[mod_index])
+            target_list = list(mod_data.get(list_key) or [])
+            mod_data[list_key] = target_list
             if item.text(0) in target_list:
                 target_list.remove(item.text(0))
                 item.setIcon(0, QApplication.style().standardIcon(QStyle.SP_DialogApplyButton))  # Галочка
@@ -731,8 +1179,9 @@ class MainWindow(QMainWindow):
                 item.setIcon(0, QApplication.style().standardIcon(QStyle.SP_DialogCloseButton))  # Крестик
 
             # Сохранение обновленных данных
-            with open(mods_db_path, 'w', encoding='utf-8') as file:
-                json.dump(active_mods_db, file, ensure_ascii=False, indent=4)
+            with self.mod_store.transaction(f"toggle {item.text(0)}") as tx:
+                tx.update('active', mod_index, mod_data)
+            self.schedule_mod_store_flush()
 
             logger.info(f"Toggled {item_type} {item.text(0)} for mod {mod_name}")
         finally:
@@ -761,16 +1210,7 @@ class MainWindow(QMainWindow):
         # Формируем путь к файлу пресета
         preset_path = os.path.join(modpacks_dir, f"{preset_name.strip()}.json")
 
-        # Загружаем данные активных модов из activemods.json
-        active_mods_db_path = 'activemods.json'
-        if os.path.exists(active_mods_db_path):
-            with open(active_mods_db_path, 'r', encoding='utf-8') as active_mods_file:
-                try:
-                    active_mods_db = json.load(active_mods_file)
-                except json.JSONDecodeError:
-                    active_mods_db = []
-        else:
-            active_mods_db = []
+        active_mods_db = self.mod_store.active
 
         # Сбор информации об активных модах
         active_mods_data = []
@@ -794,9 +1234,8 @@ class MainWindow(QMainWindow):
 
             active_mods_data.append(mod_data)
 
-        # Сохранение полной информации об активных модах в файл пресета
-        with open(preset_path, 'w', encoding='utf-8') as preset_file:
-            json.dump(active_mods_data, preset_file, ensure_ascii=False, indent=4)
+        # Пресет хранит ссылки на записи (общие записи в modpacks/records) и отключенные Mod ID / Map Folder
+        write_preset(preset_path, active_mods_data)
 
         logger.info(f"Saved preset {preset_name} to {preset_path}")
         QMessageBox.information(self, "Preset Saved", f"Preset '{preset_name}' saved successfully!")
@@ -811,52 +1250,7 @@ class MainWindow(QMainWindow):
         if not preset_file:
             return
 
-        # Загрузка пресета из выбранного файла
-        try:
-            with open(preset_file, 'r', encoding='utf-8') as file:
-                preset_mods = json.load(file)
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Failed to load preset: {str(e)}")
-            logger.error(f"Failed to load preset: {str(e)}")
-            return
-
-        # Загрузка базы данных модов
-        mods_db_path = 'modsdb.json'
-        if os.path.exists(mods_db_path):
-            with open(mods_db_path, 'r', encoding='utf-8') as mods_file:
-                try:
-                    mods_db = json.load(mods_file)
-                except json.JSONDecodeError:
-                    mods_db = []
-        else:
-            mods_db = []
-
-        existing_mods = {mod.get('name') for mod in mods_db}
-
-        # Проверка наличия модов в modsdb.json и добавление недостающих
-        for mod in preset_mods:
-            mod_name = mod.get('name')
-            if mod_name not in existing_mods:
-                mods_db.append(mod)
-                logger.info(f"Added missing mod to modsdb.json: {mod_name}")
-
-        # Сохранение обновленного списка модов в modsdb.json
-        with open(mods_db_path, 'w', encoding='utf-8') as mods_file:
-            json.dump(mods_db, mods_file, ensure_ascii=False, indent=4)
-
-        # Загрузка активных модов из пресета
-        active_mods_db_path = 'activemods.json'
-        with open(active_mods_db_path, 'w', encoding='utf-8') as active_mods_file:
-            json.dump(preset_mods, active_mods_file, ensure_ascii=False, indent=4)
-
-        # Обновление UI списка активных модов
-        self.load_active_mods()
-
-        # Проверка на дубликаты между списками Active и Inactive Mods
-        self.check_for_duplicates()
-
-        QMessageBox.information(self, "Preset Loaded", "Preset loaded successfully!")
-        logger.info(f"Preset loaded from {preset_file}")
+        self.load_preset_from_path(preset_file)
 
     def check_for_duplicates(self):
         """Проверяет на наличие дубликатов между списками Active и Inactive Mods."""
@@ -889,27 +1283,27 @@ class MainWindow(QMainWindow):
             else:
                 active_mods[mod_name] = True
 
-        # Сохраняем обновленный список активных модов
-        active_mods_db_path = 'activemods.json'
-        active_mods_data = []
-        for i in range(self.active_mods_tree.topLevelItemCount()):
-            mod_name = self.active_mods_tree.topLevelItem(i).text(0)
-            active_mods_data.append({'name': mod_name})
-
-        with open(active_mods_db_path, 'w', encoding='utf-8') as active_mods_file:
-            json.dump(active_mods_data, active_mods_file, ensure_ascii=False, indent=4)
+        # Удаляем повторы из активных модов, оставляя первую запись
+        seen_names = set()
+        with self.mod_store.transaction("remove duplicates") as tx:
+            for index, mod in enumerate(list(self.mod_store.active)):
+                if mod.get('name') in seen_names:
+                    tx.delete('active', index - (len(tx.ops)))
+                else:
+                    seen_names.add(mod.get('name'))
+        self.schedule_mod_store_flush()
 
-        logger.info("Duplicate mods removed and activemods.json updated.")
+        logger.info("Duplicate mods removed from active mods.")
 
     def reset_to_default(self):
         """Убирает все моды из активных и обновляет UI сразу после сброса."""
         # Очищаем список активных модов в UI
         self.active_mods_tree.clear()
 
-        # Очищаем файл activemods.json
-        active_mods_db_path = 'activemods.json'
-        with open(active_mods_db_path, 'w', encoding='utf-8') as active_mods_file:
-            json.dump([], active_mods_file, ensure_ascii=False, indent=4)
+        # Очищаем активные моды
+        with self.mod_store.transaction("reset to default") as tx:
+            tx.replace('active', [])
+        self.schedule_mod_store_flush()
 
         # Обновляем UI для списка неактивных модов
         self.load_inactive_mods()
@@ -930,39 +1324,18 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Error", "Unable to determine the mod to remove.")
             return
 
-        # Удаляем мод из базы данных modsdb.json
-        mods_db_path = 'modsdb.json'
-        try:
-            with open(mods_db_path, 'r', encoding='utf-8') as mods_file:
-                mods_db = json.load(mods_file)
-
-            mods_db = [mod for mod in mods_db if mod.get('name') != mod_name]
-
-            with open(mods_db_path, 'w', encoding='utf-8') as mods_file:
-                json.dump(mods_db, mods_file, ensure_ascii=False, indent=4)
-
-            logger.info(f"Removed mod from modsdb.json: {mod_name}")
-        except Exception as e:
-            logger.error(f"Failed to remove mod from modsdb.json: {str(e)}")
-
-        # Удаляем мод из базы данных activemods.json
-        active_mods_db_path = 'activemods.json'
+        # Удаляем мод из каталога и активных модов одним действием (отменяется целиком)
         try:
-            if os.path.exists(active_mods_db_path):
-                with open(active_mods_db_path, 'r', encoding='utf-8') as active_mods_file:
-                    try:
-                        active_mods_db = json.load(active_mods_file)
-                    except json.JSONDecodeError:
-                        active_mods_db = []
-
-                active_mods_db = [mod for mod in active_mods_db if mod.get('name') != mod_name]
-
-                with open(active_mods_db_path, 'w', encoding='utf-8') as active_mods_file:
-                    json.dump(active_mods_db, active_mods_file, ensure_ascii=False, indent=4)
-
-                logger.info(f"Removed mod from activemods.json: {mod_name}")
+            with self.mod_store.transaction(f"remove {mod_name}") as tx:
+                for list_name in ('catalog', 'active'):
+                    items = self.mod_store.lists[list_name]
+                    for index in reversed(range(len(items))):
+                        if items[index].get('name') == mod_name:
+                            tx.delete(list_name, index)
+            self.schedule_mod_store_flush()
+            logger.info(f"Removed mod from catalog and active mods: {mod_name}")
         except Exception as e:
-            logger.error(f"Failed to remove mod from activemods.json: {str(e)}")
+            logger.error(f"Failed to remove mod: {str(e)}")
 
         # Удаляем мод из UI списка
         if isinstance(current_item, QTreeWidgetItem):
@@ -981,24 +1354,159 @@ class MainWindow(QMainWindow):
         self.active_mods_tree.clear()
         self.inactive_mods_list.clear()
 
-        # Очищаем базы данных
-        mods_db_path = 'modsdb.json'
-        active_mods_db_path = 'activemods.json'
+        # Очищаем базы данных (можно отменить через Undo)
+        with self.mod_store.transaction("remove all mods") as tx:
+            tx.replace('catalog', [])
+            tx.replace('active', [])
+        self.schedule_mod_store_flush()
 
-        with open(mods_db_path, 'w', encoding='utf-8') as mods_file:
-            json.dump([], mods_file, ensure_ascii=False, indent=4)
+        logger.info("All mods removed and databases cleared.")
 
-        with open(active_mods_db_path, 'w', encoding='utf-8') as active_mods_file:
-            json.dump([], active_mods_file, ensure_ascii=False, indent=4)
+    def scan_local_mods(self):
+        """Сканирует mod.info установленных модов Workshop и дополняет ими modsdb.json."""
+        content_dir = self.config.get('Paths', 'workshop',
+                                      fallback=get_workshop_content_dir(self.server_directory))
+
+        self.jobs.submit("Scan local mods", lambda token: self.create_index_worker(content_dir),
+                         resources=('disk',))
+
+    def create_index_worker(self, content_dir):
+        worker = ModIndexWorker(content_dir)
+        worker.indexed.connect(self.on_local_mods_indexed)
+        return worker
+
+    def on_local_mods_indexed(self, entries):
+        """Объединяет результаты сканирования с каталогом модов."""
+        catalog = self.mod_store.catalog
+        mods_db = [dict(mod) for mod in catalog]
+
+        added, updated = merge_into_catalog(mods_db, entries)
+        if added or updated:
+            # В журнал попадают только измененные и новые записи
+            with self.mod_store.transaction("scan local mods") as tx:
+                for index, mod in enumerate(mods_db):
+                    if index >= len(catalog):
+                        tx.append('catalog', mod)
+                    elif mod != catalog[index]:
+                        tx.update('catalog', index, mod)
+            self.schedule_mod_store_flush()
+            self.load_inactive_mods()
+
+        self.append_to_console(f"Local mods indexed: {added} added, {updated} updated.")
+        logger.info(f"Local mods indexed: {added} added, {updated} updated")
+
+    def check_conflicts(self):
+        """Ищет файлы, которые поставляют сразу несколько активных модов."""
+        mods_db = self.mod_store.catalog
+        active_mods_db = self.mod_store.active
+
+        local_paths = {}
+        for mod in mods_db + active_mods_db:
+            local_paths.update(mod.get('local_path', {}))
+        if not local_paths:
+            QMessageBox.information(self, "Check Conflicts", "No local mod files indexed. Run 'Scan Local Mods' first.")
+            return
 
-        logger.info("All mods removed and databases cleared.")
+        load_order = compute_load_order(active_mods_db, mods_db)['mod_ids']
+
+        self.jobs.submit("Check mod conflicts",
+                         lambda token: self.create_conflict_worker(load_order, local_paths), resources=('disk',))
+
+    def create_conflict_worker(self, load_order, local_paths):
+        worker = ModConflictWorker(load_order, local_paths)
+        worker.report.connect(self.show_conflicts)
+        return worker
+
+    def show_conflicts(self, report):
+        """Показывает отчет о пересечениях файлов в порядке загрузки."""
+        conflicts = sum(1 for item in report if item['kind'] == 'conflict')
+        self.append_to_console(f"Conflict check: {len(report)} shared paths, {conflicts} with different content.")
+        logger.info(f"Conflict check: {len(report)} shared paths, {conflicts} conflicts")
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Mod File Conflicts")
+        dialog.setGeometry(100, 100, 900, 500)
+        dialog_layout = QVBoxLayout()
+
+        table_widget = QTableWidget()
+        table_widget.setColumnCount(4)
+        table_widget.setHorizontalHeaderLabels(["Path", "Kind", "Winner", "Mods (load order)"])
+        table_widget.setRowCount(len(report))
+        for row_index, item in enumerate(report):
+            table_widget.setItem(row_index, 0, QTableWidgetItem(item['path']))
+            kind_item = QTableWidgetItem(item['kind'])
+            if item['kind'] == 'conflict':
+                kind_item.setForeground(QBrush(QColor('red')))
+            table_widget.setItem(row_index, 1, kind_item)
+            table_widget.setItem(row_index, 2, QTableWidgetItem(item['winner']))
+            table_widget.setItem(row_index, 3, QTableWidgetItem(' -> '.join(item['mods'])))
+        table_widget.resizeColumnsToContents()
+
+        dialog_layout.addWidget(table_widget)
+        dialog.setLayout(dialog_layout)
+        dialog.exec()
+
+    def apply_mods_to_server(self):
+        """Записывает активные моды в Mods=/WorkshopItems=/Map= выбранных серверных ini."""
+        zomboid_directory = self.config.get('Paths', 'zomboid', fallback=self.zomboid_directory)
+        server_name = self.config.get('Server', 'name', fallback=DEFAULT_SERVER_NAME)
+        default_ini = get_server_ini_path(zomboid_directory, server_name)
+
+        ini_paths, _ = QFileDialog.getOpenFileNames(self, "Apply To Server", default_ini,
+                                                    "Server Config (*.ini);;All Files (*)")
+        if not ini_paths:
+            return
+
+        mods_db = self.mod_store.catalog
+        active_mods_db = self.mod_store.active
+
+        settings = compile_mod_settings(active_mods_db, mods_db)
+        results = write_server_configs(ini_paths, settings)
+        for ini_path, status in results.items():
+            self.append_to_console(f"{ini_path}: {status}")
+        logger.info(f"Applied mod settings to server configs: {results}")
+
+    def download_active_mods(self):
+        """Скачивает предметы Workshop активных модов в папку сервера одной пачкой SteamCMD."""
+        steamcmd_path = self.config.get('Paths', 'steamcmd', fallback='')
+        if not steamcmd_path or not os.path.exists(steamcmd_path):
+            self.append_to_console("Error: SteamCMD not installed. Please install SteamCMD first.")
+            return
+
+        active_mods_db = self.mod_store.active
+
+        workshop_ids = [workshop_id for mod in active_mods_db for workshop_id in mod.get('Workshop ID', [])]
+        if not workshop_ids:
+            self.append_to_console("No Workshop items to download.")
+            return
+        server_directory = self.server_directory
+
+        # workshop_ids общий для всех попыток: воркер оставляет в нем только неудавшиеся предметы
+        self.jobs.submit(f"Download {len(workshop_ids)} Workshop items",
+                         lambda token: self.create_download_worker(steamcmd_path, server_directory, workshop_ids, token),
+                         resources=('steamcmd:' + server_directory, 'http'), retries=2, backoff=15.0)
+
+    def create_download_worker(self, steamcmd_path, server_directory, workshop_ids, token):
+        worker = WorkshopDownloadWorker(steamcmd_path, server_directory, workshop_ids, token,
+                                        get_content_store_dir(self.config_path),
+                                        get_content_store_reflink(self.config_path))
+        worker.downloaded.connect(self.on_workshop_items_downloaded)
+        return worker
+
+    def on_workshop_items_downloaded(self, results):
+        """После загрузки обновляем индекс локальных модов."""
+        if any(ok for ok, _ in results.values()):
+            self.scan_local_mods()
 
     def add_mod(self):
         current_url = self.browser.url().toString()
         identifier = SteamWorkshopIdentifier()
         try:
             logger.info(f"Checking URL: {current_url}")
+            scrape_started = time.monotonic()
             result = identifier.check_url(current_url)
+            registry.observe('pz_workshop_scrape_duration_seconds', time.monotonic() - scrape_started,
+                             'Duration of Steam Workshop page scrapes')
 
             # Инициализация переменных
             page_type = None
@@ -1024,16 +1532,7 @@ class MainWindow(QMainWindow):
             if not page_type or not mod_name or not workshop_id:
                 raise ValueError("Page Type, Mod Name, or Workshop ID not found in the result.")
 
-            # Загрузка существующих данных из базы
-            mods_db_path = 'modsdb.json'
-            if os.path.exists(mods_db_path):
-                with open(mods_db_path, 'r', encoding='utf-8') as file:
-                    try:
-                        mods_db = json.load(file)
-                    except json.JSONDecodeError:
-                        mods_db = []
-            else:
-                mods_db = []
+            mods_db = self.mod_store.catalog
 
             # Проверка на дублирование по Workshop ID
             for mod in mods_db:
@@ -1058,9 +1557,9 @@ class MainWindow(QMainWindow):
             }
 
             # Сохранение новых данных
-            mods_db.append(mod_data)
-            with open(mods_db_path, 'w', encoding='utf-8') as file:
-                json.dump(mods_db, file, ensure_ascii=False, indent=4)
+            with self.mod_store.transaction(f"add {mod_name}") as tx:
+                tx.append('catalog', mod_data)
+            self.schedule_mod_store_flush()
 
             # Добавление мода в список
             self.mod_list_widget.addItem(mod_name)
@@ -1150,41 +1649,34 @@ class MainWindow(QMainWindow):
 
     def create_players_database_tab(self, layout):
         self.db_path = os.path.join(self.zomboid_directory, 'db', 'servertest.db')
+        self.db_watcher = None
         if not os.path.exists(self.db_path):
             logger.error(f"Database file not found: {self.db_path}")
             return
 
-        self.connection = sqlite3.connect(self.db_path)
-        self.cursor = self.connection.cursor()
-
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        self.tables = self.cursor.fetchall()
-        if not self.tables:
+        self.db_watcher = DatabaseWatcher(self.db_path)
+        if not self.db_watcher.tables:
             logger.error("No tables found in database.")
-            self.connection.close()
+            self.db_watcher.close()
+            self.db_watcher = None
             return
+        # Журнал изменений: дальше перечитываются только затронутые строки
+        self.db_watcher.install_change_log()
+        self.connection = self.db_watcher.connection
+        self.cursor = self.connection.cursor()
 
+        self.db_table_widgets = {}
         self.tab_widget = QTabWidget()
-        for table in self.tables:
-            table_name = table[0]
+        for table_name in self.db_watcher.tables:
             tab = QWidget()
             tab_layout = QVBoxLayout()
 
-            self.cursor.execute(f"PRAGMA table_info({table_name});")
-            columns = self.cursor.fetchall()
-            column_names = [column[1] for column in columns]
-
+            column_names = self.db_watcher.columns(table_name)
             table_widget = QTableWidget()
-            self.cursor.execute(f"SELECT * FROM {table_name}")
-            rows = self.cursor.fetchall()
-
-            table_widget.setRowCount(len(rows))
             table_widget.setColumnCount(len(column_names))
             table_widget.setHorizontalHeaderLabels(column_names)
-
-            for row_index, row in enumerate(rows):
-                for col_index, cell in enumerate(row):
-                    table_widget.setItem(row_index, col_index, QTableWidgetItem(str(cell)))
+            self.db_table_widgets[table_name] = table_widget
+            self.reload_db_table(table_name)
 
             add_row_button = QPushButton("Add Row")
             add_row_button.clicked.connect(lambda ch, t=table_name, tw=table_widget: self.add_row(t, tw))
@@ -1200,6 +1692,66 @@ class MainWindow(QMainWindow):
 
         layout.addWidget(self.tab_widget)
 
+        # В простое проверка - два os.stat в секунду
+        self.db_watch_timer = QTimer(self)
+        self.db_watch_timer.timeout.connect(self.refresh_players_database)
+        self.db_watch_timer.start(1000)
+
+    def set_db_row(self, table_widget, row_index, rowid, values):
+        """Заполняет строку таблицы; rowid хранится в первой ячейке для точечных обновлений."""
+        for col_index, cell in enumerate(values):
+            item = QTableWidgetItem(str(cell))
+            if col_index == 0:
+                item.setData(Qt.UserRole, rowid)
+            table_widget.setItem(row_index, col_index, item)
+
+    def reload_db_table(self, table_name):
+        table_widget = self.db_table_widgets[table_name]
+        rows = self.db_watcher.load_table(table_name)
+        table_widget.setRowCount(len(rows))
+        for row_index, (rowid, values) in enumerate(rows):
+            self.set_db_row(table_widget, row_index, rowid, values)
+
+    def refresh_players_database(self, changes=None):
+        """Применяет изменения servertest.db к таблицам вкладки (по умолчанию - опрос наблюдателя)."""
+        if self.db_watcher is None:
+            return
+        try:
+            changes = self.db_watcher.poll() if changes is None else changes
+            for table_name, rowids in changes.items():
+                if table_name not in self.db_table_widgets:
+                    continue
+                if rowids is None:
+                    self.reload_db_table(table_name)
+                else:
+                    self.patch_db_table(table_name, rowids)
+        except sqlite3.Error as e:
+            # Сервер держит блокировку записи - повторим на следующем тике
+            logger.debug(f"Players database refresh postponed: {e}")
+
+    def patch_db_table(self, table_name, rowids):
+        """Обновляет, добавляет и удаляет только изменившиеся строки."""
+        table_widget = self.db_table_widgets[table_name]
+        rows = self.db_watcher.fetch_rows(table_name, rowids)
+        positions = {}
+        for row_index in range(table_widget.rowCount()):
+            item = table_widget.item(row_index, 0)
+            if item is not None:
+                positions[item.data(Qt.UserRole)] = row_index
+        removed = []
+        for rowid, values in rows.items():
+            if values is None:
+                if rowid in positions:
+                    removed.append(positions[rowid])
+            elif rowid in positions:
+                self.set_db_row(table_widget, positions[rowid], rowid, values)
+            else:
+                table_widget.insertRow(table_widget.rowCount())
+                self.set_db_row(table_widget, table_widget.rowCount() - 1, rowid, values)
+        for row_index in sorted(removed, reverse=True):
+            table_widget.removeRow(row_index)
+        logger.debug(f"Players database: {len(rows)} rows of {table_name} refreshed")
+
     def add_row(self, table_name, table_widget):
         columns = [table_widget.horizontalHeaderItem(i).text() for i in range(table_widget.columnCount())]
 
@@ -1233,9 +1785,7 @@ class MainWindow(QMainWindow):
         try:
             self.cursor.execute(sql, new_row)
             self.connection.commit()
-            table_widget.setRowCount(table_widget.rowCount() + 1)
-            for col_index, cell in enumerate(new_row):
-                table_widget.setItem(table_widget.rowCount() - 1, col_index, QTableWidgetItem(cell))
+            self.refresh_players_database(self.db_watcher.changes_since_own_write())
             dialog.accept()
         except sqlite3.IntegrityError as e:
             QMessageBox.warning(self, "Error", f"Failed to add row: {e}")
@@ -1246,11 +1796,17 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Error", "No row selected")
             return
 
-        row_id = table_widget.item(selected_row, 0).text()  # Assuming the first column is the primary key
-        self.cursor.execute(f"DELETE FROM {table_name} WHERE id = ?", (row_id,))
+        rowid = table_widget.item(selected_row, 0).data(Qt.UserRole)
+        if rowid is not None:
+            self.cursor.execute(f"DELETE FROM {table_name} WHERE rowid = ?", (rowid,))
+        else:
+            row_id = table_widget.item(selected_row, 0).text()  # Таблица WITHOUT ROWID: первая колонка - ключ
+            self.cursor.execute(f"DELETE FROM {table_name} WHERE id = ?", (row_id,))
         self.connection.commit()
 
-        table_widget.removeRow(selected_row)
+        self.refresh_players_database(self.db_watcher.changes_since_own_write())
+        if rowid is None:
+            table_widget.removeRow(selected_row)
 
     def send_command(self):
         command = self.console_input_server_tab.text()
@@ -1273,33 +1829,745 @@ class MainWindow(QMainWindow):
     def start_server(self):
         self.console.append("Starting Server...")
         logger.info("Starting server")
+        self.quit_after_start = False
         if not self.process or self.process.state() != QProcess.Running:
             server_option = self.server_start_combobox_server_tab.currentText()
+            self.launch_server_process(server_option, self.console)
+
+    def launch_server_process(self, server_option, console_widget):
+        """Запускает сервер через StartServer*.bat или напрямую java по сохраненному профилю запуска."""
+        if server_option == DIRECT_JAVA_OPTION:
+            try:
+                program, arguments, environment = build_java_command(self.server_directory,
+                                                                     get_profile(self.server_directory))
+            except (OSError, ValueError) as e:
+                error_message = f"Error: cannot build java command from ProjectZomboid64.json: {e}"
+                console_widget.append(error_message)
+                logger.error(error_message)
+                return
+            if not os.path.exists(program):
+                error_message = f"Error: {program} not found."
+                console_widget.append(error_message)
+                logger.error(error_message)
+                return
+        else:
             server_file = f"{server_option}.bat"
-            if not os.path.exists(os.path.join(self.server_directory, server_file)):
+            program = os.path.join(self.server_directory, server_file)
+            arguments, environment = [], {}
+            if not os.path.exists(program):
                 error_message = f"Error: {server_file} not found in {self.server_directory}."
-                self.console.append(error_message)
+                console_widget.append(error_message)
                 logger.error(error_message)
                 return
 
-            self.process = QProcess(self)
-            self.process.setProgram(os.path.join(self.server_directory, server_file))
-            self.process.setProcessChannelMode(QProcess.MergedChannels)
-            self.process.readyReadStandardOutput.connect(self.display_output)
-            self.process.readyReadStandardError.connect(self.display_output)
-            self.process.start()
+        self.process = QProcess(self)
+        self.process.setProgram(program)
+        self.process.setArguments(arguments)
+        self.process.setWorkingDirectory(self.server_directory)
+        if environment:
+            process_environment = QProcessEnvironment.systemEnvironment()
+            for key, value in environment.items():
+                process_environment.insert(key, value)
+            self.process.setProcessEnvironment(process_environment)
+        self.process.setProcessChannelMode(QProcess.MergedChannels)
+        self.process.readyReadStandardOutput.connect(self.display_output)
+        self.process.readyReadStandardError.connect(self.display_output)
+        self.process.started.connect(self.start_resource_sampler)
+        self.process.started.connect(self.on_server_process_started)
+        self.process.finished.connect(self.on_server_process_finished)
+        logger.info(f"Starting server: {program} {' '.join(arguments)}")
+        self.process.start()
 
     def display_output(self):
         output = self.process.readAllStandardOutput().data().decode('cp1251', errors='ignore')
-        self.console.append(output)
-        self.server_setup_console.append(output)
         logger.debug(f"Server output: {output}")
 
+        received = time.time()
+        # У каждой строки свое время: начало строки могло прийти в прошлом куске вывода
+        timed_lines = self.console_lines.feed_timed(output, received)
+        lines = [line for line, _ in timed_lines]
+        registry.inc_counter('pz_console_lines_total', len(lines), 'Server console lines received')
+        self.console_archive.append(self.console_server_name, lines, received)
+
+        # Повторы одной и той же Lua ошибки не выводим, они считаются на вкладке Lua Errors
+        visible_lines = []
+        for line, line_time in timed_lines:
+            visible_lines.extend(self.lua_errors.feed_line(line, line_time))
+        if visible_lines:
+            text = '\n'.join(visible_lines)
+            self.console.append(text)
+            self.server_setup_console.append(text)
+
+        for line, line_time in timed_lines:
+            event = parse_player_event(line)
+            if event:
+                self.update_online_players(*event)
+            if self.boot_profiler and self.boot_profiler.feed_line(line, line_time):
+                self.on_boot_profiled(self.boot_profiler.result())
+                self.boot_profiler = None
+            # Маркер ищется в целых строках: чанк может разрезать его пополам
+            if self.backup_pending and any(marker in line for marker in SAVE_COMPLETE_MARKERS):
+                self.backup_pending = False
+                self.backup_save_timer.stop()
+                self.start_backup_worker()
+
         if "SERVER STARTED" in output:
-            QTimer.singleShot(10000, self.quit_server)
-            logger.info("Server started. Scheduled quit command in 10 seconds.")
+            if self.quit_after_start:
+                self.quit_after_start = False
+                self.scheduler.call_later(10, self.quit_server)
+                logger.info("Test start: scheduled quit command in 10 seconds.")
             self.save_path_to_config('Paths', 'Zomboid', self.zomboid_directory)
 
+    def get_backup_paths(self):
+        zomboid_directory = self.config.get('Paths', 'zomboid', fallback=self.zomboid_directory)
+        server_name = self.config.get('Server', 'name', fallback=DEFAULT_SERVER_NAME)
+        save_dir = get_world_save_dir(zomboid_directory, server_name)
+        backup_root = self.config.get('Backup', 'path', fallback=os.path.join(zomboid_directory, 'manager_backups'))
+        return save_dir, backup_root
+
+    def backup_world(self):
+        """Бэкап мира: на запущенном сервере сначала save и ожидание его завершения в логе."""
+        if self.process and self.process.state() == QProcess.Running:
+            if self.backup_pending:
+                return
+            self.backup_pending = True
+            self.process.write(b"save\n")
+            self.console.append("Saving world before backup...")
+            logger.info("Sent save command before backup")
+            self.backup_save_timer.start(300000)
+        else:
+            self.start_backup_worker()
+
+    def backup_save_timeout(self):
+        if self.backup_pending:
+            self.backup_pending = False
+            self.console.append("Backup skipped: save did not complete in time.")
+            logger.warning("Backup skipped: save completion marker not seen")
+
+    def start_backup_worker(self):
+        save_dir, backup_root = self.get_backup_paths()
+        if not os.path.isdir(save_dir):
+            self.console.append(f"World save not found: {save_dir}")
+            return
+
+        keep_last = self.config.getint('Backup', 'keep_last', fallback=24)
+        keep_daily = self.config.getint('Backup', 'keep_daily', fallback=7)
+        # world:<папка> - бэкап и обрезка чанков одного мира не идут одновременно
+        self.jobs.submit("Back up world",
+                         lambda token: self.create_backup_worker(save_dir, backup_root, keep_last, keep_daily),
+                         resources=('disk', 'world:' + save_dir))
+
+    def create_backup_worker(self, save_dir, backup_root, keep_last, keep_daily):
+        worker = BackupWorker(save_dir, backup_root, keep_last, keep_daily)
+        worker.log.connect(self.console.append)
+        return worker
+
+    def restore_backup(self):
+        """Восстанавливает мир из выбранной точки восстановления (только при остановленном сервере)."""
+        if self.process and self.process.state() == QProcess.Running:
+            QMessageBox.warning(self, "Restore Backup", "Stop the server before restoring a backup.")
+            return
+
+        save_dir, backup_root = self.get_backup_paths()
+        snapshots = list_snapshots(backup_root)
+        if not snapshots:
+            QMessageBox.information(self, "Restore Backup", "No backups found.")
+            return
+
+        snapshot_id, ok = QInputDialog.getItem(self, "Restore Backup", "Restore point:",
+                                               list(reversed(snapshots)), 0, False)
+        if not ok:
+            return
+        answer = QMessageBox.question(
+            self, "Restore Backup",
+            f"Replace the world in {save_dir} with backup {snapshot_id}?\n"
+            f"Files that are not in the backup will be removed. The current world is backed up first.")
+        if answer != QMessageBox.Yes:
+            return
+        # Сервер могли запустить, пока было открыто окно подтверждения
+        if self.process and self.process.state() != QProcess.NotRunning:
+            QMessageBox.warning(self, "Restore Backup", "Stop the server before restoring a backup.")
+            return
+
+        logger.info(f"Restoring backup {snapshot_id} to {save_dir}")
+        # Тот же world: что у бэкапа и обрезки чанков - восстановление не идет параллельно с ними
+        self.jobs.submit(f"Restore backup {snapshot_id}",
+                         lambda token: self.create_restore_worker(save_dir, backup_root, snapshot_id),
+                         resources=('disk', 'world:' + save_dir))
+
+    def create_restore_worker(self, save_dir, backup_root, snapshot_id):
+        worker = RestoreWorker(save_dir, backup_root, snapshot_id)
+        worker.log.connect(self.console.append)
+        return worker
+
+    def prune_world_chunks(self):
+        """Сначала dry run по защищенным областям и сейфхаусам, затем удаление после подтверждения."""
+        if self.process and self.process.state() == QProcess.Running:
+            QMessageBox.warning(self, "Prune Chunks", "Stop the server before pruning chunks.")
+            return
+
+        regions_text, ok = QInputDialog.getText(
+            self, "Prune Chunks", "Protected regions (x1,y1,x2,y2; ...):",
+            text=self.config.get('ChunkPruner', 'regions', fallback=''))
+        if not ok:
+            return
+        self.save_path_to_config('ChunkPruner', 'regions', regions_text)
+
+        zomboid_directory = self.config.get('Paths', 'zomboid', fallback=self.zomboid_directory)
+        server_name = self.config.get('Server', 'name', fallback=DEFAULT_SERVER_NAME)
+        regions = parse_regions(regions_text)
+        regions += load_safehouse_regions(os.path.join(zomboid_directory, 'db', f"{server_name}.db"))
+        if not regions:
+            QMessageBox.warning(self, "Prune Chunks", "No protected regions: refusing to prune the whole world.")
+            return
+
+        self.run_chunk_prune(regions, dry_run=True)
+
+    def run_chunk_prune(self, regions, dry_run):
+        save_dir, backup_root = self.get_backup_paths()
+        backup_dir = os.path.join(backup_root, 'pruned_chunks', datetime.now().strftime('%Y%m%d-%H%M%S'))
+        report_path = os.path.join(backup_root, f"chunk_prune_{'dry_run' if dry_run else 'report'}.csv")
+        os.makedirs(backup_root, exist_ok=True)
+        self.prune_regions = regions
+
+        self.jobs.submit("Prune world chunks" + (" (dry run)" if dry_run else ""),
+                         lambda token: self.create_prune_worker(save_dir, regions, dry_run, backup_dir, report_path),
+                         resources=('disk', 'world:' + save_dir))
+
+    def create_prune_worker(self, save_dir, regions, dry_run, backup_dir, report_path):
+        worker = ChunkPruneWorker(save_dir, regions, dry_run, backup_dir, report_path)
+        worker.log.connect(self.console.append)
+        worker.result.connect(self.on_chunk_prune_result)
+        return worker
+
+    def on_chunk_prune_result(self, stats):
+        if not stats['dry_run'] or not stats['pruned']:
+            return
+        answer = QMessageBox.question(
+            self, "Prune Chunks",
+            f"Move {stats['pruned']} of {stats['scanned']} chunks ({stats['bytes'] / 1024 / 1024:.1f} MB) "
+            f"to the backup folder?")
+        if answer != QMessageBox.Yes:
+            return
+        # Сервер могли запустить, пока шел dry run или было открыто окно подтверждения
+        if self.process and self.process.state() != QProcess.NotRunning:
+            QMessageBox.warning(self, "Prune Chunks", "Stop the server before pruning chunks.")
+            return
+        self.run_chunk_prune(self.prune_regions, dry_run=False)
+
+    def start_resource_sampler(self):
+        """Начинает собирать метрики ветки процессов, запущенной через QProcess."""
+        self.resource_sampler = create_sampler(self.process.processId())
+        if self.resource_sampler is None:
+            return
+        self.metrics_history = MetricsHistory()
+        self.metrics_timer.start(int(self.config.getfloat('Monitor', 'interval', fallback=2) * 1000))
+
+    def sample_resources(self):
+        if not self.process or self.process.state() != QProcess.Running or self.resource_sampler is None:
+            self.metrics_timer.stop()
+            self.resources_label.setText("Server not running")
+            return
+
+        sample = self.resource_sampler.sample()
+        self.metrics_history.append(sample)
+        history = self.metrics_history
+        self.resources_label.setText(
+            f"CPU  {sample['cpu_percent']:6.1f}% {sparkline(history.values('cpu_percent'), 30)}\n"
+            f"RSS  {sample['rss'] / 1024 / 1024:6.0f}M {sparkline(history.values('rss'), 30)}\n"
+            f"Thr  {sample['threads']:7d} {sparkline(history.values('threads'), 30)}\n"
+            f"Files{sample['open_files']:7d} {sparkline(history.values('open_files'), 30)}\n"
+            f"Read {sample['read_bytes_per_sec'] / 1024:6.0f}K {sparkline(history.values('read_bytes_per_sec'), 30)}\n"
+            f"Write{sample['write_bytes_per_sec'] / 1024:6.0f}K {sparkline(history.values('write_bytes_per_sec'), 30)}")
+
+    def export_metrics(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Metrics", "server_metrics.csv", "CSV Files (*.csv)")
+        if path:
+            self.metrics_history.export_csv(path)
+            logger.info(f"Exported server metrics to {path}")
+
+    def on_server_process_started(self):
+        if self.server_start_count:
+            registry.inc_counter('pz_server_restarts_total', 1, 'Server restarts since the manager started')
+        self.server_start_count += 1
+        self.boot_profiler = BootProfiler()
+        self.console_server_name = self.config.get('Server', 'name', fallback=DEFAULT_SERVER_NAME)
+        self.scheduler.set_server(self.console_server_name)
+        self.refresh_schedule_table()
+        self.online_players.clear()
+        self.player_list.clear()
+        registry.set_server_started(True)
+
+    def on_server_process_finished(self):
+        registry.set_server_started(False)
+        self.boot_profiler = None
+        remaining = []
+        last_lines = self.console_lines.flush()
+        self.console_archive.append(self.console_server_name, last_lines)
+        for line in last_lines:
+            remaining.extend(self.lua_errors.feed_line(line))
+        remaining.extend(self.lua_errors.flush())
+        if remaining:
+            self.console.append('\n'.join(remaining))
+            self.server_setup_console.append('\n'.join(remaining))
+        self.online_players.clear()
+        self.player_list.clear()
+        registry.set_gauge('pz_players_online', 0, 'Players online according to console events')
+        if self.restart_after_exit:
+            self.restart_after_exit = False
+            self.console.append("Restarting server in 5 seconds...")
+            self.scheduler.call_later(5, self.start_server)
+
+    def on_boot_profiled(self, profile):
+        """Сохраняет профиль загрузки и пишет в консоль самые медленные моды и регрессии."""
+        previous = record_profile(profile)
+        rows = rank_mods(profile, previous)
+        registry.set_gauge('pz_server_boot_seconds', round(profile['total'], 3), 'Duration of the last server boot')
+        self.console.append(f"Boot took {profile['total']:.1f}s. Slowest mods: " +
+                            ', '.join(f"{row['mod']} {row['total']:.1f}s" for row in rows[:5]))
+        regressions = [row for row in rows if row['regression']]
+        if regressions:
+            self.console.append("Slower than previous boot: " +
+                                ', '.join(f"{row['mod']} +{row['delta']:.1f}s" for row in regressions))
+        self.last_boot_profile = (profile, previous)
+
+    def profile_boot_log(self):
+        """Показывает профиль последней загрузки: из текущего запуска или из лога в папке Zomboid."""
+        profile, previous = self.last_boot_profile
+        if profile is None:
+            zomboid_directory = self.config.get('Paths', 'zomboid', fallback=self.zomboid_directory)
+            candidates = get_console_log_candidates(zomboid_directory)
+            log_path, _ = QFileDialog.getOpenFileName(self, "Boot Log", candidates[0] if candidates else zomboid_directory,
+                                                      "Log Files (*.txt *.log);;All Files (*)")
+            if not log_path:
+                return
+            try:
+                profile = profile_log_file(log_path)
+            except OSError as e:
+                QMessageBox.warning(self, "Error", f"Failed to read log: {str(e)}")
+                return
+            # Профиль из файла только сравнивается с историей: в нее пишутся загрузки из консоли
+            previous = latest_profile()
+        self.show_boot_profile(profile, previous)
+
+    def show_boot_profile(self, profile, previous):
+        rows = rank_mods(profile, previous)
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle(f"Boot Profile ({profile['total']:.1f}s)")
+        dialog.setGeometry(100, 100, 800, 500)
+        dialog_layout = QVBoxLayout()
+        dialog_layout.addWidget(QLabel(', '.join(f"{phase}: {seconds:.1f}s"
+                                                 for phase, seconds in sorted(profile['phases'].items()))))
+
+        table_widget = QTableWidget()
+        table_widget.setColumnCount(6)
+        table_widget.setHorizontalHeaderLabels(["Mod", "Total, s", "Mod Load, s", "Lua, s", "Lua Files", "Change, s"])
+        table_widget.setRowCount(len(rows))
+        for row_index, row in enumerate(rows):
+            table_widget.setItem(row_index, 0, QTableWidgetItem(row['mod']))
+            table_widget.setItem(row_index, 1, QTableWidgetItem(f"{row['total']:.2f}"))
+            table_widget.setItem(row_index, 2, QTableWidgetItem(f"{row['mod_load']:.2f}"))
+            table_widget.setItem(row_index, 3, QTableWidgetItem(f"{row['lua']:.2f}"))
+            table_widget.setItem(row_index, 4, QTableWidgetItem(str(row['files'])))
+            delta_item = QTableWidgetItem('' if row['delta'] is None else f"{row['delta']:+.2f}")
+            if row['regression']:
+                delta_item.setForeground(QBrush(QColor('red')))
+            table_widget.setItem(row_index, 5, delta_item)
+        table_widget.resizeColumnsToContents()
+
+        dialog_layout.addWidget(table_widget)
+        dialog.setLayout(dialog_layout)
+        dialog.exec()
+
+    def refresh_lua_errors(self):
+        """Перестраивает таблицу Lua ошибок не чаще раза в секунду и только после изменений."""
+        if self.lua_errors.version == self.lua_errors_shown_version:
+            return
+        self.lua_errors_shown_version = self.lua_errors.version
+        registry.set_gauge('pz_lua_errors_distinct', len(self.lua_errors.errors), 'Distinct Lua errors seen')
+        registry.set_gauge('pz_lua_errors_total', self.lua_errors.total, 'Lua errors seen including repeats')
+
+        self.lua_errors_summary = self.lua_errors.summary()
+        self.lua_errors_label.setText(f"{len(self.lua_errors_summary)} distinct errors, {self.lua_errors.total} total, "
+                                      f"{self.lua_errors.suppressed} console lines suppressed")
+        self.lua_errors_table.setRowCount(len(self.lua_errors_summary))
+        for row_index, entry in enumerate(self.lua_errors_summary):
+            self.lua_errors_table.setItem(row_index, 0, QTableWidgetItem(str(entry['count'])))
+            self.lua_errors_table.setItem(row_index, 1, QTableWidgetItem(entry['mod']))
+            self.lua_errors_table.setItem(row_index, 2, QTableWidgetItem(entry['message'][:200]))
+            self.lua_errors_table.setItem(row_index, 3, QTableWidgetItem(
+                datetime.fromtimestamp(entry['first_seen']).strftime('%Y-%m-%d %H:%M:%S')))
+            self.lua_errors_table.setItem(row_index, 4, QTableWidgetItem(
+                datetime.fromtimestamp(entry['last_seen']).strftime('%Y-%m-%d %H:%M:%S')))
+
+    def show_lua_error_details(self):
+        row = self.lua_errors_table.currentRow()
+        if row < 0 or row >= len(self.lua_errors_summary):
+            return
+        entry = self.lua_errors_summary[row]
+        frames = '\n'.join(f"{function} -- {file} line {line} [{mod}]" for function, file, line, mod in entry['frames'])
+        self.lua_error_details.setPlainText(f"{entry['message']}\n\n{frames}")
+
+    def scan_debug_logs(self):
+        """Дочитывает DebugLog-server файлы с места прошлого сканирования."""
+        zomboid_directory = self.config.get('Paths', 'zomboid', fallback=self.zomboid_directory)
+        log_paths = [path for path in get_console_log_candidates(zomboid_directory)
+                     if os.path.basename(path).startswith('DebugLog')]
+        if not log_paths:
+            QMessageBox.information(self, "Lua Errors", "No DebugLog-server files found.")
+            return
+        # Чтение и разбор лога в потоке: DebugLog может вырасти на сотни мегабайт
+        self.jobs.submit("Scan DebugLog for Lua errors",
+                         lambda token: self.create_lua_scan_worker(log_paths), resources=('disk',))
+
+    def create_lua_scan_worker(self, log_paths):
+        # Offsets берутся при старте задачи: предыдущее сканирование уже их обновило
+        worker = LuaLogScanWorker(log_paths, self.lua_log_offsets)
+        worker.scanned.connect(self.on_debug_logs_scanned)
+        return worker
+
+    def on_debug_logs_scanned(self, aggregator, offsets):
+        self.lua_log_offsets.update(offsets)
+        self.lua_errors.merge(aggregator)
+        self.refresh_lua_errors()
+
+    def clear_lua_errors(self):
+        self.lua_errors.clear()
+        self.lua_error_details.clear()
+        self.refresh_lua_errors()
+
+    def create_localnet_tab(self, layout):
+        """Серверы, управляемые по RCON: список слева, пачка команд и ответы справа."""
+        servers_layout = QVBoxLayout()
+        self.rcon_table = QTableWidget()
+        self.rcon_table.setColumnCount(4)
+        self.rcon_table.setHorizontalHeaderLabels(["Name", "Host", "Port", "Status"])
+        servers_layout.addWidget(self.rcon_table, stretch=1)
+
+        rcon_form_layout = QFormLayout()
+        self.rcon_name_edit = QLineEdit()
+        self.rcon_host_edit = QLineEdit("127.0.0.1")
+        self.rcon_port_edit = QLineEdit(str(DEFAULT_RCON_PORT))
+        self.rcon_password_edit = QLineEdit()
+        self.rcon_password_edit.setEchoMode(QLineEdit.Password)
+        rcon_form_layout.addRow("Name", self.rcon_name_edit)
+        rcon_form_layout.addRow("Host", self.rcon_host_edit)
+        rcon_form_layout.addRow("Port", self.rcon_port_edit)
+        rcon_form_layout.addRow("Password", self.rcon_password_edit)
+        servers_layout.addLayout(rcon_form_layout)
+
+        rcon_buttons_layout = QHBoxLayout()
+        add_rcon_button = QPushButton("Add")
+        add_local_rcon_button = QPushButton("Add From Server ini")
+        remove_rcon_button = QPushButton("Remove")
+        add_rcon_button.clicked.connect(self.add_rcon_server)
+        add_local_rcon_button.clicked.connect(self.add_local_rcon_server)
+        remove_rcon_button.clicked.connect(self.remove_rcon_server)
+        rcon_buttons_layout.addWidget(add_rcon_button)
+        rcon_buttons_layout.addWidget(add_local_rcon_button)
+        rcon_buttons_layout.addWidget(remove_rcon_button)
+        servers_layout.addLayout(rcon_buttons_layout)
+        layout.addLayout(servers_layout, stretch=1)
+
+        commands_layout = QVBoxLayout()
+        commands_layout.addWidget(QLabel("Commands (one per line)"))
+        self.rcon_commands_edit = QTextEdit()
+        self.rcon_commands_edit.setMaximumHeight(120)
+        commands_layout.addWidget(self.rcon_commands_edit)
+        send_buttons_layout = QHBoxLayout()
+        send_selected_button = QPushButton("Send to Selected")
+        send_all_button = QPushButton("Send to All")
+        send_selected_button.clicked.connect(self.send_rcon_to_selected)
+        send_all_button.clicked.connect(self.send_rcon_to_all)
+        send_buttons_layout.addWidget(send_selected_button)
+        send_buttons_layout.addWidget(send_all_button)
+        commands_layout.addLayout(send_buttons_layout)
+        self.rcon_output = QTextEdit()
+        self.rcon_output.setReadOnly(True)
+        commands_layout.addWidget(self.rcon_output, stretch=1)
+        layout.addLayout(commands_layout, stretch=2)
+
+        self.refresh_rcon_table()
+
+    def get_rcon_servers(self):
+        """Серверы из секций [RCON <имя>] config.ini."""
+        servers = []
+        for section in self.config.sections():
+            if section.startswith('RCON '):
+                servers.append({'name': section[len('RCON '):],
+                                'host': self.config.get(section, 'host', fallback='127.0.0.1'),
+                                'port': self.config.getint(section, 'port', fallback=DEFAULT_RCON_PORT),
+                                'password': self.config.get(section, 'password', fallback='')})
+        return servers
+
+    def refresh_rcon_table(self):
+        servers = self.get_rcon_servers()
+        self.rcon_table.setRowCount(len(servers))
+        for row_index, server in enumerate(servers):
+            values = [server['name'], server['host'], str(server['port']), self.rcon_status.get(server_key(server), '')]
+            for column, value in enumerate(values):
+                self.rcon_table.setItem(row_index, column, QTableWidgetItem(value))
+
+    def save_rcon_server(self, name, host, port, password):
+        section = f"RCON {name}"
+        if not self.config.has_section(section):
+            self.config.add_section(section)
+        self.config.set(section, 'host', host)
+        self.config.set(section, 'port', str(port))
+        self.config.set(section, 'password', password)
+        self.save_config()
+        logger.info(f"Saved RCON server {name} ({host}:{port})")
+        self.refresh_rcon_table()
+
+    def add_rcon_server(self):
+        name = self.rcon_name_edit.text().strip()
+        host = self.rcon_host_edit.text().strip()
+        try:
+            port = int(self.rcon_port_edit.text())
+        except ValueError:
+            QMessageBox.warning(self, "RCON", "Port must be a number.")
+            return
+        if not name or not host:
+            QMessageBox.warning(self, "RCON", "Name and host are required.")
+            return
+        self.save_rcon_server(name, host, port, self.rcon_password_edit.text())
+        self.rcon_password_edit.clear()
+
+    def add_local_rcon_server(self):
+        """Берет RCONPort / RCONPassword из ini текущего сервера."""
+        zomboid_directory = self.config.get('Paths', 'zomboid', fallback=self.zomboid_directory)
+        server_name = self.config.get('Server', 'name', fallback=DEFAULT_SERVER_NAME)
+        ini_path = get_server_ini_path(zomboid_directory, server_name)
+        try:
+            values = read_ini_values(ini_path, ('RCONPort', 'RCONPassword'))
+        except OSError as e:
+            QMessageBox.warning(self, "RCON", f"Cannot read {ini_path}: {e}")
+            return
+        if not values.get('RCONPassword'):
+            QMessageBox.warning(self, "RCON", f"RCONPassword is empty in {ini_path}, RCON is disabled.")
+            return
+        self.save_rcon_server(server_name, '127.0.0.1', int(values.get('RCONPort') or DEFAULT_RCON_PORT),
+                              values['RCONPassword'])
+
+    def remove_rcon_server(self):
+        row = self.rcon_table.currentRow()
+        if row < 0:
+            return
+        name = self.rcon_table.item(row, 0).text()
+        self.config.remove_section(f"RCON {name}")
+        self.save_config()
+        self.refresh_rcon_table()
+
+    def send_rcon_to_selected(self):
+        servers = self.get_rcon_servers()
+        rows = sorted({index.row() for index in self.rcon_table.selectedIndexes()})
+        self.send_rcon_commands([servers[row] for row in rows if row < len(servers)])
+
+    def send_rcon_to_all(self):
+        self.send_rcon_commands(self.get_rcon_servers())
+
+    def send_rcon_commands(self, servers):
+        commands = [line.strip() for line in self.rcon_commands_edit.toPlainText().splitlines() if line.strip()]
+        if not servers or not commands:
+            return
+        for server in servers:
+            self.rcon_status[server_key(server)] = "sending..."
+        self.refresh_rcon_table()
+        self.rcon_output.append(f"> {len(commands)} commands to {', '.join(server['name'] for server in servers)}")
+        logger.info(f"RCON batch of {len(commands)} commands to {len(servers)} servers")
+        self.rcon.send(servers, commands)
+
+    def on_rcon_result(self, key, responses):
+        self.rcon_status[key] = f"ok {datetime.now().strftime('%H:%M:%S')}"
+        for command, response in responses:
+            self.rcon_output.append(f"[{key}] > {command}\n{response}".rstrip())
+        self.refresh_rcon_table()
+
+    def on_rcon_error(self, key, message):
+        self.rcon_status[key] = f"error: {message}"
+        self.rcon_output.append(f"[{key}] error: {message}")
+        self.refresh_rcon_table()
+
+    def search_console_archive(self):
+        """Поиск по архиву консоли: за период или за конкретный день, по одному или всем серверам."""
+        text = self.archive_query_edit.text().strip()
+        if not text:
+            return
+        since = until = None
+        day = self.archive_day_edit.text().strip()
+        if day:
+            try:
+                since = datetime.strptime(day, '%Y-%m-%d').timestamp()
+            except ValueError:
+                QMessageBox.warning(self, "Console Archive", "Date must be YYYY-MM-DD.")
+                return
+            until = since + 86400
+        else:
+            period = ARCHIVE_PERIODS[self.archive_period_combobox.currentText()]
+            if period:
+                since = time.time() - period
+        server = self.archive_server_combobox.currentText()
+        server = server if server != "All servers" else None
+        self.archive_status_label.setText("Searching...")
+        # Ожидание записи и чтение сегментов (в т.ч. gzip) идут в задаче, окно не блокируется
+        self.jobs.submit("Search console archive",
+                         lambda token: self.create_archive_search_worker(text, server, since, until),
+                         resources=('console_archive',))
+
+    def create_archive_search_worker(self, text, server, since, until):
+        worker = ArchiveSearchWorker(self.console_archive, text, server, since, until)
+        worker.searched.connect(self.on_console_archive_searched)
+        return worker
+
+    def on_console_archive_searched(self, rows, elapsed):
+        self.archive_status_label.setText(f"{len(rows)} lines in {elapsed:.1f} ms")
+        self.archive_table.setRowCount(len(rows))
+        for row_index, (ts, server_name, line) in enumerate(rows):
+            self.archive_table.setItem(row_index, 0, QTableWidgetItem(
+                datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')))
+            self.archive_table.setItem(row_index, 1, QTableWidgetItem(server_name))
+            self.archive_table.setItem(row_index, 2, QTableWidgetItem(line))
+        self.refresh_archive_servers()
+
+    def refresh_archive_servers(self):
+        current = self.archive_server_combobox.currentText()
+        self.archive_server_combobox.clear()
+        self.archive_server_combobox.addItems(["All servers"] + self.console_archive.servers())
+        index = self.archive_server_combobox.findText(current)
+        if index >= 0:
+            self.archive_server_combobox.setCurrentIndex(index)
+
+    def run_scheduler(self):
+        """Тик колеса таймеров: выполняет наступившие задачи расписания и разовые вызовы."""
+        events = self.scheduler.tick()
+        for event in events:
+            kind, payload = event[0], event[1]
+            if kind == 'call':
+                payload()
+            elif kind == 'warn':
+                self.send_scheduled_command(f'servermsg "{self.scheduler.restart_message(payload, event[2])}"')
+            elif kind == 'restart':
+                self.graceful_restart()
+            else:
+                self.run_scheduled_job(payload)
+        if any(event[0] != 'call' for event in events):
+            self.refresh_schedule_table()
+
+    def run_scheduled_job(self, job):
+        action = job['action']
+        logger.info(f"Scheduled job {job['id']}: {action}")
+        if action == 'save':
+            self.send_scheduled_command("save")
+        elif action == 'command':
+            self.send_scheduled_command(job['command'])
+        elif action == 'broadcast':
+            self.send_scheduled_command(f'servermsg "{job["message"]}"')
+        elif action == 'restart':
+            self.graceful_restart()
+        elif action == 'restart_if_mods_updated':
+            self.check_mod_updates(job)
+
+    def send_scheduled_command(self, command):
+        """Команда расписания; если сервер не запущен - пропускается."""
+        if not self.process or self.process.state() != QProcess.Running:
+            logger.info(f"Scheduled command skipped, server not running: {command}")
+            return False
+        self.console.append(f"> {command} (scheduled)")
+        self.process.write(f"{command}\n".encode())
+        return True
+
+    def graceful_restart(self):
+        """save + quit, после выхода процесса сервер запускается снова (on_server_process_finished)."""
+        if self.send_scheduled_command("save"):
+            self.restart_after_exit = True
+            self.send_scheduled_command("quit")
+
+    def check_mod_updates(self, job):
+        """Сравнивает время обновления активных модов в Workshop со скачанными сервером."""
+        if not self.process or self.process.state() != QProcess.Running or self.update_check_job is not None:
+            return
+        workshop_ids = list(dict.fromkeys(str(workshop_id) for mod in self.mod_store.active
+                                          for workshop_id in mod.get('Workshop ID', [])))
+        if not workshop_ids:
+            return
+        self.update_check_job = job
+        server_directory = self.server_directory
+        self.jobs.submit("Check Workshop updates",
+                         lambda token: self.create_update_check_worker(server_directory, workshop_ids),
+                         resources=('http',))
+
+    def create_update_check_worker(self, server_directory, workshop_ids):
+        worker = ModUpdateCheckWorker(server_directory, workshop_ids)
+        worker.checked.connect(self.on_mod_updates_checked)
+        worker.finished.connect(self.on_mod_update_check_finished)
+        return worker
+
+    def on_mod_updates_checked(self, updated):
+        job = self.update_check_job
+        if updated and job is not None:
+            self.console.append(f"Workshop updates found for {len(updated)} items, restarting with countdown.")
+            self.scheduler.start_countdown(job)
+
+    def on_mod_update_check_finished(self):
+        self.update_check_job = None
+
+    def refresh_schedule_table(self):
+        jobs = self.scheduler.server_jobs()
+        self.schedule_table.setRowCount(len(jobs))
+        for row_index, job in enumerate(jobs):
+            next_run = self.scheduler.next_runs.get(job['id'])
+            values = [str(job['id']), job['action'], describe_schedule(job),
+                      job.get('command') or job.get('message') or '',
+                      datetime.fromtimestamp(next_run).strftime('%Y-%m-%d %H:%M:%S') if next_run else '',
+                      "yes" if job.get('enabled', True) else "no"]
+            for column, value in enumerate(values):
+                self.schedule_table.setItem(row_index, column, QTableWidgetItem(value))
+
+    def selected_schedule_job_id(self):
+        row = self.schedule_table.currentRow()
+        if row < 0:
+            return None
+        return int(self.schedule_table.item(row, 0).text())
+
+    def add_schedule_job(self):
+        action = self.schedule_action_combobox.currentText()
+        argument = self.schedule_argument_edit.text().strip()
+        if action in ('command', 'broadcast') and not argument:
+            QMessageBox.warning(self, "Scheduler", f"Action '{action}' needs a command or message.")
+            return
+        try:
+            job = self.scheduler.add_job(action, self.schedule_when_edit.text(), argument)
+        except ValueError as e:
+            QMessageBox.warning(self, "Scheduler", str(e))
+            return
+        logger.info(f"Added scheduled job {job['id']}: {action} {describe_schedule(job)}")
+        self.schedule_when_edit.clear()
+        self.schedule_argument_edit.clear()
+        self.refresh_schedule_table()
+
+    def toggle_schedule_job(self):
+        job_id = self.selected_schedule_job_id()
+        if job_id is not None:
+            self.scheduler.set_enabled(job_id, not self.scheduler.jobs[job_id].get('enabled', True))
+            self.refresh_schedule_table()
+
+    def remove_schedule_job(self):
+        job_id = self.selected_schedule_job_id()
+        if job_id is not None:
+            self.scheduler.remove_job(job_id)
+            self.refresh_schedule_table()
+
+    def update_online_players(self, event, name):
+        """Обновляет Player List по событиям подключения/отключения из консоли."""
+        if event == 'join':
+            self.online_players.add(name)
+        else:
+            self.online_players.discard(name)
+        self.player_list.clear()
+        self.player_list.addItems(sorted(self.online_players))
+        registry.set_gauge('pz_players_online', len(self.online_players), 'Players online according to console events')
+
     def quit_server(self):
         if self.process and self.process.state() == QProcess.Running:
             self.process.write(b"quit\n")
@@ -1320,23 +2588,10 @@ class MainWindow(QMainWindow):
 
     def test_start_pz_server(self):
         self.load_config()  # Ensure we have the latest config values
+        self.quit_after_start = True
         self.server_directory = self.config.get('Paths', 'pzserver', fallback="C:/default/server/directory")
         server_option = self.server_start_combobox.currentText()
-        server_file = f"{server_option}.bat"
-
-        if not os.path.exists(os.path.join(self.server_directory, server_file)):
-            error_message = f"Error: {server_file} not found in {self.server_directory}."
-            self.server_setup_console.append(error_message)
-            logger.error(error_message)
-            return
-
-        self.process = QProcess(self)
-        self.process.setProgram(os.path.join(self.server_directory, server_file))
-        self.process.setProcessChannelMode(QProcess.MergedChannels)
-        self.process.readyReadStandardOutput.connect(self.display_output)
-        self.process.readyReadStandardError.connect(self.display_output)
-        logger.info(f"Starting server with {server_file} in {self.server_directory}")
-        self.process.start()
+        self.launch_server_process(server_option, self.server_setup_console)
 
     def open_settings(self):
         settings_dialog = QDialog(self)
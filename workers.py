@@ -1,10 +1,27 @@
+import os
+import time
 import logging
 from PySide6.QtCore import QObject, Signal
 from setup import install_steamcmd, install_pz_server
+from mod_indexer import scan_workshop_content, read_installed_workshop_times, get_workshop_content_dir
+from network_manager import fetch_workshop_update_times
+from mod_conflicts import check_active_mods
+from steamcmd_downloader import get_steamcmd_executable, download_workshop_items, download_items_in_session
+from steamcmd_session import session_pool, SteamCMDSessionError
+from content_store import dedupe_tree, dedupe_paths, unshare_paths, verify_store
+from backup_manager import create_snapshot, prune_snapshots, restore_snapshot
+from chunk_pruner import prune_chunks
+from metrics_exporter import registry
+from rcon_client import RconLoop, RconPool, server_key
+from lua_errors import LuaErrorAggregator, read_log_increment
+
+STEAMCMD_DURATION_METRIC = 'pz_steamcmd_operation_duration_seconds'
+STEAMCMD_DURATION_HELP = 'Duration of SteamCMD operations'
 
 class Worker(QObject):
     finished = Signal()
     log = Signal(str)
+    failed = Signal(str)
 
     def __init__(self, program_directory, user_directory, config_path):
         super().__init__()
@@ -13,29 +30,396 @@ class Worker(QObject):
         self.config_path = config_path
 
     def run(self):
+        started = time.monotonic()
         try:
             self.log.emit(f"Starting SteamCMD installation in {self.user_directory}")
-            install_steamcmd(self.log.emit, self.program_directory, self.user_directory, self.config_path)
+            success = install_steamcmd(self.log.emit, self.program_directory, self.user_directory, self.config_path)
+            registry.observe(STEAMCMD_DURATION_METRIC, time.monotonic() - started, STEAMCMD_DURATION_HELP,
+                             operation='install_steamcmd')
+            if not success:
+                # JobManager повторит задачу, если для нее заданы retries
+                self.failed.emit("SteamCMD installation failed")
         except Exception as e:
             logging.error(f"Error during SteamCMD installation: {e}")
             self.log.emit(f"Error during SteamCMD installation: {e}")
+            self.failed.emit(str(e))
         self.finished.emit()
 
 class PZServerWorker(QObject):
     finished = Signal()
     log = Signal(str)
+    failed = Signal(str)
 
-    def __init__(self, steamcmd_path, install_dir, config_path):
+    def __init__(self, steamcmd_path, install_dir, config_path, force_validate=False, cancel_token=None):
         super().__init__()
         self.steamcmd_path = steamcmd_path
         self.install_dir = install_dir
         self.config_path = config_path
+        self.force_validate = force_validate
+        self.cancel_token = cancel_token
 
     def run(self):
+        started = time.monotonic()
         try:
             self.log.emit(f"Starting Project Zomboid server installation in {self.install_dir} using SteamCMD from {self.steamcmd_path}")
-            install_pz_server(self.log.emit, self.steamcmd_path, self.install_dir, self.config_path)
+            success = install_pz_server(self.log.emit, self.steamcmd_path, self.install_dir, self.config_path,
+                                        self.force_validate, self.cancel_token)
+            registry.observe(STEAMCMD_DURATION_METRIC, time.monotonic() - started, STEAMCMD_DURATION_HELP,
+                             operation='app_update')
+            if not success:
+                self.failed.emit("Project Zomboid server installation failed")
         except Exception as e:
             logging.error(f"Error during Project Zomboid server installation: {e}")
             self.log.emit(f"Error during Project Zomboid server installation: {e}")
+            self.failed.emit(str(e))
+        self.finished.emit()
+
+class ModIndexWorker(QObject):
+    finished = Signal()
+    log = Signal(str)
+    failed = Signal(str)
+    indexed = Signal(object)
+
+    def __init__(self, content_dir):
+        super().__init__()
+        self.content_dir = content_dir
+
+    def run(self):
+        try:
+            self.log.emit(f"Scanning local Workshop content in {self.content_dir}")
+            entries, stats = scan_workshop_content(self.content_dir)
+            self.log.emit(f"Indexed {stats['total']} Workshop items "
+                          f"({stats['parsed']} parsed, {stats['cached']} from cache)")
+            self.indexed.emit(entries)
+        except Exception as e:
+            logging.error(f"Error during Workshop content scan: {e}")
+            self.log.emit(f"Error during Workshop content scan: {e}")
+            self.failed.emit(str(e))
+        self.finished.emit()
+
+class ModConflictWorker(QObject):
+    finished = Signal()
+    log = Signal(str)
+    failed = Signal(str)
+    report = Signal(object)
+
+    def __init__(self, load_order, local_paths, with_hashes=True):
+        super().__init__()
+        self.load_order = load_order
+        self.local_paths = local_paths
+        self.with_hashes = with_hashes
+
+    def run(self):
+        try:
+            self.log.emit(f"Checking file conflicts across {len(self.load_order)} active mods")
+            self.report.emit(check_active_mods(self.load_order, self.local_paths, self.with_hashes))
+        except Exception as e:
+            logging.error(f"Error during conflict check: {e}")
+            self.log.emit(f"Error during conflict check: {e}")
+            self.failed.emit(str(e))
+        self.finished.emit()
+
+class WorkshopDownloadWorker(QObject):
+    finished = Signal()
+    log = Signal(str)
+    failed = Signal(str)
+    progress = Signal(int)
+    downloaded = Signal(object)
+
+    def __init__(self, steamcmd_path, install_dir, workshop_ids, cancel_token=None, store_dir=None,
+                 use_reflink=False):
+        super().__init__()
+        self.steamcmd_path = steamcmd_path
+        self.install_dir = install_dir
+        self.workshop_ids = workshop_ids
+        self.cancel_token = cancel_token
+        self.store_dir = store_dir
+        self.use_reflink = use_reflink
+        self.completed = 0
+
+    def report_item(self, text):
+        """Лог загрузки + процент выполненных предметов."""
+        self.log.emit(text)
+        if text.startswith("Workshop item "):
+            self.completed += 1
+            self.progress.emit(int(self.completed * 100 / max(1, len(self.workshop_ids))))
+
+    def run(self):
+        started = time.monotonic()
+        try:
+            self.log.emit(f"Downloading {len(self.workshop_ids)} Workshop items to {self.install_dir}")
+            item_dirs = [os.path.join(get_workshop_content_dir(self.install_dir), workshop_id)
+                         for workshop_id in self.workshop_ids]
+            if self.store_dir:
+                # Copy-on-update только для папок скачиваемых предметов
+                copied = unshare_paths(item_dirs, self.store_dir)
+                self.log.emit(f"Unshared {copied} deduplicated files before download.")
+            steamcmd_exe = get_steamcmd_executable(self.steamcmd_path)
+            try:
+                session = session_pool.get(steamcmd_exe, self.install_dir)
+                results = download_items_in_session(session, self.workshop_ids, self.report_item, self.cancel_token)
+            except (OSError, TimeoutError, SteamCMDSessionError) as e:
+                if self.cancel_token is not None and self.cancel_token.is_cancelled():
+                    raise  # сессию убили при выходе: запасной SteamCMD не запускаем
+                self.log.emit(f"SteamCMD session unavailable ({e}), using batch download.")
+                results = download_workshop_items(steamcmd_exe, self.install_dir, self.workshop_ids, self.log.emit)
+            failed = [workshop_id for workshop_id, (ok, _) in results.items() if not ok]
+            # Повтор задачи (тот же список) скачивает только неудавшиеся предметы
+            self.workshop_ids[:] = [workshop_id for workshop_id in self.workshop_ids
+                                    if not results.get(workshop_id, (False, None))[0]]
+            self.log.emit(f"Workshop download finished: {len(results) - len(failed)} ok, {len(failed)} failed")
+            registry.observe(STEAMCMD_DURATION_METRIC, time.monotonic() - started, STEAMCMD_DURATION_HELP,
+                             operation='workshop_download')
+            if self.store_dir:
+                stats = dedupe_paths(item_dirs, self.store_dir, use_reflink=self.use_reflink)
+                self.log.emit(f"Deduplicated Workshop items: {stats['linked']} linked")
+            self.downloaded.emit(results)
+            if failed:
+                self.failed.emit(f"{len(failed)} Workshop items failed")
+        except Exception as e:
+            logging.error(f"Error during Workshop download: {e}")
+            self.log.emit(f"Error during Workshop download: {e}")
+            self.failed.emit(str(e))
+        self.finished.emit()
+
+class ContentStoreWorker(QObject):
+    finished = Signal()
+    log = Signal(str)
+    failed = Signal(str)
+
+    def __init__(self, roots, store_dir, repair=True, cancel_token=None, use_reflink=False):
+        super().__init__()
+        self.roots = roots
+        self.store_dir = store_dir
+        self.repair = repair
+        self.cancel_token = cancel_token
+        self.use_reflink = use_reflink
+
+    def run(self):
+        try:
+            for root in self.roots:
+                if self.cancel_token is not None and self.cancel_token.is_cancelled():
+                    self.log.emit("Content deduplication cancelled.")
+                    break
+                self.log.emit(f"Deduplicating {root} into {self.store_dir}")
+                stats = dedupe_tree(root, self.store_dir, use_reflink=self.use_reflink)
+                self.log.emit(f"{root}: {stats['files']} files, {stats['linked']} linked, "
+                              f"{stats['bytes_saved'] / 1024 / 1024:.1f} MB saved")
+            result = verify_store(self.store_dir, repair=self.repair)
+            self.log.emit(f"Content store verified: {result['objects']} objects, {len(result['corrupt'])} corrupt, "
+                          f"{result['unreferenced']} unreferenced")
+            for path in result['affected_files']:
+                self.log.emit(f"Corrupt content, run Force validate for: {path}")
+        except Exception as e:
+            logging.error(f"Error during content deduplication: {e}")
+            self.log.emit(f"Error during content deduplication: {e}")
+            self.failed.emit(str(e))
+        self.finished.emit()
+
+class BackupWorker(QObject):
+    finished = Signal()
+    log = Signal(str)
+    failed = Signal(str)
+
+    def __init__(self, save_dir, backup_root, keep_last=24, keep_daily=7):
+        super().__init__()
+        self.save_dir = save_dir
+        self.backup_root = backup_root
+        self.keep_last = keep_last
+        self.keep_daily = keep_daily
+
+    def run(self):
+        try:
+            self.log.emit(f"Backing up {self.save_dir} to {self.backup_root}")
+            stats = create_snapshot(self.save_dir, self.backup_root)
+            self.log.emit(f"Backup {stats['id']}: {stats['changed']} of {stats['files']} files changed, "
+                          f"{stats['stored_bytes'] / 1024 / 1024:.1f} MB stored")
+            removed, freed = prune_snapshots(self.backup_root, self.keep_last, self.keep_daily)
+            if removed:
+                self.log.emit(f"Pruned {len(removed)} old backups, freed {freed / 1024 / 1024:.1f} MB")
+        except Exception as e:
+            logging.error(f"Error during world backup: {e}")
+            self.log.emit(f"Error during world backup: {e}")
+            self.failed.emit(str(e))
+        self.finished.emit()
+
+class RestoreWorker(QObject):
+    finished = Signal()
+    log = Signal(str)
+    failed = Signal(str)
+
+    def __init__(self, save_dir, backup_root, snapshot_id):
+        super().__init__()
+        self.save_dir = save_dir
+        self.backup_root = backup_root
+        self.snapshot_id = snapshot_id
+
+    def run(self):
+        try:
+            if os.path.isdir(self.save_dir):
+                # Текущий мир тоже становится точкой восстановления: ошибочный restore можно откатить
+                stats = create_snapshot(self.save_dir, self.backup_root)
+                self.log.emit(f"Safety backup {stats['id']} of the current world created")
+            count = restore_snapshot(self.backup_root, self.snapshot_id, self.save_dir)
+            self.log.emit(f"Restored backup {self.snapshot_id} ({count} files).")
+        except Exception as e:
+            logging.error(f"Error during backup restore: {e}")
+            self.log.emit(f"Error during backup restore: {e}")
+            self.failed.emit(str(e))
+        self.finished.emit()
+
+class ChunkPruneWorker(QObject):
+    finished = Signal()
+    log = Signal(str)
+    failed = Signal(str)
+    result = Signal(object)
+
+    def __init__(self, save_dir, regions, dry_run, backup_dir, report_path):
+        super().__init__()
+        self.save_dir = save_dir
+        self.regions = regions
+        self.dry_run = dry_run
+        self.backup_dir = backup_dir
+        self.report_path = report_path
+
+    def run(self):
+        try:
+            mode = "Dry run" if self.dry_run else "Pruning"
+            self.log.emit(f"{mode}: chunks of {self.save_dir} outside {len(self.regions)} protected regions")
+            stats = prune_chunks(self.save_dir, self.regions, self.dry_run, self.backup_dir, self.report_path)
+            self.log.emit(f"{mode}: {stats['pruned']} of {stats['scanned']} chunks, "
+                          f"{stats['bytes'] / 1024 / 1024:.1f} MB (report: {self.report_path})")
+            self.result.emit(stats)
+        except Exception as e:
+            logging.error(f"Error during chunk pruning: {e}")
+            self.log.emit(f"Error during chunk pruning: {e}")
+            self.failed.emit(str(e))
+        self.finished.emit()
+
+class ModUpdateCheckWorker(QObject):
+    finished = Signal()
+    log = Signal(str)
+    failed = Signal(str)
+    checked = Signal(object)
+
+    def __init__(self, server_directory, workshop_ids):
+        super().__init__()
+        self.server_directory = server_directory
+        self.workshop_ids = workshop_ids
+
+    def run(self):
+        try:
+            installed = read_installed_workshop_times(self.server_directory)
+            remote = fetch_workshop_update_times(self.workshop_ids)
+            # Не скачанные сервером предметы тоже считаем обновленными: он скачает их при запуске
+            updated = [workshop_id for workshop_id in self.workshop_ids
+                       if remote.get(workshop_id, 0) > installed.get(workshop_id, 0)]
+            self.log.emit(f"Workshop update check: {len(updated)} of {len(self.workshop_ids)} items updated")
+            self.checked.emit(updated)
+        except Exception as e:
+            logging.error(f"Error during Workshop update check: {e}")
+            self.log.emit(f"Error during Workshop update check: {e}")
+            self.failed.emit(str(e))
         self.finished.emit()
+
+class LuaLogScanWorker(QObject):
+    finished = Signal()
+    log = Signal(str)
+    failed = Signal(str)
+    scanned = Signal(object, object)  # LuaErrorAggregator, {путь: offset}
+
+    def __init__(self, log_paths, offsets):
+        super().__init__()
+        self.log_paths = log_paths
+        self.offsets = dict(offsets)
+
+    def run(self):
+        # Свой агрегатор: общий читается окном, ошибки сливаются в него в главном потоке
+        aggregator = LuaErrorAggregator()
+        try:
+            for path in self.log_paths:
+                # У каждого файла свой агрегатор, чтобы незаконченный блок не продолжился строками другого файла
+                file_errors = LuaErrorAggregator()
+                try:
+                    self.offsets[path] = read_log_increment(path, file_errors, self.offsets.get(path, 0))
+                    aggregator.merge(file_errors)
+                except OSError as e:
+                    logging.error(f"Failed to read {path}: {e}")
+                    self.log.emit(f"Failed to read {path}: {e}")
+            self.scanned.emit(aggregator, self.offsets)
+        except Exception as e:
+            logging.error(f"Error during DebugLog scan: {e}")
+            self.log.emit(f"Error during DebugLog scan: {e}")
+            self.failed.emit(str(e))
+        self.finished.emit()
+
+
+class ArchiveSearchWorker(QObject):
+    finished = Signal()
+    log = Signal(str)
+    failed = Signal(str)
+    searched = Signal(object, float)  # [(время, сервер, строка)], мс на поиск
+
+    def __init__(self, archive, text, server, since, until):
+        super().__init__()
+        self.archive = archive
+        self.text = text
+        self.server = server
+        self.since = since
+        self.until = until
+
+    def run(self):
+        try:
+            # Ждем запись только что пришедших строк здесь, а не в окне: поток индексации может быть занят
+            self.archive.flush(timeout=2)
+            started = time.perf_counter()
+            rows = self.archive.search(self.text, self.server, self.since, self.until)
+            self.searched.emit(rows, (time.perf_counter() - started) * 1000)
+        except Exception as e:
+            logging.error(f"Error during console archive search: {e}")
+            self.log.emit(f"Error during console archive search: {e}")
+            self.failed.emit(str(e))
+        finally:
+            # Поток задачи завершается, его соединение с архивом больше не нужно
+            self.archive.close_reader()
+        self.finished.emit()
+
+class RconBridge(QObject):
+    """
+    Мост между циклом asyncio RCON и Qt: сигналы испускаются из потока цикла и
+    доставляются подписчикам в главном потоке через очередь событий.
+    """
+    result = Signal(str, object)  # host:port, [(команда, ответ)]
+    error = Signal(str, str)  # host:port, текст ошибки
+    log = Signal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = RconPool()
+        self.rcon_loop = RconLoop()
+        self.rcon_loop.start()
+
+    def send(self, servers, commands):
+        """Пачка команд на каждый сервер; серверы обрабатываются параллельно, по одному соединению на каждый."""
+        for server in servers:
+            future = self.rcon_loop.submit(self.pool.execute(server, commands))
+            future.add_done_callback(self._make_callback(server, commands))
+
+    def _make_callback(self, server, commands):
+        key = server_key(server)
+        started = time.monotonic()
+
+        def done(future):
+            registry.observe('pz_rcon_batch_duration_seconds', time.monotonic() - started,
+                             'Duration of RCON command batches')
+            try:
+                responses = future.result()
+            except Exception as e:
+                logging.error(f"RCON {key}: {e}")
+                self.error.emit(key, str(e))
+                return
+            self.result.emit(key, list(zip(commands, responses)))
+        return done
+
+    def close(self):
+        self.rcon_loop.stop(self.pool.close_all())